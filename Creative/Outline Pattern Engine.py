@@ -21,10 +21,15 @@ import math
 import random
 import traceback
 import time
+import os
+import sys
 from collections import defaultdict
 
-# Cache para longitudes de curva calculadas
-_curve_length_cache = {}
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import flatten
+
 
 def debug_message(msg):
     """Print debug message with timestamp"""
@@ -54,74 +59,6 @@ def distance_between_points(p1, p2):
         debug_error(f"Error in distance_between_points: {e}")
         return 0
 
-def identify_segment_type(path, i):
-    """Identify the type of segment at given index"""
-    try:
-        nodes = path.nodes
-        current_node = nodes[i]
-        next_node = nodes[(i + 1) % len(nodes)]
-        if current_node.type == GSOFFCURVE:
-            return "offcurve"
-        if next_node.type == GSOFFCURVE:
-            return "curve_start"
-        return "line"
-    except Exception as e:
-        debug_error(f"Error in identify_segment_type: {e}")
-        return "unknown"
-
-def get_curve_points(path, start_index):
-    """Get the four points defining a bezier curve"""
-    try:
-        nodes = path.nodes
-        count = len(nodes)
-        p0 = nodes[start_index].position
-        p1 = nodes[(start_index + 1) % count].position
-        p2 = nodes[(start_index + 2) % count].position
-        p3 = nodes[(start_index + 3) % count].position
-        return p0, p1, p2, p3
-    except Exception as e:
-        debug_error(f"Error in get_curve_points: {e}")
-        return None, None, None, None
-
-def bezier_point_at_t(p0, p1, p2, p3, t):
-    """Calculate point on bezier curve at parameter t (optimized)"""
-    try:
-        u = 1 - t
-        u2 = u * u
-        u3 = u2 * u
-        t2 = t * t
-        t3 = t2 * t
-        
-        x = u3 * p0.x + 3 * u2 * t * p1.x + 3 * u * t2 * p2.x + t3 * p3.x
-        y = u3 * p0.y + 3 * u2 * t * p1.y + 3 * u * t2 * p2.y + t3 * p3.y
-        return NSPoint(x, y)
-    except Exception as e:
-        debug_error(f"Error in bezier_point_at_t: {e}")
-        return NSPoint(0, 0)
-
-def approximate_curve_length(p0, p1, p2, p3, steps=10):
-    """Approximate the length of a bezier curve (optimized with fewer steps)"""
-    try:
-        # Usar caché para evitar recalcular la misma curva
-        cache_key = (p0.x, p0.y, p1.x, p1.y, p2.x, p2.y, p3.x, p3.y)
-        if cache_key in _curve_length_cache:
-            return _curve_length_cache[cache_key]
-        
-        length = 0.0
-        prev_x, prev_y = p0.x, p0.y
-        
-        for s in range(1, steps + 1):
-            t = s / float(steps)
-            cur = bezier_point_at_t(p0, p1, p2, p3, t)
-            length += math.hypot(cur.x - prev_x, cur.y - prev_y)
-            prev_x, prev_y = cur.x, cur.y
-        
-        _curve_length_cache[cache_key] = length
-        return length
-    except Exception as e:
-        debug_error(f"Error in approximate_curve_length: {e}")
-        return 0
-
 def parse_irregular_values(text, default):
     """Parse comma-separated values for irregular spacing/diameter"""
     if not text or not text.strip():
@@ -289,87 +226,6 @@ def place_glyph_at_point(target_layer, glyph_layer, center_x, center_y):
     except Exception as e:
         debug_error(f"Error placing glyph at point: {e}")
 
-def calculate_path_length(path):
-    """Calculate total length of a path (optimized)"""
-    try:
-        nodes = list(path.nodes)
-        count = len(nodes)
-        
-        if count < 2:
-            return 0
-            
-        total_length = 0.0
-        i = 0
-        
-        while i < count:
-            node_type = identify_segment_type(path, i)
-            
-            if node_type == "line":
-                p0 = nodes[i].position
-                p1 = nodes[(i + 1) % count].position
-                total_length += math.hypot(p1.x - p0.x, p1.y - p0.y)
-                i += 1
-            elif node_type == "curve_start":
-                p0, p1, p2, p3 = get_curve_points(path, i)
-                if p0 and p1 and p2 and p3:
-                    total_length += approximate_curve_length(p0, p1, p2, p3, steps=8)
-                i += 3
-            else:
-                i += 1
-                
-        return total_length
-    except Exception as e:
-        debug_error(f"Error calculating path length: {e}")
-        return 0
-
-def get_point_at_distance(path, target_distance):
-    """Get point on path at specified distance from start (optimized)"""
-    try:
-        nodes = list(path.nodes)
-        count = len(nodes)
-        
-        if count < 2 or target_distance < 0:
-            return None
-            
-        accumulated = 0.0
-        i = 0
-        
-        while i < count:
-            node_type = identify_segment_type(path, i)
-            
-            if node_type == "line":
-                p0 = nodes[i].position
-                p1 = nodes[(i + 1) % count].position
-                seg_len = math.hypot(p1.x - p0.x, p1.y - p0.y)
-                
-                if accumulated + seg_len >= target_distance:
-                    t = (target_distance - accumulated) / seg_len if seg_len > 0 else 0
-                    x = p0.x + t * (p1.x - p0.x)
-                    y = p0.y + t * (p1.y - p0.y)
-                    return NSPoint(x, y)
-                
-                accumulated += seg_len
-                i += 1
-                
-            elif node_type == "curve_start":
-                p0, p1, p2, p3 = get_curve_points(path, i)
-                if p0 and p1 and p2 and p3:
-                    seg_len = approximate_curve_length(p0, p1, p2, p3, steps=8)
-                    
-                    if accumulated + seg_len >= target_distance:
-                        t = (target_distance - accumulated) / seg_len if seg_len > 0 else 0
-                        return bezier_point_at_t(p0, p1, p2, p3, t)
-                    
-                    accumulated += seg_len
-                i += 3
-            else:
-                i += 1
-                
-        return None
-    except Exception as e:
-        debug_error(f"Error getting point at distance: {e}")
-        return None
-
 def create_dotted_outline(layer, spacing_values, diameter_values, use_glyph=False, glyph_names=None, rotation_mode="none", rotation_value=0):
     """Create a new layer with dotted outline (circles or glyphs at irregular intervals) - OPTIMIZED"""
     
@@ -383,9 +239,6 @@ def create_dotted_outline(layer, spacing_values, diameter_values, use_glyph=Fals
         if not glyph_list:
             return None
 
-    # Clear cache for this run
-    _curve_length_cache.clear()
-    
     # Create new layer for the dotted outline
     try:
         dotted_layer = GSLayer()
@@ -403,25 +256,33 @@ def create_dotted_outline(layer, spacing_values, diameter_values, use_glyph=Fals
     # Pre-calculate path lengths and points for all paths
     for path in layer.paths:
         try:
-            total_length = calculate_path_length(path)
+            # Contorn aplanat una vegada: longitud d'arc real, no per paràmetre t
+            polyline = flatten.flattenPath(path)
+            if polyline is None:
+                continue
+            total_length = flatten.polylineLengths(polyline.points, polyline.closed)[-1]
             if total_length == 0:
                 continue
             
-            # Pre-calculate all points on this path
-            points_on_contour = []
+            # Pre-calculate all distances on this path
+            distances = []
             current_pos = 0.0
             
             while current_pos < total_length:
                 spacing = spacing_values[spacing_index % len(spacing_values)]
-                point = get_point_at_distance(path, current_pos)
-                if point:
-                    points_on_contour.append(point)
+                distances.append(current_pos)
                 current_pos += spacing
                 spacing_index += 1
                 
                 if spacing_index > 10000:  # Safety liApache2
                     break
             
+            # Un sol recorregut del polígon per a tots els punts
+            points_on_contour = [
+                NSPoint(x, y)
+                for x, y in flatten.pointsAtDistances(polyline.points, polyline.closed, distances)
+            ]
+            
             # Create elements at each point
             for point in points_on_contour:
                 diameter = diameter_values[diameter_index % len(diameter_values)]
@@ -18,7 +18,14 @@ from vanilla import *
 from AppKit import *
 from Foundation import NSPoint
 import objc
+import os
 import random
+import sys
+
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import flatten
 
 __doc__ = """
 Glyph Roughness Generator:
@@ -63,34 +70,6 @@ def get_curve_points(path, start_index):
     p3 = nodes[(start_index + 3) % count].position
     return p0, p1, p2, p3
 
-def bezier_point_at_t(p0, p1, p2, p3, t):
-    """Calculate point on bezier curve at parameter t"""
-    u = 1 - t
-    x = (
-        u**3 * p0.x +
-        3 * u**2 * t * p1.x +
-        3 * u * t**2 * p2.x +
-        t**3 * p3.x
-    )
-    y = (
-        u**3 * p0.y +
-        3 * u**2 * t * p1.y +
-        3 * u * t**2 * p2.y +
-        t**3 * p3.y
-    )
-    return NSPoint(x, y)
-
-def approximate_curve_length(p0, p1, p2, p3, steps=20):
-    """Approximate the length of a bezier curve"""
-    length = 0.0
-    prev = p0
-    for s in range(1, steps + 1):
-        t = s / float(steps)
-        cur = bezier_point_at_t(p0, p1, p2, p3, t)
-        length += distance_between_points(prev, cur)
-        prev = cur
-    return length
-
 def add_equidistant_nodes_mixed(path, spacing):
     """Add equidistant nodes to paths (lines and curves)"""
     if spacing <= 0:
@@ -136,7 +115,10 @@ def add_equidistant_nodes_mixed(path, spacing):
             
         elif seg_type == "curve_start":
             p0, p1, p2, p3 = get_curve_points(path, i)
-            seg_len = approximate_curve_length(p0, p1, p2, p3, steps=20)
+            # Corba aplanada adaptativament: nodes equidistants per longitud d'arc real
+            polyline = flatten.flattenSegment(
+                flatten.CURVE, [(p.x, p.y) for p in (p0, p1, p2, p3)])
+            seg_len = flatten.polylineLengths(polyline, False)[-1]
             
             if seg_len <= spacing:
                 continue
@@ -145,12 +127,11 @@ def add_equidistant_nodes_mixed(path, spacing):
             if num <= 0:
                 continue
                 
+            distances = [seg_len * k / (num + 1) for k in range(1, num + 1)]
             new_nodes = []
-            for k in range(1, num + 1):
-                t = float(k) / (num + 1)
-                pos = bezier_point_at_t(p0, p1, p2, p3, t)
+            for x, y in flatten.pointsAtDistances(polyline, False, distances):
                 n = GSNode()
-                n.position = pos
+                n.position = NSPoint(x, y)
                 n.type = GSCURVE
                 new_nodes.append(n)
                 
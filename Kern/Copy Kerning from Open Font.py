@@ -7,6 +7,22 @@
 
 import GlyphsApp
 import vanilla
+import os
+import sys
+
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import merge
+
+# Ordre del desplegable de conflictes
+POLICY_TITLES = [
+    ("Overwrite", merge.OVERWRITE),
+    ("Keep existing", merge.KEEP),
+    ("Larger value", merge.MAX),
+    ("Smaller value", merge.MIN),
+    ("Average", merge.AVERAGE),
+]
 
 class CopyKerningFromFont(object):
 
@@ -45,7 +61,7 @@ class CopyKerningFromFont(object):
         self.scroll_height = y + 10
 
         # --- ALTURA DINÁMICA ---
-        window_height = min(self.scroll_height + 170, 700)
+        window_height = min(self.scroll_height + 200, 700)
 
         self.w = vanilla.FloatingWindow((320, window_height), "Copy Kerning from Open Font")
 
@@ -73,7 +89,7 @@ class CopyKerningFromFont(object):
 
         # --- SCROLL (FIX GLYPHS) ---
         self.w.scroll = vanilla.ScrollView(
-            (10, 10, -10, window_height - 150),
+            (10, 10, -10, window_height - 180),
             self.inner.getNSView()
         )
 
@@ -81,17 +97,23 @@ class CopyKerningFromFont(object):
         self.select_all_state = True
 
         self.w.select_all = vanilla.Button(
-            (10, window_height - 130, 140, 30),
+            (10, window_height - 160, 140, 30),
             "Select All",
             callback=self.SelectAllCallback
         )
 
         self.w.radio = vanilla.RadioGroup(
-            (10, window_height - 95, -10, 60),
+            (10, window_height - 125, -10, 60),
             ["Current selected master", "All masters", "Selected masters"]
         )
         self.w.radio.set(0)
 
+        self.w.policy_label = vanilla.TextBox((10, window_height - 60, 80, 20), "Conflicts:")
+        self.w.policy = vanilla.PopUpButton(
+            (90, window_height - 62, -10, 20),
+            [title for title, _ in POLICY_TITLES]
+        )
+
         self.w.apply = vanilla.Button(
             (10, window_height - 35, -10, 30),
             "Apply",
@@ -140,25 +162,20 @@ class CopyKerningFromFont(object):
             for font in self.source_fonts:
                 for m in font.masters:
                     if m.id == self.current_master.id:
-                        masters_to_copy.append((font, m))
+                        masters_to_copy.append((font, m, self.current_master))
                         break
 
-        elif option == 1:
-            for font in self.source_fonts:
-                for m in font.masters:
-                    target = next(
-                        (tm for tm in self.current_font.masters if tm.name == m.name),
-                        None
-                    )
-                    if target:
-                        masters_to_copy.append((font, m, target))
-
         else:
-            for font, m in self.GetSelectedMasters():
-                target = next(
-                    (tm for tm in self.current_font.masters if tm.name == m.name),
-                    None
-                )
+            # Masters del destí per nom, calculat un cop per font d'origen
+            if option == 1:
+                selected = [(font, m) for font in self.source_fonts for m in font.masters]
+            else:
+                selected = self.GetSelectedMasters()
+            matches = {}
+            for font, m in selected:
+                if font not in matches:
+                    matches[font] = merge.matchMasters(font, self.current_font)
+                target = matches[font].get(m.id)
                 if target:
                     masters_to_copy.append((font, m, target))
 
@@ -166,34 +183,30 @@ class CopyKerningFromFont(object):
             Glyphs.showNotification("Error", "No valid masters found.")
             return
 
+        # Pair by pair, keys translated to this font, everything in one undo step
+        policy = POLICY_TITLES[self.w.policy.get()][1]
+        merger = merge.KerningMerger(self.current_font, policy)
         total = 0
-
-        for item in masters_to_copy:
-            if option == 0:
-                font, sm = item
-                tm = self.current_master
-            else:
-                font, sm, tm = item
-
-            kerning = font.kerning.get(sm.id, {}) if font.kerning else {}
-
-            if not kerning:
+        for font, sm, tm in masters_to_copy:
+            if not font.kerning or not font.kerning.get(sm.id):
                 continue
+            merger.add(font, sm.id, tm.id)
+            total += 1
 
-            if self.current_font.kerning is None:
-                self.current_font.kerning = {}
-
-            if tm.id not in self.current_font.kerning:
-                self.current_font.kerning[tm.id] = {}
-
-            target_kern = self.current_font.kerning[tm.id]
-
-            for pair, value in kerning.items():
-                target_kern[pair] = value
+        report = merger.merge("Copy Kerning from Open Font")
 
-            total += 1
+        print(f"Copy Kerning from Open Font: {report.summary()}")
+        for conflict in report.conflicts[:50]:
+            print(f"  {conflict.left} {conflict.right}: {conflict.existing} vs {conflict.incoming} -> {conflict.result}")
+        if len(report.conflicts) > 50:
+            print(f"  ... {len(report.conflicts) - 50} more conflicts")
+        if report.missing:
+            print(f"  Keys not in this font: {', '.join(sorted(report.missing)[:30])}")
 
-        Glyphs.showNotification("Done", f"Kerning copied from {total} masters.")
+        Glyphs.showNotification(
+            "Done",
+            f"Kerning merged from {total} masters: {report.written} pairs, {len(report.conflicts)} conflicts."
+        )
         self.w.close()
 
 
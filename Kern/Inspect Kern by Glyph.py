@@ -7,9 +7,16 @@
 from __future__ import division, print_function, unicode_literals
 from GlyphsApp import Glyphs, Message
 import vanilla
+import os
 import re
+import sys
 import time
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex, scaling
+
 DEBUG = False
 
 
@@ -22,10 +29,10 @@ class InspectKernByGlyph(object):
             return
 
         self.w = vanilla.FloatingWindow(
-            (220, 315),
+            (220, 340),
             "Inspect Kern by Glyph",
-            minSize=(220, 315),
-            maxSize=(360, 315)
+            minSize=(220, 340),
+            maxSize=(360, 340)
         )
 
         self.w.text = vanilla.TextBox(
@@ -70,14 +77,20 @@ class InspectKernByGlyph(object):
             "10",
             sizeStyle="small"
         )
+        self.w.allMasters = vanilla.CheckBox(
+            (12, 205, -12, 20),
+            "All masters",
+            value=False,
+            sizeStyle="small"
+        )
         self.w.applyButton = vanilla.Button(
-            (12, 207, -12, 24),
-            "Apply to Active Master",
+            (12, 232, -12, 24),
+            "Apply Scale",
             callback=self.applyScale
         )
-        self.w.line2 = vanilla.HorizontalLine((12, 240, -12, 1))
+        self.w.line2 = vanilla.HorizontalLine((12, 265, -12, 1))
         self.w.deleteButton = vanilla.Button(
-            (12, 247, -12, 24),
+            (12, 272, -12, 24),
             "Delete in Active Master",
             callback=self.deleteKerning
         )
@@ -161,18 +174,6 @@ class InspectKernByGlyph(object):
             self.glyphNamesString(suffix)
         )
 
-    def keyForLeftGlyph(self, glyph):
-        keys = [glyph.name]
-        if glyph.rightKerningGroup:
-            keys.append("@MMK_L_%s" % glyph.rightKerningGroup)
-        return keys
-
-    def keyForRightGlyph(self, glyph):
-        keys = [glyph.name]
-        if glyph.leftKerningGroup:
-            keys.append("@MMK_R_%s" % glyph.leftKerningGroup)
-        return keys
-
     def representativeForLeftKey(self, key):
         if key in self._left_key_cache:
             return self._left_key_cache[key]
@@ -189,8 +190,10 @@ class InspectKernByGlyph(object):
                     if glyph.rightKerningGroup == group:
                         result = glyph.name
                         break
-        elif key in font.glyphs:
-            result = key
+        else:
+            name = self.resolveKerningKey(key)
+            if name in font.glyphs:
+                result = name
 
         self._left_key_cache[key] = result
         return result
@@ -211,8 +214,10 @@ class InspectKernByGlyph(object):
                     if glyph.leftKerningGroup == group:
                         result = glyph.name
                         break
-        elif key in font.glyphs:
-            result = key
+        else:
+            name = self.resolveKerningKey(key)
+            if name in font.glyphs:
+                result = name
 
         self._right_key_cache[key] = result
         return result
@@ -246,9 +251,9 @@ class InspectKernByGlyph(object):
             return key
 
         if isinstance(key, str) and len(key) == 36:
-            for glyph in font.glyphs:
-                if glyph.id == key:
-                    return glyph.name
+            name = fontIndex.indexForFont(font).nameForID(key)
+            if name:
+                return name
 
         return key
 
@@ -274,20 +279,15 @@ class InspectKernByGlyph(object):
             Message("No glyphs found", "Write at least one valid glyph name.")
             return None
 
+        # Keys of the glyphs (IDs, names, groups): Inspect, Apply and Delete share the same filter
         target_keys_by_name = {}
-        all_target_left_keys = set()
-        all_target_right_keys = set()
-
         for name in target_names:
-            glyph = font.glyphs[name]
-            left_keys = set(self.keyForLeftGlyph(glyph))
-            right_keys = set(self.keyForRightGlyph(glyph))
+            name_filter = scaling.KeyFilter.forGlyphs(font, [name])
             target_keys_by_name[name] = {
-                "left": left_keys,
-                "right": right_keys,
+                "left": name_filter.left,
+                "right": name_filter.right,
             }
-            all_target_left_keys.update(left_keys)
-            all_target_right_keys.update(right_keys)
+        key_filter = scaling.KeyFilter.forGlyphs(font, target_names)
 
         return {
             "font": font,
@@ -296,22 +296,20 @@ class InspectKernByGlyph(object):
             "target_names": target_names,
             "missing": missing,
             "target_keys_by_name": target_keys_by_name,
-            "all_target_left_keys": all_target_left_keys,
-            "all_target_right_keys": all_target_right_keys,
+            "key_filter": key_filter,
         }
 
     def matchingKerningEntries(self, context):
         font = context["font"]
         master_id = context["master_id"]
-        all_target_left_keys = context["all_target_left_keys"]
-        all_target_right_keys = context["all_target_right_keys"]
+        key_filter = context["key_filter"]
 
         entries = []
         kerning = font.kerning.get(master_id, {})
 
         for left_key, right_dict in kerning.items():
             for right_key, value in right_dict.items():
-                if left_key not in all_target_left_keys and right_key not in all_target_right_keys:
+                if not key_filter.matches(left_key, right_key):
                     continue
                 if value is None:
                     continue
@@ -463,27 +461,20 @@ class InspectKernByGlyph(object):
             operation_name = "Decrease"
 
         font = context["font"]
-        master_id = context["master_id"]
-        entries = self.matchingKerningEntries(context)
+        if self.w.allMasters.get():
+            master_ids = [m.id for m in font.masters]
+        else:
+            master_ids = [context["master_id"]]
 
-        if not entries:
+        # Same key filter as Inspect and Delete; every master in one undo step
+        plan = scaling.planScale(font, dict((mid, factor) for mid in master_ids), context["key_filter"], skipUnchanged=False)
+
+        if not any(plan.values()):
             Message("Info", "No kerning pairs found for: %s" % ", ".join(context["target_names"]))
             return
 
-        updated = 0
-        font.disableUpdateInterface()
-        try:
-            for left_key, right_key, value in entries:
-                left = self.resolveKerningKey(left_key)
-                right = self.resolveKerningKey(right_key)
-                if not left or not right:
-                    continue
-
-                new_value = int(round(value * factor))
-                font.setKerningForPair(master_id, left, right, new_value)
-                updated += 1
-        finally:
-            font.enableUpdateInterface()
+        report = scaling.applyPlan(font, plan)
+        updated = report.applied - len(report.mismatched)
 
         self.w.status.set("%d updated" % updated)
         Message(
@@ -7,6 +7,8 @@
 
 import vanilla
 import json
+import os
+import sys
 import re
 import math
 import time
@@ -15,6 +17,13 @@ from GlyphsApp import Glyphs, GSFeature, Message, OFFCURVE
 from vanilla.dialogs import askYesNo
 from AppKit import NSOpenPanel, NSSavePanel, NSFont, NSAttributedString, NSFontAttributeName
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex, kerning, profiles, segmentIndex, trace
+
+tracer = trace.sharedTracer
+
 
 PREF = "com.kingSubdit.sets"
 PREF_NO_KERN = "com.kingSubdit.noKern"
@@ -30,98 +39,15 @@ PREF_CONTEXTUAL_AFFIXES = "com.kingSubdit.contextualAffixes"
 
 
 # ======== GEOMETRY HELPERS ========
-
-def distance(p1, p2):
-    return math.hypot(p2[0]-p1[0], p2[1]-p1[1])
-
-def minDistanceBetweenSegments(a1, a2, b1, b2):
-    def clamp(x, a, b):
-        return max(a, min(b, x))
-
-    A = (a1.x, a1.y); B = (a2.x, a2.y)
-    C = (b1.x, b1.y); D = (b2.x, b2.y)
-
-    def closestPoint(P, Q, R):
-        vx, vy = Q[0]-P[0], Q[1]-P[1]
-        denom = vx*vx + vy*vy
-        if denom == 0:
-            return P
-        t = ((R[0]-P[0])*vx + (R[1]-P[1])*vy) / denom
-        t = clamp(t, 0, 1)
-        return (P[0] + t*vx, P[1] + t*vy)
-
-    dmin = float("inf")
-    for p in (A, B):
-        q = closestPoint(C, D, p)
-        dmin = min(dmin, distance(p, q))
-    for p in (C, D):
-        q = closestPoint(A, B, p)
-        dmin = min(dmin, distance(p, q))
-
-    return dmin
-
-def getSegments(layer):
-    segs = []
-    for path in layer.paths:
-        nodes = path.nodes
-        if not nodes:
-            continue
-        count = len(nodes)
-        for i in range(count):
-            n1 = nodes[i]
-            if path.closed:
-                n2 = nodes[(i+1) % count]
-            elif i+1 < count:
-                n2 = nodes[i+1]
-            else:
-                continue
-            segs.append((n1, n2))
-    return segs
+# Segment-distance kernel: Libraries/kernCore (geometry, segmentIndex)
 
 def minDistanceBetweenLayers(layer1, layer2, dx, liApache2=10000):
-    segs1 = getSegments(layer1)
-    segs2 = getSegments(layer2)
-    if not segs1 or not segs2:
-        return liApache2
-
-    shifted = []
-    for n1, n2 in segs2:
-        shifted.append((
-            type("P", (), {"x": n1.x + dx, "y": n1.y}),
-            type("P", (), {"x": n2.x + dx, "y": n2.y})
-        ))
-
-    dmin = liApache2
-    for s1 in segs1:
-        for s2 in shifted:
-            d = minDistanceBetweenSegments(s1[0], s1[1], s2[0], s2[1])
-            if d < dmin:
-                dmin = d
-            if dmin <= 0:
-                return 0.0
-    return dmin
+    return segmentIndex.minDistanceIndexed(
+        segmentIndex.indexSegments(layer1), segmentIndex.indexSegments(layer2), dx, liApache2)
 
 def margin_for_pair(font, masterID, leftName, rightName):
-    gL = font.glyphs[leftName]
-    gR = font.glyphs[rightName]
-    if not gL or not gR:
-        return None
-
-    layerL = gL.layers[masterID]
-    layerR = gR.layers[masterID]
-
-    try:
-        layerL = layerL.copyDecomposedLayer()
-    except:
-        pass
-
-    try:
-        layerR = layerR.copyDecomposedLayer()
-    except:
-        pass
-
-    dx = layerL.width
-    return minDistanceBetweenLayers(layerL, layerR, dx)
+    """Pair margin from the cached sidebearing profiles (one geometry pass per glyph)"""
+    return profiles.sharedCache.marginForPair(font, masterID, leftName, rightName)
 
 
 class KingSubditKerningEngine:
@@ -129,7 +55,6 @@ class KingSubditKerningEngine:
     def __init__(self):
         self._kerningCache = {}
         self._segmentCache = {}
-        self._group_members_cache = {}  # Cache para miembros de grupos
         self.DEBUG = False
         self.loadDefaults()
         self.loadNoKernDefaults()
@@ -785,10 +710,10 @@ class KingSubditKerningEngine:
         tab = font.currentTab
         if tab and hasattr(tab, 'features'):
             smcp_active = 'smcp' in tab.features
-            print(f"\n📌 Show one per group - smcp active: {smcp_active}")
+            tracer.debug("COACH", "📌 Show one per group - smcp active: %s", smcp_active)
 
-        print(f"\n🔍 DEDUPLICATE BY GROUP [{position}]:")
-        print(f"   Input glyphs: {glyphs_list}")
+        tracer.debug("COACH", "🔍 DEDUPLICATE BY GROUP [%s]:", position)
+        tracer.debug("COACH", "Input glyphs: %s", glyphs_list)
     
         seen = set()
         result = []
@@ -806,20 +731,20 @@ class KingSubditKerningEngine:
                 sc_glyph = font.glyphs[sc_glyph_name] if sc_glyph_name in font.glyphs else None
             
                 if sc_glyph:
-                    print(f"\n   Glyph '{gname}': found .sc version '{sc_glyph_name}'")
+                    tracer.debug("COACH", "Glyph '%s': found .sc version '%s'", gname, sc_glyph_name)
                 
                     if position == "first":
                         # Para posición first, usar UNA CLAVE COMPUESTA de ambos lados
                         right_key = sc_glyph.rightKerningKey or 'none'
                         left_key = sc_glyph.leftKerningKey or 'none'
                         key = f"{right_key}|{left_key}"
-                        print(f"   → Using COMPOUND key: right='{right_key}', left='{left_key}' → '{key}'")
+                        tracer.debug("COACH", "→ Using COMPOUND key: right='%s', left='%s' → '%s'", right_key, left_key, key)
                     else:
                         key = sc_glyph.leftKerningKey
                         group = sc_glyph.leftKerningGroup
-                        print(f"   → Using .sc leftKerningKey: '{key}', leftKerningGroup: '{group}'")
+                        tracer.debug("COACH", "→ Using .sc leftKerningKey: '%s', leftKerningGroup: '%s'", key, group)
                 else:
-                    print(f"\n   Glyph '{gname}': no .sc version found, using original")
+                    tracer.debug("COACH", "Glyph '%s': no .sc version found, using original", gname)
                     if position == "first":
                         right_key = glyph.rightKerningKey or 'none'
                         left_key = glyph.leftKerningKey or 'none'
@@ -838,18 +763,18 @@ class KingSubditKerningEngine:
             # Si no hay clave, usar el nombre
             if not key or key == 'none|none':
                 key = gname
-                print(f"   → Using glyph name as key: '{key}'")
+                tracer.debug("COACH", "→ Using glyph name as key: '%s'", key)
 
             if key in seen:
-                print(f"   → Key '{key}' already seen, skipping '{gname}'")
+                tracer.debug("COACH", "→ Key '%s' already seen, skipping '%s'", key, gname)
                 continue
             
             seen.add(key)
             result.append(gname)
             debug_info.append(f"{gname} (key: {key})")
 
-        print(f"\n   Result after deduplication: {result}")
-        print(f"   Keys seen: {seen}")
+        tracer.debug("COACH", "Result after deduplication: %s", result)
+        tracer.debug("COACH", "Keys seen: %s", seen)
         return result
     
     # -----------------------------
@@ -866,65 +791,23 @@ class KingSubditKerningEngine:
         if not group:
             return []
 
-        # Usar cache
-        cache_key = f"{group}_{side}"
-        if cache_key in self._group_members_cache:
-            return self._group_members_cache[cache_key]
-
-        members = []
-        group_clean = group.lstrip('@')
-    
-        for g in font.glyphs:
-            if side == "left":
-                grp = g.leftKerningGroup
-            else:
-                grp = g.rightKerningGroup
-            
-            if grp:
-                grp_clean = grp.lstrip('@')
-                # Solo incluir si el grupo es EXACTAMENTE igual
-                # Esto excluirá automáticamente grupos como @A.ss, @A.sc, etc.
-                if grp_clean == group_clean:
-                    # Verificación adicional para excluir glyphs con sufijos problemáticos
-                    glyph_name = g.name
-                    # Excluir si tiene .ss, .sc, .alt, etc. en el nombre
-                    if not any(suffix in glyph_name for suffix in ['.ss', '.sc', '.alt', '.ornm']):
-                        members.append(g.name)
-
-        members = sorted(set(members))
-        self._group_members_cache[cache_key] = members
-        return members
+        # Solo el grupo EXACTO (excluye @A.ss, @A.sc, etc.) y sin glyphs con sufijos problemáticos
+        members = fontIndex.indexForFont(font).groupMembers(group, side)
+        return [name for name in members if not any(suffix in name for suffix in ['.ss', '.sc', '.alt', '.ornm'])]
     
     # -----------------------------
     # FUNCIÓN: VERIFICAR KERNING POR GRUPOS
     # -----------------------------
     
-    def _has_group_kerning_only(self, font, master_id, left_name, right_name):
-        if left_name not in font.glyphs or right_name not in font.glyphs:
-            return False
-
-        left_glyph = font.glyphs[left_name]
-        right_glyph = font.glyphs[right_name]
-
-        kerning_dict = font.kerning.get(master_id, {})
-
-        left_keys = {left_name}
-        right_keys = {right_name}
-
-        if left_glyph.rightKerningGroup:
-            left_keys.add(f"@MMK_L_{left_glyph.rightKerningGroup}")
-
-        if right_glyph.leftKerningGroup:
-            right_keys.add(f"@MMK_R_{right_glyph.leftKerningGroup}")
-
-        for lk in left_keys:
-            if lk not in kerning_dict:
-                continue
-            rk_dict = kerning_dict.get(lk, {})
-            for rk in right_keys:
-                if rk in rk_dict:
-                    return True
-        return False
+    def _has_group_kerning_only(self, font, master_id, left_name, right_name, resolver=None):
+        """
+        True if the pair is already covered by any kerning entry (glyph-glyph,
+        glyph-group, group-glyph or group-group). For batches, pass one
+        kerning.KerningResolver instead of re-reading the font per pair.
+        """
+        if resolver is None:
+            resolver = kerning.KerningResolver(font, master_id)
+        return resolver.isKerned(left_name, right_name)
 
     def _kerning_debug_info(self, font, master_id, left_name, right_name):
         info = {
@@ -1297,7 +1180,7 @@ class KingSubditKerningEngine:
     
     def debug(self, msg):
         if self.DEBUG:
-            print(f"🔍 {msg}")
+            tracer.info("COACH", "%s", msg)
     
     # -----------------------------
     # FUNCIONES DE FEATURES
@@ -1421,8 +1304,8 @@ class KingSubditKerningEngine:
         glyphs = set()
         groups = set()
     
-        print(f"\n🔍 DEBUG _parse_exclude_lines [{side_name}]:")
-        print(f"   Raw text: '{raw_text}'")
+        tracer.debug("COACH", "🔍 DEBUG _parse_exclude_lines [%s]:", side_name)
+        tracer.debug("COACH", "Raw text: '%s'", raw_text)
     
         for line_num, line in enumerate(raw_text.splitlines()):
             txt = line.strip()
@@ -1430,12 +1313,12 @@ class KingSubditKerningEngine:
                 continue
             if txt.startswith("@"):
                 groups.add(txt)
-                print(f"   Line {line_num}: Added GROUP '{txt}'")
+                tracer.debug("COACH", "Line %s: Added GROUP '%s'", line_num, txt)
             else:
                 glyphs.add(txt)
-                print(f"   Line {line_num}: Added GLYPH '{txt}'")
+                tracer.debug("COACH", "Line %s: Added GLYPH '%s'", line_num, txt)
     
-        print(f"   Result: glyphs={glyphs}, groups={groups}")
+        tracer.debug("COACH", "Result: glyphs=%s, groups=%s", glyphs, groups)
         return glyphs, groups
 
     def _get_glyph_base(self, glyph_name):
@@ -1448,7 +1331,7 @@ class KingSubditKerningEngine:
         variants = []
         base_lower = base_name.lower()
     
-        print(f"\n🔍 DEBUG _get_glyph_variants for base '{base_name}':")
+        tracer.debug("COACH", "🔍 DEBUG _get_glyph_variants for base '%s':", base_name)
     
         for glyph in font.glyphs:
             name = glyph.name
@@ -1459,53 +1342,53 @@ class KingSubditKerningEngine:
             parts = name.split('.', 1)
             if len(parts) > 1 and parts[0] == base_name:
                 variants.append(name)
-                print(f"   Found variant (dot): {name}")
+                tracer.debug("COACH", "Found variant (dot): %s", name)
             # También verificar variantes sin punto (ej: Aacute, Agrave, etc.)
             elif name.startswith(base_name) and len(name) > len(base_name):
                 rest = name[len(base_name):]
                 if rest and rest[0].islower():
                     variants.append(name)
-                    print(f"   Found variant (accent): {name}")
+                    tracer.debug("COACH", "Found variant (accent): %s", name)
     
-        print(f"   Total variants found: {len(variants)}")
+        tracer.debug("COACH", "Total variants found: %s", len(variants))
         return variants
 
     def _glyph_belongs_to_group(self, glyph, group_name, position):
         """Verifica si un glyph pertenece a un grupo específico, considerando features activos."""
-        print(f"\n🔍 DEBUG _glyph_belongs_to_group:")
-        print(f"   Glyph: {glyph.name}")
-        print(f"   Position: {position}")
-        print(f"   Target group: '{group_name}'")
+        tracer.debug("COACH", "🔍 DEBUG _glyph_belongs_to_group:")
+        tracer.debug("COACH", "Glyph: %s", glyph.name)
+        tracer.debug("COACH", "Position: %s", position)
+        tracer.debug("COACH", "Target group: '%s'", group_name)
     
         # Verificar si el feature smcp está activo en el tab actual
         smcp_active = False
         tab = Glyphs.font.currentTab
         if tab and hasattr(tab, 'features'):
             smcp_active = 'smcp' in tab.features
-            print(f"   Feature smcp active: {smcp_active}")
+            tracer.debug("COACH", "Feature smcp active: %s", smcp_active)
     
         # Obtener el grupo del glyph según la posición
         if position == "first":
             current_group = glyph.rightKerningGroup
-            print(f"   Glyph's rightKerningGroup: '{current_group}'")
+            tracer.debug("COACH", "Glyph's rightKerningGroup: '%s'", current_group)
         else:
             current_group = glyph.leftKerningGroup
-            print(f"   Glyph's leftKerningGroup: '{current_group}'")
+            tracer.debug("COACH", "Glyph's leftKerningGroup: '%s'", current_group)
     
         if not current_group:
-            print("   No group assigned, returning False")
+            tracer.debug("COACH", "No group assigned, returning False")
             return False
     
         # Limpiar @ de ambos
         current_clean = current_group.lstrip('@')
         target_clean = group_name.lstrip('@')
     
-        print(f"   Clean glyph group: '{current_clean}'")
-        print(f"   Clean target group: '{target_clean}'")
+        tracer.debug("COACH", "Clean glyph group: '%s'", current_clean)
+        tracer.debug("COACH", "Clean target group: '%s'", target_clean)
     
         # 1. Comparación exacta
         if current_clean == target_clean:
-            print(f"   ✓ Exact match: {current_clean} == {target_clean}")
+            tracer.debug("COACH", "✓ Exact match: %s == %s", current_clean, target_clean)
             return True
     
         # 2. Si smcp está activo, mapear minúsculas a sus equivalentes small caps
@@ -1543,17 +1426,17 @@ class KingSubditKerningEngine:
         
             if current_clean in lowercase_to_sc:
                 sc_equivalent = lowercase_to_sc[current_clean]
-                print(f"   With smcp active: {current_clean} → {sc_equivalent}")
+                tracer.debug("COACH", "With smcp active: %s → %s", current_clean, sc_equivalent)
             
                 if sc_equivalent == target_clean:
-                    print(f"   ✓ Target matches smcp equivalent: {target_clean}")
+                    tracer.debug("COACH", "✓ Target matches smcp equivalent: %s", target_clean)
                     return True
             
                 # También verificar si el target es la base del grupo small caps
                 if target_clean.endswith('.sc'):
                     base_target = target_clean.replace('.sc', '')
                     if current_clean == base_target:
-                        print(f"   ✓ Target small caps group matches base with smcp: {target_clean} → {base_target}")
+                        tracer.debug("COACH", "✓ Target small caps group matches base with smcp: %s → %s", target_clean, base_target)
                         return True
 
 
@@ -1563,56 +1446,54 @@ class KingSubditKerningEngine:
         if not font or glyphname not in font.glyphs:
             return False
 
-        print(f"\n{'='*60}")
-        print(f"🔍 CHECKING EXCLUSION: {glyphname} at position {position}")
-        print(f"{'='*60}")
+        tracer.debug("COACH", "🔍 CHECKING EXCLUSION: %s at position %s", glyphname, position)
 
         # Verificar si smcp está activo
         smcp_active = False
         tab = font.currentTab
         if tab and hasattr(tab, 'features'):
             smcp_active = 'smcp' in tab.features
-            print(f"📌 Feature smcp active: {smcp_active}")
+            tracer.debug("COACH", "📌 Feature smcp active: %s", smcp_active)
 
         if position == "first":
             exclude_text = self.getCurrentExcludeFirst()
-            print(f"Exclude First text: '{exclude_text}'")
+            tracer.debug("COACH", "Exclude First text: '%s'", exclude_text)
         else:
             exclude_text = self.getCurrentExcludeSecond()
-            print(f"Exclude Second text: '{exclude_text}'")
+            tracer.debug("COACH", "Exclude Second text: '%s'", exclude_text)
 
         exglyphs, exgroups = self._parse_exclude_lines(exclude_text, position)
         g = font.glyphs[glyphname]
 
         # 1. Verificar nombre exacto
         if glyphname in exglyphs:
-            print(f"   ✓ Exact match found: '{glyphname}' in exglyphs")
+            tracer.debug("COACH", "✓ Exact match found: '%s' in exglyphs", glyphname)
             return True
 
         # 2. Verificar nombre base
         base_name = glyphname.split('.')[0]
         if base_name in exglyphs:
-            print(f"   ✓ Base name match: '{base_name}' in exglyphs")
+            tracer.debug("COACH", "✓ Base name match: '%s' in exglyphs", base_name)
             return True
 
         # 3. Verificar variantes
         variants = self._get_glyph_variants(font, base_name)
         for variant in variants:
             if variant in exglyphs:
-                print(f"   ✓ Variant match: '{variant}' in exglyphs")
+                tracer.debug("COACH", "✓ Variant match: '%s' in exglyphs", variant)
                 return True
 
         # 4. Verificar grupos de exclusión
-        print(f"\n📌 Check 4: Group check")
-        print(f"   Excluded groups: {exgroups}")
+        tracer.debug("COACH", "📌 Check 4: Group check")
+        tracer.debug("COACH", "Excluded groups: %s", exgroups)
     
         # Obtener el grupo REAL del glyph
         if position == "first":
             current_group = g.rightKerningGroup
-            print(f"   Glyph's rightKerningGroup: '{current_group}'")
+            tracer.debug("COACH", "Glyph's rightKerningGroup: '%s'", current_group)
         else:
             current_group = g.leftKerningGroup
-            print(f"   Glyph's leftKerningGroup: '{current_group}'")
+            tracer.debug("COACH", "Glyph's leftKerningGroup: '%s'", current_group)
     
         # 5. NUEVO: Lista de exclusión específica para posición second con smcp
         if smcp_active and position == "second":
@@ -1625,7 +1506,7 @@ class KingSubditKerningEngine:
             glyph_base = glyphname.split('.')[0]
         
             if glyph_base in excluded_glyphs_with_smcp:
-                print(f"   ✓ Glyph '{glyphname}' (base: '{glyph_base}') excluded by smcp exclusion list")
+                tracer.debug("COACH", "✓ Glyph '%s' (base: '%s') excluded by smcp exclusion list", glyphname, glyph_base)
                 return True
     
         # Verificar grupos normalmente
@@ -1634,10 +1515,10 @@ class KingSubditKerningEngine:
             for excluded_group in exgroups:
                 excluded_clean = excluded_group.lstrip('@')
                 if group_clean == excluded_clean:
-                    print(f"   ✓ Group match: {group_clean} == {excluded_clean}")
+                    tracer.debug("COACH", "✓ Group match: %s == %s", group_clean, excluded_clean)
                     return True
 
-        print(f"\n❌ FINAL: '{glyphname}' is NOT excluded for position {position}")
+        tracer.debug("COACH", "❌ FINAL: '%s' is NOT excluded for position %s", glyphname, position)
         return False
         
                                         
@@ -1688,13 +1569,13 @@ class KingSubditKerningEngine:
                 pairs.append(pair)
                 seen.add(pair)
 
-        print("\n🔎 _getPairsFromTab debug")
-        print("   Method: consecutive tab.layers")
-        print(f"   Tab layers: {len(layers)}")
-        print(f"   Raw layer links sampled: {len(debug_rows)}")
+        tracer.debug("COACH", "🔎 _getPairsFromTab debug")
+        tracer.debug("COACH", "Method: consecutive tab.layers")
+        tracer.debug("COACH", "Tab layers: %s", len(layers))
+        tracer.debug("COACH", "Raw layer links sampled: %s", len(debug_rows))
         for index, (left, right) in enumerate(debug_rows, 1):
-            print(f"   {index:02d}. /{left}/ -> /{right}/")
-        print(f"   Unique non-space pairs returned: {len(pairs)}")
+            tracer.debug("COACH", "%02d. /%s/ -> /%s/", index, left, right)
+        tracer.debug("COACH", "Unique non-space pairs returned: %s", len(pairs))
 
         return pairs
     
@@ -1904,13 +1785,13 @@ class KingSubditKerningEngine:
         total_pairs = len(validKings) * len(validSubs)
         processed = 0
 
-        print("\n" + "="*80)
-        print("GENERATING PAIRS WITH EXCLUSION FILTERS")
-        print("="*80)
+        tracer.debug("COACH", "GENERATING PAIRS WITH EXCLUSION FILTERS")
 
         if hasattr(self.w.tabs[0], "progress"):
             self.w.tabs[0].progress.set(0)
 
+        resolver = kerning.KerningResolver(font, master_id) if exclude_existing else None
+
         for k in validKings:
             for s in validSubs:
                 processed += 1
@@ -1919,47 +1800,45 @@ class KingSubditKerningEngine:
                     self.w.tabs[0].progress.set(progress)
 
                 # LEFT MODE
-                print(f"\n--- Processing pair: {s} (left) + {k} (right) ---")
+                tracer.debug("COACH", "--- Processing pair: %s (left) + %s (right) ---", s, k)
                 exclude_s_first = self._is_glyph_excluded_for_position(s, "first")
                 exclude_k_second = self._is_glyph_excluded_for_position(k, "second")
 
                 if not exclude_s_first and not exclude_k_second:
-                    print(f"✅ Pair ACCEPTED for LEFT mode")
+                    tracer.debug("COACH", "✅ Pair ACCEPTED for LEFT mode")
                     if exclude_existing:
-                        if not self._has_group_kerning_only(font, master_id, s, k):
+                        if not self._has_group_kerning_only(font, master_id, s, k, resolver):
                             pairs_left.append((s, k))
                         else:
-                            print(f"   But excluded because pair already has kerning")
+                            tracer.debug("COACH", "But excluded because pair already has kerning")
                     else:
                         pairs_left.append((s, k))
                 else:
-                    print(f"❌ Pair REJECTED for LEFT mode")
+                    tracer.debug("COACH", "❌ Pair REJECTED for LEFT mode")
 
                 # RIGHT MODE
-                print(f"\n--- Processing pair: {k} (left) + {s} (right) ---")
+                tracer.debug("COACH", "--- Processing pair: %s (left) + %s (right) ---", k, s)
                 exclude_k_first = self._is_glyph_excluded_for_position(k, "first")
                 exclude_s_second = self._is_glyph_excluded_for_position(s, "second")
 
                 if not exclude_k_first and not exclude_s_second:
-                    print(f"✅ Pair ACCEPTED for RIGHT mode")
+                    tracer.debug("COACH", "✅ Pair ACCEPTED for RIGHT mode")
                     if exclude_existing:
-                        if not self._has_group_kerning_only(font, master_id, k, s):
+                        if not self._has_group_kerning_only(font, master_id, k, s, resolver):
                             pairs_right.append((k, s))
                         else:
-                            print(f"   But excluded because pair already has kerning")
+                            tracer.debug("COACH", "But excluded because pair already has kerning")
                     else:
                         pairs_right.append((k, s))
                 else:
-                    print(f"❌ Pair REJECTED for RIGHT mode")
+                    tracer.debug("COACH", "❌ Pair REJECTED for RIGHT mode")
 
         pairs_left = list(dict.fromkeys(pairs_left))
         pairs_right = list(dict.fromkeys(pairs_right))
 
-        print(f"\n{'='*80}")
-        print(f"FINAL RESULTS:")
-        print(f"Left pairs accepted: {len(pairs_left)}")
-        print(f"Right pairs accepted: {len(pairs_right)}")
-        print(f"{'='*80}")
+        tracer.debug("COACH", "FINAL RESULTS:")
+        tracer.debug("COACH", "Left pairs accepted: %s", len(pairs_left))
+        tracer.debug("COACH", "Right pairs accepted: %s", len(pairs_right))
 
         lines = []
 
@@ -2037,23 +1916,20 @@ class KingSubditKerningEngine:
         master_id = font.selectedFontMaster.id
         pairs = self._getPairsFromTab()
 
-        print("\n" + "=" * 80)
-        print("🙈 DEBUG HIDE KERN TAB")
-        print("=" * 80)
-        print(f"Font: {font.familyName if hasattr(font, 'familyName') else font}")
-        print(f"Master ID: {master_id}")
-        print(f"Tab has layers: {len(tab.layers) if tab.layers else 0}")
+        tracer.debug("COACH", "🙈 DEBUG HIDE KERN TAB")
+        tracer.debug("COACH", "Font: %s", font.familyName if hasattr(font, 'familyName') else font)
+        tracer.debug("COACH", "Master ID: %s", master_id)
+        tracer.debug("COACH", "Tab has layers: %s", len(tab.layers) if tab.layers else 0)
         try:
             tab_text = tab.text or ""
-            print(f"Tab text length: {len(tab_text)}")
-            print(f"Tab text preview: {repr(tab_text[:300])}")
+            tracer.debug("COACH", "Tab text length: %s", len(tab_text))
+            tracer.debug("COACH", "Tab text preview: %r", tab_text[:300])
         except Exception as e:
-            print(f"Could not read tab.text: {e}")
-        print(f"Pairs detected by _getPairsFromTab(): {len(pairs)}")
+            tracer.debug("COACH", "Could not read tab.text: %s", e)
+        tracer.debug("COACH", "Pairs detected by _getPairsFromTab(): %s", len(pairs))
 
         if not pairs:
             print("⚠️ No kerning pairs found in current tab")
-            print("=" * 80)
             return
 
         hidden = []
@@ -2063,23 +1939,23 @@ class KingSubditKerningEngine:
             debug = self._kerning_debug_info(font, master_id, left, right)
             has_kerning = bool(debug["matches"])
 
-            print(f"\n[{index}] Pair: /{left}/ /{right}")
+            tracer.debug("COACH", "[%s] Pair: /%s/ /%s", index, left, right)
             if debug["missing_glyph"]:
-                print("    ⚠️ Missing glyph in font")
-            print(f"    Left keys tried: {debug['left_keys']}")
-            print(f"    Right keys tried: {debug['right_keys']}")
+                tracer.debug("COACH", "⚠️ Missing glyph in font")
+            tracer.debug("COACH", "Left keys tried: %s", debug['left_keys'])
+            tracer.debug("COACH", "Right keys tried: %s", debug['right_keys'])
 
             if debug["matches"]:
                 for lk, rk, value in debug["matches"]:
-                    print(f"    ✅ Kerning found: {lk} + {rk} = {value}")
+                    tracer.debug("COACH", "✅ Kerning found: %s + %s = %s", lk, rk, value)
             else:
-                print("    ❌ No kerning found for these keys")
+                tracer.debug("COACH", "❌ No kerning found for these keys")
 
             if has_kerning:
-                print("    ACTION: HIDE")
+                tracer.debug("COACH", "ACTION: HIDE")
                 hidden.append((left, right))
             else:
-                print("    ACTION: KEEP")
+                tracer.debug("COACH", "ACTION: KEEP")
                 visible.append((left, right))
 
         try:
@@ -2101,7 +1977,6 @@ class KingSubditKerningEngine:
         print(f"   Hidden existing pairs: {len(hidden)}")
         print(f"   Visible pending pairs: {len(visible)}")
         print(f"   Rebuilt tab lines: {len(lines)}")
-        print("=" * 80)
     
     # -----------------------------
     # FUNCIÓN: DELETE TAB KERN
@@ -2224,6 +2099,7 @@ class KingSubditKerningEngine:
         skipped_condition = 0
         skipped_no_margin = 0
         skipped_existing = 0
+        resolver = kerning.KerningResolver(font, masterID) if preserve_existing else None
 
         for Lname, Rname in pairs:
             if self._is_glyph_no_kern_for_position(Lname, no_kern_left, "first"):
@@ -2234,7 +2110,7 @@ class KingSubditKerningEngine:
                 skipped_no_kern += 1
                 continue
 
-            if preserve_existing and self._has_group_kerning_only(font, masterID, Lname, Rname):
+            if preserve_existing and self._has_group_kerning_only(font, masterID, Lname, Rname, resolver):
                 skipped_existing += 1
                 continue
 
@@ -2268,6 +2144,8 @@ class KingSubditKerningEngine:
                 rightKey = gR.leftKerningKey
 
             font.setKerningForPair(masterID, leftKey, rightKey, delta)
+            if resolver is not None:
+                resolver.setPair(leftKey, rightKey, delta)
             applied += 1
 
         print(f"\nSUMMARY")
@@ -3336,6 +3214,7 @@ class KingSubditKerningEngine:
             self.showInfo(f"Error: {e}")
             traceback.print_exc()
         finally:
+            fontIndex.indexForFont(Font).invalidate()
             Font.enableUpdateInterface()
 
     def deleteKerningGroups(self, sender):
@@ -3363,6 +3242,7 @@ class KingSubditKerningEngine:
             self.showInfo(f"Error: {e}")
             traceback.print_exc()
         finally:
+            fontIndex.indexForFont(Font).invalidate()
             Font.enableUpdateInterface()
 
     def generateKerningGroups(self, sender):
@@ -3389,6 +3269,7 @@ class KingSubditKerningEngine:
             self.showInfo(f"Error: {e}")
             traceback.print_exc()
         finally:
+            fontIndex.indexForFont(Font).invalidate()
             Font.enableUpdateInterface()
 
     # ---------- TEST WORDS METHODS ----------
@@ -3465,14 +3346,13 @@ class KingSubditKerningEngine:
             return
 
         # Resolve key to glyph name
+        index = fontIndex.indexForFont(font)
+
         def resolveKey(key):
             if isinstance(key, str) and key.startswith("@MMK_"):
                 return key
             if isinstance(key, str) and len(key) == 36:
-                for g in font.glyphs:
-                    if g.id == key:
-                        return g.name
-                return None
+                return index.nameForID(key)
             return key
 
         # Apply scaling
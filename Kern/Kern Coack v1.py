@@ -6,10 +6,11 @@
 # If you find this script useful, you can show your appreciation by purchasing any font at: https://www.myfonts.com/collections/tipo-pepel-foundry
 # License: Apache2
 
-import math
 import re
 import json
 import time
+import os
+import sys
 from GlyphsApp import *
 from vanilla import *
 from AppKit import *
@@ -17,6 +18,13 @@ from AppKit import NSAlert, NSAlertStyleInformational, NSAlertFirstButtonReturn
 from AppKit import NSAlert, NSInformationalAlertStyle
 from GlyphsApp import Glyphs
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex, kerning, pairGen, profiles, segmentIndex, trace
+
+tracer = trace.sharedTracer
+
 
 
 
@@ -145,130 +153,16 @@ def split_blocks(line):
 #           MOTOR KERN BASE GTP - GEOMETRY OPTIMIZED
 # ============================================================
 
-def distance(A, B):
-    return math.hypot(B[0]-A[0], B[1]-A[1])
-
-def closestPointOnSegment(A, B, P):
-    ABx = B[0] - A[0]
-    ABy = B[1] - A[1]
-
-    denom = ABx*ABx + ABy*ABy
-    if denom == 0:
-        return A
-
-    t = ((P[0] - A[0]) * ABx + (P[1] - A[1]) * ABy) / denom
-    t = max(0, min(1, t))
-
-    return (A[0] + t * ABx, A[1] + t * ABy)
-
-
-def segmentDistance(a1, a2, b1, b2):
-    dmin = float("inf")
-
-    for P in (a1, a2):
-        Q = closestPointOnSegment(b1, b2, P)
-        dmin = min(dmin, distance(P, Q))
-
-    for P in (b1, b2):
-        Q = closestPointOnSegment(a1, a2, P)
-        dmin = min(dmin, distance(P, Q))
-
-    return dmin
-
-
-def bbox(p1, p2):
-    return (
-        min(p1[0], p2[0]),
-        min(p1[1], p2[1]),
-        max(p1[0], p2[0]),
-        max(p1[1], p2[1]),
-    )
-
-
-def bboxOverlap(b1, b2, pad=0):
-    return (
-        b1[0] <= b2[2] + pad and
-        b1[2] >= b2[0] - pad and
-        b1[1] <= b2[3] + pad and
-        b1[3] >= b2[1] - pad
-    )
-
-
-def getSegments(layer):
-    segs = []
-
-    for p in layer.paths:
-        nodes = p.nodes
-        if not nodes:
-            continue
-
-        pts = [(n.x, n.y) for n in nodes]
-        count = len(pts)
-
-        if p.closed:
-            rng = range(count)
-        else:
-            rng = range(count - 1)
-
-        for i in rng:
-            a = pts[i]
-            b = pts[(i + 1) % count]
-            segs.append((a, b, bbox(a, b)))
-
-    return segs
-
+# Segment-distance kernel: Libraries/kernCore (geometry, segmentIndex)
 
 def minDistanceBetweenLayers(layer1, layer2, dx, liApache2=10000):
-    segs1 = getSegments(layer1)
-    segs2_raw = getSegments(layer2)
-
-    if not segs1 or not segs2_raw:
-        return liApache2
-
-    segs2 = []
-    for a, b, bb in segs2_raw:
-        a2 = (a[0] + dx, a[1])
-        b2 = (b[0] + dx, b[1])
-        segs2.append((a2, b2, bbox(a2, b2)))
-
-    dmin = float("inf")
-
-    for a1, a2, bb1 in segs1:
-        for b1, b2, bb2 in segs2:
-
-            if not bboxOverlap(bb1, bb2, pad=dmin):
-                continue
-
-            d = segmentDistance(a1, a2, b1, b2)
-
-            if d < dmin:
-                dmin = d
-                if dmin <= 0:
-                    return 0.0
-
-    return dmin
+    return segmentIndex.minDistanceIndexed(
+        segmentIndex.indexSegments(layer1), segmentIndex.indexSegments(layer2), dx, liApache2)
 
 
 def margin_for_pair(font, masterID, leftName, rightName):
-    gL = font.glyphs[leftName]
-    gR = font.glyphs[rightName]
-    if not gL or not gR:
-        return None
-
-    layerL = gL.layers[masterID]
-    layerR = gR.layers[masterID]
-
-    try:
-        layerL = layerL.copyDecomposedLayer()
-    except:
-        pass
-    try:
-        layerR = layerR.copyDecomposedLayer()
-    except:
-        pass
-
-    dx = layerL.width
-    return minDistanceBetweenLayers(layerL, layerR, dx)
+    """Pair margin from the cached sidebearing profiles (one geometry pass per glyph)"""
+    return profiles.sharedCache.marginForPair(font, masterID, leftName, rightName)
 
 # ============================================================
 #           MAIN UNIFIED CLASS
@@ -277,8 +171,18 @@ def margin_for_pair(font, masterID, leftName, rightName):
 class KernCoach(object):
     
     
-    def _debug(self, category, msg):
-        """Método centralizado para debug"""
+    def _debug(self, category, msg, *args):
+        """
+        Método centralizado para debug: va al buffer de kernCore.trace, no a la ventana Macro
+        (salvo ERROR y los resúmenes GENERAL). msg % args solo se formatea si el tracer guarda el mensaje.
+        """
+        if category == "ERROR":
+            tracer.error(category, msg, *args)  # Los errores siempre se muestran
+            return
+        if category == "GENERAL":
+            tracer.echo(category, msg, *args)  # Los mensajes generales siempre se muestran
+            return
+
         # Bandera general que activa todo el debug
         DEBUG_ALL = getattr(self, "DEBUG_ALL", False)
     
@@ -294,15 +198,11 @@ class KernCoach(object):
             category_flag = getattr(self, "DEBUG_NO_KERN", False)
         elif category == "HIDE":
             category_flag = getattr(self, "DEBUG_HIDE", True)
-        elif category == "ERROR":
-            category_flag = True  # Los errores siempre se muestran
-        elif category == "GENERAL":
-            category_flag = True  # Los mensajes generales siempre se muestran
         elif category == "TAB":
             category_flag = getattr(self, "DEBUG_TAB", True)
     
         if DEBUG_ALL or category_flag:
-            print(f"[{category} DEBUG] {msg}")
+            tracer.info(category, msg, *args)
 
     def debug_no_kern(self, msg):
         """Función de debug para NoKern - mantenida por compatibilidad"""
@@ -310,14 +210,15 @@ class KernCoach(object):
 
     def debug_exclusion(self, glyph_name, side, excluded_info, result, reason=""):
         """Debug detallado para exclusiones"""
-        if getattr(self, "DEBUG_EXCLUSION", False):
+        # sorted() de les exclusions només si el tracer guardarà el missatge
+        if getattr(self, "DEBUG_EXCLUSION", False) and tracer.enabled("EXCLUSION", trace.INFO):
             exglyphs, exgroups = excluded_info
-            self._debug("EXCLUSION", f"\nGlyph: {glyph_name}, Side: {side}")
-            self._debug("EXCLUSION", f"  Excluded glyphs: {sorted(exglyphs)[:5]}{'...' if len(exglyphs) > 5 else ''}")
-            self._debug("EXCLUSION", f"  Excluded groups: {sorted(exgroups)[:5]}{'...' if len(exgroups) > 5 else ''}")
-            self._debug("EXCLUSION", f"  Result: {'EXCLUDED' if result else 'NOT excluded'}")
+            self._debug("EXCLUSION", "\nGlyph: %s, Side: %s", glyph_name, side)
+            self._debug("EXCLUSION", "  Excluded glyphs: %s%s", sorted(exglyphs)[:5], '...' if len(exglyphs) > 5 else '')
+            self._debug("EXCLUSION", "  Excluded groups: %s%s", sorted(exgroups)[:5], '...' if len(exgroups) > 5 else '')
+            self._debug("EXCLUSION", "  Result: %s", 'EXCLUDED' if result else 'NOT excluded')
             if reason:
-                self._debug("EXCLUSION", f"  Reason: {reason}")
+                self._debug("EXCLUSION", "  Reason: %s", reason)
             self._debug("EXCLUSION", "-" * 50)
     
     
@@ -406,6 +307,9 @@ class KernCoach(object):
         master_id = font.selectedFontMaster.id
         tabs_created = 0
 
+        # Taules de la font: es refan només si ha canviat algun glif o grup
+        tables = pairGen.tablesForFont(font)
+
         # -----------------------------
         # Helpers CORRECTOS para Boss - VERSIÓN CORREGIDA
         # -----------------------------
@@ -452,11 +356,11 @@ class KernCoach(object):
         hide_existing = bool(self.tab1.hideKernedPairsCheck.get())
         show_only_boss = bool(self.tab1.showOnlyBossCheck.get())
     
-        self._debug("GENERAL", f"\n{'='*60}")
-        self._debug("GENERAL", f"CONFIGURACIÓN 'show only @ boss':")
-        self._debug("GENERAL", f"  Estado del checkbox: {show_only_boss}")
-        self._debug("GENERAL", f"  Position: {position}")
-        self._debug("GENERAL", f"{'='*60}")
+        self._debug("GENERAL", "\n%s", '='*60)
+        self._debug("GENERAL", "CONFIGURACIÓN 'show only @ boss':")
+        self._debug("GENERAL", "  Estado del checkbox: %s", show_only_boss)
+        self._debug("GENERAL", "  Position: %s", position)
+        self._debug("GENERAL", "%s", '='*60)
 
         # -----------------------------
 
@@ -465,15 +369,28 @@ class KernCoach(object):
 
         (ex_first_glyphs, ex_first_groups), (ex_second_glyphs, ex_second_groups) = self._excluded_groups()
 
-        self._debug("TAB", f"Excluded first (glyphs): {sorted(ex_first_glyphs)[:5]}{'...' if len(ex_first_glyphs) > 5 else ''}")
-        self._debug("TAB", f"Excluded first (groups): {sorted(ex_first_groups)[:5]}{'...' if len(ex_first_groups) > 5 else ''}")
-        self._debug("TAB", f"Excluded second (glyphs): {sorted(ex_second_glyphs)[:5]}{'...' if len(ex_second_glyphs) > 5 else ''}")
-        self._debug("TAB", f"Excluded second (groups): {sorted(ex_second_groups)[:5]}{'...' if len(ex_second_groups) > 5 else ''}")
+        if tracer.enabled("TAB", trace.INFO):
+            self._debug("TAB", "Excluded first (glyphs): %s%s", sorted(ex_first_glyphs)[:5], '...' if len(ex_first_glyphs) > 5 else '')
+            self._debug("TAB", "Excluded first (groups): %s%s", sorted(ex_first_groups)[:5], '...' if len(ex_first_groups) > 5 else '')
+            self._debug("TAB", "Excluded second (glyphs): %s%s", sorted(ex_second_glyphs)[:5], '...' if len(ex_second_glyphs) > 5 else '')
+            self._debug("TAB", "Excluded second (groups): %s%s", sorted(ex_second_groups)[:5], '...' if len(ex_second_groups) > 5 else '')
+
+        # Cada glif es comprova una sola vegada per rol en tota la generació
+        excluded_cache = {}
+
+        def is_excluded(name, role):
+            key = (name, role)
+            if key not in excluded_cache:
+                if role == "first":
+                    excluded_cache[key] = self._is_glyph_excluded(name, (ex_first_glyphs, ex_first_groups), "first")
+                else:
+                    excluded_cache[key] = self._is_glyph_excluded(name, (ex_second_glyphs, ex_second_groups), "second")
+            return excluded_cache[key]
 
         baseGlyphs = [
             b.strip()
             for b in self.tab1.baseInput.get().split(",")
-            if b.strip() and b.strip() in font.glyphs
+            if b.strip() and b.strip() in tables
         ]
 
         if not baseGlyphs:
@@ -494,152 +411,149 @@ class KernCoach(object):
             self._debug("WARNING", "⚠️ No categories selected.")
             return
 
-        # Obtener vecinos para CADA categoría
+        # Obtener vecinos para CADA categoría (una sola vez para todas las bases)
         category_neighbors = {}
         for category in categories:
-            neighbors = self.get_neighbors_by_category(category)
-            neighbors = self._filter_out_variations(neighbors, font)
+            neighbors = self.get_neighbors_by_category(category, tables)
+            neighbors = pairGen.withoutVariations(neighbors)
             category_neighbors[category] = neighbors
-            
-        for base in baseGlyphs:
-            self._debug("TAB", f"\n→ Base '{base}'")
+
+        # Prefix / suffix de la UI, llegits una vegada; les línies queden a la cache de la font
+        context_settings = self._context_settings()
+
+        def pair_line(left_name, right_name):
+            return self.build_pair_line(left_name, right_name, tables, context_settings)
+
+        def build_pairs(base, category):
+            """(pairs_left, pairs_right) de una base y categoría, o None si no hay parejas."""
+            self._debug("TAB", "\n→ Base '%s' / %s", base, category)
         
             if '.' in base:
-                self._debug("TAB", f"  Base is a variation, skipping")
-                continue
-        
-            if base not in font.glyphs:
-                self._debug("TAB", "  base not in font → skip")
-                continue
+                self._debug("TAB", "  Base is a variation, skipping")
+                return None
 
-            base_glyph = font.glyphs[base]
-            base_is_sc = base_glyph.subCategory == "Smallcaps"
+            base_glyph = tables.record(base)
+            if base_glyph is None:
+                self._debug("TAB", "  base not in font → skip")
+                return None
 
-            # Para CADA categoría, generar las parejas
-            for category in categories:
-                effective_neighbors = category_neighbors[category]
-            
-                if base_is_sc:
-                    # Si es smallcaps, usar solo vecinos smallcaps
-                    effective_neighbors = sorted(
-                        g.name for g in font.glyphs if g.subCategory == "Smallcaps"
-                    )
+            effective_neighbors = category_neighbors[category]
+            if base_glyph.subCategory == "Smallcaps":
+                # Si es smallcaps, usar solo vecinos smallcaps
+                effective_neighbors = sorted(tables.select("Smallcaps", lambda r: r.subCategory == "Smallcaps"))
 
-                pairs_left = []
-                pairs_right = []
+            pairs_left = []
+            pairs_right = []
 
-                for n in effective_neighbors:
-                    if n == base or n not in font.glyphs:
-                        continue
+            for n in effective_neighbors:
+                if n == base or n not in tables:
+                    continue
 
-                    glyph_n = font.glyphs[n]
-                    nombre_base_n = self._get_glyph_base(n)
+                glyph_n = tables.record(n)
+                nombre_base_n = self._get_glyph_base(n)
 
-                    if position in ("left", "both"):
-                        # Verificar exclusión
-                        excluded_as_second = self._is_glyph_excluded(n, (ex_second_glyphs, ex_second_groups), "second")
-                        excluded_base_as_first = self._is_glyph_excluded(base, (ex_first_glyphs, ex_first_groups), "first")
-                
-                        if excluded_as_second:
-                            continue
-            
-                        if excluded_base_as_first:
-                            continue
-            
-                        if show_only_boss:
-                            # CORRECCIÓN IMPORTANTE: Para n como SEGUNDO en el par: 
-                            # solo verificar leftKerningGroup (no rightKerningGroup!)
-                            if is_boss_second_position(glyph_n) or (category == "Punctuation" and is_boss_punctuation(glyph_n)):
-                                # DEBUG: Mostrar qué se encontró
-                                self._debug("TAB", f"  [BOSS CHECK] '{n}' como SEGUNDO: leftKerningGroup='{glyph_n.leftKerningGroup}' vs base='{nombre_base_n}' → ACEPTADO")
-                                pairs_left.append(self.build_pair_line(base, n))
-                            else:
-                                self._debug("TAB", f"  [BOSS CHECK] '{n}' como SEGUNDO: leftKerningGroup='{glyph_n.leftKerningGroup}' vs base='{nombre_base_n}' → RECHAZADO")
+                if position in ("left", "both"):
+                    # Verificar exclusión
+                    if is_excluded(n, "second"):
+                        continue
+        
+                    if is_excluded(base, "first"):
+                        continue
+        
+                    if show_only_boss:
+                        # CORRECCIÓN IMPORTANTE: Para n como SEGUNDO en el par: 
+                        # solo verificar leftKerningGroup (no rightKerningGroup!)
+                        if is_boss_second_position(glyph_n) or (category == "Punctuation" and is_boss_punctuation(glyph_n)):
+                            # DEBUG: Mostrar qué se encontró
+                            self._debug("TAB", "  [BOSS CHECK] '%s' como SEGUNDO: leftKerningGroup='%s' vs base='%s' → ACEPTADO", n, glyph_n.leftKerningGroup, nombre_base_n)
+                            pairs_left.append(pair_line(base, n))
                         else:
-                            pairs_left.append(self.build_pair_line(base, n))
+                            self._debug("TAB", "  [BOSS CHECK] '%s' como SEGUNDO: leftKerningGroup='%s' vs base='%s' → RECHAZADO", n, glyph_n.leftKerningGroup, nombre_base_n)
+                    else:
+                        pairs_left.append(pair_line(base, n))
 
-                    if position in ("right", "both"):
-                        # Verificar exclusión
-                        excluded_as_first = self._is_glyph_excluded(n, (ex_first_glyphs, ex_first_groups), "first")
-                        excluded_base_as_second = self._is_glyph_excluded(base, (ex_second_glyphs, ex_second_groups), "second")
-                
-                        if excluded_as_first:
-                            continue
-            
-                        if excluded_base_as_second:
-                            continue
-            
-                        if show_only_boss:
-                            # CORRECCIÓN IMPORTANTE: Para n como PRIMERO en el par:
-                            # solo verificar rightKerningGroup (no leftKerningGroup!)
-                            if is_boss_first_position(glyph_n) or (category == "Punctuation" and is_boss_punctuation(glyph_n)):
-                                # DEBUG: Mostrar qué se encontró
-                                self._debug("TAB", f"  [BOSS CHECK] '{n}' como PRIMERO: rightKerningGroup='{glyph_n.rightKerningGroup}' vs base='{nombre_base_n}' → ACEPTADO")
-                                pairs_right.append(self.build_pair_line(n, base))
-                            else:
-                                self._debug("TAB", f"  [BOSS CHECK] '{n}' como PRIMERO: rightKerningGroup='{glyph_n.rightKerningGroup}' vs base='{nombre_base_n}' → RECHAZADO")
+                if position in ("right", "both"):
+                    # Verificar exclusión
+                    if is_excluded(n, "first"):
+                        continue
+        
+                    if is_excluded(base, "second"):
+                        continue
+        
+                    if show_only_boss:
+                        # CORRECCIÓN IMPORTANTE: Para n como PRIMERO en el par:
+                        # solo verificar rightKerningGroup (no leftKerningGroup!)
+                        if is_boss_first_position(glyph_n) or (category == "Punctuation" and is_boss_punctuation(glyph_n)):
+                            # DEBUG: Mostrar qué se encontró
+                            self._debug("TAB", "  [BOSS CHECK] '%s' como PRIMERO: rightKerningGroup='%s' vs base='%s' → ACEPTADO", n, glyph_n.rightKerningGroup, nombre_base_n)
+                            pairs_right.append(pair_line(n, base))
                         else:
-                            pairs_right.append(self.build_pair_line(n, base))
+                            self._debug("TAB", "  [BOSS CHECK] '%s' como PRIMERO: rightKerningGroup='%s' vs base='%s' → RECHAZADO", n, glyph_n.rightKerningGroup, nombre_base_n)
+                    else:
+                        pairs_right.append(pair_line(n, base))
 
-                pairs_left = sorted(set(pairs_left))
-                pairs_right = sorted(set(pairs_right))
+            pairs_left = sorted(set(pairs_left))
+            pairs_right = sorted(set(pairs_right))
 
-                # DEBUG: Resumen
-                if show_only_boss:
-                    self._debug("TAB", f"  Resultados 'show only @ boss' para categoría '{category}':")
-                    self._debug("TAB", f"    Pares izquierda (base + vecino): {len(pairs_left)}")
-                    self._debug("TAB", f"    Pares derecha (vecino + base): {len(pairs_right)}")
+            # DEBUG: Resumen
+            if show_only_boss:
+                self._debug("TAB", "  Resultados 'show only @ boss' para categoría '%s':", category)
+                self._debug("TAB", "    Pares izquierda (base + vecino): %s", len(pairs_left))
+                self._debug("TAB", "    Pares derecha (vecino + base): %s", len(pairs_right))
 
-                if not pairs_left and not pairs_right:
-                    continue
+            if not pairs_left and not pairs_right:
+                return None
 
-                if hide_existing:
-                    pairs_left = self.filter_pairs_with_existing_kerning(
-                        pairs_left, font, master_id,
-                        boss_only=False, base=base,
-                        category=category, tab=None
-                    )
-                    pairs_right = self.filter_pairs_with_existing_kerning(
-                        pairs_right, font, master_id,
-                        boss_only=False, base=base,
-                        category=category, tab=None
-                    )
-
-                if not pairs_left and not pairs_right:
-                    continue
+            if hide_existing:
+                pairs_left = self.filter_pairs_with_existing_kerning(
+                    pairs_left, font, master_id,
+                    boss_only=False, base=base,
+                    category=category, tab=None
+                )
+                pairs_right = self.filter_pairs_with_existing_kerning(
+                    pairs_right, font, master_id,
+                    boss_only=False, base=base,
+                    category=category, tab=None
+                )
+
+            if not pairs_left and not pairs_right:
+                return None
+            return pairs_left, pairs_right
 
-                self._debug("TAB", "  → creating tab for category")
-                new_tab = font.newTab("")
+        # Les parelles de cada base es calculen quan se'n crea la pestanya
+        for base, category, (pairs_left, pairs_right) in pairGen.iterTabs(baseGlyphs, categories, build_pairs):
+            self._debug("TAB", "  → creating tab for category")
+            new_tab = font.newTab("")
 
-                lines = []
-                lines.extend(self.build_info_block(base, category))
+            lines = []
+            lines.extend(self.build_info_block(base, category))
 
-                render_pairs_blocks(
-                    lines=lines,
-                    position=position,
-                    pairs_left=pairs_left,
-                    pairs_right=pairs_right,
-                )
+            render_pairs_blocks(
+                lines=lines,
+                position=position,
+                pairs_left=pairs_left,
+                pairs_right=pairs_right,
+            )
 
-                new_tab.text = "\n".join(lines)
-                tabs_created += 1
+            new_tab.text = "\n".join(lines)
+            tabs_created += 1
 
-                try:
-                    feature_names = self.getFeatureNames()
-                    feature_index = self.tab1.featurePopup.get()
-                    if 0 <= feature_index < len(feature_names):
-                        fName = feature_names[feature_index]
-                        if fName != "No features":
-                            new_tab.features = [fName]
-                            self._debug("TAB", f"  Feature activada: {fName}")
-                except Exception as e:
-                    self._debug("ERROR", f"  ⚠️ Error activando feature: {e}")
+            try:
+                feature_names = self.getFeatureNames()
+                feature_index = self.tab1.featurePopup.get()
+                if 0 <= feature_index < len(feature_names):
+                    fName = feature_names[feature_index]
+                    if fName != "No features":
+                        new_tab.features = [fName]
+                        self._debug("TAB", "  Feature activada: %s", fName)
+            except Exception as e:
+                self._debug("ERROR", "  ⚠️ Error activando feature: %s", e)
 
         # Restaurar estado original del debug
         self.DEBUG_EXCLUSION = DEBUG_EXCLUSION_ORIGINAL
 
-        self._debug("GENERAL", f"\n{'='*80}")
-        self._debug("GENERAL", f"✅ TOTAL: Created {tabs_created} tabs")
+        self._debug("GENERAL", "\n%s", '='*80)
+        self._debug("GENERAL", "✅ TOTAL: Created %s tabs", tabs_created)
         if tabs_created == 0:
             self._debug("WARNING", "⚠️ No se crearon tabs.")
             
@@ -658,18 +572,9 @@ class KernCoach(object):
     
     def _get_glyph_variants(self, font, base_name):
         """Obtiene todas las variantes de un glifo base"""
-        variants = []
-    
-        for glyph in font.glyphs:
-            if glyph.name == base_name:
-                continue  # Saltar el glifo base
-        
-            # Verificar si es una variante del glifo base
-            # Ejemplo: base_name = "l", variantes = "l.sc", "l.ss01", "l.alt"
-            if glyph.name.startswith(base_name + '.'):
-                variants.append(glyph.name)
-    
-        return variants
+        # Ejemplo: base_name = "l", variantes = "l.sc", "l.ss01", "l.alt"
+        # Taula de la darrera generació (generatePairsGenerator la refresca)
+        return pairGen.tablesForFont(font, refresh=False).variantsOf(base_name)
     
     def build_info_block(self, base_glyph, category):
         """Construye el bloque de información para la pestaña"""
@@ -755,14 +660,7 @@ class KernCoach(object):
         if not group:
             return []
 
-        members = []
-        for g in font.glyphs:
-            if side == "left" and g.leftKerningGroup == group:
-                members.append(g.name)
-            elif side == "right" and g.rightKerningGroup == group:
-                members.append(g.name)
-
-        return sorted(set(members))
+        return fontIndex.indexForFont(font).groupMembers(group, side)
 
 
 
@@ -915,11 +813,37 @@ class KernCoach(object):
             pass
 
 
-    def get_context_strings(self, left_name, right_name):
+    def _context_settings(self):
+        """(prefix, suffix) tal com estan escrits a la UI."""
+        def read_field(tab, *names):
+            for n in names:
+                if hasattr(tab, n):
+                    try:
+                        return tab.__dict__[n].get().strip()
+                    except Exception:
+                        pass
+            return ""
+
+        ui_prefix = read_field(
+            self.tab1,
+            "prefixEdit", "prefixField", "prefixInput", "prefixText"
+        )
+        ui_suffix = read_field(
+            self.tab1,
+            "suffixEdit", "suffixField", "suffixInput", "suffixText"
+        )
+        return ui_prefix, ui_suffix
+
+    def get_context_strings(self, left_name, right_name, settings=None, tables=None):
         font = Glyphs.font
 
-        left_glyph = font.glyphs[left_name] if left_name in font.glyphs else None
-        right_glyph = font.glyphs[right_name] if right_name in font.glyphs else None
+        if tables is not None:
+            # GlyphRecord té els mateixos atributs que el glif
+            left_glyph = tables.record(left_name)
+            right_glyph = tables.record(right_name)
+        else:
+            left_glyph = font.glyphs[left_name] if left_name in font.glyphs else None
+            right_glyph = font.glyphs[right_name] if right_name in font.glyphs else None
 
         def glyph_case(g):
             if not g:
@@ -942,23 +866,7 @@ class KernCoach(object):
         left_case = glyph_case(left_glyph)
         right_case = glyph_case(right_glyph)
 
-        def read_field(tab, *names):
-            for n in names:
-                if hasattr(tab, n):
-                    try:
-                        return tab.__dict__[n].get().strip()
-                    except Exception:
-                        pass
-            return ""
-
-        ui_prefix = read_field(
-            self.tab1,
-            "prefixEdit", "prefixField", "prefixInput", "prefixText"
-        )
-        ui_suffix = read_field(
-            self.tab1,
-            "suffixEdit", "suffixField", "suffixInput", "suffixText"
-        )
+        ui_prefix, ui_suffix = settings if settings is not None else self._context_settings()
 
         if not ui_prefix:
             prefix_pattern = ""
@@ -992,9 +900,19 @@ class KernCoach(object):
 
 
 
-    def build_pair_line(self, left_name, right_name):
-        prefix, suffix = self.get_context_strings(left_name, right_name)
-        return f"{prefix}/{left_name}/{right_name}{suffix}"
+    def build_pair_line(self, left_name, right_name, tables=None, settings=None):
+        """Línia /prefix/L/R/suffix; amb tables, cada línia es calcula una vegada per versió de la font."""
+        if tables is None:
+            prefix, suffix = self.get_context_strings(left_name, right_name, settings)
+            return f"{prefix}/{left_name}/{right_name}{suffix}"
+        if settings is None:
+            settings = self._context_settings()
+
+        def build(left, right):
+            prefix, suffix = self.get_context_strings(left, right, settings, tables)
+            return f"{prefix}/{left}/{right}{suffix}"
+
+        return tables.affixes(("pair line",) + tuple(settings), left_name, right_name, build)
 
         
         
@@ -1086,13 +1004,13 @@ class KernCoach(object):
         
             for char, count in first_counter.items():
                 if count > 1:
-                    self._debug("GENERAL", f"✅ REGLA: '{char}' aparece {count} veces como primer carácter en bloques #")
+                    self._debug("GENERAL", "✅ REGLA: '%s' aparece %s veces como primer carácter en bloques #", char, count)
                     should_remove_all = True
                     break
                 
             for char, count in last_counter.items():
                 if count > 1:
-                    self._debug("GENERAL", f"✅ REGLA: '{char}' aparece {count} veces como último carácter en bloques #")
+                    self._debug("GENERAL", "✅ REGLA: '%s' aparece %s veces como último carácter en bloques #", char, count)
                     should_remove_all = True
                     break
     
@@ -1133,7 +1051,7 @@ class KernCoach(object):
                             break
             
                 if is_protected:
-                    self._debug("GENERAL", f"🛡️ Protegido: {left} / {right}")
+                    self._debug("GENERAL", "🛡️ Protegido: %s / %s", left, right)
                     continue
 
             # Eliminar kerning
@@ -1160,17 +1078,17 @@ class KernCoach(object):
                         if font.kerningForPair(master_id, lk, rk) is not None:
                             font.removeKerningForPair(master_id, lk, rk)
                             removed += 1
-                            self._debug("GENERAL", f"🗑️ Eliminado: {lk} / {rk}")
+                            self._debug("GENERAL", "🗑️ Eliminado: %s / %s", lk, rk)
                     except:
                         pass
     
-        self._debug("GENERAL", f"\n📊 RESUMEN:")
+        self._debug("GENERAL", "\n📊 RESUMEN:")
         if should_remove_all:
-            self._debug("GENERAL", f"   MODE: ELIMINAR TODO (regla aplicada)")
+            self._debug("GENERAL", "   MODE: ELIMINAR TODO (regla aplicada)")
         else:
-            self._debug("GENERAL", f"   MODE: NORMAL (solo no protegidos)")
-        self._debug("GENERAL", f"   Total pares procesados: {len(seen)}")
-        self._debug("GENERAL", f"   Pares con kerning eliminado: {removed}")
+            self._debug("GENERAL", "   MODE: NORMAL (solo no protegidos)")
+        self._debug("GENERAL", "   Total pares procesados: %s", len(seen))
+        self._debug("GENERAL", "   Pares con kerning eliminado: %s", removed)
         
         
     def _reconstructTextFromGlyphs(self, glyph_names, font):
@@ -1378,7 +1296,7 @@ class KernCoach(object):
                                                 
             
     def debug_group_info(self, font, group_name):
-        self._debug("GENERAL", f"\n🔍 DEBUG ESPECÍFICO PARA GRUPO: @{group_name}")
+        self._debug("GENERAL", "\n🔍 DEBUG ESPECÍFICO PARA GRUPO: @%s", group_name)
         
         right_members = []
         left_members = []
@@ -1389,17 +1307,17 @@ class KernCoach(object):
             if hasattr(glyph, 'leftKerningGroup') and glyph.leftKerningGroup == group_name:
                 left_members.append(glyph.name)
         
-        self._debug("GENERAL", f"  Miembros con rightKerningGroup @{group_name}: {len(right_members)}")
+        self._debug("GENERAL", "  Miembros con rightKerningGroup @%s: %s", group_name, len(right_members))
         if right_members:
-            self._debug("GENERAL", f"    {', '.join(sorted(right_members)[:15])}")
+            self._debug("GENERAL", "    %s", ', '.join(sorted(right_members)[:15]))
             if len(right_members) > 15:
-                self._debug("GENERAL", f"    ... y {len(right_members)-15} más")
+                self._debug("GENERAL", "    ... y %s más", len(right_members)-15)
         
-        self._debug("GENERAL", f"  Miembros con leftKerningGroup @{group_name}: {len(left_members)}")
+        self._debug("GENERAL", "  Miembros con leftKerningGroup @%s: %s", group_name, len(left_members))
         if left_members:
-            self._debug("GENERAL", f"    {', '.join(sorted(left_members)[:15])}")
+            self._debug("GENERAL", "    %s", ', '.join(sorted(left_members)[:15]))
             if len(left_members) > 15:
-                self._debug("GENERAL", f"    ... y {len(left_members)-15} más")
+                self._debug("GENERAL", "    ... y %s más", len(left_members)-15)
             
             
 # ============================================================
@@ -1661,47 +1579,16 @@ class KernCoach(object):
         
 
     def get_kerning_group_members(self, group_name_with_at):
-        """Obtiene TODOS los glifos que pertenecen a un grupo de kerning (cacheado)"""
+        """Obtiene TODOS los glifos que pertenecen a un grupo de kerning (ambos lados, con subgrupos)"""
         font = Glyphs.font
         if not font:
             return []
     
-        # Cache para mejorar rendimiento
-        if not hasattr(self, '_group_members_cache'):
-            self._group_members_cache = {}
-    
-        group_name = group_name_with_at.lstrip('@')
-    
-        # Verificar cache
-        if group_name in self._group_members_cache:
-            return self._group_members_cache[group_name]
-    
-        members = set()
-    
-        for glyph in font.glyphs:
-            # Verificar grupo izquierdo
-            if hasattr(glyph, 'leftKerningGroup') and glyph.leftKerningGroup:
-                if glyph.leftKerningGroup.lstrip('@') == group_name:
-                    members.add(glyph.name)
-        
-            # Verificar grupo derecho
-            if hasattr(glyph, 'rightKerningGroup') and glyph.rightKerningGroup:
-                if glyph.rightKerningGroup.lstrip('@') == group_name:
-                    members.add(glyph.name)
-    
-        # También verificar subgrupos (ej: @h.sc.alt es subgrupo de @h.sc)
-        for glyph in font.glyphs:
-            for attr in ['leftKerningGroup', 'rightKerningGroup']:
-                group = getattr(glyph, attr, None)
-                if group:
-                    clean_group = group.lstrip('@')
-                    if clean_group.startswith(group_name + '.'):
-                        members.add(glyph.name)
-    
-        result = list(members)
-        self._group_members_cache[group_name] = result
-    
-        return result
+        # Subgrupos incluidos (ej: @h.sc.alt es subgrupo de @h.sc)
+        index = fontIndex.indexForFont(font)
+        members = set(index.groupMembers(group_name_with_at, "left", subgroups=True))
+        members.update(index.groupMembers(group_name_with_at, "right", subgroups=True))
+        return list(members)
 
         
         
@@ -1846,94 +1733,58 @@ class KernCoach(object):
 
         
 
-    def get_neighbors_by_category(self, category):
+    def get_neighbors_by_category(self, category, tables=None):
         font = Glyphs.font
         if not font:
             return []
+        if tables is None:
+            tables = pairGen.tablesForFont(font)
     
-        neighbors = []
-    
-        if category == 'Latin Upper':
-            for base in LATINUPPERCASE:
-                for glyph in font.glyphs:
-                    glyphname = glyph.name
-                    # COMPTE! Solament agafar la forma base sense extensió
-                    if '.' in glyphname:
-                        continue  # ⬅️ Saltar variacions (.sc, .ss01, etc.)
-                    if glyphname == base:  # ⬅️ Comparació exacta
-                        neighbors.append(glyphname)
+        def my_glyphs(glyphcategory=None):
+            """Glifs de la pestanya 2 (sense variacions), opcionalment d'una categoria."""
             self.buildMyGlyphsCollection()
+            names = []
             for glyphdata in self.baseglyphslist:
                 if isinstance(glyphdata, dict):
                     glyphname = glyphdata.get('name', '').strip()
-                    glyphcategory = glyphdata.get('category', '')
-                    if (glyphname and glyphname in font.glyphs and 
-                        glyphcategory == 'Uppercase' and '.' not in glyphname):
-                        if glyphname not in neighbors:
-                            neighbors.append(glyphname)
-            return sorted(set(neighbors))
+                    if glyphcategory is not None and glyphdata.get('category', '') != glyphcategory:
+                        continue
+                    if (glyphname and glyphname in tables and 
+                        '.' not in glyphname):  # ⬅️ Filtrar variacions
+                        names.append(glyphname)
+            return names
+    
+        if category == 'Latin Upper':
+            # COMPTE! Solament la forma base sense extensió (comparació exacta)
+            neighbors = tables.existing(LATINUPPERCASE)
+            return sorted(set(neighbors + my_glyphs('Uppercase')))
     
         elif category == 'Latin Lower':
-            for base in LATINLOWERCASE:
-                for glyph in font.glyphs:
-                    glyphname = glyph.name
-                    if '.' in glyphname:
-                        continue  # ⬅️ Saltar variacions
-                    if glyphname == base:
-                        neighbors.append(glyphname)
-            self.buildMyGlyphsCollection()
-            for glyphdata in self.baseglyphslist:
-                if isinstance(glyphdata, dict):
-                    glyphname = glyphdata.get('name', '').strip()
-                    glyphcategory = glyphdata.get('category', '')
-                    if (glyphname and glyphname in font.glyphs and 
-                        glyphcategory == 'Lowercase' and '.' not in glyphname):
-                        if glyphname not in neighbors:
-                            neighbors.append(glyphname)
-            return sorted(set(neighbors))
+            neighbors = tables.existing(LATINLOWERCASE)
+            return sorted(set(neighbors + my_glyphs('Lowercase')))
     
         elif category == 'Numbers':
             # Per números, només agafar les formes canòniques sense extensió
-            return sorted([n for n in CANONICALNUMBERS 
-                          if n in font.glyphs and '.' not in n])
+            return sorted([n for n in tables.existing(CANONICALNUMBERS) if '.' not in n])
     
         elif category == 'Punctuation':
             # Per puntuació, només formes sense extensió
-            return sorted([n for n in CANONICALPUNCTUATION 
-                          if n in font.glyphs and '.' not in n])
+            return sorted([n for n in tables.existing(CANONICALPUNCTUATION) if '.' not in n])
     
         elif category == 'Symbols':
-            for g in font.glyphs:
-                if g.category == 'Symbol' and '.' not in g.name:
-                    neighbors.append(g.name)
-            return sorted(set(neighbors))
+            return sorted(set(tables.select(
+                'Symbols', lambda g: g.category == 'Symbol' and '.' not in g.name)))
     
         elif category == 'My Glyphs':
-            self.buildMyGlyphsCollection()
-    
-            tab2_glyphs = []
-            for glyphdata in self.baseglyphslist:
-                if isinstance(glyphdata, dict):
-                    name = glyphdata.get('name', '').strip()
-                    if (name and name in font.glyphs and 
-                        '.' not in name):  # ⬅️ Filtrar variacions
-                        tab2_glyphs.append(name)
-    
-            return sorted(set(tab2_glyphs))
+            return sorted(set(my_glyphs()))
     
         elif category == 'Cyrillic Upper':
-            for g in font.glyphs:
-                iscyr, isupper = self.iscyrillicglyph(g)
-                if iscyr and isupper is True and '.' not in g.name:
-                    neighbors.append(g.name)
-            return sorted(set(neighbors))
+            return sorted(set(tables.select(
+                'Cyrillic Upper', lambda g: self.iscyrillicglyph(g) == (True, True) and '.' not in g.name)))
     
         elif category == 'Cyrillic Lower':
-            for g in font.glyphs:
-                iscyr, isupper = self.iscyrillicglyph(g)
-                if iscyr and isupper is False and '.' not in g.name:
-                    neighbors.append(g.name)
-            return sorted(set(neighbors))
+            return sorted(set(tables.select(
+                'Cyrillic Lower', lambda g: self.iscyrillicglyph(g) == (True, False) and '.' not in g.name)))
     
         return []
 
@@ -1984,19 +1835,7 @@ class KernCoach(object):
         """
         Filtra les variacions (.sc, .ss01, etc.) dels glifs base.
         """
-        filtered = []
-        base_names = set()
-    
-        for glyph_name in glyph_list:
-            if '.' in glyph_name:
-                # És una variació, verificar si la base ja està a la llista
-                base = glyph_name.split('.')[0]
-                if base in glyph_list:
-                    # La base ja està a la llista, descartar la variació
-                    continue
-            filtered.append(glyph_name)
-    
-        return filtered
+        return pairGen.withoutVariations(glyph_list)
 
 
     def filter_pairs_with_existing_kerning(
@@ -2018,6 +1857,7 @@ class KernCoach(object):
             active_features = tab.features
 
         filtered = []
+        resolver = kerning.KerningResolver(font, master_id)
     
         for pair in pairs:
             try:
@@ -2041,11 +1881,11 @@ class KernCoach(object):
 
             # *** CAMBIO CRÍTICO: Verificar SI el par tiene kerning POR GRUPOS ***
             # Necesitamos una nueva función que solo detecte kerning por grupos
-            has_group_kerning = self._has_group_kerning_only(font, master_id, left_name, right_name)
+            has_group_kerning = self._has_group_kerning_only(font, master_id, left_name, right_name, resolver)
         
             if has_group_kerning:
                 # ⛔ Filtrar este par - ya tiene kerning por grupos (candado cerrado)
-                self._debug("HIDE", f"🗑️ Filtering pair (has group kerning 🔒): {left_name} / {right_name}")
+                self._debug("HIDE", "🗑️ Filtering pair (has group kerning 🔒): %s / %s", left_name, right_name)
                 continue
             else:
                 # ✅ Mantener este par - no tiene kerning por grupos
@@ -2054,78 +1894,21 @@ class KernCoach(object):
     
         return filtered
 
-    def _has_group_kerning_only(self, font, master_id, left_name, right_name):
+    def _has_group_kerning_only(self, font, master_id, left_name, right_name, resolver=None):
         """
         Retorna True si el parell ja està cobert per QUALSEVOL
-        combinació de kerning per grup (grup-grup, grup-glif, glif-grup)
+        combinació de kerning (glif-glif, grup-grup, grup-glif, glif-grup).
+        Per a lots de parells, passa un kerning.KerningResolver creat una vegada.
         """
-        if left_name not in font.glyphs or right_name not in font.glyphs:
-            return False
-
-        left_glyph = font.glyphs[left_name]
-        right_glyph = font.glyphs[right_name]
-
-        kerning_dict = font.kerning.get(master_id, {})
-
-        # Claus possibles
-        left_keys = {left_name}
-        right_keys = {right_name}
-
-        if left_glyph.rightKerningGroup:
-            left_keys.add(f"@MMK_L_{left_glyph.rightKerningGroup}")
+        if resolver is None:
+            resolver = kerning.KerningResolver(font, master_id)
+        return resolver.isKerned(left_name, right_name)
 
-        if right_glyph.leftKerningGroup:
-            right_keys.add(f"@MMK_R_{right_glyph.leftKerningGroup}")
-
-        # Comprovar TOTES les combinacions
-        for lk in left_keys:
-            if lk not in kerning_dict:
-                continue
-
-            rk_dict = kerning_dict.get(lk, {})
-            for rk in right_keys:
-                if rk in rk_dict:
-                    self._debug(
-                        "HIDE",
-                        f"🔒 Covered by kerning: {lk} / {rk}"
-                    )
-                    return True
-
-        return False
-
-
-    def _has_specific_kerning_pair(self, font, master_id, left_name, right_name):
+    def _has_specific_kerning_pair(self, font, master_id, left_name, right_name, resolver=None):
         """Verifica si un par tiene kerning ESPECÍFICO (candado abierto 🔓)"""
-        if left_name not in font.glyphs or right_name not in font.glyphs:
-            return False
-    
-        # Verificar par EXACTO (no por grupos)
-        try:
-            kerning_dict = font.kerning.get(master_id, {})
-            if left_name in kerning_dict:
-                right_dict = kerning_dict[left_name]
-                if right_name in right_dict:
-                    self._debug("HIDE", f"       Found SPECIFIC kerning: {left_name} / {right_name}")
-                    return True
-        
-            # También verificar directamente
-            kern_value = font.kerningForPair(master_id, left_name, right_name)
-            if kern_value is not None:
-                # Verificar que NO sea por grupos indirectamente
-                left_glyph = font.glyphs[left_name]
-                right_glyph = font.glyphs[right_name]
-            
-                # Si ambos tienen grupos, pero estamos usando nombres específicos, es candado abierto
-                left_has_group = hasattr(left_glyph, 'rightKerningGroup') and left_glyph.rightKerningGroup
-                right_has_group = hasattr(right_glyph, 'leftKerningGroup') and right_glyph.leftKerningGroup
-            
-                if left_has_group and right_has_group:
-                    # Hay grupos, pero estamos usando nombres específicos → candado abierto
-                    return True
-        except Exception:
-            pass
-    
-        return False
+        if resolver is None:
+            resolver = kerning.KerningResolver(font, master_id)
+        return resolver.kind(left_name, right_name) == kerning.DIRECT
 
     def clear_kerning_cache(self, master_id=None):
         """Limpia la cache de kerning"""
@@ -3077,21 +2860,21 @@ class KernCoach(object):
         # Usar grupo derecho del glifo izquierdo si existe
         if gL.rightKerningGroup:
             leftKey = f"@MMK_L_{gL.rightKerningGroup}"
-            self._debug("GENERAL", f"  Usando grupo derecho: {gL.rightKerningGroup} → {leftKey}")
+            self._debug("GENERAL", "  Usando grupo derecho: %s → %s", gL.rightKerningGroup, leftKey)
     
         # Usar grupo izquierdo del glifo derecho si existe
         if gR.leftKerningGroup:
             rightKey = f"@MMK_R_{gR.leftKerningGroup}"
-            self._debug("GENERAL", f"  Usando grupo izquierdo: {gR.leftKerningGroup} → {rightKey}")
+            self._debug("GENERAL", "  Usando grupo izquierdo: %s → %s", gR.leftKerningGroup, rightKey)
     
         # Verificar si ya existe kerning por grupos
         existing_kern = font.kerningForPair(masterID, leftKey, rightKey)
         if existing_kern is not None:
-            self._debug("GENERAL", f"  ⚠️ Ya existe kerning por grupos: {leftKey}/{rightKey} = {existing_kern}")
+            self._debug("GENERAL", "  ⚠️ Ya existe kerning por grupos: %s/%s = %s", leftKey, rightKey, existing_kern)
             return True  # Ya existe, no crear duplicado
 
         try:
-            self._debug("GENERAL", f"  Aplicando kerning por GRUPOS: {leftKey} / {rightKey} = {kerningValue}")
+            self._debug("GENERAL", "  Aplicando kerning por GRUPOS: %s / %s = %s", leftKey, rightKey, kerningValue)
             font.setKerningForPair(
                 masterID,
                 leftKey,
@@ -3101,7 +2884,7 @@ class KernCoach(object):
             return True
 
         except Exception as e:
-            self._debug("ERROR", f"  ❌ Error aplicando kerning: {e}")
+            self._debug("ERROR", "  ❌ Error aplicando kerning: %s", e)
             return False
             
             
@@ -3403,28 +3186,28 @@ class KernCoach(object):
             
                 # Debug para mostrar qué tipo de kerning se creó
                 if left_key.startswith("@MMK_L") and right_key.startswith("@MMK_R"):
-                    self._debug("GENERAL", f"✅ Group-group kerning: {left_key}/{right_key} = {needed}")
+                    self._debug("GENERAL", "✅ Group-group kerning: %s/%s = %s", left_key, right_key, needed)
                 elif left_key.startswith("@MMK_L"):
-                    self._debug("GENERAL", f"✅ Group-glyph kerning: {left_key}/{right_key} = {needed}")
+                    self._debug("GENERAL", "✅ Group-glyph kerning: %s/%s = %s", left_key, right_key, needed)
                 elif right_key.startswith("@MMK_R"):
-                    self._debug("GENERAL", f"✅ Glyph-group kerning: {left_key}/{right_key} = {needed}")
+                    self._debug("GENERAL", "✅ Glyph-group kerning: %s/%s = %s", left_key, right_key, needed)
                 else:
-                    self._debug("GENERAL", f"⚠️ Specific kerning (candau obert): {left_key}/{right_key} = {needed}")
+                    self._debug("GENERAL", "⚠️ Specific kerning (candau obert): %s/%s = %s", left_key, right_key, needed)
                 
             except Exception as e:
-                self._debug("ERROR", f"❌ Error applying kerning: {e}")
+                self._debug("ERROR", "❌ Error applying kerning: %s", e)
 
         self.refreshMargin(None)
 
         # Mostrar resumen
-        self._debug("GENERAL", f"\n📊 KERNALLPAIRS SUMMARY")
-        self._debug("GENERAL", f"   Total unique pairs: {len(seen)}")
-        self._debug("GENERAL", f"   Pairs kerned: {applied}")
-        self._debug("GENERAL", f"   Pairs skipped (NoKern): {skipped}")
-        self._debug("GENERAL", f"   Pairs skipped (already has group kerning): {skipped_already_has_group_kerning}")
+        self._debug("GENERAL", "\n📊 KERNALLPAIRS SUMMARY")
+        self._debug("GENERAL", "   Total unique pairs: %s", len(seen))
+        self._debug("GENERAL", "   Pairs kerned: %s", applied)
+        self._debug("GENERAL", "   Pairs skipped (NoKern): %s", skipped)
+        self._debug("GENERAL", "   Pairs skipped (already has group kerning): %s", skipped_already_has_group_kerning)
     
         if skipped_already_has_group_kerning > 0:
-            self._debug("GENERAL", f"   ✅ No se crearon duplicados de kerning por grupos")
+            self._debug("GENERAL", "   ✅ No se crearon duplicados de kerning por grupos")
 
 
 
@@ -3929,11 +3712,6 @@ class KernCoach(object):
             except Exception as e:
                 self.debug_no_kern(f"✗ ERROR applying kerning: {e}")
     
-        # Limpiar cache de miembros de grupos si se modificó kerning
-        if hasattr(self, '_group_members_cache'):
-            self._group_members_cache.clear()
-            self.debug_no_kern(f"Cleared group members cache")
-    
         self.debug_no_kern(f"\n{'='*60}")
         self.debug_no_kern("KERNING COMPLETED - SUMMARY")
         self.debug_no_kern(f"Total unique pairs considered: {len(seen)}")
@@ -3952,15 +3730,15 @@ class KernCoach(object):
         self.refreshMargin(None)
     
         # También mostrar resumen en la consola normal
-        self._debug("GENERAL", f"\n📊 KERNING COMPLETED")
-        self._debug("GENERAL", f"   Total unique pairs considered: {len(seen)}")
-        self._debug("GENERAL", f"   Pairs with adjustments: {applied_with_adjustments}")
-        self._debug("GENERAL", f"   Pairs with normal kerning: {applied_normal}")
-        self._debug("GENERAL", f"   Pairs skipped (NoKern): {skipped_no_kern}")
-        self._debug("GENERAL", f"   Pairs skipped (invalid/missing glyphs): {skipped_invalid}")
-        self._debug("GENERAL", f"   Pairs skipped (no kerning needed): {skipped_no_kerning_needed}")
-        self._debug("GENERAL", f"   Pairs skipped (already has group kerning): {skipped_already_has_group_kerning}")
-        self._debug("GENERAL", f"   Total kerned: {applied_with_adjustments + applied_normal}")
+        self._debug("GENERAL", "\n📊 KERNING COMPLETED")
+        self._debug("GENERAL", "   Total unique pairs considered: %s", len(seen))
+        self._debug("GENERAL", "   Pairs with adjustments: %s", applied_with_adjustments)
+        self._debug("GENERAL", "   Pairs with normal kerning: %s", applied_normal)
+        self._debug("GENERAL", "   Pairs skipped (NoKern): %s", skipped_no_kern)
+        self._debug("GENERAL", "   Pairs skipped (invalid/missing glyphs): %s", skipped_invalid)
+        self._debug("GENERAL", "   Pairs skipped (no kerning needed): %s", skipped_no_kerning_needed)
+        self._debug("GENERAL", "   Pairs skipped (already has group kerning): %s", skipped_already_has_group_kerning)
+        self._debug("GENERAL", "   Total kerned: %s", applied_with_adjustments + applied_normal)
            
               
                  
@@ -4045,39 +3823,10 @@ class KernCoach(object):
         if not font:
             return []
     
-        # Cache para mejorar rendimiento
-        if not hasattr(self, '_group_members_cache_side'):
-            self._group_members_cache_side = {}
-    
-        cache_key = f"{group_name_with_at}_{side}"
-        if cache_key in self._group_members_cache_side:
-            return self._group_members_cache_side[cache_key]
-    
-        group_name = group_name_with_at.lstrip('@')
-        members = set()
-    
-        for glyph in font.glyphs:
-            # Determinar qué atributo verificar según el lado
-            if side == "left":
-                # Para "No Kern RightSB" - verificar rightKerningGroup
-                group = glyph.rightKerningGroup
-            else:
-                # Para "No Kern LeftSB" - verificar leftKerningGroup
-                group = glyph.leftKerningGroup
-        
-            if group and group.lstrip('@') == group_name:
-                members.add(glyph.name)
-        
-            # También verificar subgrupos (ej: @h.sc.alt es subgrupo de @h.sc)
-            if group:
-                clean_group = group.lstrip('@')
-                if clean_group.startswith(group_name + '.'):
-                    members.add(glyph.name)
-    
-        result = list(members)
-        self._group_members_cache_side[cache_key] = result
-    
-        return result
+        # "No Kern RightSB" (side "left") mira rightKerningGroup, y viceversa;
+        # subgrupos incluidos (ej: @h.sc.alt es subgrupo de @h.sc)
+        group_side = "right" if side == "left" else "left"
+        return fontIndex.indexForFont(font).groupMembers(group_name_with_at, group_side, subgroups=True)
                   
                   
     def _is_glyph_blocked(self, glyphName, side):
@@ -4342,9 +4091,9 @@ class KernCoach(object):
             if master_id in self._kerningCache:
                 del self._kerningCache[master_id]
 
-        self._debug("GENERAL", f"📊 RESUMEN CLEAR KERNING")
-        self._debug("GENERAL", f"   Pares protegidos (dentro de #...#): {protected}")
-        self._debug("GENERAL", f"   Pares de kerning eliminados: {removed}")
+        self._debug("GENERAL", "📊 RESUMEN CLEAR KERNING")
+        self._debug("GENERAL", "   Pares protegidos (dentro de #...#): %s", protected)
+        self._debug("GENERAL", "   Pares de kerning eliminados: %s", removed)
         
         
     def removeHashSymbolsCallback(self, sender):
@@ -5014,10 +4763,10 @@ class KernCoach(object):
         # Obtener features activas del tab
         active_features = self._get_active_features_from_tab()
     
-        self._debug("HIDE", f"\n🔍 HIDE EXISTING PAIRS DEBUG START")
-        self._debug("HIDE", f"   Master ID: {master_id}")
-        self._debug("HIDE", f"   Active features in tab: {active_features}")
-        self._debug("HIDE", f"   Original text lines: {len(lines)}")
+        self._debug("HIDE", "\n🔍 HIDE EXISTING PAIRS DEBUG START")
+        self._debug("HIDE", "   Master ID: %s", master_id)
+        self._debug("HIDE", "   Active features in tab: %s", active_features)
+        self._debug("HIDE", "   Original text lines: %s", len(lines))
     
         # Activar debug temporal
         DEBUG_HAS_KERNING_ORIGINAL = getattr(self, "DEBUG_HAS_KERNING", False)
@@ -5025,6 +4774,9 @@ class KernCoach(object):
         self.DEBUG_HAS_KERNING = True
         self.DEBUG_HIDE = True
 
+        # Un sol snapshot del kerning per a tot el tab
+        resolver = kerning.KerningResolver(font, master_id)
+
         for line_num, line in enumerate(lines):
             raw = line.rstrip()
     
@@ -5106,21 +4858,21 @@ class KernCoach(object):
                 is_left_variant = '.' in left_name
                 is_right_variant = '.' in right_name
         
-                self._debug("HIDE", f"\n       Checking pair: {left_name} / {right_name}")
+                self._debug("HIDE", "\n       Checking pair: %s / %s", left_name, right_name)
                 if is_left_variant:
-                    self._debug("HIDE", f"       Left is variant: {left_name} (base: {left_base})")
+                    self._debug("HIDE", "       Left is variant: %s (base: %s)", left_name, left_base)
                 if is_right_variant:
-                    self._debug("HIDE", f"       Right is variant: {right_name} (base: {right_base})")
+                    self._debug("HIDE", "       Right is variant: %s (base: %s)", right_name, right_base)
         
                 # *** CAMBIO CRÍTICO: Verificar solo kerning por GRUPOS (candados cerrados) ***
-                has_group_kerning = self._has_group_kerning_only(font, master_id, left_name, right_name)
+                has_group_kerning = self._has_group_kerning_only(font, master_id, left_name, right_name, resolver)
         
-                self._debug("HIDE", f"       Has group kerning (candado cerrado): {has_group_kerning}")
+                self._debug("HIDE", "       Has group kerning (candado cerrado): %s", has_group_kerning)
         
                 # Verificar si tiene kerning específico (candado abierto) - SOLO para debug
-                has_specific_kerning = self._has_specific_kerning_pair(font, master_id, left_name, right_name)
+                has_specific_kerning = self._has_specific_kerning_pair(font, master_id, left_name, right_name, resolver)
                 if has_specific_kerning:
-                    self._debug("HIDE", f"       ⚠️ Pair has specific kerning (candado abierto) - IGNORING for hiding")
+                    self._debug("HIDE", "       ⚠️ Pair has specific kerning (candado abierto) - IGNORING for hiding")
             
                 # **REGLA CRÍTICA: Si es una variante y no tiene kerning por grupos,**
                 # **verificar si DEBERÍAMOS considerar el kerning de base por grupos**
@@ -5128,7 +4880,7 @@ class KernCoach(object):
                 special_case_handled = False
         
                 if not has_group_kerning and (is_left_variant or is_right_variant):
-                    self._debug("HIDE", f"       Variant pair without group kerning, checking base groups...")
+                    self._debug("HIDE", "       Variant pair without group kerning, checking base groups...")
             
                     # Caso 1: Ambos son variantes con la MISMA extensión
                     if is_left_variant and is_right_variant:
@@ -5137,23 +4889,23 @@ class KernCoach(object):
                 
                         if left_ext == right_ext:
                             # Ambos son .sc, .ss01, etc.
-                            self._debug("HIDE", f"         Both have same extension: .{left_ext}")
+                            self._debug("HIDE", "         Both have same extension: .%s", left_ext)
                     
                             # Verificar si el kerning de base existe POR GRUPOS
-                            base_has_group_kerning = self._has_group_kerning_only(font, master_id, left_base, right_base)
-                            self._debug("HIDE", f"         Base pair {left_base}/{right_base} has group kerning: {base_has_group_kerning}")
+                            base_has_group_kerning = self._has_group_kerning_only(font, master_id, left_base, right_base, resolver)
+                            self._debug("HIDE", "         Base pair %s/%s has group kerning: %s", left_base, right_base, base_has_group_kerning)
                     
                             if base_has_group_kerning:
                                 # **DECISIÓN: ¿Ocultar o mostrar?**
                                 # En Glyphs, el kerning de base por grupos NO se aplica automáticamente a variantes
                                 # a menos que uses grupos específicos. Por lo tanto, NO ocultamos.
-                                self._debug("HIDE", f"         ⚠️ Base has group kerning but variants don't - KEEPING pair")
+                                self._debug("HIDE", "         ⚠️ Base has group kerning but variants don't - KEEPING pair")
                                 has_group_kerning = False  # Mantener como False
                                 special_case_handled = True
             
                     # Caso 2: Solo uno es variante
                     elif is_left_variant or is_right_variant:
-                        self._debug("HIDE", f"         Mixed pair (one variant, one base)")
+                        self._debug("HIDE", "         Mixed pair (one variant, one base)")
                 
                         # Verificar kerning por grupos para esta combinación mixta
                         # En Glyphs, e/Y por grupos NO implica automáticamente e.sc/Y
@@ -5168,17 +4920,17 @@ class KernCoach(object):
                 if has_group_kerning:
                     # Ocultar solo si encontramos kerning POR GRUPOS (candado cerrado)
                     hidden_pairs += 1
-                    self._debug("HIDE", f"       ✅ HIDDEN: {left_name} / {right_name} (has group kerning 🔒)")
+                    self._debug("HIDE", "       ✅ HIDDEN: %s / %s (has group kerning 🔒)", left_name, right_name)
                 else:
                     kept_blocks.append(block)
                     kept_pairs += 1
             
                     if special_case_handled:
-                        self._debug("HIDE", f"       ✅ KEPT: {left_name} / {right_name} (variant without group kerning)")
+                        self._debug("HIDE", "       ✅ KEPT: %s / %s (variant without group kerning)", left_name, right_name)
                     elif has_specific_kerning:
-                        self._debug("HIDE", f"       ✅ KEPT: {left_name} / {right_name} (has specific kerning 🔓 - ignoring)")
+                        self._debug("HIDE", "       ✅ KEPT: %s / %s (has specific kerning 🔓 - ignoring)", left_name, right_name)
                     else:
-                        self._debug("HIDE", f"       ✅ KEPT: {left_name} / {right_name} (no group kerning)")
+                        self._debug("HIDE", "       ✅ KEPT: %s / %s (no group kerning)", left_name, right_name)
     
             if kept_blocks:
                 columns = 4
@@ -5200,25 +4952,25 @@ class KernCoach(object):
     
         if final_text != original_text:
             tab.text = final_text
-            self._debug("HIDE", f"   Text modified: {len(original_text.splitlines())} → {len(final_text.splitlines())} lines")
+            self._debug("HIDE", "   Text modified: %s → %s lines", len(original_text.splitlines()), len(final_text.splitlines()))
         else:
-            self._debug("HIDE", f"   Text unchanged")
+            self._debug("HIDE", "   Text unchanged")
     
         # Mostrar resumen
-        self._debug("HIDE", f"\n📊 HIDE EXISTING PAIRS SUMMARY")
-        self._debug("HIDE", f"   Total blocks checked: {total_pairs}")
-        self._debug("HIDE", f"   Blocks hidden (had GROUP kerning 🔒): {hidden_pairs}")
-        self._debug("HIDE", f"   Blocks kept (no group kerning): {kept_pairs}")
+        self._debug("HIDE", "\n📊 HIDE EXISTING PAIRS SUMMARY")
+        self._debug("HIDE", "   Total blocks checked: %s", total_pairs)
+        self._debug("HIDE", "   Blocks hidden (had GROUP kerning 🔒): %s", hidden_pairs)
+        self._debug("HIDE", "   Blocks kept (no group kerning): %s", kept_pairs)
     
         if active_features:
-            self._debug("HIDE", f"   Active features considered: {active_features}")
+            self._debug("HIDE", "   Active features considered: %s", active_features)
     
         if hidden_pairs > 0:
-            self._debug("HIDE", f"   ✅ Successfully hid {hidden_pairs} pairs with GROUP kerning (candados cerrados)")
+            self._debug("HIDE", "   ✅ Successfully hid %s pairs with GROUP kerning (candados cerrados)", hidden_pairs)
         else:
-            self._debug("HIDE", f"   ⚠️ No pairs were hidden (only GROUP kerning counts, specific kerning 🔓 is ignored)")
+            self._debug("HIDE", "   ⚠️ No pairs were hidden (only GROUP kerning counts, specific kerning 🔓 is ignored)")
     
-        self._debug("HIDE", f"🔍 HIDE EXISTING PAIRS DEBUG END\n")
+        self._debug("HIDE", "🔍 HIDE EXISTING PAIRS DEBUG END\n")
         self._debug("GENERAL", "🔥 hideExistingPairsSmart COMPLETED")
 
 
@@ -5301,6 +5053,7 @@ class KernCoach(object):
         kept_layers = []
         i = 0
         removed_pairs = 0
+        resolver = kerning.KerningResolver(font, master_id)
 
         while i < len(layers) - 1:
             L = layers[i]
@@ -5313,27 +5066,7 @@ class KernCoach(object):
                 i += 1
                 continue
 
-            gL = font.glyphs[left]
-            gR = font.glyphs[right]
-
-            left_keys = {left}
-            right_keys = {right}
-
-            if gL.rightKerningGroup:
-                left_keys.add(f"@MMK_L_{gL.rightKerningGroup}")
-            if gR.leftKerningGroup:
-                right_keys.add(f"@MMK_R_{gR.leftKerningGroup}")
-
-            has_kern = False
-            for lk in left_keys:
-                for rk in right_keys:
-                    if font.kerningForPair(master_id, lk, rk) is not None:
-                        has_kern = True
-                        break
-                if has_kern:
-                    break
-
-            if has_kern:
+            if resolver.isKerned(left, right):
                 removed_pairs += 1
                 i += 2
             else:
@@ -15,20 +15,13 @@ Central panel with multiple tabs for kerning-related tools"""
 from GlyphsApp import *
 from vanilla import Window, Tabs, TextBox, EditText, PopUpButton, Button, CheckBox, HorizontalLine, TextEditor, RadioGroup, List
 from AppKit import NSAlert, NSInformationalAlertStyle, NSTextField, NSView, NSMakeRect, NSNormalWindowLevel, NSColor
-import json, os, math, unicodedata
+import collections, os, sys, unicodedata
 from vanilla.dialogs import askYesNo
 
-# ===========================================================
-# Helper function used by Clear & Restore
-# ===========================================================
-def nameForID(font, ID):
-    try:
-        if ID[0] == "@":
-            return ID
-        else:
-            return font.glyphForId_(ID).name
-    except:
-        return None
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex, kerning, kerningBatch, pairGen, pairStream, pruning, scaling, segmentIndex, smallCaps, snapshots
 
 # ===========================================================
 # MAIN CLASS
@@ -641,29 +634,6 @@ class KernTools:
                     out.append((L, R, val))
         return out
 
-    def filter_unique_by_groups(self, font, glyph_names):
-        """Filter duplicate glyphs by kerning groups"""
-        seen_groups = set()
-        result = []
-        
-        for name in glyph_names:
-            if name not in font.glyphs:
-                continue
-                
-            g = font.glyphs[name]
-            left_group = g.leftKerningGroup
-            
-            if not left_group:
-                left_group = f"NO_GROUP_{name}"
-            
-            if left_group in seen_groups:
-                continue
-                
-            seen_groups.add(left_group)
-            result.append(name)
-        
-        return result
-
     # --- Function to count glyphs without kerning groups ---
     def count_glyphs_without_kerning_groups(self, font):
         """Count how many base glyphs don't have kerning groups assigned"""
@@ -693,11 +663,11 @@ class KernTools:
                 continue
                 
             if not glyph.leftKerningGroup:
-                glyph.leftKerningGroup = glyph.name
+                fontIndex.indexForFont(font).setKerningGroup(glyph, "left", glyph.name)
                 count_left += 1
                 
             if not glyph.rightKerningGroup:
-                glyph.rightKerningGroup = glyph.name
+                fontIndex.indexForFont(font).setKerningGroup(glyph, "right", glyph.name)
                 count_right += 1
         
         return count_left + count_right
@@ -836,9 +806,10 @@ class KernTools:
         self.generatePairsGenerator()
 
     # --- MODIFIED FUNCTION: Contextual prefixes and suffixes that USE USER INPUT ---
-    def _getContextualSuffixes(self, left_glyph_name, right_glyph_name):
+    def _getContextualSuffixes(self, left_glyph_name, right_glyph_name, tables=None):
         """
         Internal helper that returns (prefix, suffix) according to user input OR glyph types.
+        With tables (pairGen), the contextual affixes of a pair are computed once per font version.
         """
         # FIRST: Check if user has provided custom prefixes/suffixes
         tab = self.w.tabs[0]
@@ -850,6 +821,12 @@ class KernTools:
             return user_prefix, user_suffix
         
         # OTHERWISE: Use the default contextual behavior
+        if tables is not None:
+            return tables.affixes("contextual", left_glyph_name, right_glyph_name, self._contextualAffixes)
+        return self._contextualAffixes(left_glyph_name, right_glyph_name)
+
+    def _contextualAffixes(self, left_glyph_name, right_glyph_name):
+        """Default (prefix, suffix) from the type of each side: HHOH / hhoh and HOOH / hooh."""
         font = Glyphs.font
 
         # Helper: robust classification
@@ -984,13 +961,15 @@ class KernTools:
         except: text_size = 60
         master_id = font.selectedFontMaster.id
 
-        # Generate tabs only for valid base glyphs
-        for base in valid_base_names:
-            g_base = font.glyphs[base]
+        # Neighbour lists, displays and affixes are cached per font version (pairGen)
+        tables = pairGen.tablesForFont(font)
+        section_neighbors = dict((sec, self.section_neighbors_display(sec, use_groups, tables)) for sec in sections)
+
+        def build_tab(base, category):
             base_disp = self.format_glyph_display(base)
             
             if not base_disp:
-                continue
+                return None
                 
             tab_lines = [f"# {base} ({base_disp})", ""]
 
@@ -998,17 +977,7 @@ class KernTools:
             if show_existing:
                 tab_lines += ["# Existing kerning pairs (with values)", "# ———"]
                 for sec in sections:
-                    neighs = self.neighbors_for_section(sec, use_groups)
-                    
-                    for n in neighs:
-                        # Verify that neighbor glyph is valid
-                        if not self.glyph_exists_and_valid(n):
-                            continue
-                            
-                        n_disp = self.format_glyph_display(n)
-                        if not n_disp:
-                            continue
-                            
+                    for n, n_disp in section_neighbors[sec]:
                         for L, R, val in self.all_kernings_between(font, master_id, base, n) + self.all_kernings_between(font, master_id, n, base):
                             L_glyph = self.group_to_glyph(L)
                             R_glyph = self.group_to_glyph(R)
@@ -1023,13 +992,13 @@ class KernTools:
                                 continue
                             existing_pairs_set.add(pair_key)
                             
-                            prefix, suffix = self._getContextualSuffixes(L_glyph, R_glyph)
+                            prefix, suffix = self._getContextualSuffixes(L_glyph, R_glyph, tables)
                             line = f"{prefix}{Ldisp}{Rdisp}{suffix}" + " " * 10 + f"{int(val)}"
                             tab_lines.append(line)
                 tab_lines.append("")
 
             # Generate symmetric trios automatically mixed with regular pairs
-            symmetric_trios = self.get_symmetric_trios_for_glyph(base, master_id)
+            symmetric_trios = self.get_symmetric_trios_for_glyph(base, master_id, tables)
             if symmetric_trios:
                 tab_lines += ["# Symmetric trios (check consistency)", ""]
                 # Remove duplicates while preserving order
@@ -1046,68 +1015,74 @@ class KernTools:
 
             # Generate new pairs with intelligent context - CORRECTED
             for sec in sections:
-                neighs = self.neighbors_for_section(sec, use_groups)
+                neighs = section_neighbors[sec]
                 
                 if position in ["left", "both"]:
                     tab_lines.append(f"# Left pairs - {sec}")
                     tab_lines.append("")
-                    for n in neighs:
-                        # VERIFY that neighbor glyph is valid
-                        if not self.glyph_exists_and_valid(n):
-                            continue
-                            
-                        n_disp = self.format_glyph_display(n)
-                        if not n_disp:
-                            continue
-                            
+                    for n, n_disp in neighs:
                         pair_key = (base_disp, n_disp)
                         
                         existing_kern = any(self.all_kernings_between(font, master_id, base, n))
                         if pair_key in existing_pairs_set or existing_kern:
                             continue
                         
-                        prefix, suffix = self._getContextualSuffixes(base, n)
+                        prefix, suffix = self._getContextualSuffixes(base, n, tables)
                         tab_lines.append(f"{prefix}{base_disp}{n_disp}{suffix}")
                     tab_lines.append("")
                 
                 if position in ["right", "both"]:
                     tab_lines.append(f"# Right pairs - {sec}")
                     tab_lines.append("")
-                    for n in neighs:
-                        # VERIFY that neighbor glyph is valid
-                        if not self.glyph_exists_and_valid(n):
-                            continue
-                            
-                        n_disp = self.format_glyph_display(n)
-                        if not n_disp:
-                            continue
-                            
+                    for n, n_disp in neighs:
                         pair_key = (n_disp, base_disp)
                         
                         existing_kern = any(self.all_kernings_between(font, master_id, n, base))
                         if pair_key in existing_pairs_set or existing_kern:
                             continue
                         
-                        prefix, suffix = self._getContextualSuffixes(n, base)
+                        prefix, suffix = self._getContextualSuffixes(n, base, tables)
                         tab_lines.append(f"{prefix}{n_disp}{base_disp}{suffix}")
                     tab_lines.append("")
 
             if len(tab_lines) > 2:
-                tab_content = "\n".join(tab_lines)
-                new_tab = font.newTab(tab_content)
+                return "\n".join(tab_lines)
+            return None
+
+        # Generate tabs only for valid base glyphs; each tab is built when it is opened
+        for base, _, tab_content in pairGen.iterTabs(valid_base_names, None, build_tab):
+            new_tab = font.newTab(tab_content)
+            try:
+                # Apply selected OT feature to the newly opened tab (if any)
                 try:
-                    # Apply selected OT feature to the newly opened tab (if any)
-                    try:
-                        feature_list = [f.name for f in font.features]
-                        idx = tab.featurePopup.get() if hasattr(tab, 'featurePopup') else None
-                        if idx is not None and isinstance(idx, int) and 0 <= idx < len(feature_list):
-                            selectedFeature = feature_list[idx]
-                            new_tab.features = [selectedFeature]
-                    except Exception:
-                        pass
-                    new_tab.textView().setFontSize_(text_size)
-                except:
+                    feature_list = [f.name for f in font.features]
+                    idx = tab.featurePopup.get() if hasattr(tab, 'featurePopup') else None
+                    if idx is not None and isinstance(idx, int) and 0 <= idx < len(feature_list):
+                        selectedFeature = feature_list[idx]
+                        new_tab.features = [selectedFeature]
+                except Exception:
                     pass
+                new_tab.textView().setFontSize_(text_size)
+            except:
+                pass
+
+    def section_neighbors_display(self, section, use_groups=True, tables=None):
+        """[(glyph name, display)] of the valid neighbours of a section, once per font version."""
+        if tables is None:
+            tables = pairGen.tablesForFont(Glyphs.font)
+
+        def build():
+            out = []
+            for n in self.neighbors_for_section(section, use_groups):
+                # VERIFY that neighbor glyph is valid
+                if not self.glyph_exists_and_valid(n):
+                    continue
+                n_disp = self.format_glyph_display(n)
+                if n_disp:
+                    out.append((n, n_disp))
+            return out
+
+        return tables.memo(("section display", section, bool(use_groups)), build)
 
 
     def neighbors_for_section(self, section, use_groups=True):
@@ -1158,18 +1133,20 @@ class KernTools:
             if glyph_name in font.glyphs and self.is_base_glyph(font.glyphs[glyph_name]):
                 valid_glyphs.append(glyph_name)
         
-        # THEN apply group filter if enabled
+        # THEN apply group filter if enabled (one glyph per left kerning group)
         if use_groups:
-            out = self.filter_unique_by_groups(font, valid_glyphs)
+            out = pairGen.tablesForFont(font).uniqueByGroup(valid_glyphs)
         else:
             out = valid_glyphs
         
         return sorted(set(out))
 
     # --- CORRECTED FUNCTION: Get symmetric trios for glyph - ALWAYS VISIBLE ---
-    def get_symmetric_trios_for_glyph(self, base_name, master_id):
+    def get_symmetric_trios_for_glyph(self, base_name, master_id, tables=None):
         """Get symmetric trios that include the specified base glyph - ALWAYS VISIBLE"""
         font = Glyphs.font
+        if tables is None:
+            tables = pairGen.tablesForFont(font)
         base_disp = self.format_glyph_display(base_name)
         if not base_disp:
             return []
@@ -1181,6 +1158,15 @@ class KernTools:
         base_is_upper = self.is_uppercase_glyph(base_name)
         
         symmetric_trios = []
+
+        # Display -> first glyph with that display, in font order (once per font version)
+        def build_display_table():
+            names = {}
+            for g in font.glyphs:
+                names.setdefault(self.format_glyph_display(g.name), g.name)
+            return names
+
+        display_names = tables.memo("display names", build_display_table)
         
         for trio in self.SYMMETRIC_TRIOS:
             # Check if base character is in this trio
@@ -1204,16 +1190,10 @@ class KernTools:
                 trio_glyphs = []
                 
                 for char in trio:
-                    char_found = False
-                    for g in font.glyphs:
-                        g_disp = self.format_glyph_display(g.name)
-                        if g_disp == char:
-                            trio_glyphs.append(g.name)
-                            char_found = True
-                            break
-                    if not char_found:
+                    if char not in display_names:
                         glyphs_exist = False
                         break
+                    trio_glyphs.append(display_names[char])
             
                 # MODIFICACIÓN PRINCIPAL: Siempre incluir el trio si todos los glifos existen
                 # Eliminamos la verificación de kerning existente
@@ -1221,7 +1201,7 @@ class KernTools:
                     # Get contextual prefix/suffix for the entire trio
                     first_glyph = trio_glyphs[0]
                     last_glyph = trio_glyphs[2]
-                    prefix, suffix = self._getContextualSuffixes(first_glyph, last_glyph)
+                    prefix, suffix = self._getContextualSuffixes(first_glyph, last_glyph, tables)
                     symmetric_trios.append(f"{prefix}{trio}{suffix}")
     
         return symmetric_trios
@@ -1293,9 +1273,9 @@ class KernTools:
                 continue
             glyph = font.glyphs[glyph_name]
             if side == 'L' and not glyph.leftKerningGroup:
-                glyph.leftKerningGroup = f"@MMK_L_{glyph_name}"
+                fontIndex.indexForFont(font).setKerningGroup(glyph, "left", f"@MMK_L_{glyph_name}")
             elif side == 'R' and not glyph.rightKerningGroup:
-                glyph.rightKerningGroup = f"@MMK_R_{glyph_name}"
+                fontIndex.indexForFont(font).setKerningGroup(glyph, "right", f"@MMK_R_{glyph_name}")
         return True
     
     def get_glyph_case_type(self, glyph_name):
@@ -1385,9 +1365,8 @@ class KernTools:
         # Get glyph name from glyph ID
         font = Glyphs.font
         if isinstance(glyph_id, str) and len(glyph_id) == 36:
-            for glyph in font.glyphs:
-                if glyph.id == glyph_id: 
-                    return glyph.name
+            glyph = fontIndex.indexForFont(font).glyphForID(glyph_id)
+            return glyph.name if glyph else None
         return None
 
     def find_glyph_for_group(self, group_name, target_side):
@@ -1396,33 +1375,21 @@ class KernTools:
         group_name: group name without prefix (e.g., 'acir', 'bcir', 'tcir')
         target_side: 'L' for left, 'R' for right
         """
-        font = Glyphs.font
-        found_glyphs = []
-        
-        for g in font.glyphs:
-            left_group = g.leftKerningGroup or ""
-            right_group = g.rightKerningGroup or ""
-            
-            if target_side == 'L':
-                # Search in left groups (compare with and without prefix)
-                if (left_group == group_name or 
-                    left_group == f"@MMK_L_{group_name}" or
-                    left_group.endswith(f"_{group_name}")):
-                    found_glyphs.append(g.name)
-            elif target_side == 'R':
-                # Search in right groups (compare with and without prefix)
-                if (right_group == group_name or 
-                    right_group == f"@MMK_R_{group_name}" or
-                    right_group.endswith(f"_{group_name}")):
-                    found_glyphs.append(g.name)
-        
-        return found_glyphs
+        side = {'L': "left", 'R': "right"}.get(target_side)
+        if not side:
+            return []
+        return fontIndex.indexForFont(Glyphs.font).groupMembers(group_name, side)
 
     def get_all_convertible_pairs(self, master_id):
         # Convert all kerning pairs to displayable format with glyph names
         font = Glyphs.font
         convertible_pairs = []
         all_pairs = self.get_all_kern_pairs(master_id)
+        # Representative glyphs for the special groups, looked up once
+        index = fontIndex.indexForFont(font)
+        special_groups = ["acir", "bcir", "tcir", "cometes"]
+        left_reps = index.representatives(special_groups, "right")
+        right_reps = index.representatives(special_groups, "left")
         name_fixes = {
             "a-sc": "a.sc",
             "hypen": "hyphen", 
@@ -1451,13 +1418,8 @@ class KernTools:
                     group_name = left_key[7:]  # Extract group name without '@MMK_L_'
                     left_glyph = group_name
                     
-                    # Find representative glyph for left group
-                    if group_name in ["acir", "bcir", "tcir", "cometes"]:
-                        # For a left group, we look for glyphs that have this group on the RIGHT side
-                        found_glyphs = self.find_glyph_for_group(group_name, 'R')
-                        if found_glyphs:
-                            # Use the first found glyph as representative
-                            left_glyph = found_glyphs[0]
+                    # For a left group, the representative has this group on the RIGHT side
+                    left_glyph = left_reps.get(group_name, left_glyph)
                     
                 elif left_key in font.glyphs:
                     left_glyph = left_key
@@ -1471,13 +1433,8 @@ class KernTools:
                     group_name = right_key[7:]  # Extract group name without '@MMK_R_'
                     right_glyph = group_name
                     
-                    # Find representative glyph for right group
-                    if group_name in ["acir", "bcir", "tcir", "cometes"]:
-                        # For a right group, we look for glyphs that have this group on the LEFT side
-                        found_glyphs = self.find_glyph_for_group(group_name, 'L')
-                        if found_glyphs:
-                            # Use the first found glyph as representative
-                            right_glyph = found_glyphs[0]
+                    # For a right group, the representative has this group on the LEFT side
+                    right_glyph = right_reps.get(group_name, right_glyph)
                     
                 elif right_key in font.glyphs:
                     right_glyph = right_key
@@ -1640,28 +1597,22 @@ class KernTools:
         self._keyCache = {}  # Cache for key resolution
         self._productionCache = {}  # Cache for production names
         self._graphicalCache = {}  # Cache for graphical representations
-        self._groupCache = {}  # Cache for group data
 
     # ===================================================
     # GROUP MANAGER (TURBO OPTIMIZED)
     # ===================================================
     def get_group_glyphs(self, group, side):
-        """TURBO: Fast group member retrieval with caching"""
+        """TURBO: Fast group member retrieval from the font index"""
         font = Glyphs.font
         if not font or not group:
             return []
         
-        # TURBO: Check cache first
-        cache_key = f"{group}_{side}"
-        if cache_key in self._groupCache:
-            return self._groupCache[cache_key]
-        
         # TURBO: Get custom order from userData
         key = f"kernOrder_{side}"
         custom_order = font.userData.get(key, {}).get(group, [])
         
-        # TURBO: Fast glyph collection
-        glyph_names = [g.name for g in font.glyphs if getattr(g, side + "KerningGroup") == group]
+        # TURBO: Indexed glyph collection
+        glyph_names = fontIndex.indexForFont(font).groupMembers(group, side)
         
         # TURBO: Apply custom order if exists
         if custom_order:
@@ -1674,9 +1625,6 @@ class KernTools:
         # TURBO: Format with trophy emoji for leader
         formatted = [f"🏆 {n}" if i == 0 else f"  {n}" for i, n in enumerate(glyph_names)]
         
-        # TURBO: Cache result
-        self._groupCache[cache_key] = formatted
-        
         return formatted
 
     def active_group_tab(self):
@@ -1699,6 +1647,9 @@ class KernTools:
             self.showNoGlyphSelected()
             return
             
+        # Refresh button: re-read groups edited outside the scripts
+        if sender is not None:
+            fontIndex.indexForFont(font).invalidate()
         glyph = font.selectedLayers[0].parent
         
         # TURBO: Parallel group processing
@@ -1758,11 +1709,6 @@ class KernTools:
             font.userData[key] = {}
         font.userData[key][group] = order
 
-        # TURBO: Clear cache to force refresh
-        cache_key = f"{group}_{side}"
-        if cache_key in self._groupCache:
-            del self._groupCache[cache_key]
-
         Message(f"Order applied to {side} group '{group}'")
 
     def showNoGlyphSelected(self):
@@ -2081,46 +2027,10 @@ class KernTools:
         tab.checkBtn = Button((170, 80, 100, 25), "Check", callback=self.checkCollisions)
         tab.out = TextEditor((20, 120, -20, -20), "")
 
-    # TURBO: Optimized geometry functions
-    def distance(self, p1, p2):
-        return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
-
-    def minDistanceBetweenSegments(self, a1, a2, b1, b2):
-        def clamp(x, a, b): return max(a, min(b, x))
-        A, B = (a1.x, a1.y), (a2.x, a2.y)
-        C, D = (b1.x, b1.y), (b2.x, b2.y)
-        
-        def closestPoint(P, Q, R):
-            vx, vy = Q[0]-P[0], Q[1]-P[1]
-            denom = vx*vx + vy*vy
-            if denom == 0: return P
-            t = ((R[0]-P[0])*vx + (R[1]-P[1])*vy) / denom
-            return (P[0] + clamp(t, 0, 1)*vx, P[1] + clamp(t, 0, 1)*vy)
-            
-        dmin = float("inf")
-        for p in (A, B):
-            dmin = min(dmin, self.distance(p, closestPoint(C, D, p)))
-        for p in (C, D):
-            dmin = min(dmin, self.distance(p, closestPoint(A, B, p)))
-        return dmin
-
+    # TURBO: Optimized geometry functions (kernCore.segmentIndex)
     def getSegments(self, layer):
-        """TURBO: Fast segment extraction"""
-        segs = []
-        for p in layer.paths:
-            nodes = p.nodes
-            if not nodes: continue
-            count = len(nodes)
-            for i in range(count):
-                n1 = nodes[i]
-                if p.closed:
-                    n2 = nodes[(i+1) % count]
-                elif i+1 < count:
-                    n2 = nodes[i+1]
-                else:
-                    continue
-                segs.append((n1, n2))
-        return segs
+        """TURBO: Packed segments indexed by Y band"""
+        return segmentIndex.indexSegments(layer)
 
     def bbox(self, layer):
         b = layer.bounds
@@ -2131,17 +2041,8 @@ class KernTools:
                    b1[3] + margin < b2[1] or b2[3] + margin < b1[1])
 
     def layersAreClose(self, layer1, layer2, dx, margin):
-        """TURBO: Fast collision detection"""
-        segs1 = self.getSegments(layer1)
-        shifted = [(type("P", (), {"x": n1.x+dx, "y": n1.y}),
-                    type("P", (), {"x": n2.x+dx, "y": n2.y}))
-                  for n1, n2 in self.getSegments(layer2)]
-                  
-        for s1 in segs1:
-            for s2 in shifted:
-                if self.minDistanceBetweenSegments(s1[0], s1[1], s2[0], s2[1]) < margin:
-                    return True
-        return False
+        """TURBO: Y-banded collision detection, facing contours first"""
+        return segmentIndex.indexedAreClose(self.getSegments(layer1), self.getSegments(layer2), dx, margin)
 
     def glyphType(self, g):
         """TURBO: Fast glyph type detection"""
@@ -2180,30 +2081,31 @@ class KernTools:
         master = font.selectedFontMaster
         mid = master.id
 
-        # TURBO: Fast glyph filtering
-        allGlyphs = [g for g in font.glyphs if g.layers[mid] and (g.layers[mid].paths or g.layers[mid].components)]
+        # TURBO: indexed geometry from the shared kernCore cache (memory + disk),
+        # kept for the whole session and rebuilt only for edited glyphs
+        segCache, bboxCache = {}, {}
+
+        def prepare(g):
+            if g.name not in segCache:
+                segCache[g.name], bboxCache[g.name], _ = segmentIndex.sharedCache.geometry(font, g.name, mid)
+            return segCache[g.name]
+
+        # TURBO: Fast glyph filtering (glyphs without ink have an empty index)
+        allGlyphs = [g for g in font.glyphs if len(prepare(g))]
         specified = [font.glyphs[n] for n in names if n in font.glyphs]
         
         results = []
 
         # TURBO: Optimized collision checking
         for left in specified:
-            L = left.layers[mid]
-            try:
-                L = L.copyDecomposedLayer()
-            except:
-                pass
+            L = prepare(left)
                 
             for right in allGlyphs:
                 if right == left: continue
                 
-                R = right.layers[mid]
-                try:
-                    R = R.copyDecomposedLayer()
-                except:
-                    pass
+                R = prepare(right)
 
-                if not self.boxesAreClose(self.bbox(L), self.bbox(R), margin):
+                if not self.boxesAreClose(bboxCache[left.name], bboxCache[right.name], margin):
                     continue
 
                 if self.layersAreClose(L, R, L.width, margin):
@@ -2424,106 +2326,44 @@ class KernTools:
 
     def transfer_upper_to_upper_sc_fixed(self, font, factor, percentage, overwrite, debug_mode=False):
         created = updated = 0
-        processed_pairs = set()
 
         if debug_mode:
             self.kernToSCLog(f"[DEBUG] Iniciando Uppercase→Uppercase SC transfer")
             self.kernToSCLog(f"[DEBUG] Porcentaje: {percentage}%, Factor: {factor}")
 
-        font.disableUpdateInterface()
         try:
-            masters = [font.selectedFontMaster]
-            for master in masters:
-                mid = master.id
-                kerning_dict = font.kerning.get(mid, {})
-                all_kerning_sources = {}
-
-                for left_key, right_dict in kerning_dict.items():
-                    for right_key, value in right_dict.items():
-                        all_kerning_sources[(str(left_key), str(right_key))] = ("font.kerning", value)
-
-                transfer_pairs = []
-                excluded_sc = 0
-                total_pairs = 0
-
-                for (leftKey_str, rightKey_str), (source, original_value) in all_kerning_sources.items():
-                    total_pairs += 1
-                    if ".sc" in leftKey_str or ".sc" in rightKey_str:
-                        excluded_sc += 1
-                        continue
-                    transfer_pairs.append({
-                        'left': leftKey_str,
-                        'right': rightKey_str,
-                        'value': original_value
-                    })
-
-                if debug_mode:
-                    self.kernToSCLog(f"[DEBUG] Total pares: {total_pairs}, Transferir: {len(transfer_pairs)}, Excluidos SC: {excluded_sc}")
-
-                unique_pairs_to_process = []
-
-                for pair_info in transfer_pairs:
-                    leftKey_str = pair_info['left']
-                    rightKey_str = pair_info['right']
-                    original_value = pair_info['value']
-
-                    leftSC = self.convert_to_sc_like_original(leftKey_str, font)
-                    rightSC = self.convert_to_sc_like_original(rightKey_str, font)
-
-                    if not self._checkGlyphExists(font, leftSC) or not self._checkGlyphExists(font, rightSC):
-                        if debug_mode:
-                            missing = []
-                            if not self._checkGlyphExists(font, leftSC): missing.append(leftSC)
-                            if not self._checkGlyphExists(font, rightSC): missing.append(rightSC)
-                            self.kernToSCLog(f"[DEBUG] Saltado pares por glifos SC faltantes: {missing}")
-                        continue
-
-                    if leftSC != leftKey_str or rightSC != rightKey_str:
-                        pair_key = f"{leftSC}|{rightSC}"
-                        if pair_key not in processed_pairs:
-                            processed_pairs.add(pair_key)
-                            unique_pairs_to_process.append({
-                                'leftSC': leftSC,
-                                'rightSC': rightSC,
-                                'original_value': original_value,
-                                'pair_key': pair_key,
-                            })
-
-                if debug_mode:
-                    self.kernToSCLog(f"[DEBUG] Pares únicos a procesar: {len(unique_pairs_to_process)}")
-
-                for pair in unique_pairs_to_process:
-                    leftSC = pair['leftSC']
-                    rightSC = pair['rightSC']
-                    original_value = pair['original_value']
-                    try:
-                        newValue = int(round(float(original_value) * factor))
-                    except:
-                        continue
+            # Taula clau → clau .sc construïda un sol cop; després una passada i un sol lot
+            mid = font.selectedFontMaster.id
+            scMap = smallCaps.SmallCapMap(font, [mid])
+            writes, skipped = smallCaps.upperToUpperSC(scMap, mid, factor, overwrite)
 
-                    try:
-                        existing = font.kerningForPair(mid, leftSC, rightSC)
-                    except:
-                        existing = None
-
-                    if existing is not None and not overwrite:
-                        if debug_mode:
-                            self.kernToSCLog(f"[DEBUG] Saltado (existe): {leftSC} + {rightSC}")
-                        continue
-
-                    try:
-                        font.setKerningForPair(mid, leftSC, rightSC, newValue)
-                        if existing is not None:
-                            updated += 1
-                            if debug_mode and updated <= 25:
-                                self.kernToSCLog(f"[DEBUG] Actualizado: {leftSC} + {rightSC} = {newValue}")
-                        else:
-                            created += 1
-                            if debug_mode and created <= 25:
-                                self.kernToSCLog(f"[DEBUG] Creado: {leftSC} + {rightSC} = {newValue}")
-                    except Exception as e:
-                        if debug_mode:
-                            self.kernToSCLog(f"[ERROR] {leftSC} + {rightSC}: {e}")
+            if debug_mode:
+                total_pairs = sum(len(rights) for rights in scMap.snapshots[mid].values())
+                self.kernToSCLog(f"[DEBUG] Total pares: {total_pairs}, Transferir: {len(writes)}")
+                for reason, count in skipped.items():
+                    self.kernToSCLog(f"[DEBUG] Saltados ({reason}): {count}")
+
+            batch = kerningBatch.KerningBatch(font, "Kern to SC")
+            for write in writes:
+                batch.set(mid, write.left, write.right, write.value)
+            report = batch.apply()
+
+            failed = set((left, right) for m, left, right, e in report.failed)
+            for write in writes:
+                if (write.left, write.right) in failed:
+                    continue
+                if write.existing is not None:
+                    updated += 1
+                    if debug_mode and updated <= 25:
+                        self.kernToSCLog(f"[DEBUG] Actualizado: {write.left} + {write.right} = {write.value}")
+                else:
+                    created += 1
+                    if debug_mode and created <= 25:
+                        self.kernToSCLog(f"[DEBUG] Creado: {write.left} + {write.right} = {write.value}")
+            if debug_mode:
+                for m, left, right, e in report.failed:
+                    self.kernToSCLog(f"[ERROR] {left} + {right}: {e}")
+                self.kernToSCLog(f"[DEBUG] {report.summary()}")
 
         except Exception as e:
             if debug_mode:
@@ -2531,9 +2371,6 @@ class KernTools:
             import traceback
             self.kernToSCLog(f"[TRACEBACK] {traceback.format_exc()}")
 
-        finally:
-            font.enableUpdateInterface()
-
         self.kernToSCLog(f"✅ Transferencia completada!")
         self.kernToSCLog(f"Pares nuevos: {created}")
         self.kernToSCLog(f"Pares actualizados: {updated}")
@@ -2541,423 +2378,61 @@ class KernTools:
 
         return {'created': created, 'updated': updated}
 
-
-    def _checkGlyphExists(self, font, key):
-        """Verifica si un glifo existe en la fuente"""
-        if not key:
-            return False
-            
-        # Para grupos de kerning, siempre asumir que existen
-        if key.startswith("@MMK_"):
-            return True
-            
-        # Para glifos individuales, verificar existencia
-        try:
-            if key in font.glyphs:
-                return True
-                
-            # Si es un ID, intentar obtener el glifo
-            g = font.glyphForId_(key)
-            if g:
-                return True
-                
-        except:
-            pass
-            
-        return False
-
-    def convert_to_sc_like_original(self, key, font):
-        if not key:
-            return None
-
-        if key.startswith("@MMK_L_"):
-            base_name = key[7:]
-            sc_name = base_name.lower() + ".sc"
-            if sc_name in font.glyphs:
-                return "@MMK_L_" + sc_name
-            else:
-                return None
-
-        if key.startswith("@MMK_R_"):
-            base_name = key[7:]
-            sc_name = base_name.lower() + ".sc"
-            if sc_name in font.glyphs:
-                return "@MMK_R_" + sc_name
-            else:
-                return None
-
-        # Para glifos individuales
-        glyph_name = None
-        try:
-            glyph = font.glyphForId_(key)
-            glyph_name = glyph.name if glyph else None
-        except:
-            if key in font.glyphs:
-                glyph_name = key
-    
-        if glyph_name:
-            sc_name = glyph_name + ".sc"
-            if sc_name in font.glyphs:
-                return sc_name
-    
-        return None
-
     def transfer_upper_lower_bidirectional_sc(self, font, factor, overwrite, debug_mode):
         """Group Aware Transfer - same as the 258 results script"""
         try:
             masters = font.masters
-            total_applied = 0
             total_seen = 0
-            total_discarded = 0
-            debug_liApache2_shown = 100
 
             self.kernToSCLog("=== KERN TRANSFER UPPERCASE-LOWERCASE TO SC (GROUP AWARE) ===")
             self.kernToSCLog(f"Masters: {len(masters)}, Factor: {factor}, Overwrite: {overwrite}")
-        
-            # GROUP ANALYSIS - KEY FOR MORE RESULTS
-            group_analysis = {}
-        
+
+            # GROUP ANALYSIS and key → SC key table, built once for every master
+            scMap = smallCaps.SmallCapMap(font)
+
+            if debug_mode:
+                self.kernToSCLog("=== GROUP ANALYSIS ===")
+                for group_key, data in scMap.groups.items():
+                    self.kernToSCLog(f"Group {group_key}:")
+                    self.kernToSCLog(f"  Left members: {sorted(data['left'])}")
+                    self.kernToSCLog(f"  Right members: {sorted(data['right'])}")
+
+            batch = kerningBatch.KerningBatch(font, "Kern to SC")
+            skipped = collections.Counter()
             for master in masters:
                 mid = master.id
-                kernDict = font.kerning.get(mid, {})
-                if not kernDict:
+                pairs_in_master = sum(len(rd) for rd in scMap.snapshots[mid].values())
+                if not pairs_in_master:
                     continue
-            
-                for leftKey, rightDict in kernDict.items():
-                    for rightKey, value in rightDict.items():
-                        # Analyze right groups
-                        if rightKey.startswith("@MMK_R_"):
-                            group_key = rightKey[7:]
-                            left_name = self._glyphNameFromKey(font, leftKey)
-                            if left_name and left_name in font.glyphs:
-                                if group_key not in group_analysis:
-                                    group_analysis[group_key] = {"left_members": set(), "right_members": set()}
-                                group_analysis[group_key]["left_members"].add(left_name)
-                    
-                        # Analyze left groups
-                        if leftKey.startswith("@MMK_L_"):
-                            group_key = leftKey[7:]
-                            right_name = self._glyphNameFromKey(font, rightKey)
-                            if right_name and right_name in font.glyphs:
-                                if group_key not in group_analysis:
-                                    group_analysis[group_key] = {"left_members": set(), "right_members": set()}
-                                group_analysis[group_key]["right_members"].add(right_name)
-        
+                self.kernToSCLog(f"Master {mid}: {pairs_in_master} pairs to analyze")
+                total_seen += pairs_in_master
+
+                writes, masterSkipped = smallCaps.upperLowerSC(scMap, mid, factor, overwrite)
+                skipped.update(masterSkipped)
+                for i, write in enumerate(writes):
+                    batch.set(mid, write.left, write.right, write.value)
+                    if debug_mode and i < 100:
+                        self.kernToSCLog(f"*** APPLIED: {write.left} + {write.right} = {write.value} ***")
+
+            report = batch.apply()
             if debug_mode:
-                self.kernToSCLog("=== GROUP ANALYSIS ===")
-                for group_key, data in group_analysis.items():
-                    self.kernToSCLog(f"Group {group_key}:")
-                    self.kernToSCLog(f"  Left members: {sorted(data['left_members'])}")
-                    self.kernToSCLog(f"  Right members: {sorted(data['right_members'])}")
-        
-            font.disableUpdateInterface()
-            try:
-                for master in masters:
-                    mid = master.id
-                    kernDict = font.kerning.get(mid, {})
-                    if not kernDict:
-                        continue
-                
-                    pairs_in_master = sum(len(rd) for rd in kernDict.values())
-                    self.kernToSCLog(f"Master {mid}: {pairs_in_master} pairs to analyze")
-                
-                    processed_pairs = set()
-                
-                    for leftKey, rightDict in kernDict.items():
-                        for rightKey, value in rightDict.items():
-                            total_seen += 1
-                        
-                            # Case 1: Upper left -> Lower right (T + @MMK_R_o)
-                            if self._isUpperCase(font, leftKey) and self._isLowerCase(font, rightKey):
-                            
-                                base_key = self._resolveKeyForSetting(font, leftKey)
-                            
-                                # GROUP AWARE: If the rightKey is a group
-                                if rightKey.startswith("@MMK_R_"):
-                                    group_key = rightKey[7:]
-                                
-                                    if debug_mode and total_seen <= debug_liApache2_shown:
-                                        self.kernToSCLog(f"=== PROCESSING GROUP: {group_key} ===")
-                                        self.kernToSCLog(f"  Base: {base_key}, Group: {group_key}, Value: {value}")
-                                
-                                    # Get REAL members of this group
-                                    if group_key in group_analysis:
-                                        left_members = group_analysis[group_key]["left_members"]
-                                    
-                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                            self.kernToSCLog(f"  Left members in group: {left_members}")
-                                    
-                                        # Only process if base_key is in the left members of the group
-                                        base_name = self._glyphNameFromKey(font, base_key)
-                                        if base_name in left_members:
-                                        
-                                            # Find ALL right members of the group to find their SC
-                                            right_members = group_analysis[group_key]["right_members"]
-                                        
-                                            for right_member in right_members:
-                                                sc_name = self._findSCForGroupMember(font, right_member)
-                                                if sc_name and sc_name in font.glyphs:
-                                                    target_sc = "@MMK_R_" + sc_name
-                                                    pair_id = f"{base_key}+{target_sc}"
-                                                
-                                                    if pair_id in processed_pairs:
-                                                        continue
-                                                    processed_pairs.add(pair_id)
-                                                
-                                                    existing_kern = self._safeKerningForPair(font, mid, base_key, target_sc)
-                                                    if existing_kern is not None and not overwrite:
-                                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                                            self.kernToSCLog(f"  → Kerning exists, skipping: {base_key} + {target_sc}")
-                                                        continue
-                                                
-                                                    new_value = round(value * factor)
-                                                    try:
-                                                        font.setKerningForPair(mid, base_key, target_sc, new_value)
-                                                        total_applied += 1
-                                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                                            self.kernToSCLog(f"*** APPLIED: {base_key} + {target_sc} = {new_value} ***")
-                                                    except Exception as e:
-                                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                                            self.kernToSCLog(f"  → Error: {e}")
-                            
-                                # Normal case (rightKey is not a group)
-                                else:
-                                    target_sc = self._getSCEquivalent(font, rightKey)
-                                    # VERIFICACIÓN AÑADIDA: Comprobar que el glifo SC existe
-                                    if not self._checkGlyphExists(font, target_sc):
-                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                            self.kernToSCLog(f"  → Target SC not found: {target_sc}")
-                                        continue
-                                        
-                                    pair_id = f"{base_key}+{target_sc}"
-                                
-                                    if pair_id in processed_pairs:
-                                        continue
-                                    processed_pairs.add(pair_id)
-                                
-                                    if target_sc and base_key:
-                                        if not target_sc.startswith("@MMK_") and target_sc not in font.glyphs:
-                                            if debug_mode and total_seen <= debug_liApache2_shown:
-                                                self.kernToSCLog(f"  → Target not found: {target_sc}")
-                                            continue
-                                    
-                                        existing_kern = self._safeKerningForPair(font, mid, base_key, target_sc)
-                                        if existing_kern is not None and not overwrite:
-                                            if debug_mode and total_seen <= debug_liApache2_shown:
-                                                self.kernToSCLog(f"  → Kerning exists, skipping: {base_key} + {target_sc}")
-                                            continue
-                                    
-                                        new_value = round(value * factor)
-                                        try:
-                                            font.setKerningForPair(mid, base_key, target_sc, new_value)
-                                            total_applied += 1
-                                            if debug_mode and total_seen <= debug_liApache2_shown:
-                                                self.kernToSCLog(f"*** APPLIED: {base_key} + {target_sc} = {new_value} ***")
-                                        except Exception as e:
-                                            if debug_mode and total_seen <= debug_liApache2_shown:
-                                                self.kernToSCLog(f"  → Error: {e}")
-                        
-                            # Case 2: Lower left -> Upper right (inverse - @MMK_L_o + T)
-                            elif self._isLowerCase(font, leftKey) and self._isUpperCase(font, rightKey):
-                            
-                                base_key = self._resolveKeyForSetting(font, rightKey)
-                            
-                                # GROUP AWARE: If the leftKey is a group
-                                if leftKey.startswith("@MMK_L_"):
-                                    group_key = leftKey[7:]
-                                
-                                    # Get REAL members of this group
-                                    if group_key in group_analysis:
-                                        right_members = group_analysis[group_key]["right_members"]
-                                    
-                                        # Only process if base_key is in the right members of the group
-                                        base_name = self._glyphNameFromKey(font, base_key)
-                                        if base_name in right_members:
-                                        
-                                            # Find ALL left members of the group to find their SC
-                                            left_members = group_analysis[group_key]["left_members"]
-                                        
-                                            for left_member in left_members:
-                                                sc_name = self._findSCForGroupMember(font, left_member)
-                                                if sc_name and sc_name in font.glyphs:
-                                                    target_sc = "@MMK_L_" + sc_name
-                                                    pair_id = f"{target_sc}+{base_key}"
-                                                
-                                                    if pair_id in processed_pairs:
-                                                        continue
-                                                    processed_pairs.add(pair_id)
-                                                
-                                                    existing_kern = self._safeKerningForPair(font, mid, target_sc, base_key)
-                                                    if existing_kern is not None and not overwrite:
-                                                        continue
-                                                
-                                                    new_value = round(value * factor)
-                                                    try:
-                                                        font.setKerningForPair(mid, target_sc, base_key, new_value)
-                                                        total_applied += 1
-                                                        if debug_mode and total_seen <= debug_liApache2_shown:
-                                                            self.kernToSCLog(f"*** APPLIED INVERSE: {target_sc} + {base_key} = {new_value} ***")
-                                                    except Exception as e:
-                                                        pass
-                            
-                                # Normal case (leftKey is not a group)
-                                else:
-                                    target_sc = self._getSCEquivalent(font, leftKey)
-                                    # VERIFICACIÓN AÑADIDA: Comprobar que el glifo SC existe
-                                    if not self._checkGlyphExists(font, target_sc):
-                                        continue
-                                        
-                                    pair_id = f"{target_sc}+{base_key}"
-                                
-                                    if pair_id in processed_pairs:
-                                        continue
-                                    processed_pairs.add(pair_id)
-                                
-                                    if target_sc and base_key:
-                                        if not target_sc.startswith("@MMK_") and target_sc not in font.glyphs:
-                                            continue
-                                    
-                                        existing_kern = self._safeKerningForPair(font, mid, target_sc, base_key)
-                                        if existing_kern is not None and not overwrite:
-                                            continue
-                                    
-                                        new_value = round(value * factor)
-                                        try:
-                                            font.setKerningForPair(mid, target_sc, base_key, new_value)
-                                            total_applied += 1
-                                            if debug_mode and total_seen <= debug_liApache2_shown:
-                                                self.kernToSCLog(f"*** APPLIED INVERSE: {target_sc} + {base_key} = {new_value} ***")
-                                        except Exception as e:
-                                            pass
-                                
-            finally:
-                font.enableUpdateInterface()
+                for m, left, right, e in report.failed:
+                    self.kernToSCLog(f"  → Error: {left} + {right}: {e}")
+            total_applied = report.applied
 
             self.kernToSCLog("=== SUMMARY ===")
             self.kernToSCLog(f"Total pairs analyzed: {total_seen}")
             self.kernToSCLog(f"Total kerning pairs applied: {total_applied}")
-            self.kernToSCLog(f"Total discarded: {total_discarded}")
-        
+            self.kernToSCLog(f"Total discarded: {sum(skipped.values())}")
+
             return total_applied
-        
+
         except Exception as e:
             self.kernToSCLog(f"Error in transfer_upper_lower_bidirectional_sc: {str(e)}")
             import traceback
             self.kernToSCLog(traceback.format_exc())
             return 0
 
-    # HELPER FUNCTIONS FOR GROUP AWARE
-    def _glyphNameFromKey(self, font, key):
-        """Get glyph name from a kerning key"""
-        if not key:
-            return None
-        if key.startswith("@MMK_L_") or key.startswith("@MMK_R_"):
-            return key.split("_", 2)[-1]
-        if key in font.glyphs:
-            return key
-        try:
-            g = font.glyphForId_(key)
-            if g and g.name:
-                return g.name
-        except:
-            pass
-        return None
-
-    def _safeKerningForPair(self, font, master_id, left_key, right_key):
-        """Get kerning value safely"""
-        try:
-            return font.kerningForPair(master_id, left_key, right_key)
-        except:
-            return None
-
-    def _isUpperCase(self, font, key):
-        """Determine if a kerning key represents uppercase"""
-        if not key:
-            return False
-        
-        glyph_name = self._glyphNameFromKey(font, key)
-        if not glyph_name:
-            return False
-        
-        if key.startswith("@MMK_L_") or key.startswith("@MMK_R_"):
-            return glyph_name and glyph_name[0].isupper()
-    
-        return bool(glyph_name) and glyph_name[0].isupper()
-
-    def _isLowerCase(self, font, key):
-        """Determine if a kerning key represents lowercase"""
-        if not key:
-            return False
-        
-        glyph_name = self._glyphNameFromKey(font, key)
-        if not glyph_name:
-            return False
-        
-        if key.startswith("@MMK_L_") or key.startswith("@MMK_R_"):
-            return glyph_name and glyph_name[0].islower()
-    
-        return bool(glyph_name) and glyph_name[0].islower()
-
-    def _getSCEquivalent(self, font, key):
-        """Get SC equivalent for a kerning key"""
-        if not key:
-            return None
-        
-        glyph_name = self._glyphNameFromKey(font, key)
-        if not glyph_name:
-            return None
-        
-        possible_names = [
-            glyph_name + ".sc",
-            glyph_name.lower() + ".sc", 
-            glyph_name.upper() + ".sc",
-            glyph_name.capitalize() + ".sc"
-        ]
-    
-        for name in possible_names:
-            if name in font.glyphs:
-                if key.startswith("@MMK_L_"):
-                    return "@MMK_L_" + name
-                elif key.startswith("@MMK_R_"):
-                    return "@MMK_R_" + name
-                else:
-                    return name
-        return None
-
-    def _findSCForGroupMember(self, font, original_glyph_name):
-        """Find SC equivalent for a specific glyph"""
-        if not original_glyph_name:
-            return None
-    
-        possible_names = [
-            original_glyph_name + ".sc",
-            original_glyph_name.lower() + ".sc", 
-            original_glyph_name.upper() + ".sc",
-            original_glyph_name.capitalize() + ".sc"
-        ]
-    
-        for name in possible_names:
-            if name in font.glyphs:
-                return name
-    
-        return None
-
-    def _resolveKeyForSetting(self, font, key):
-        """Resolve a kerning key for use in setKerningForPair"""
-        if not key:
-            return None
-        if key.startswith("@MMK_"):
-            return key
-        if key in font.glyphs:
-            return key
-        try:
-            g = font.glyphForId_(key)
-            if g and g.name:
-                return g.name
-        except Exception:
-            pass
-        return None
-                                                                                                                                                                                                                                                                                                                                                                                                                                              
     # ===========================================================
     #  SANITIZER TAB
     # ===========================================================
@@ -3101,10 +2576,10 @@ class KernTools:
                 base = font.glyphs[base_name]
                 if base:
                     if not g.leftKerningGroup and base.leftKerningGroup:
-                        g.leftKerningGroup = base.leftKerningGroup
+                        fontIndex.indexForFont(font).setKerningGroup(g, "left", base.leftKerningGroup)
                         reassigned += 1
                     if not g.rightKerningGroup and base.rightKerningGroup:
-                        g.rightKerningGroup = base.rightKerningGroup
+                        fontIndex.indexForFont(font).setKerningGroup(g, "right", base.rightKerningGroup)
                         reassigned += 1
 
         # ======================================================
@@ -3130,7 +2605,7 @@ class KernTools:
         tab = self.w.tabs[6]
 
         tab.titleLabel = TextBox((15, 15, -15, 20), "Select master:")
-        tab.masterPopup = PopUpButton((15, 40, -15, 20), self.getMasterNames())
+        tab.masterPopup = PopUpButton((15, 40, -15, 20), self.getMasterNames(), callback=self.refreshCheckpoints)
         
         # Automatically select current master
         self.selectCurrentMaster()
@@ -3143,8 +2618,19 @@ class KernTools:
         tab.sep2 = HorizontalLine((15, 185, -15, 1))
         tab.smallValLabel = TextBox((15, 200, -15, 20), "Delete small-value pairs in active master:")
         tab.threshold = EditText((15, 225, 60, 22), "10")
-        tab.negativeOnly = CheckBox((90, 225, -15, 20), "Only negative", value=True)
-        tab.deleteSmallButton = Button((15, 255, -15, 20), "🧹 Delete small values", callback=self.deleteSmallKerning)
+        tab.signPopup = PopUpButton((85, 225, 130, 20), ["Only negative", "Only positive", "Any sign"])
+        tab.kindPopup = PopUpButton((225, 225, 170, 20), ["All pairs", "Group–group only", "Exceptions only", "Glyph–glyph only"])
+        tab.allMastersCheck = CheckBox((410, 225, 110, 20), "All masters", value=False)
+        tab.everyMasterCheck = CheckBox((525, 225, -15, 20), "Only if small in every master", value=False)
+        tab.countSmallButton = Button((15, 255, 180, 20), "🔍 Count small values", callback=self.countSmallKerning)
+        tab.deleteSmallButton = Button((205, 255, -15, 20), "🧹 Delete small values", callback=self.deleteSmallKerning)
+
+        tab.sep3 = HorizontalLine((15, 290, -15, 1))
+        tab.checkpointLabel = TextBox((15, 305, -15, 20), "Checkpoints of selected master (only changed pairs are stored and restored):")
+        tab.checkpointPopup = PopUpButton((15, 330, -150, 20), [])
+        tab.checkpointButton = Button((-140, 330, -15, 20), "📸 Checkpoint", callback=self.checkpointCallback)
+        tab.restoreCheckpointButton = Button((15, 360, -15, 20), "⏪ Restore selected checkpoint", callback=self.restoreCheckpointCallback)
+        self.refreshCheckpoints(None)
 
     def getMasterNames(self):
         font = Glyphs.font
@@ -3188,6 +2674,8 @@ class KernTools:
 
         if self.w.tabs[6].backupCheck.get():
             self.backupKerning(master)
+        # Punt de control automàtic: es pot desfer l'esborrat des de la llista
+        self.checkpoint(master, "Before delete")
 
         count = 0
         kdict = font.kerning.get(master.id, {})
@@ -3204,29 +2692,19 @@ class KernTools:
             return
         from GlyphsApp import GetSaveFile
         masterName = master.name.replace(" ", "_")
-        filePath = GetSaveFile(message="Save JSON Backup As", ProposedFileName=f"{masterName}_kerning_backup.json")
+        filePath = GetSaveFile(message="Save Kerning Backup As", ProposedFileName=f"{masterName}_kerning_backup.jsonl")
         if not filePath:
             return
         
         try:
-            # Convert MGOrderedDictionary to serializable dictionary
-            kerning_data = font.kerning.get(master.id, {})
-            serializable_data = {}
-            
-            for leftKey in kerning_data.keys():
-                right_dict = kerning_data[leftKey]
-                serializable_right_dict = {}
-                
-                for rightKey in right_dict.keys():
-                    serializable_right_dict[str(rightKey)] = right_dict[rightKey]
-                
-                serializable_data[str(leftKey)] = serializable_right_dict
-            
-            with open(filePath, "w", encoding="utf-8") as f:
-                json.dump(serializable_data, f, indent=2)
+            # Streamed pair by pair (.jsonl, or .kcp binary); glyph IDs stored as names
+            index = fontIndex.indexForFont(font)
+            with pairStream.PairWriter(filePath, {"name": f"{font.familyName} kerning backup"}) as writer:
+                writer.writeKerning(master.id, font.kerning.get(master.id, {}), master.name,
+                                    lambda key: index.nameForID(str(key)) or str(key))
             
             print(f"💾 Backup saved: {filePath}")
-            print(f"📊 Kerning pairs backed up: {sum(len(v) for v in serializable_data.values())}")
+            print(f"📊 Kerning pairs backed up: {writer.count}")
             
         except Exception as e:
             print(f"❌ DEBUG - Error details: {type(e).__name__}: {e}")
@@ -3235,7 +2713,7 @@ class KernTools:
     # ---------- RESTORE ----------
     def restoreCallback(self, sender):
         from GlyphsApp import GetOpenFile
-        filePath = GetOpenFile(message="Select kerning JSON backup")
+        filePath = GetOpenFile(message="Select kerning backup (.jsonl, .kcp or .json)")
         if not filePath:
             return
         self.restoreKerning(filePath)
@@ -3251,54 +2729,188 @@ class KernTools:
             return
             
         try:
-            with open(filePath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            count = 0
-            for left, rightDict in data.items():
-                for right, value in rightDict.items():
-                    try:
-                        font.setKerningForPair(master.id, left, right, value)
-                        count += 1
-                    except Exception as e:
-                        print(f"❌ {left}-{right}: {e}")
-            print(f"✅ Imported {count} pairs into {master.name}")
-            Message("Done", f"✅ Imported {count} pairs into '{master.name}'.", OKButton="OK")
+            # Read as a stream; one pass, one undo step, verified in bulk.
+            # The first master of the file goes to the selected master, any other
+            # master section to the font master with the same ID or name.
+            # Pairs that already have the backed-up value are not written again.
+            batch = kerningBatch.KerningBatch(font, "Restore Kerning")
+            reader = pairStream.PairReader(filePath)
+            index = fontIndex.indexForFont(font)
+            targets = {}
+            currents = {}
+            queued = collections.Counter()
+            unchanged = collections.Counter()
+            for record in reader:
+                if record.value is None:
+                    continue
+                target = targets.get(record.master)
+                if target is None:
+                    if not targets:
+                        target = master
+                    else:
+                        name = reader.masters.get(record.master)
+                        target = next((m for m in font.masters if m.id == record.master or m.name == name), False)
+                        if not target:
+                            print(f"⚠️ Master '{name}' not in this font, skipped")
+                    targets[record.master] = target
+                if not target:
+                    continue
+                current = currents.get(target.id)
+                if current is None:
+                    current = currents[target.id] = kerning.kerningSnapshot(font, target.id)
+                if kerningBatch.storedValue(current, index, record.left, record.right) == record.value:
+                    unchanged[target.id] += 1
+                    continue
+                batch.set(target.id, record.left, record.right, record.value)
+                queued[target.id] += 1
+            report = batch.apply()
+            # Els parells que no s'han pogut escriure o verificar no compten com a importats
+            imported = collections.Counter(queued)
+            for m, left, right, e in report.failed:
+                print(f"❌ {left}-{right}: {e}")
+                imported[m] -= 1
+            for m, left, right, expected, actual in report.mismatched:
+                print(f"❌ {left}-{right}: {actual} instead of {expected}")
+                imported[m] -= 1
+            # Un resum per cada màster de la font que ha rebut una secció de la còpia
+            written = collections.OrderedDict()
+            for target in targets.values():
+                if target:
+                    written.setdefault(target.id, target)
+            lines = [f"{m.name}: {imported[m.id]} pairs imported, {unchanged[m.id]} already up to date" for m in written.values()]
+            for line in lines:
+                print(f"✅ {line}")
+            print(f"✅ Restore: {report.summary()}")
+            Message("Done", "\n".join(["✅ Restored kerning:"] + [f"• {line}" for line in lines or ["no pairs in the backup"]]), OKButton="OK")
             
         except Exception as e:
             Message("Error", f"Could not restore backup: {e}", OKButton="OK")
 
-    # ---------- DELETE SMALL VALUES ----------
-    def deleteSmallKerning(self, sender):
+    # ---------- CHECKPOINTS ----------
+    def checkpoint(self, master, label=""):
+        """Store the master's kerning as a checkpoint (only the pairs changed since the last one)."""
+        font = Glyphs.font
+        try:
+            snapshot = snapshots.storeForFont(font).checkpoint(font, master.id, label)
+        except Exception as e:
+            print(f"❌ Could not store checkpoint: {e}")
+            return None
+        if snapshot is None:
+            print(f"📸 {master.name}: kerning unchanged since the last checkpoint")
+        else:
+            print(f"📸 {master.name}: checkpoint {snapshot.title()}")
+        self.refreshCheckpoints(None)
+        return snapshot
+
+    def refreshCheckpoints(self, sender):
+        tab = self.w.tabs[6]
+        font = Glyphs.font
+        master = self.getSelectedMaster()
+        self.checkpointIDs = []
+        titles = []
+        if font and master:
+            # Més recent primer
+            for snapshot in reversed(snapshots.storeForFont(font).snapshots(master.id)):
+                self.checkpointIDs.append(snapshot.id)
+                titles.append(snapshot.title())
+        tab.checkpointPopup.setItems(titles or ["No checkpoints"])
+
+    def checkpointCallback(self, sender):
         font = Glyphs.font
         if not font:
             Message("Error", "Open a font first.", OKButton="OK")
             return
-        master = font.selectedFontMaster
-        masterID = master.id
-        kernDict = font.kerning[masterID]
+        master = self.getSelectedMaster()
+        if not master:
+            Message("Error", "No master selected.", OKButton="OK")
+            return
+        self.checkpoint(master)
+
+    def restoreCheckpointCallback(self, sender):
+        font = Glyphs.font
+        if not font:
+            Message("Error", "Open a font first.", OKButton="OK")
+            return
+        master = self.getSelectedMaster()
+        if not master or not self.checkpointIDs:
+            Message("Error", "No checkpoint to restore.", OKButton="OK")
+            return
+        snapshotID = self.checkpointIDs[self.w.tabs[6].checkpointPopup.get()]
+        try:
+            report = snapshots.storeForFont(font).restore(font, master.id, snapshotID)
+        except Exception as e:
+            Message("Error", f"Could not restore checkpoint: {e}", OKButton="OK")
+            return
+        for m, left, right, e in report.failed:
+            print(f"❌ {left}-{right}: {e}")
+        print(f"⏪ {master.name}: checkpoint #{snapshotID} restored ({report.summary()})")
+        Message("Done", f"⏪ Checkpoint #{snapshotID} restored in '{master.name}': {report.applied} pairs set, {report.removed} removed.", OKButton="OK")
+
+    # ---------- DELETE SMALL VALUES ----------
+    def smallKerningSettings(self):
+        """(pruner, filter arguments, master IDs to act on) for the small-value settings, or None"""
+        font = Glyphs.font
+        if not font:
+            Message("Error", "Open a font first.", OKButton="OK")
+            return None
+        tab = self.w.tabs[6]
         try:
-            threshold = abs(float(self.w.tabs[6].threshold.get()))
+            threshold = abs(float(tab.threshold.get()))
         except:
             Message("Error", "Threshold must be numeric.", OKButton="OK")
+            return None
+        sign = (pruning.NEGATIVE, pruning.POSITIVE, pruning.ANY)[tab.signPopup.get()]
+        kinds = (pruning.ALL, pruning.GROUPS, pruning.EXCEPTIONS, pruning.GLYPHS)[tab.kindPopup.get()]
+        everyMaster = tab.everyMasterCheck.get()
+        if tab.allMastersCheck.get() or everyMaster:
+            masterIDs = [m.id for m in font.masters]
+        else:
+            masterIDs = [font.selectedFontMaster.id]
+        # Tot el kerning en taules planes; els filtres s'apliquen de cop
+        pruner = pruning.Pruner(font, masterIDs)
+        # everyMaster mira tots els masters però només actua al seleccionat
+        targetIDs = masterIDs if tab.allMastersCheck.get() else [font.selectedFontMaster.id]
+        return pruner, (threshold, sign, kinds, everyMaster), targetIDs
+
+    def countSmallKerning(self, sender):
+        found = self.smallKerningSettings()
+        if not found:
             return
-        negativeOnly = self.w.tabs[6].negativeOnly.get()
-
-        toDelete = []
-        for leftID in kernDict.keys():
-            for rightID in kernDict[leftID].keys():
-                val = kernDict[leftID][rightID]
-                if (negativeOnly and 0 > val > -threshold) or (not negativeOnly and abs(val) <= threshold):
-                    leftName = nameForID(font, leftID)
-                    rightName = nameForID(font, rightID)
-                    if leftName and rightName:
-                        toDelete.append((leftName, rightName))
+        font = Glyphs.font
+        pruner, arguments, targetIDs = found
+        counts = pruner.counts(*arguments)
+        lines = []
+        for master in font.masters:
+            if master.id in targetIDs:
+                lines.append(f"{master.name}: {counts[master.id]} of {len(pruner.tables[master.id])} pairs")
+        for line in lines:
+            print(f"🔍 {line}")
+        Message("Small values", "\n".join(lines), OKButton="OK")
 
-        for left, right in toDelete:
-            font.removeKerningForPair(masterID, left, right)
+    def deleteSmallKerning(self, sender):
+        found = self.smallKerningSettings()
+        if not found:
+            return
+        font = Glyphs.font
+        pruner, arguments, targetIDs = found
+        candidates = dict((mid, pairs) for mid, pairs in pruner.candidates(*arguments).items() if mid in targetIDs)
+        threshold = self.w.tabs[6].threshold.get()
+
+        # Un lot (un pas de desfer) per master
+        reports = pruner.prune(candidates)
+        lines = []
+        for master in font.masters:
+            if master.id not in candidates:
+                continue
+            report = reports.get(master.id)
+            removed = report.removed - len(report.mismatched) if report else 0
+            if report:
+                for m, left, right, e in report.failed:
+                    print(f"❌ {left}-{right}: {e}")
+            lines.append(f"{master.name}: {removed}")
 
-        print(f"🧹 Deleted {len(toDelete)} small-value pairs ≤ {threshold} in '{master.name}'.")
-        Message("Done", f"🧹 Deleted {len(toDelete)} small-value pairs ≤ {threshold} in '{master.name}'.", OKButton="OK")
+        print(f"🧹 Deleted small-value pairs ≤ {threshold}: " + ", ".join(lines))
+        Message("Done", f"🧹 Deleted small-value pairs ≤ {threshold}:\n" + "\n".join(lines), OKButton="OK")
 
     # ===========================================================
     # SCALE % TAB
@@ -3309,7 +2921,10 @@ class KernTools:
         tab.input = EditText((10, 40, 280, 20), "100")
         tab.directionText = TextBox((10, 70, 100, 20), "Action:")
         tab.direction = PopUpButton((110, 70, 180, 20), ["Decrease", "Increase"])
-        tab.button = Button((10, 100, 280, 30), "Apply", callback=self.applyScale)
+        tab.roundingText = TextBox((10, 100, 100, 20), "Rounding:")
+        tab.rounding = PopUpButton((110, 100, 180, 20), ["Nearest", "Down", "Up", "Toward zero"])
+        tab.allMasters = CheckBox((10, 130, 280, 20), "All masters", value=False)
+        tab.button = Button((10, 160, 280, 30), "Apply", callback=self.applyScale)
 
     def applyScale(self, sender):
         font = Glyphs.font
@@ -3323,37 +2938,30 @@ class KernTools:
             Message("Error", "Please enter a valid number.", OKButton="OK")
             return
 
-        masterID = font.selectedFontMaster.id
-        if masterID not in font.kerning:
+        tab = self.w.tabs[7]
+        if tab.allMasters.get():
+            masterIDs = [m.id for m in font.masters if m.id in font.kerning]
+        else:
+            masterIDs = [font.selectedFontMaster.id] if font.selectedFontMaster.id in font.kerning else []
+        if not masterIDs:
             Message("Info", "This master has no kerning.", OKButton="OK")
             return
 
-        if self.w.tabs[7].direction.get() == 0:
+        if tab.direction.get() == 0:
             scaleFactor = percentage / 100.0
         else:
             scaleFactor = 1.0 + (percentage / 100.0)
+        rounding = (scaling.ROUND, scaling.FLOOR, scaling.CEIL, scaling.TOWARD_ZERO)[tab.rounding.get()]
 
-        kernDict = font.kerning[masterID]
-        adjustedCount = 0
-        pairs = []
-
-        for left, rightDict in kernDict.items():
-            for right, value in rightDict.items():
-                pairs.append((left, right, value))
-
-        font.disableUpdateInterface()
-        try:
-            for left, right, oldValue in pairs:
-                newValue = int(round(oldValue * scaleFactor))
-                if newValue != oldValue:
-                    font.kerning[masterID][left][right] = newValue
-                    adjustedCount += 1
-        finally:
-            font.enableUpdateInterface()
+        # Tots els masters en una passada i un sol pas de desfer
+        plan, report = scaling.scaleKerning(font, dict((mid, scaleFactor) for mid in masterIDs), rounding=rounding)
+        for m, left, right, e in report.failed:
+            print(f"❌ {left}-{right}: {e}")
+        adjustedCount = report.applied - len(report.mismatched)
 
         Message(
             "Process completed",
-            f"{adjustedCount} kerning pairs adjusted with scale factor {scaleFactor:.2f}.",
+            f"{adjustedCount} kerning pairs adjusted with scale factor {scaleFactor:.2f} in {len(masterIDs)} master(s).",
             OKButton="OK"
         )
 
@@ -7,8 +7,15 @@
 from GlyphsApp import *
 from vanilla import *
 from AppKit import NSFloatingWindowLevel
+import os
+import sys
 import traceback
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex
+
 class SetKerningGroupsFromProductionNames(object):
     
     def __init__(self):
@@ -54,12 +61,9 @@ class SetKerningGroupsFromProductionNames(object):
         try:
             print(f"    Attempting to set {side} group to: {groupName}")
             
-            if side == 'left':
-                glyph.leftKerningGroup = groupName
-                print(f"    ✓ Set left group to: {groupName}")
-            elif side == 'right':
-                glyph.rightKerningGroup = groupName
-                print(f"    ✓ Set right group to: {groupName}")
+            if side in ('left', 'right'):
+                fontIndex.indexForFont(glyph.parent).setKerningGroup(glyph, side, groupName)
+                print(f"    ✓ Set {side} group to: {groupName}")
             
             return True
             
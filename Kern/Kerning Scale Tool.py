@@ -1,20 +1,27 @@
 # MenuTitle: Kerning Scale Tool
 # -*- coding: utf-8 -*-
-# Description: Scales kerning pairs by a percentage with optional group filtering in the active master.
+# Description: Scales kerning pairs by a percentage with optional group filtering in the active master or all masters.
 # Author: Designed by Josep Patau Bellart, programmed with AI tools
 # If you find this script useful, you can show your appreciation by purchasing any font at: https://www.myfonts.com/collections/tipo-pepel-foundry
 # License: Apache2
 
 import vanilla
 import math
+import os
+import sys
 from GlyphsApp import Glyphs, Message
 from AppKit import NSFont, NSAttributedString, NSFontAttributeName
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import scaling
+
 
 class ScaleKerningWithGroups:
     
     def __init__(self):
-        self.w = vanilla.FloatingWindow((220, 260), "Kerning Scale Tool")
+        self.w = vanilla.FloatingWindow((220, 285), "Kerning Scale Tool")
         
         y = 15
         
@@ -49,8 +56,12 @@ class ScaleKerningWithGroups:
         )
         y += 45
         
+        # Masters
+        self.w.allMasters = vanilla.CheckBox((15, y, 180, 20), "All masters", value=False)
+        y += 25
+        
         # Apply button
-        self.w.applyButton = vanilla.Button((15, y, 180, 24), "Apply to Active Master", callback=self.applyScale)
+        self.w.applyButton = vanilla.Button((15, y, 180, 24), "Apply", callback=self.applyScale)
         
         self.w.open()
     
@@ -71,27 +82,6 @@ class ScaleKerningWithGroups:
         
         return groups
     
-    def keyMatchesGroups(self, key, groups):
-        """Check if a kerning key matches any of the specified groups"""
-        if not groups:
-            return True
-        
-        # Convert key to string for comparison
-        key_str = str(key)
-        
-        for group in groups:
-            # Check exact match
-            if key_str == group:
-                return True
-            
-            # Check if it's a group member key (@MMK_L_group or @MMK_R_group)
-            if key_str.startswith('@MMK_L_') and key_str[7:] == group[1:]:
-                return True
-            if key_str.startswith('@MMK_R_') and key_str[7:] == group[1:]:
-                return True
-        
-        return False
-    
     def applyScale(self, sender):
         """Apply scaling to kerning pairs"""
         font = Glyphs.font
@@ -131,37 +121,24 @@ class ScaleKerningWithGroups:
             factor = 1.0 + percent / 100.0
             operation_name = "Decrease"
         
-        # Get groups filter
+        # Get groups filter, compiled once into the matching kerning keys
         filter_groups = self.getGroupsList()
         has_filter = len(filter_groups) > 0
+        key_filter = scaling.KeyFilter.forGroups(filter_groups) if has_filter else None
         
-        master_id = master.id
-        if master_id not in font.kerning:
+        if self.w.allMasters.get():
+            master_ids = [m.id for m in font.masters if m.id in font.kerning]
+        else:
+            master_ids = [master.id] if master.id in font.kerning else []
+        if not master_ids:
             Message("Info", "No kerning found in the active master.", OKButton="OK")
             return
         
-        # Collect kerning pairs that match the filter
-        kerning_pairs = []
-        filtered_count = 0
-        total_count = 0
-        
-        for left_key, right_dict in font.kerning[master_id].items():
-            for right_key, value in right_dict.items():
-                if value is not None:
-                    total_count += 1
-                    
-                    # Apply filter if specified
-                    if has_filter:
-                        left_match = self.keyMatchesGroups(left_key, filter_groups)
-                        right_match = self.keyMatchesGroups(right_key, filter_groups)
-                        
-                        if not (left_match or right_match):
-                            continue
-                    
-                    kerning_pairs.append((left_key, right_key, value))
-                    filtered_count += 1
-        
-        if not kerning_pairs:
+        total_count = sum(len(rights) for mid in master_ids for rights in font.kerning[mid].values())
+        plan = scaling.planScale(font, dict((mid, factor) for mid in master_ids), key_filter, skipUnchanged=False)
+        filtered_count = sum(len(changes) for changes in plan.values())
+        
+        if not filtered_count:
             if has_filter:
                 groups_str = ", ".join(filter_groups)
                 Message("Info", f"No kerning pairs found in specified groups: {groups_str}", OKButton="OK")
@@ -169,32 +146,9 @@ class ScaleKerningWithGroups:
                 Message("Info", "No kerning pairs to scale.", OKButton="OK")
             return
         
-        # Resolve key to glyph name for setting kerning
-        def resolveKey(key):
-            if isinstance(key, str) and key.startswith("@MMK_"):
-                return key
-            if isinstance(key, str) and len(key) == 36:
-                for g in font.glyphs:
-                    if g.id == key:
-                        return g.name
-                return None
-            return key
-        
-        # Apply scaling
-        count = 0
-        font.disableUpdateInterface()
-        try:
-            for left_key, right_key, value in kerning_pairs:
-                left = resolveKey(left_key)
-                right = resolveKey(right_key)
-                if not left or not right:
-                    continue
-                
-                new_value = int(round(value * factor))
-                font.setKerningForPair(master_id, left, right, new_value)
-                count += 1
-        finally:
-            font.enableUpdateInterface()
+        # Apply scaling (every master in one undo step)
+        report = scaling.applyPlan(font, plan)
+        count = report.applied - len(report.mismatched)
         
         # Show summary
         if has_filter:
@@ -214,6 +168,8 @@ class ScaleKerningWithGroups:
                 f"Operation: {operation_name}\n"
                 f"Percentage: {percent}%"
             )
+        if len(master_ids) > 1:
+            summary += f"\nMasters: {len(master_ids)}"
         
         Message("Done", summary, OKButton="OK")
 
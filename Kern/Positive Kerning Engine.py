@@ -5,10 +5,10 @@
 # If you find this script useful, you can show your appreciation by purchasing any font at: https://www.myfonts.com/collections/tipo-pepel-foundry
 # License: Apache2
 
-import math
 import re
-import json
 import time
+import os
+import sys
 from GlyphsApp import *
 from vanilla import *
 from AppKit import *
@@ -16,6 +16,15 @@ from AppKit import NSAlert, NSAlertStyleInformational, NSAlertFirstButtonReturn
 from AppKit import NSAlert, NSInformationalAlertStyle
 from GlyphsApp import Glyphs
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+	sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex, kerning, kerningBatch, masters, pairStream, profiles, segmentIndex, sweep, trace
+
+tracer = trace.sharedTracer
+# Esdeveniments que "Show trace" escriu a la finestra Macro
+TRACE_LINES = 200
+
 
 # ===================================================
 # CONTEXT NORMALIZATION (GLOBAL, OBLIGATORI)
@@ -100,76 +109,14 @@ def format_kern_pair_block(prefix, left, right, suffix, pad=5):
 
 
 # ===== helpers de geometria =====
-
-def distance(p1, p2):
-	return math.hypot(p2[0] - p1[0], p2[1] - p1[1])
-
-def minDistanceBetweenSegments(a1, a2, b1, b2):
-	def clamp(x, a, b):
-		return max(a, min(b, x))
-
-	A = (a1.x, a1.y); B = (a2.x, a2.y)
-	C = (b1.x, b1.y); D = (b2.x, b2.y)
-
-	def closestPoint(P, Q, R):
-		vx, vy = Q[0]-P[0], Q[1]-P[1]
-		denom = vx*vx + vy*vy
-		if denom == 0:
-			return P
-		t = ((R[0]-P[0])*vx + (R[1]-P[1])*vy) / denom
-		t = clamp(t, 0, 1)
-		return (P[0] + t*vx, P[1] + t*vy)
-
-	dmin = float("inf")
-	for p in (A, B):
-		q = closestPoint(C, D, p)
-		dmin = min(dmin, distance(p, q))
-	for p in (C, D):
-		q = closestPoint(A, B, p)
-		dmin = min(dmin, distance(p, q))
-
-	return dmin
+# El nucli vectoritzat viu a Libraries/kernCore (geometry, segmentIndex)
 
 def getSegments(layer):
-	segs = []
-	for p in layer.paths:
-		nodes = p.nodes
-		if not nodes:
-			continue
-		count = len(nodes)
-		for i in range(count):
-			n1 = nodes[i]
-			if p.closed:
-				n2 = nodes[(i+1) % count]
-			elif i+1 < count:
-				n2 = nodes[i+1]
-			else:
-				continue
-			segs.append((n1, n2))
-	return segs
+	"""Segments empaquetats i indexats per franges Y d'una capa ja descomposta"""
+	return segmentIndex.indexSegments(layer)
 
 def minDistanceBetweenLayers(layer1, layer2, dx, liApache2=10000):
-	segs1 = getSegments(layer1)
-	segs2 = getSegments(layer2)
-	if not segs1 or not segs2:
-		return liApache2
-
-	shifted = []
-	for n1, n2 in segs2:
-		shifted.append((
-			type("P", (), {"x": n1.x + dx, "y": n1.y}),
-			type("P", (), {"x": n2.x + dx, "y": n2.y})
-		))
-
-	dmin = liApache2
-	for s1 in segs1:
-		for s2 in shifted:
-			d = minDistanceBetweenSegments(s1[0], s1[1], s2[0], s2[1])
-			if d < dmin:
-				dmin = d
-			if dmin <= 0:
-				return 0.0
-	return dmin
+	return segmentIndex.minDistanceIndexed(getSegments(layer1), getSegments(layer2), dx, liApache2)
 
 # ===== CONSTANTS DE VISUALITZACIÓ DETECTOR DE COL·LISIONS =====
 ZOOM_LEVEL = 15.0  # Escala al 15%
@@ -500,7 +447,7 @@ class KernMarginSlider(object):
 		Rshort = glyph_to_compact(Rprod)
 	
 		result = f"H◂{Lshort}◂{Rshort}◂H {val}"
-		print(f"🧪 DEBUG: '{result}'")
+		tracer.debug("TABS", "'%s'", result)
 		return result
 
 
@@ -656,27 +603,19 @@ class KernMarginSlider(object):
 			suffix = format_context(custom_suffix, right)
 
 			# DEBUG EXHAUSTIU
-			print("🧪 TAB2 DEBUG -----------------------------")
-			print("RAW prefix :", repr(custom_prefix))
-			print("RAW suffix :", repr(custom_suffix))
-			print("LEFT glyph :", left)
-			print("RIGHT glyph:", right)
-			print("FMT prefix :", prefix)
-			print("FMT suffix :", suffix)
+			tracer.debug("TABS", "TAB2 %s/%s: raw prefix %r, raw suffix %r, prefix %r, suffix %r",
+				left, right, custom_prefix, custom_suffix, prefix, suffix)
 
 			base = format_kern_pair_block(prefix, left, right, suffix)
 			line = f"{base}    {value}"
 
-			print("FINAL LINE :", repr(line))
-			print("-------------------------------------------")
+			tracer.debug("TABS", "TAB2 final line: %r", line)
 
 			lines.append(line)
 
 		if lines:
 			tab_text = "\n".join(lines)
-			print("🧪 TAB CONTENT FULL =======================")
-			print(tab_text)
-			print("===========================================")
+			tracer.debug("TABS", "Tab content:\n%s", tab_text)
 			font.newTab(tab_text)
 
 			
@@ -686,22 +625,17 @@ class KernMarginSlider(object):
 	# ===================================================
 
 	def getGroupGlyphsTurbo(self, group, side):
-		"""TURBO: Fast group member retrieval with caching"""
+		"""TURBO: Fast group member retrieval from the font index"""
 		font = Glyphs.font
 		if not font or not group:
 			return []
 	
-		# TURBO: Check cache first
-		cache_key = f"{group}_{side}"
-		if cache_key in self._groupCacheTurbo:
-			return self._groupCacheTurbo[cache_key]
-	
 		# TURBO: Get custom order from userData
 		key = f"kernOrder_{side}"
 		custom_order = font.userData.get(key, {}).get(group, [])
 	
-		# TURBO: Fast glyph collection
-		glyph_names = [g.name for g in font.glyphs if getattr(g, side + "KerningGroup") == group]
+		# TURBO: Indexed glyph collection
+		glyph_names = fontIndex.indexForFont(font).groupMembers(group, side)
 	
 		# TURBO: Apply custom order if exists
 		if custom_order:
@@ -714,9 +648,6 @@ class KernMarginSlider(object):
 		# TURBO: Format with trophy emoji for leader
 		formatted = [f"🏆 {n}" if i == 0 else f"  {n}" for i, n in enumerate(glyph_names)]
 	
-		# TURBO: Cache result
-		self._groupCacheTurbo[cache_key] = formatted
-	
 		return formatted
 
 	def activeGroupTabTurbo(self):
@@ -742,6 +673,9 @@ class KernMarginSlider(object):
 			self.showNoGlyphSelectedTurbo()
 			return
 		
+		# Refresh button: re-read groups edited outside the scripts
+		if sender is not None:
+			fontIndex.indexForFont(font).invalidate()
 		glyph = font.selectedLayers[0].parent
 	
 		# TURBO: Parallel group processing
@@ -802,11 +736,6 @@ class KernMarginSlider(object):
 			font.userData[key] = {}
 		font.userData[key][group] = order
 
-		# TURBO: Clear cache to force refresh
-		cache_key = f"{group}_{side}"
-		if cache_key in self._groupCacheTurbo:
-			del self._groupCacheTurbo[cache_key]
-
 		Message(f"Order applied to {side} group '{group}'")
 
 	def showNoGlyphSelectedTurbo(self):
@@ -890,9 +819,7 @@ class KernMarginSlider(object):
 		Botón #AV#: aplicar el mismo motor de kerning que kernAutoCallback,
 		es decir, solo pares dentro de bloques #...# del tab actual.
 		"""
-		print("\n" + "=" * 80)
-		print("🧪 AV# → llamar a kernAutoCallback (AUTO KERN en bloques #...#)")
-		print("=" * 80)
+		tracer.debug("AUTOKERN", "AV# → llamar a kernAutoCallback (AUTO KERN en bloques #...#)")
 
 		# Reutilizar exactamente el mismo motor
 		self.kernAutoCallback(sender)
@@ -961,9 +888,7 @@ class KernMarginSlider(object):
 
 
 	def kernAutoCallback(self, sender):
-		print("\n" + "=" * 80)
-		print("🧪 AUTO KERN — BLOCS COMPLETS #...#")
-		print("=" * 80)
+		tracer.debug("AUTOKERN", "AUTO KERN — BLOCS COMPLETS #...#")
 
 		font = Glyphs.font
 		if not font:
@@ -983,27 +908,30 @@ class KernMarginSlider(object):
 			print("⚠️ No hay bloques #...#")
 			return
 
+		# Tots els parells de tots els blocs, escrits en una sola transacció
+		pairs = []
 		font.disableUpdateInterface()
 		try:
 			for block_text in blocks:
 				temp_tab = font.newTab(block_text)
 
-				pairs = self.get_pairs_from_tab(temp_tab)
-				print(f"🔗 Pares en bloc: {len(pairs)}")
-
-				self.apply_kerning_to_pairs(pairs)
+				block_pairs = self.get_pairs_from_tab(temp_tab)
+				tracer.debug("AUTOKERN", "🔗 Pares en bloc: %s", len(block_pairs))
+				pairs.extend(block_pairs)
 
 				temp_tab.close()
 		finally:
 			font.enableUpdateInterface()
 
+		self.apply_kerning_to_pairs(pairs, "Auto Kern")
+
 		Glyphs.showNotification(
 			"Auto Kern",
 			f"{len(blocks)} blocs processats"
 		)
 
 	def get_pairs_from_tab(self, tab):
-		print("\n🧪 DEBUG — get_pairs_from_tab")
+		tracer.debug("TABS", "get_pairs_from_tab")
 
 		pairs = []
 		if not tab:
@@ -1022,20 +950,20 @@ class KernMarginSlider(object):
 			R = layers[i + 1]
 
 			if not L or not R:
-				print(f"  [{i}] layer None → skip")
+				tracer.debug("TABS", "[%s] layer None → skip", i)
 				continue
 
 			if not L.parent or not R.parent:
-				print(f"  [{i}] layer sense parent → skip")
+				tracer.debug("TABS", "[%s] layer sense parent → skip", i)
 				continue
 
 			left = L.parent.name
 			right = R.parent.name
 
-			print(f"  [{i}] candidat: {left} / {right}")
+			tracer.debug("TABS", "[%s] candidat: %s / %s", i, left, right)
 
 			if left == "space" or right == "space":
-				print("		⤷ skip (space)")
+				tracer.debug("TABS", "⤷ skip (space)")
 				continue
 
 			pairs.append((left, right))
@@ -1126,14 +1054,13 @@ class KernMarginSlider(object):
 		# --------------------------------------------------
 		# Resolve glyph / group / UUID
 		# --------------------------------------------------
+		index = fontIndex.indexForFont(font)
+
 		def resolveKey(key):
 			if isinstance(key, str) and key.startswith("@MMK_"):
 				return key
 			if isinstance(key, str) and len(key) == 36:
-				for g in font.glyphs:
-					if g.id == key:
-						return g.name
-				return None
+				return index.nameForID(key)
 			return key
 
 		# --------------------------------------------------
@@ -1168,37 +1095,50 @@ class KernMarginSlider(object):
 		
 		
 
-	def apply_kerning_to_pairs(self, pairs):
+	def positiveKerningMasters(self, font):
+		"""
+		(masterIDs, mode) segons la UI: només el màster actiu o tots els màsters
+		amb el mode de coherència triat (masters.INDEPENDENT / INTERPOLATE / MONOTONIC).
+		"""
+		tab = self.w.tabs[0]
+		try:
+			allMasters = bool(tab.allMastersCheckbox.get())
+		except Exception:
+			allMasters = False
+		if not allMasters:
+			return [font.selectedFontMaster.id], masters.INDEPENDENT
+		try:
+			mode = masters.MODES[tab.mastersModePopup.get()]
+		except Exception:
+			mode = masters.INDEPENDENT
+		return [m.id for m in font.masters], mode
+
+	def apply_kerning_to_pairs(self, pairs, undoName="Positive Kerning"):
 		font = Glyphs.font
 		if not font or not pairs:
 			return
 
-		master = font.selectedFontMaster
-		mid = master.id
-
 		try:
 			target_margin = float(self.w.tabs[0].marginInput.get())
 		except:
 			target_margin = 40.0
 
-		for left, right in pairs:
-			if left not in font.glyphs or right not in font.glyphs:
-				continue
+		pairs = [(l, r) for l, r in pairs if l in font.glyphs and r in font.glyphs]
+		masterIDs, mode = self.positiveKerningMasters(font)
 
-			current = margin_for_pair(font, mid, left, right)
-			if current is None or current >= 10000:
-				continue
+		# 👉 NOMÉS KERN POSITIU: perfils carregats un cop per màster, tots els parells junts
+		kerner = masters.MasterKerner(font, target_margin, masterIDs, mode, skipKerned=False)
+		result = kerner.compute(pairs)
+		for (left, right), row in result.values.items():
+			tracer.debug("AUTOKERN", "✔ Kern %s %s %s", dict(row), left, right)
 
-			# 👉 NOMÉS KERN POSITIU
-			if current >= target_margin:
-				continue
-
-			delta = int(round(target_margin - current))
-			if delta <= 0:
-				continue
-
-			font.setKerningForPair(mid, left, right, delta)
-			print(f"✔ Kern +{delta} {left} {right}")
+		batch = kerningBatch.KerningBatch(font, undoName)
+		kerner.queue(batch, result)
+		report = batch.apply()
+		for m, left, right, e in report.failed:
+			tracer.error("AUTOKERN", "Exception applying kerning %s / %s [%s]: %s", left, right, m, e)
+		print(f"✔ {result.summary()} — {report.summary()}")
+		return report
 
 
 
@@ -1208,7 +1148,7 @@ class KernMarginSlider(object):
 	
 	def createCollisionListWithCheckboxes(self, resultsList, reset_label=False):
 		"""Crea una llista de col·lisions amb checkboxes manuales"""
-		print(f"🧪 DEBUG: createCollisionListWithCheckboxes called with {len(resultsList)} items, reset_label={reset_label}")
+		tracer.debug("COLLISIONS", "createCollisionListWithCheckboxes called with %s items, reset_label=%s", len(resultsList), reset_label)
 	
 		tab = self.w.tabs[0]
 	
@@ -1231,7 +1171,7 @@ class KernMarginSlider(object):
 			self.collisionContentHeight = 0
 	
 		if not resultsList:
-			print("🧪 DEBUG: No results to display")
+			tracer.debug("COLLISIONS", "No results to display")
 			noCollisionsLabel = NSTextField.alloc().initWithFrame_(NSMakeRect(0, 80, 360, 22))
 			noCollisionsLabel.setStringValue_("No collisions found")
 			noCollisionsLabel.setEditable_(False)
@@ -1293,7 +1233,7 @@ class KernMarginSlider(object):
 		scrollView.setDocumentView_(contentView)
 		containerView.addSubview_(scrollView)
 	
-		print(f"🧪 DEBUG: Created {len(resultsList)} checkboxes")
+		tracer.debug("COLLISIONS", "Created %s checkboxes", len(resultsList))
 
 	def listSelectedPairsCallback(self, sender):
 		"""
@@ -1344,6 +1284,7 @@ class KernMarginSlider(object):
 			hide_existing = tab.blockCheckbox.get()
 		except:
 			hide_existing = False
+		resolver = kerning.KerningResolver(font, mid) if hide_existing else None
 
 		masterName = master.name
 
@@ -1366,10 +1307,7 @@ class KernMarginSlider(object):
 
 			# Optionally hide existing kerning
 			if hide_existing:
-				filtered_pairs = []
-				for left, right, prefix, suffix in glyph_pairs:
-					if not self.hasKerning(font, mid, left, right):
-						filtered_pairs.append((left, right, prefix, suffix))
+				filtered_pairs = resolver.unkerned(glyph_pairs)
 			else:
 				filtered_pairs = glyph_pairs
 
@@ -1436,28 +1374,13 @@ class KernMarginSlider(object):
 	
 	
 	def layersAreCloseCollision(self, layer1, layer2, dx, margin):
-		"""Verificar col·lisió entre capes"""
+		"""Verificar col·lisió entre capes (accepta capes o segments indexats)"""
 		segs1 = getSegments(layer1)
 		segs2 = getSegments(layer2)
-		if not segs1 or not segs2:
-			print(f"🧪 DEBUG layersAreCloseCollision: No segments")
+		if not len(segs1) or not len(segs2):
 			return False
-	
-		shifted = []
-		for n1, n2 in segs2:
-			shifted.append((
-				type("P", (), {"x": n1.x+dx, "y": n1.y}),
-				type("P", (), {"x": n2.x+dx, "y": n2.y})
-			))
-	
-		for s1 in segs1:
-			for s2 in shifted:
-				distance = minDistanceBetweenSegments(s1[0], s1[1], s2[0], s2[1])
-				if distance < margin:
-					print(f"🧪 DEBUG layersAreCloseCollision: Collision! distance={distance}, margin={margin}")
-					return True
-	
-		return False
+		# Només es comparen franges Y properes, primer els contorns encarats
+		return segmentIndex.indexedAreClose(segs1, segs2, dx, margin)
 
 	
 	
@@ -1542,12 +1465,12 @@ class KernMarginSlider(object):
 		
 				
 	def loadJSONPairsCallback(self, sender):
-		print("🧪 Import JSON button pressed")
+		tracer.debug("JSON", "Import JSON button pressed")
 
 		from vanilla.dialogs import getFile
 
 		paths = getFile(
-			fileTypes=["json"],
+			fileTypes=["json", "jsonl", "kcp"],
 			allowsMultipleSelection=False
 		)
 
@@ -1611,6 +1534,13 @@ class KernMarginSlider(object):
 		self.currentCollisionRightGlyph = ""
 		self.currentCollisionSuffix = ""
 		self.zoomLevelCollision = ZOOM_LEVEL / 100.0
+		self.collisionSweep = None
+		self.collisionSweepTimer = None
+		self.collisionSweepSeen = set()
+		self.collisionSweepResults = []
+		# Últim sweep complet: només es tornen a mirar els parells amb glifs editats
+		self.collisionMemory = sweep.SweepMemory()
+		self.collisionSweepPlan = None
 	
 		# ============================================
 		# VARIABLES PARA EL LISTADOR TURBO (INICIALIZAR)
@@ -1621,7 +1551,6 @@ class KernMarginSlider(object):
 		self._keyCacheTurbo = {}
 		self._productionCacheTurbo = {}
 		self._graphicalCacheTurbo = {}
-		self._groupCacheTurbo = {}
 		# ============================================
 	
 		# Construir las pestañas que quedan
@@ -1705,15 +1634,25 @@ class KernMarginSlider(object):
 			
 	def checkCollisionsCallback(self, sender):
 		"""Callback per al botó Check Collisions - CON FILTRO DE VECINOS SIN CREACIÓN AUTOMÁTICA DE TAB"""
-		print("🧪 DEBUG: checkCollisionsCallback START")
+		tracer.debug("COLLISIONS", "checkCollisionsCallback START")
+	
+		# El mateix botó fa de "Cancel" mentre el sweep corre
+		if self.cancelCollisionSweep():
+			return
 	
 		font = Glyphs.font
 		if not font:
-			print("🧪 DEBUG ERROR: No font open")
+			tracer.error("COLLISIONS", "No font open")
 			return
 	
 		tab = self.w.tabs[0]
 	
+		# Parells marcats de l'última llista, per tornar-los a marcar si segueixen
+		checked_pairs = set(
+			(p[0], p[1]) for i, p in enumerate(self.collisionPairs)
+			if self.collisionStates.get(i, {}).get('checked')
+		)
+	
 		# Netejar resultats anteriors (RESETEAR LABEL)
 		self.clearCollisionList(reset_label=True)
 		self.collisionPairs = []
@@ -1721,7 +1660,7 @@ class KernMarginSlider(object):
 		self.createEmptyPreviewCollision()
 	
 		names = [n.strip() for n in tab.glyphsInput.get().split(",") if n.strip()]
-		print(f"🧪 DEBUG: Glyphs to check: {names}")
+		tracer.debug("COLLISIONS", "Glyphs to check: %s", names)
 	
 		# ===== OBTENER GLIFOS VECINOS DEL CAMPO NUEVO =====
 		neighbors_text = tab.neighborsInput.get()
@@ -1734,8 +1673,8 @@ class KernMarginSlider(object):
 				line_names = [n.strip() for n in line.split(",") if n.strip()]
 				neighbor_names.extend(line_names)
 		
-			print(f"🧪 DEBUG: Neighbor glyphs specified: {len(neighbor_names)}")
-			print(f"🧪 DEBUG: Neighbors: {neighbor_names}")
+			tracer.debug("COLLISIONS", "Neighbor glyphs specified: %s", len(neighbor_names))
+			tracer.debug("COLLISIONS", "Neighbors: %s", neighbor_names)
 	
 		# ===== FILTRAR NOMBRES CON EXTENSIONES =====
 		excluded_extensions = [
@@ -1753,44 +1692,44 @@ class KernMarginSlider(object):
 			for ext in excluded_extensions:
 				if ext in name:
 					has_extension = True
-					print(f"🧪 DEBUG: Skipping glyph with extension '{ext}': {name}")
+					tracer.debug("COLLISIONS", "Skipping glyph with extension '%s': %s", ext, name)
 					break
 		
 			if not has_extension:
 				filtered_names.append(name)
 	
 		names = filtered_names
-		print(f"🧪 DEBUG: Filtered glyphs to check: {names}")
+		tracer.debug("COLLISIONS", "Filtered glyphs to check: %s", names)
 		# ===== FIN DEL FILTRO =====
 	
 		try:
 			margin = float(tab.toleranceInput.get())
-			print(f"🧪 DEBUG: Tolerance margin: {margin}")
+			tracer.debug("COLLISIONS", "Tolerance margin: %s", margin)
 		except:
 			margin = 40.0
-			print(f"🧪 DEBUG: Using default margin: {margin}")
+			tracer.debug("COLLISIONS", "Using default margin: %s", margin)
 	
 		if not names:
-			print("🧪 DEBUG: No glyph names specified")
+			tracer.debug("COLLISIONS", "No glyph names specified")
 			# Mostrar mensaje cuando no hay glifos especificados
 			self.createEmptyResultsList("Enter glyphs to check")
 			return
 	
 		master = font.selectedFontMaster
 		if not master:
-			print("🧪 DEBUG ERROR: No master selected")
+			tracer.error("COLLISIONS", "No master selected")
 			self.createEmptyResultsList("No master selected")
 			return
 	
 		mid = master.id
-		print(f"🧪 DEBUG: Master ID: {mid}")
+		tracer.debug("COLLISIONS", "Master ID: %s", mid)
 	
 		# ===== DETERMINAR LA LISTA DE GLIFOS CONTRA LOS QUE COMPARAR =====
 		allGlyphNames = []
 	
 		if neighbor_names:
 			# Si hay glifos vecinos especificados, usar solo esos
-			print(f"🧪 DEBUG: Using ONLY neighbor glyphs list")
+			tracer.debug("COLLISIONS", "Using ONLY neighbor glyphs list")
 		
 			# Filtrar vecinos con extensiones
 			filtered_neighbors = []
@@ -1799,19 +1738,19 @@ class KernMarginSlider(object):
 				for ext in excluded_extensions:
 					if ext in neighbor:
 						has_extension = True
-						print(f"🧪 DEBUG: Skipping neighbor with extension '{ext}': {neighbor}")
+						tracer.debug("COLLISIONS", "Skipping neighbor with extension '%s': %s", ext, neighbor)
 						break
 			
 				if not has_extension and neighbor in font.glyphs:
 					filtered_neighbors.append(neighbor)
 				elif neighbor not in font.glyphs:
-					print(f"🧪 DEBUG WARNING: Neighbor glyph '{neighbor}' not found in font")
+					tracer.warning("COLLISIONS", "Neighbor glyph '%s' not found in font", neighbor)
 		
 			allGlyphNames = filtered_neighbors
-			print(f"🧪 DEBUG: Using {len(allGlyphNames)} filtered neighbor glyphs")
+			tracer.debug("COLLISIONS", "Using %s filtered neighbor glyphs", len(allGlyphNames))
 		else:
 			# Si no hay vecinos especificados, usar todos los glifos del font
-			print(f"🧪 DEBUG: No neighbor glyphs specified, using ALL font glyphs")
+			tracer.debug("COLLISIONS", "No neighbor glyphs specified, using ALL font glyphs")
 			allGlyphNames = list(font.glyphs.keys())
 		
 			# Filtrar glifos con extensiones de la lista completa
@@ -1827,284 +1766,114 @@ class KernMarginSlider(object):
 					filtered_all_glyph_names.append(glyph_name)
 		
 			allGlyphNames = filtered_all_glyph_names
-			print(f"🧪 DEBUG: Total glyphs in font (filtered): {len(allGlyphNames)}")
+			tracer.debug("COLLISIONS", "Total glyphs in font (filtered): %s", len(allGlyphNames))
 	
 		# Cache de dades per a millor rendiment
 		segCache, bboxCache, adv = {}, {}, {}
 	
-		print(f"🧪 DEBUG: Processing specified glyphs...")
+		tracer.debug("COLLISIONS", "Processing specified glyphs...")
 		for name in names:
 			if name in font.glyphs:
-				glyph = font.glyphs[name]
-				print(f"🧪 DEBUG: Found glyph: {name}")
-				layer = None
-				for l in glyph.layers:
-					if l.associatedMasterId == mid:
-						layer = l
-						break
-				if not layer and glyph.layers:
-					layer = glyph.layers[0]
-			
-				if layer:
-					try:
-						layer_copy = layer.copyDecomposedLayer()
-						print(f"🧪 DEBUG: Decomposed layer for {name}")
-					except Exception as e:
-						layer_copy = layer
-						print(f"🧪 DEBUG: Using original layer for {name}: {e}")
-				
-					segCache[name] = getSegments(layer_copy)
-					bboxCache[name] = self.bboxCollision(layer_copy)
-					adv[name] = layer_copy.width
-					print(f"🧪 DEBUG: Cached data for {name}: width={layer_copy.width}")
+				tracer.debug("COLLISIONS", "Found glyph: %s", name)
+				if self.cacheCollisionGeometry(font, name, mid, segCache, bboxCache, adv):
+					tracer.debug("COLLISIONS", "Cached data for %s: width=%s", name, adv[name])
 				else:
-					print(f"🧪 DEBUG WARNING: No layer found for {name}")
+					tracer.warning("COLLISIONS", "No layer found for %s", name)
 			else:
-				print(f"🧪 DEBUG WARNING: Glyph '{name}' not found in font")
+				tracer.warning("COLLISIONS", "Glyph '%s' not found in font", name)
 	
 		specified = [font.glyphs[n] for n in names if n in font.glyphs]
-		print(f"🧪 DEBUG: Valid specified glyphs: {len(specified)}")
+		tracer.debug("COLLISIONS", "Valid specified glyphs: %s", len(specified))
 	
 		if not specified:
-			print("🧪 DEBUG: No valid glyphs found")
+			tracer.debug("COLLISIONS", "No valid glyphs found")
 			self.createEmptyResultsList("No valid glyphs found")
 			return
 	
-		# Inicializar resultsList aquí
-		resultsList = []
-		temp_collision_pairs = []
-	
-		print(f"🧪 DEBUG: Starting collision detection...")
+		# Geometria compacta de tots els glifs implicats (cache de kernCore)
+		with tracer.timer("collisions.prepare"):
+			for name in allGlyphNames:
+				if name not in segCache and name in font.glyphs:
+					self.cacheCollisionGeometry(font, name, mid, segCache, bboxCache, adv)
+		geometry = dict((n, (segCache[n], bboxCache[n], adv[n])) for n in segCache)
+	
+		# FASE 1: cada glifo especificado como IZQUIERDO contra los vecinos/todos
+		# FASE 2: cada glifo especificado como DERECHO contra los vecinos/todos
+		specified_names = [g.name for g in specified]
+		rows = [(s, [r for r in allGlyphNames if r != s]) for s in specified_names]
+		rows += [(l, [s for s in specified_names if s != l]) for l in allGlyphNames]
+	
+		# Només els parells amb algun glif (o font de component) editat des de l'últim sweep
+		settings = (id(font), mid, margin)
+		versions = sweep.glyphVersions(font, geometry, mid)
+		sweep_rows, kept, changed = self.collisionMemory.plan(settings, rows, versions)
+		self.collisionSweepPlan = (settings, rows, versions)
+		if changed is None:
+			tracer.debug("COLLISIONS", "Full sweep")
+		else:
+			tracer.debug("COLLISIONS", "Incremental sweep: %s changed glyphs, %s collisions kept", len(changed), len(kept))
+	
+		self.collisionSweep = sweep.CollisionSweep(geometry, sweep_rows, margin).start()
+		self.collisionSweepSeen = set()
+		self.collisionSweepResults = []
+		for left_name, right_name in kept:
+			self.collisionSweepSeen.add((left_name, right_name))
+			pre, suf = self.contextualPrefixSuffixCollision(font.glyphs[left_name], font.glyphs[right_name])
+			self.collisionPairs.append((left_name, right_name, pre, suf))
+			self.collisionSweepResults.append(f"{left_name} / {right_name}")
+		if kept:
+			self.createCollisionListWithCheckboxes(self.collisionSweepResults, reset_label=False)
+			for i, (left_name, right_name, pre, suf) in enumerate(self.collisionPairs):
+				if (left_name, right_name) in checked_pairs:
+					self.collisionStates[i]['checked'] = True
+					self.collisionStates[i]['checkbox'].setState_(1)
+					self.updateRowBackgroundColor(i, True)
+		tracer.debug("COLLISIONS", "Sweep started: %s of %s pairs after pruning, %s chunks, parallel=%s", self.collisionSweep.total, self.collisionSweep.requested, len(self.collisionSweep.tasks), self.collisionSweep.parallel)
+	
+		tab.checkButton.setTitle("Cancel")
+		tab.resultsLabel.set(f"Collisions found: {len(kept)} (0%)")
+		self.collisionSweepTimer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
+			0.25,
+			self,
+			"pollCollisionSweep:",
+			None,
+			True
+		)
+
+	def pollCollisionSweep_(self, timer):
+		"""Afegeix a la llista les col·lisions que el sweep ha trobat des de l'últim cop"""
+		sweepRun = self.collisionSweep
+		if sweepRun is None:
+			timer.invalidate()
+			return
 	
-		# FASE 1: Cada glifo especificado como IZQUIERDO contra los vecinos/todos
-		print(f"🧪 DEBUG: FASE 1 - Glifos especificados como IZQUIERDOS")
-		for left in specified:
-			L = None
-			for l in left.layers:
-				if l.associatedMasterId == mid:
-					L = l
-					break
-			if not L and left.layers:
-				L = left.layers[0]
-		
-			if not L:
-				print(f"🧪 DEBUG: No layer for {left.name}, skipping")
-				continue
-		
-			try:
-				L = L.copyDecomposedLayer()
-				print(f"🧪 DEBUG: Decomposed left layer for {left.name}")
-			except Exception as e:
-				print(f"🧪 DEBUG: Could not decompose {left.name}: {e}")
-				pass
-		
-			collision_count = 0
-			print(f"🧪 DEBUG: Checking {left.name} as LEFT against {len(allGlyphNames)} glyphs...")
-		
-			# Contador de progreso
-			checked = 0
-			total_to_check = len(allGlyphNames)
-		
-			for right_name in allGlyphNames:
-				checked += 1
-				if checked % 100 == 0:
-					print(f"🧪 DEBUG: Progress: {checked}/{total_to_check} glyphs checked")
-			
-				if right_name == left.name:
-					continue
-			
-				# ===== FILTRAR GLIFOS CON EXTENSIONES DURANTE LA DETECCIÓN =====
-				skip_this_glyph = False
-				for ext in excluded_extensions:
-					if ext in right_name:
-						skip_this_glyph = True
-						break
-			
-				if skip_this_glyph:
-					continue
-				# ===== FIN DEL FILTRO DURANTE DETECCIÓN =====
-			
-				if right_name not in segCache:
-					if right_name in font.glyphs:
-						right_glyph = font.glyphs[right_name]
-						R_layer = None
-						for l in right_glyph.layers:
-							if l.associatedMasterId == mid:
-								R_layer = l
-								break
-						if not R_layer and right_glyph.layers:
-							R_layer = right_glyph.layers[0]
-					
-						if R_layer:
-							try:
-								R_layer_copy = R_layer.copyDecomposedLayer()
-							except Exception:
-								R_layer_copy = R_layer
-						
-							segCache[right_name] = getSegments(R_layer_copy)
-							bboxCache[right_name] = self.bboxCollision(R_layer_copy)
-							adv[right_name] = R_layer_copy.width
-			
-				# Verificar bounding boxes primer (més ràpid)
-				if not self.boxesAreCloseCollision(bboxCache.get(left.name, (0,0,0,0)), 
-												bboxCache.get(right_name, (0,0,0,0)), 
-												margin):
-					continue
-			
-				dx = adv.get(left.name, 0)
-			
-				R_for_check = None
-				if right_name in font.glyphs:
-					right_glyph = font.glyphs[right_name]
-					for l in right_glyph.layers:
-						if l.associatedMasterId == mid:
-							R_for_check = l
-							break
-					if not R_for_check and right_glyph.layers:
-						R_for_check = right_glyph.layers[0]
-			
-				if R_for_check:
-					try:
-						R_for_check = R_for_check.copyDecomposedLayer()
-					except Exception:
-						pass
-				
-					# Verificar col·lisió real
-					if self.layersAreCloseCollision(L, R_for_check, dx, margin):
-						pre, suf = self.contextualPrefixSuffixCollision(left, font.glyphs[right_name])
-					
-						temp_collision_pairs.append((left.name, right_name, pre, suf))
-					
-						# Format per a la llista amb checkboxes
-						displayText = f"{left.name} / {right_name}"
-						resultsList.append(displayText)
-					
-						collision_count += 1
-						print(f"🧪 DEBUG COLLISION FOUND: {left.name} / {right_name}")
-
-		# FASE 2: Cada glifo especificado como DERECHO contra los vecinos/todos
-		print(f"\n🧪 DEBUG: FASE 2 - Glifos especificados como DERECHOS")
-		for right in specified:
-			R = None
-			for l in right.layers:
-				if l.associatedMasterId == mid:
-					R = l
-					break
-			if not R and right.layers:
-				R = right.layers[0]
-		
-			if not R:
-				print(f"🧪 DEBUG: No layer for {right.name}, skipping")
+		font = Glyphs.font
+		tab = self.w.tabs[0]
+		added = False
+		for left_name, right_name in sweepRun.poll():
+			key = (left_name, right_name)
+			if key in self.collisionSweepSeen or not font:
 				continue
-		
-			try:
-				R = R.copyDecomposedLayer()
-				print(f"🧪 DEBUG: Decomposed right layer for {right.name}")
-			except Exception as e:
-				print(f"🧪 DEBUG: Could not decompose {right.name}: {e}")
-				pass
-		
-			collision_count = 0
-			print(f"🧪 DEBUG: Checking {right.name} as RIGHT against {len(allGlyphNames)} glyphs...")
-		
-			# Contador de progreso
-			checked = 0
-			total_to_check = len(allGlyphNames)
-		
-			for left_name in allGlyphNames:
-				checked += 1
-				if checked % 100 == 0:
-					print(f"🧪 DEBUG: Progress: {checked}/{total_to_check} glyphs checked")
-			
-				if left_name == right.name:
-					continue
-			
-				# ===== FILTRAR GLIFOS CON EXTENSIONES DURANTE LA DETECCIÓN =====
-				skip_this_glyph = False
-				for ext in excluded_extensions:
-					if ext in left_name:
-						skip_this_glyph = True
-						break
-			
-				if skip_this_glyph:
-					continue
-				# ===== FIN DEL FILTRO DURANTE DETECCIÓN =====
-			
-				if left_name not in segCache:
-					if left_name in font.glyphs:
-						left_glyph = font.glyphs[left_name]
-						L_layer = None
-						for l in left_glyph.layers:
-							if l.associatedMasterId == mid:
-								L_layer = l
-								break
-						if not L_layer and left_glyph.layers:
-							L_layer = left_glyph.layers[0]
-					
-						if L_layer:
-							try:
-								L_layer_copy = L_layer.copyDecomposedLayer()
-							except Exception:
-								L_layer_copy = L_layer
-						
-							segCache[left_name] = getSegments(L_layer_copy)
-							bboxCache[left_name] = self.bboxCollision(L_layer_copy)
-							adv[left_name] = L_layer_copy.width
-			
-				# Necesitamos calcular dx basado en el glifo izquierdo
-				dx = adv.get(left_name, 0)
-			
-				# Verificar bounding boxes primer (més ràpid)
-				if not self.boxesAreCloseCollision(bboxCache.get(left_name, (0,0,0,0)), 
-												bboxCache.get(right.name, (0,0,0,0)), 
-												margin):
-					continue
-			
-				L_for_check = None
-				if left_name in font.glyphs:
-					left_glyph = font.glyphs[left_name]
-					for l in left_glyph.layers:
-						if l.associatedMasterId == mid:
-							L_for_check = l
-							break
-					if not L_for_check and left_glyph.layers:
-						L_for_check = left_glyph.layers[0]
-			
-				if L_for_check:
-					try:
-						L_for_check = L_for_check.copyDecomposedLayer()
-					except Exception:
-						pass
-				
-					# Verificar col·lisió real
-					if self.layersAreCloseCollision(L_for_check, R, dx, margin):
-						# Para pares donde el glifo especificado está a la derecha,
-						# necesitamos obtener el contexto apropiado
-						left_glyph_obj = font.glyphs[left_name]
-						pre, suf = self.contextualPrefixSuffixCollision(left_glyph_obj, right)
-					
-						temp_collision_pairs.append((left_name, right.name, pre, suf))
-					
-						# Format per a la llista amb checkboxes
-						displayText = f"{left_name} / {right.name}"
-						resultsList.append(displayText)
-					
-						collision_count += 1
-						print(f"🧪 DEBUG COLLISION FOUND: {left_name} / {right.name}")
-	
-		# ===== 6. ACTUALIZAR UI CON RESULTADOS =====
-		self.collisionPairs = temp_collision_pairs
-	
-		if resultsList:
-			tab.resultsLabel.set(f"Collisions found: {len(resultsList)}")
-		
-			self.createCollisionListWithCheckboxes(
-				resultsList,
-				reset_label=False
-			)
-		
-			# Si hay resultados, mostrar el primero en preview
-			if self.collisionPairs:
+			self.collisionSweepSeen.add(key)
+			pre, suf = self.contextualPrefixSuffixCollision(font.glyphs[left_name], font.glyphs[right_name])
+			self.collisionPairs.append((left_name, right_name, pre, suf))
+			self.collisionSweepResults.append(f"{left_name} / {right_name}")
+			added = True
+	
+		if added:
+			# Reconstruir la llista sense perdre les marques ni la fila activa
+			checked = [i for i, st in self.collisionStates.items() if st.get('checked')]
+			selected = self.selectedCollisionIndex
+			self.createCollisionListWithCheckboxes(self.collisionSweepResults, reset_label=False)
+			for i in checked:
+				self.collisionStates[i]['checked'] = True
+				self.collisionStates[i]['checkbox'].setState_(1)
+				self.updateRowBackgroundColor(i, True)
+			if selected >= 0:
+				self.selectedCollisionIndex = selected
+				self.updateRowBackgroundColor(selected, 'navigate')
+			elif self.collisionPairs:
+				# Mostrar la primera col·lisió tan aviat com arriba
 				left, right, pre, suf = self.collisionPairs[0]
 				self.currentCollisionPrefix = pre
 				self.currentCollisionLeftGlyph = left
@@ -2113,17 +1882,52 @@ class KernMarginSlider(object):
 				self.selectedCollisionIndex = 0
 				self.updateRowBackgroundColor(0, 'navigate')
 				self.updatePreviewCollision(pre, left, right, suf)
+	
+		found = len(self.collisionSweepResults)
+		if not sweepRun.done:
+			tab.resultsLabel.set(f"Collisions found: {found} ({int(sweepRun.progress * 100)}%)")
+			return
+	
+		# ===== 6. ACTUALIZAR UI CON RESULTADOS =====
+		timer.invalidate()
+		self.collisionSweepTimer = None
+		self.collisionSweep = None
+		tab.checkButton.setTitle("Check Collisions")
+		if sweepRun.error is not None:
+			tracer.error("COLLISIONS", "Collision sweep error: %s", sweepRun.error)
+	
+		# Recordar el sweep només si ha acabat sencer
+		plan, self.collisionSweepPlan = self.collisionSweepPlan, None
+		if plan is None or sweepRun.cancelled or sweepRun.error is not None:
+			self.collisionMemory.reset()
+		else:
+			settings, rows, versions = plan
+			self.collisionMemory.commit(settings, rows, versions, [(p[0], p[1]) for p in self.collisionPairs])
+		tracer.count("collisions.pairs", sweepRun.checked)
+		tracer.count("collisions.hits", found)
+	
+		if found:
+			state = "cancelled" if sweepRun.cancelled else "found"
+			tab.resultsLabel.set(f"Collisions {state}: {found}")
+		elif sweepRun.cancelled:
+			self.createEmptyResultsList("Cancelled")
 		else:
 			self.createEmptyResultsList("No collisions found")
 	
-		print(f"✅ checkCollisionsCallback END. Found {len(resultsList)} collisions")
+		tracer.info("COLLISIONS", "checkCollisionsCallback END. Found %d collisions", found)
+
+	def cancelCollisionSweep(self):
+		"""Atura el sweep en curs (el timer tanca la UI a la següent lectura)"""
+		if self.collisionSweep is not None and not self.collisionSweep.done:
+			tracer.debug("COLLISIONS", "Cancelling collision sweep")
+			self.collisionSweep.cancel()
+			return True
+		return False
 
 	# ===== AHORA define useSelectedCollisionCallback =====
 
 	def useSelectedCollisionCallback(self, sender):
-		print("\n" + "=" * 80)
-		print("🧪 USE = Detectar colisiones: NEIGHBORS → GLYPHS TO CHECK")
-		print("=" * 80)
+		tracer.debug("COLLISIONS", "USE = Detectar colisiones: NEIGHBORS → GLYPHS TO CHECK")
 
 		tab = self.w.tabs[0]
 		font = Glyphs.font
@@ -2146,8 +1950,8 @@ class KernMarginSlider(object):
 				line_names = [n.strip() for n in line.split(",") if n.strip()]
 				left_glyphs.extend(line_names)
 
-		print(f"DEBUG left_glyphs (from 'Only neighboring glyphs'): {left_glyphs}")
-		print(f"DEBUG right_glyphs (from 'Glyphs to check'): {right_glyphs}")
+		tracer.debug("COLLISIONS", "left_glyphs (from 'Only neighboring glyphs'): %s", left_glyphs)
+		tracer.debug("COLLISIONS", "right_glyphs (from 'Glyphs to check'): %s", right_glyphs)
 
 		if not left_glyphs:
 			print("❌ No glyphs in 'Only neighboring glyphs'")
@@ -2196,8 +2000,8 @@ class KernMarginSlider(object):
 
 		print(f"VALID left glyphs: {len(valid_left)}")
 		print(f"VALID right glyphs: {len(valid_right)}")
-		print(f"Valid left: {valid_left}")
-		print(f"Valid right: {valid_right}")
+		tracer.debug("COLLISIONS", "Valid left: %s", valid_left)
+		tracer.debug("COLLISIONS", "Valid right: %s", valid_right)
 
 		if not valid_left:
 			print("❌ No valid glyphs in 'Only neighboring glyphs'")
@@ -2220,18 +2024,7 @@ class KernMarginSlider(object):
 		def prepare(name):
 			if name in segCache:
 				return
-			g = font.glyphs[name]
-			layer = next(
-				(l for l in g.layers if l.associatedMasterId == mid),
-				g.layers[0]
-			)
-			try:
-				layer = layer.copyDecomposedLayer()
-			except:
-				pass
-			segCache[name] = getSegments(layer)
-			bboxCache[name] = self.bboxCollision(layer)
-			adv[name] = layer.width
+			self.cacheCollisionGeometry(font, name, mid, segCache, bboxCache, adv)
 
 		# Preparar todos los glifos
 		for g in valid_left + valid_right:
@@ -2241,8 +2034,7 @@ class KernMarginSlider(object):
 	
 		# Detectar colisiones: left (neighbors) → right (glyphs to check)
 		for left_name in valid_left:
-			print(f"  Checking {left_name} as LEFT...")
-			L_layer = font.glyphs[left_name].layers[0].copyDecomposedLayer()
+			tracer.debug("COLLISIONS", "Checking %s as LEFT...", left_name)
 		
 			for right_name in valid_right:
 				if left_name == right_name:
@@ -2252,11 +2044,10 @@ class KernMarginSlider(object):
 				if not self.boxesAreCloseCollision(bboxCache[left_name], bboxCache[right_name], margin):
 					continue
 			
-				# Verificar colisión real
-				R_layer = font.glyphs[right_name].layers[0].copyDecomposedLayer()
+				# Verificar colisión real (segmentos empaquetados en segCache)
 				dx = adv[left_name]
 			
-				if self.layersAreCloseCollision(L_layer, R_layer, dx, margin):
+				if self.layersAreCloseCollision(segCache[left_name], segCache[right_name], dx, margin):
 					key = (left_name, right_name)
 					if key not in seen:
 						seen.add(key)
@@ -2268,10 +2059,10 @@ class KernMarginSlider(object):
 					
 						self.collisionPairs.append((left_name, right_name, pre, suf))
 						results_list.append(f"{left_name} / {right_name}")
-						print(f"    ✅ COLLISION: {left_name} / {right_name}")
+						tracer.debug("COLLISIONS", "✅ COLLISION: %s / %s", left_name, right_name)
 
 		print(f"\n📊 RESULTADOS: {len(results_list)} colisiones encontradas")
-		print(f"DEBUG collisionPairs: {self.collisionPairs}")
+		tracer.debug("COLLISIONS", "collisionPairs: %s", self.collisionPairs)
 
 		# --- 5. ACTUALIZAR UI ---
 		self.clearCollisionList(reset_label=False)
@@ -2300,7 +2091,6 @@ class KernMarginSlider(object):
 			tab.resultsLabel.set("Collisions found: 0")
 
 		print("✔ USE completed (Neighbors → Glyphs to check)")
-		print("=" * 80)
 	
 					
 							
@@ -2366,6 +2156,8 @@ class KernMarginSlider(object):
 		y += 40
 	
 		tab.positiveLabel = TextBox((15, y, 120, 22), "Positive Kerning")
+		tab.allMastersCheckbox = CheckBox((135, y, 100, 20), "All masters", value=False, sizeStyle="small")
+		tab.mastersModePopup = PopUpButton((235, y, 125, 20), ["Independent", "Interpolation", "Monotonic"], sizeStyle="small")
 		y += 25
 	
 		tab.marginLabel = TextBox((15, y, 50, 22), "Margin:")
@@ -2418,6 +2210,10 @@ class KernMarginSlider(object):
 		)
 		y += 35
 	
+		tab.showTraceButton = Button((15, y-10, 150, 24), "Show trace", callback=self.showTraceCallback)
+		tab.exportTraceButton = Button((180, y-10, 130, 24), "Export trace…", callback=self.exportTraceCallback)
+		y += 35
+	
 
 	def addGlyphsToGlyphsInput(self, glyph_names):
 		"""
@@ -2475,6 +2271,7 @@ class KernMarginSlider(object):
 			hide_existing = tab.blockCheckbox.get()
 		except:
 			hide_existing = False
+		resolver = kerning.KerningResolver(font, mid) if hide_existing else None
 
 		# -------------------------------------------------
 		# OBTENER LOS GLIFOS ESPECIFICADOS EN "GLYPHS TO CHECK"
@@ -2483,7 +2280,7 @@ class KernMarginSlider(object):
 			glyphs_to_check_text = tab.glyphsInput.get()
 			specified_glyphs = [g.strip() for g in glyphs_to_check_text.split(",") if g.strip()]
 		except:
-			print("🧪 DEBUG: No se pudo obtener glyphs to check")
+			tracer.debug("COLLISIONS", "No se pudo obtener glyphs to check")
 			return
 
 		if not specified_glyphs:
@@ -2516,7 +2313,7 @@ class KernMarginSlider(object):
 		for glyph_name in specified_glyphs:
 			# Verificar que el glifo existe en la fuente
 			if glyph_name not in font.glyphs:
-				print(f"⚠️ Glyph '{glyph_name}' not found in font")
+				tracer.warning("COLLISIONS", "⚠️ Glyph '%s' not found in font", glyph_name)
 				continue
 
 			# Recolectar todos los pares que contengan este glifo
@@ -2526,20 +2323,17 @@ class KernMarginSlider(object):
 					glyph_pairs.append((left, right, prefix, suffix))
 
 			if not glyph_pairs:
-				print(f"ℹ️ No pairs found for glyph '{glyph_name}'")
+				tracer.debug("COLLISIONS", "ℹ️ No pairs found for glyph '%s'", glyph_name)
 				continue
 
 			# Filtrar si es necesario
 			if hide_existing:
-				filtered_pairs = []
-				for left, right, prefix, suffix in glyph_pairs:
-					if not self.hasKerning(font, mid, left, right):
-						filtered_pairs.append((left, right, prefix, suffix))
+				filtered_pairs = resolver.unkerned(glyph_pairs)
 			else:
 				filtered_pairs = glyph_pairs
 
 			if not filtered_pairs:
-				print(f"ℹ️ All pairs for glyph '{glyph_name}' have existing kerning")
+				tracer.debug("COLLISIONS", "ℹ️ All pairs for glyph '%s' have existing kerning", glyph_name)
 				continue
 
 			# -------------------------------------------------
@@ -2613,8 +2407,8 @@ class KernMarginSlider(object):
 			font.newTab(tab_content)
 			tabs_created += 1
 
-			print(f"✅ Created tab for {glyph_name} with {len(filtered_pairs)} pairs in 4 columns")
-			print(f"   Cada bloque tiene 5 espacios antes del prefijo")
+			tracer.debug("COLLISIONS", "✅ Created tab for %s with %s pairs in 4 columns", glyph_name, len(filtered_pairs))
+			tracer.debug("COLLISIONS", "Cada bloque tiene 5 espacios antes del prefijo")
 
 		# Mensaje final
 		if tabs_created > 0:
@@ -2908,14 +2702,12 @@ class KernMarginSlider(object):
 		self.custom_prefix = tab.customPrefixInput.get().strip()
 		self.custom_suffix = tab.customSuffixInput.get().strip()
 	
-		print(f"🧪 Custom Prefix/Suffix updated: '{self.custom_prefix}' / '{self.custom_suffix}'")
+		tracer.debug("TABS", "Custom Prefix/Suffix updated: '%s' / '%s'", self.custom_prefix, self.custom_suffix)
 																
 																																				
 	def deleteAllKerningGroupsCallback(self, sender):
 		"""Elimina TODOS los grupos de kerning de la fuente con confirmación"""
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — ELIMINAR TODOS LOS GRUPOS DE KERNING")
-		print("=" * 80)
+		tracer.debug("GROUPS", "ELIMINAR TODOS LOS GRUPOS DE KERNING")
 	
 		font = Glyphs.font
 		if not font:
@@ -3004,11 +2796,11 @@ class KernMarginSlider(object):
 		# Eliminar grupos de todos los glifos
 		for glyph in font.glyphs:
 			if glyph.leftKerningGroup:
-				glyph.leftKerningGroup = None
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "left", None)
 				left_removed += 1
 		
 			if glyph.rightKerningGroup:
-				glyph.rightKerningGroup = None
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "right", None)
 				right_removed += 1
 	
 		# También limpiar el kerning que depende de grupos
@@ -3053,7 +2845,6 @@ class KernMarginSlider(object):
 			f"• {kerning_entries_removed} kerning entries removed"
 		)
 	
-		print("=" * 80)
 
 	def updateGroupsInfoAfterDeletion(self):
 		"""Actualiza la información de grupos después de la eliminación"""
@@ -3080,23 +2871,21 @@ class KernMarginSlider(object):
 	
 		tab.groupsInfo.set(message)
 	
-		print(f"🧪 UI actualizada: {total_remaining} grupos restantes")
+		tracer.debug("GROUPS", "UI actualizada: %s grupos restantes", total_remaining)
 		
 		
 		
 	def kernTabCollisionCallback_REAL(self, sender):
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — KERN TAB (GENÈRIC)")
-		print("=" * 80)
+		tracer.debug("COLLISIONS", "KERN TAB (GENÈRIC)")
 
 		font = Glyphs.font
-		print("Font:", font)
+		tracer.debug("COLLISIONS", "Font: %s", font)
 		if not font:
 			print("❌ No font")
 			return
 
 		tab = font.currentTab
-		print("Tab:", tab)
+		tracer.debug("COLLISIONS", "Tab: %s", tab)
 		if not tab:
 			print("❌ No tab")
 			return
@@ -3105,7 +2894,7 @@ class KernMarginSlider(object):
 			print("❌ Tab has no layers")
 			return
 
-		print(f"📄 TAB TEXT: {repr(tab.text)}")
+		tracer.debug("COLLISIONS", "Tab text: %r", tab.text)
 		print(f"📐 Layers count: {len(tab.layers)}")
 
 		# --- mostrar layers i glifs ---
@@ -3114,9 +2903,9 @@ class KernMarginSlider(object):
 			if layer and layer.parent:
 				name = layer.parent.name
 				glyph_names.append(name)
-				print(f"  [{i}] glyph = {name}")
+				tracer.debug("COLLISIONS", "[%s] glyph = %s", i, name)
 			else:
-				print(f"  [{i}] layer buit / None")
+				tracer.debug("COLLISIONS", "[%s] layer buit / None", i)
 
 		if len(glyph_names) < 2:
 			print("⚠️ Menys de 2 glifs → res a kernar")
@@ -3128,7 +2917,7 @@ class KernMarginSlider(object):
 
 		print(f"🔗 PARELLS DETECTATS: {len(pairs)}")
 		for i, (l, r) in enumerate(pairs):
-			print(f"   {i:02d}: {l} / {r}")
+			tracer.debug("COLLISIONS", "%02d: %s / %s", i, l, r)
 
 		if not pairs:
 			print("❌ get_pairs_from_tab ha retornat cap parell")
@@ -3139,7 +2928,6 @@ class KernMarginSlider(object):
 		self.apply_kerning_to_pairs(pairs)
 
 		print("✅ KERN TAB FINALITZAT")
-		print("=" * 80)
 
 
 
@@ -3147,9 +2935,7 @@ class KernMarginSlider(object):
 		
 		
 	def useSelectedCollisionCallback(self, sender):
-		print("\n" + "=" * 80)
-		print("🧪 USE = Detectar colisiones BIDIRECCIONALES entre NEIGHBORS y GLYPHS TO CHECK")
-		print("=" * 80)
+		tracer.debug("COLLISIONS", "USE = Detectar colisiones BIDIRECCIONALES entre NEIGHBORS y GLYPHS TO CHECK")
 
 		tab = self.w.tabs[0]
 		font = Glyphs.font
@@ -3172,8 +2958,8 @@ class KernMarginSlider(object):
 				line_names = [n.strip() for n in line.split(",") if n.strip()]
 				neighbor_names.extend(line_names)
 
-		print(f"🧪 Glyphs to check: {names}")
-		print(f"🧪 Neighbor glyphs: {neighbor_names}")
+		tracer.debug("COLLISIONS", "Glyphs to check: %s", names)
+		tracer.debug("COLLISIONS", "Neighbor glyphs: %s", neighbor_names)
 
 		if not names:
 			print("❌ No glyphs in 'Glyphs to check'")
@@ -3188,10 +2974,10 @@ class KernMarginSlider(object):
 		# --- 2. OBTENER TOLERANCIA ---
 		try:
 			margin = float(tab.toleranceInput.get())
-			print(f"🧪 Tolerance margin: {margin}")
+			tracer.debug("COLLISIONS", "Tolerance margin: %s", margin)
 		except:
 			margin = 40.0
-			print(f"🧪 Using default margin: {margin}")
+			tracer.debug("COLLISIONS", "Using default margin: %s", margin)
 
 		master = font.selectedFontMaster
 		if not master:
@@ -3199,7 +2985,7 @@ class KernMarginSlider(object):
 			return
 	
 		mid = master.id
-		print(f"🧪 Master ID: {mid}")
+		tracer.debug("COLLISIONS", "Master ID: %s", mid)
 
 		# --- 3. FILTRAR GLIFOS VÁLIDOS (más permisivo) ---
 		excluded_extensions = [
@@ -3219,7 +3005,7 @@ class KernMarginSlider(object):
 			# Solo excluir extensiones que realmente causan problemas
 			for ext in excluded_extensions:
 				if ext in name:
-					print(f"⚠️ Skipping glyph with extension '{ext}': {name}")
+					tracer.debug("COLLISIONS", "Skipping glyph with extension '%s': %s", ext, name)
 					return False
 		
 			return True
@@ -3228,10 +3014,10 @@ class KernMarginSlider(object):
 		valid_names = [n for n in names if valid(n)]
 		valid_neighbors = [n for n in neighbor_names if valid(n)]
 
-		print(f"🧪 VALID Glyphs to check: {len(valid_names)}")
-		print(f"🧪 VALID Neighbor glyphs: {len(valid_neighbors)}")
-		print(f"🧪 Valid names: {valid_names}")
-		print(f"🧪 Valid neighbors: {valid_neighbors}")
+		tracer.debug("COLLISIONS", "VALID Glyphs to check: %s", len(valid_names))
+		tracer.debug("COLLISIONS", "VALID Neighbor glyphs: %s", len(valid_neighbors))
+		tracer.debug("COLLISIONS", "Valid names: %s", valid_names)
+		tracer.debug("COLLISIONS", "Valid neighbors: %s", valid_neighbors)
 
 		if not valid_names:
 			print("❌ No valid glyphs in 'Glyphs to check'")
@@ -3251,38 +3037,20 @@ class KernMarginSlider(object):
 		# Cache para rendimiento (igual que en checkCollisionsCallback)
 		segCache, bboxCache, adv = {}, {}, {}
 
-		print(f"🧪 Preparing glyphs...")
+		tracer.debug("COLLISIONS", "Preparing glyphs...")
 		for name in valid_names + valid_neighbors:
 			if name in segCache:
 				continue
 			
-			g = font.glyphs[name]
-			layer = None
-			for l in g.layers:
-				if l.associatedMasterId == mid:
-					layer = l
-					break
-			if not layer and g.layers:
-				layer = g.layers[0]
-		
-			if layer:
-				try:
-					layer_copy = layer.copyDecomposedLayer()
-				except Exception as e:
-					layer_copy = layer
-					print(f"🧪 Using original layer for {name}: {e}")
-			
-				segCache[name] = getSegments(layer_copy)
-				bboxCache[name] = self.bboxCollision(layer_copy)
-				adv[name] = layer_copy.width
-				print(f"🧪 Prepared {name}: width={layer_copy.width}")
+			if self.cacheCollisionGeometry(font, name, mid, segCache, bboxCache, adv):
+				tracer.debug("COLLISIONS", "Prepared %s: width=%s", name, adv[name])
 
 		print(f"\n🔍 DETECTANDO COLISIONES BIDIRECCIONALES...")
 	
 		# DIRECCIÓN 1: Neighbors (left) → Glyphs to check (right)
-		print(f"🧪 DIRECCIÓN 1: Neighbors → Glyphs to check")
+		tracer.debug("COLLISIONS", "DIRECCIÓN 1: Neighbors → Glyphs to check")
 		for left_name in valid_neighbors:
-			print(f"  Checking {left_name} as LEFT...")
+			tracer.debug("COLLISIONS", "Checking %s as LEFT...", left_name)
 			L = None
 			left_glyph = font.glyphs[left_name]
 			for l in left_glyph.layers:
@@ -3295,11 +3063,6 @@ class KernMarginSlider(object):
 			if not L:
 				continue
 		
-			try:
-				L = L.copyDecomposedLayer()
-			except Exception:
-				pass
-		
 			for right_name in valid_names:
 				if left_name == right_name:
 					continue
@@ -3310,26 +3073,12 @@ class KernMarginSlider(object):
 			
 				dx = adv[left_name]
 			
-				# Obtener capa derecha
-				R = None
 				right_glyph = font.glyphs[right_name]
-				for l in right_glyph.layers:
-					if l.associatedMasterId == mid:
-						R = l
-						break
-				if not R and right_glyph.layers:
-					R = right_glyph.layers[0]
-			
-				if not R:
+				if right_name not in segCache:
 					continue
 			
-				try:
-					R = R.copyDecomposedLayer()
-				except Exception:
-					pass
-			
-				# Verificar colisión real
-				if self.layersAreCloseCollision(L, R, dx, margin):
+				# Verificar colisión real (segmentos empaquetados en segCache)
+				if self.layersAreCloseCollision(segCache[left_name], segCache[right_name], dx, margin):
 					key = (left_name, right_name)
 					if key not in seen:
 						seen.add(key)
@@ -3339,12 +3088,12 @@ class KernMarginSlider(object):
 					
 						self.collisionPairs.append((left_name, right_name, pre, suf))
 						results_list.append(f"{left_name} / {right_name}")
-						print(f"    ✅ COLLISION: {left_name} / {right_name}")
+						tracer.debug("COLLISIONS", "✅ COLLISION: %s / %s", left_name, right_name)
 
 		# DIRECCIÓN 2: Glyphs to check (left) → Neighbors (right)
-		print(f"\n🧪 DIRECCIÓN 2: Glyphs to check → Neighbors")
+		tracer.debug("COLLISIONS", "DIRECCIÓN 2: Glyphs to check → Neighbors")
 		for left_name in valid_names:
-			print(f"  Checking {left_name} as LEFT...")
+			tracer.debug("COLLISIONS", "Checking %s as LEFT...", left_name)
 			L = None
 			left_glyph = font.glyphs[left_name]
 			for l in left_glyph.layers:
@@ -3357,11 +3106,6 @@ class KernMarginSlider(object):
 			if not L:
 				continue
 		
-			try:
-				L = L.copyDecomposedLayer()
-			except Exception:
-				pass
-		
 			for right_name in valid_neighbors:
 				if left_name == right_name:
 					continue
@@ -3372,26 +3116,12 @@ class KernMarginSlider(object):
 			
 				dx = adv[left_name]
 			
-				# Obtener capa derecha
-				R = None
 				right_glyph = font.glyphs[right_name]
-				for l in right_glyph.layers:
-					if l.associatedMasterId == mid:
-						R = l
-						break
-				if not R and right_glyph.layers:
-					R = right_glyph.layers[0]
-			
-				if not R:
+				if right_name not in segCache:
 					continue
 			
-				try:
-					R = R.copyDecomposedLayer()
-				except Exception:
-					pass
-			
-				# Verificar colisión real
-				if self.layersAreCloseCollision(L, R, dx, margin):
+				# Verificar colisión real (segmentos empaquetados en segCache)
+				if self.layersAreCloseCollision(segCache[left_name], segCache[right_name], dx, margin):
 					key = (left_name, right_name)
 					if key not in seen:
 						seen.add(key)
@@ -3401,10 +3131,10 @@ class KernMarginSlider(object):
 					
 						self.collisionPairs.append((left_name, right_name, pre, suf))
 						results_list.append(f"{left_name} / {right_name}")
-						print(f"    ✅ COLLISION: {left_name} / {right_name}")
+						tracer.debug("COLLISIONS", "✅ COLLISION: %s / %s", left_name, right_name)
 
 		print(f"\n📊 RESULTADOS: {len(results_list)} colisiones encontradas")
-		print(f"🧪 Collision pairs: {self.collisionPairs}")
+		tracer.debug("COLLISIONS", "Collision pairs: %s", self.collisionPairs)
 
 		# --- 5. ACTUALIZAR UI ---
 		self.clearCollisionList(reset_label=False)
@@ -3433,7 +3163,6 @@ class KernMarginSlider(object):
 			tab.resultsLabel.set("Collisions found: 0")
 
 		print("✔ USE completed (Bidirectional detection)")
-		print("=" * 80)
 
 		
 	
@@ -3724,6 +3453,14 @@ class KernMarginSlider(object):
 		# Actualizar preview vacío
 		self.createEmptyPreviewCollision()
 	
+	def cacheCollisionGeometry(self, font, name, mid, segCache, bboxCache, adv):
+		"""Omple segCache/bboxCache/adv des de la cache compartida (i de disc) de kernCore"""
+		entry = segmentIndex.sharedCache.geometry(font, name, mid)
+		if entry is None:
+			return False
+		segCache[name], bboxCache[name], adv[name] = entry
+		return True
+
 	def bboxCollision(self, layer):
 		"""Obtener bounding box per a Collision Detector"""
 		if not layer:
@@ -3766,9 +3503,7 @@ class KernMarginSlider(object):
 
 	def hideExistingPairsCollisionCallback(self, sender):
 		"""Hide blocks where ANY consecutive pair has POSITIVE kerning"""
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — HIDE EXISTING PAIRS (checking TWO consecutive pairs)")
-		print("=" * 80)
+		tracer.debug("COLLISIONS", "HIDE EXISTING PAIRS (checking TWO consecutive pairs)")
 	
 		font = Glyphs.font
 		if not font:
@@ -3918,13 +3653,13 @@ class KernMarginSlider(object):
 		print(f"✅ Found {len(unique_blocks)} unique blocks")
 	
 		for i, block in enumerate(unique_blocks):
-			print(f"\n	Block {i}: '{block['full_text']}'")
-			print(f"	Type: {block['type']}, Pos: [{block['start']}:{block['end']}]")
+			tracer.debug("COLLISIONS", "Block %s: '%s'", i, block['full_text'])
+			tracer.debug("COLLISIONS", "Type: %s, Pos: [%s:%s]", block['type'], block['start'], block['end'])
 		
 			if block['type'] == 'explicit':
-				print(f"	Explicit: '{block['left_glyph']}' / '{block['right_glyph']}'")
+				tracer.debug("COLLISIONS", "Explicit: '%s' / '%s'", block['left_glyph'], block['right_glyph'])
 			else:
-				print(f"	Unicode: '{block['left_char']}' + '{block['unicode_char']}'")
+				tracer.debug("COLLISIONS", "Unicode: '%s' + '%s'", block['left_char'], block['unicode_char'])
 	
 		# numbersign protection ranges
 		pranges = []
@@ -3939,7 +3674,7 @@ class KernMarginSlider(object):
 	
 		print(f"\n🛡️ Found {len(pranges)} protected numbersign...# ranges")
 		for idx, (ps, pe) in enumerate(pranges):
-			print(f"  Protected {idx}: pos [{ps}:{pe}] = '{text[ps:pe]}'")
+			tracer.debug("COLLISIONS", "Protected %s: pos [%s:%s] = '%s'", idx, ps, pe, text[ps:pe])
 	
 		def line_intersects_protected(ls, le, pranges):
 			for ps, pe in pranges:
@@ -3951,12 +3686,12 @@ class KernMarginSlider(object):
 		to_hide = []
 	
 		for bi, block in enumerate(unique_blocks):
-			print(f"\n🔎 Checking block {bi}: '{block['full_text']}'")
-			print(f"  Position: [{block['start']}:{block['end']}]")
+			tracer.debug("COLLISIONS", "🔎 Checking block %s: '%s'", bi, block['full_text'])
+			tracer.debug("COLLISIONS", "Position: [%s:%s]", block['start'], block['end'])
 		
 			# Check protection
 			if line_intersects_protected(block['start'], block['end'], pranges):
-				print(f"  ⛔ Block intersects with protected range → KEEP")
+				tracer.debug("COLLISIONS", "⛔ Block intersects with protected range → KEEP")
 				continue
 		
 			# Lista para almacenar todos los pares a verificar
@@ -3988,7 +3723,7 @@ class KernMarginSlider(object):
 				if unicode_glyph_name and suffix_char_name:
 					pairs_to_check.append((f"Pair 2: {unicode_glyph_name}/{suffix_char_name}", unicode_glyph_name, suffix_char_name))
 	
-			print(f"  Pairs to check: {len(pairs_to_check)}")
+			tracer.debug("COLLISIONS", "Pairs to check: %s", len(pairs_to_check))
 		
 			# Verificar kerning en CADA par
 			has_positive_kern = False
@@ -4000,21 +3735,21 @@ class KernMarginSlider(object):
 					kern_details.append(f"{pair_desc} = {kern}")
 					if kern > 0:
 						has_positive_kern = True
-						print(f"  ✅ {pair_desc} has POSITIVE kerning ({kern})")
+						tracer.debug("COLLISIONS", "✅ %s has POSITIVE kerning (%s)", pair_desc, kern)
 					else:
-						print(f"  ℹ️ {pair_desc} has kerning {kern} (≤ 0)")
+						tracer.debug("COLLISIONS", "ℹ️ %s has kerning %s (≤ 0)", pair_desc, kern)
 				else:
-					print(f"  ℹ️ {pair_desc} has NO kerning")
+					tracer.debug("COLLISIONS", "ℹ️ %s has NO kerning", pair_desc)
 	
 			if kern_details:
-				print(f"  All kerning values: {', '.join(kern_details)}")
+				tracer.debug("COLLISIONS", "All kerning values: %s", ', '.join(kern_details))
 	
 			# Decidir si ocultar
 			if has_positive_kern:
-				print(f"  🚫 Block has AT LEAST ONE positive kerning pair → HIDE")
+				tracer.debug("COLLISIONS", "🚫 Block has AT LEAST ONE positive kerning pair → HIDE")
 				to_hide.append((block['start'], block['end']))
 			else:
-				print(f"  ✅ Block has NO positive kerning pairs → KEEP")
+				tracer.debug("COLLISIONS", "✅ Block has NO positive kerning pairs → KEEP")
 	
 		# ============================================================
 		# CORRECCIÓN: Mantener alineación eliminando líneas completas
@@ -4024,11 +3759,11 @@ class KernMarginSlider(object):
 		
 			# Dividir el texto en líneas
 			lines = text.split('\n')
-			print(f"🧪 DEBUG: Texto tiene {len(lines)} líneas")
+			tracer.debug("COLLISIONS", "Texto tiene %s líneas", len(lines))
 		
 			# Procesar cada bloque a ocultar
 			for start, end in reversed(to_hide):
-				print(f"\n	🔧 Procesando bloque en [{start}:{end}]")
+				tracer.debug("COLLISIONS", "🔧 Procesando bloque en [%s:%s]", start, end)
 			
 				# Encontrar en qué línea está este bloque
 				block_line_index = -1
@@ -4044,17 +3779,17 @@ class KernMarginSlider(object):
 						block_in_line_start = start - line_start
 						block_in_line_end = end - line_start
 					
-						print(f"	 Bloque en línea {i}: '{line}'")
-						print(f"	 Posición en línea: {block_in_line_start} a {block_in_line_end}")
+						tracer.debug("COLLISIONS", "Bloque en línea %s: '%s'", i, line)
+						tracer.debug("COLLISIONS", "Posición en línea: %s a %s", block_in_line_start, block_in_line_end)
 					
 						# Verificar si la línea ya está vacía o solo tiene espacios
 						if line.strip() == '':
-							print(f"	 ⏭️ Línea ya está vacía, saltando")
+							tracer.debug("COLLISIONS", "⏭️ Línea ya está vacía, saltando")
 							break
 					
 						# Extraer el bloque y los 6 espacios siguientes
 						line_after_block = line[block_in_line_end:]
-						print(f"	 Texto después del bloque: '{line_after_block[:20]}...'")
+						tracer.debug("COLLISIONS", "Texto después del bloque: '%s...'", line_after_block[:20])
 					
 						# Contar espacios después del bloque
 						spaces_after = 0
@@ -4064,7 +3799,7 @@ class KernMarginSlider(object):
 							else:
 								break
 					
-						print(f"	 Espacios después del bloque: {spaces_after}")
+						tracer.debug("COLLISIONS", "Espacios después del bloque: %s", spaces_after)
 					
 						# Eliminar el bloque + 6 espacios (o menos si no hay suficientes)
 						spaces_to_remove = min(6, spaces_after)
@@ -4072,7 +3807,7 @@ class KernMarginSlider(object):
 					
 						# Crear nueva línea
 						new_line = line[:block_in_line_start] + line[block_in_line_start + total_to_remove:]
-						print(f"	 Nueva línea ({len(new_line)} chars): '{new_line}'")
+						tracer.debug("COLLISIONS", "Nueva línea (%s chars): '%s'", len(new_line), new_line)
 					
 						# Reemplazar la línea
 						lines[i] = new_line
@@ -4083,7 +3818,7 @@ class KernMarginSlider(object):
 			# Reconstruir el texto manteniendo líneas vacías si es necesario
 			final_text = '\n'.join(lines)
 		
-			print(f"\n🧪 DEBUG: Texto final tiene {len(final_text)} caracteres")
+			tracer.debug("COLLISIONS", "Texto final tiene %s caracteres", len(final_text))
 		
 			# Aplicar el texto modificado al tab
 			tab.text = final_text
@@ -4102,7 +3837,6 @@ class KernMarginSlider(object):
 				"No blocks with positive kerning found"
 			)
 	
-		print("=" * 80) 
 		
 		
 	def glyphTypeCollision(self, leftGlyph, rightGlyph=None):
@@ -4134,9 +3868,7 @@ class KernMarginSlider(object):
 	# Añadir este método nuevo a la clase KernMarginSlider:
 	def removeHashFromTabCallback(self, sender):
 		"""Elimina todos los caracteres '#' (numbersign) del tab actual"""
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — ELIMINAR TODOS LOS # DEL TAB")
-		print("=" * 80)
+		tracer.debug("TABS", "ELIMINAR TODOS LOS # DEL TAB")
 	
 		font = Glyphs.font
 		if not font:
@@ -4193,13 +3925,10 @@ class KernMarginSlider(object):
 		)
 	
 		print(f"✅ Eliminados {total_removed} caracteres del tab")
-		print("=" * 80)
 		
 		
 	def removeTabKernCollisionCallback(self, sender):
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — REMOVE TAB KERN (PROTEGER BLOQUES numbersign...#)")
-		print("=" * 80)
+		tracer.debug("TABS", "REMOVE TAB KERN (PROTEGER BLOQUES numbersign...#)")
 
 		font = Glyphs.font
 		if not font:
@@ -4247,21 +3976,21 @@ class KernMarginSlider(object):
 		i = 0
 		while i < len(glyph_names):
 			if glyph_names[i] == "numbersign":
-				print(f"  🔎 Encontrado 'numbersign' en posición {i}")
+				tracer.debug("TABS", "🔎 Encontrado 'numbersign' en posición %s", i)
 			
 				# Buscar el cierre del bloque
 				block_end = -1
 				for j in range(i + 1, len(glyph_names)):
 					if glyph_names[j] == "numbersign":
 						block_end = j
-						print(f"	→ Encontrado 'numbersign' de cierre en posición {j}")
+						tracer.debug("TABS", "→ Encontrado 'numbersign' de cierre en posición %s", j)
 						break
 			
 				if block_end > i:
 					# Marcar todos los glifos dentro de este bloque como protegidos
 					for k in range(i, block_end + 1):
 						protected_indices.add(k)
-						print(f"	🛡️	 Marcando glifo {k} ('{glyph_names[k]}') como PROTEGIDO")
+						tracer.debug("TABS", "🛡️	 Marcando glifo %s ('%s') como PROTEGIDO", k, glyph_names[k])
 				
 					i = block_end + 1  # Saltar al final del bloque
 					continue
@@ -4275,6 +4004,7 @@ class KernMarginSlider(object):
 		# IDENTIFICAR PARES CON KERNING (EXCLUYENDO PROTEGIDOS)
 		# -------------------------------------------------
 		pairs_with_kern = []
+		resolver = kerning.KerningResolver(font, mid)
 
 		print("\n🔍 COMPROBANDO PARELLS (EXCLUYENDO PROTEGIDOS):")
 
@@ -4296,30 +4026,30 @@ class KernMarginSlider(object):
 				# (es decir, que left_name no sea el numbersign de apertura)
 				if left_name != "numbersign":
 					is_protected = True
-					print(f"➡️ Parell {i}: {left_name} / {right_name}")
-					print(f"  🛡️  PAR COMPLETAMENTE PROTEGIDO (ambos índices en bloque)")
+					tracer.debug("TABS", "➡️ Parell %s: %s / %s", i, left_name, right_name)
+					tracer.debug("TABS", "🛡️  PAR COMPLETAMENTE PROTEGIDO (ambos índices en bloque)")
 		
 			# Opción 2: Par que cruza el borde de un bloque protegido
 			# (esto sería raro pero lo manejamos)
 			elif (i in protected_indices and left_name != "numbersign") or \
 				 ((i + 1) in protected_indices and right_name != "numbersign"):
 				is_protected = True
-				print(f"➡️ Parell {i}: {left_name} / {right_name}")
-				print(f"  🛡️  PAR PARCIALMENTE PROTEGIDO (en borde de bloque)")
+				tracer.debug("TABS", "➡️ Parell %s: %s / %s", i, left_name, right_name)
+				tracer.debug("TABS", "🛡️  PAR PARCIALMENTE PROTEGIDO (en borde de bloque)")
 
 			if is_protected:
-				print(f"  ✅ Saltando par protegido")
+				tracer.debug("TABS", "✅ Saltando par protegido")
 				continue
 
 			# Solo verificar kerning para pares NO protegidos
-			print(f"\n➡️ Parell {i}: {left_name} / {right_name}")
+			tracer.debug("TABS", "➡️ Parell %s: %s / %s", i, left_name, right_name)
 		
-			has_kern = self.hasKerning(font, mid, left_name, right_name)
-			print(f"   Té kerning: {has_kern}")
+			has_kern = self.hasKerning(font, mid, left_name, right_name, resolver)
+			tracer.debug("TABS", "Té kerning: %s", has_kern)
 
 			if has_kern:
 				pairs_with_kern.append((left_name, right_name))
-				print(f"  🗑️  Marcado para eliminación")
+				tracer.debug("TABS", "🗑️  Marcado para eliminación")
 
 		if not pairs_with_kern:
 			print("\n⚠️ No s'ha detectat cap parell amb kerning (o todos están protegidos)")
@@ -4327,7 +4057,7 @@ class KernMarginSlider(object):
 
 		print("\n🧽 PARELLS A ELIMINAR (NO PROTEGIDOS):")
 		for idx, p in enumerate(pairs_with_kern):
-			print(f"  {idx:3d}: {p[0]} / {p[1]}")
+			tracer.debug("TABS", "%3d: %s / %s", idx, p[0], p[1])
 
 		# -------------------------------------------------
 		# ELIMINACIÓN DIRECTA SIN CONFIRMACIÓN
@@ -4336,13 +4066,13 @@ class KernMarginSlider(object):
 
 		print("\n🔨 ELIMINANDO KERNING...")
 		for left, right in pairs_with_kern:
-			print(f"  🧹 Eliminando {left} / {right}")
+			tracer.debug("TABS", "🧹 Eliminando %s / %s", left, right)
 			try:
 				self.removeKerning(font, mid, left, right)
 				removed += 1
-				print(f"	 ✅ Eliminado")
+				tracer.debug("TABS", "✅ Eliminado")
 			except Exception as e:
-				print(f"	 ❌ Error eliminando: {e}")
+				tracer.error("TABS", "❌ Error eliminando: %s", e)
 
 		print(f"\n✅ TOTAL ELIMINADO: {removed}")
 	
@@ -4360,7 +4090,6 @@ class KernMarginSlider(object):
 				f"Pares en bloques protegidos preservados"
 			)
 	
-		print("=" * 80)
 
 	# ===== COL·LECCIONS I MÈTODES DEL GENERADOR DE PARES =====
 
@@ -4382,11 +4111,11 @@ class KernMarginSlider(object):
 		for glyph in font.glyphs:
 			if glyph.category in ["Letter", "Number", "Punctuation", "Symbol"]:
 				if not glyph.leftKerningGroup:
-					glyph.leftKerningGroup = glyph.name
+					fontIndex.indexForFont(font).setKerningGroup(glyph, "left", glyph.name)
 					count_left += 1
 					
 				if not glyph.rightKerningGroup:
-					glyph.rightKerningGroup = glyph.name
+					fontIndex.indexForFont(font).setKerningGroup(glyph, "right", glyph.name)
 					count_right += 1
 		
 		return count_left + count_right
@@ -4516,7 +4245,7 @@ class KernMarginSlider(object):
 		"""
 		glyphs = []
 
-		print("\n🧪 DEBUG TAB GLYPHS --------------------")
+		tracer.debug("TABS", "TAB GLYPHS --------------------")
 
 		try:
 			for i, layer in enumerate(tab.layers):
@@ -4529,12 +4258,12 @@ class KernMarginSlider(object):
 						f"unicode: {g.unicode}"
 					)
 				else:
-					print(f"{i:02d} | layer WITHOUT parent")
+					tracer.debug("TABS", "%02d | layer WITHOUT parent", i)
 		except Exception as e:
 			print("❌ ERROR leyendo layers del tab:", e)
 
-		print("🧪 TOTAL GLYPHS:", len(glyphs))
-		print("🧪 END TAB GLYPHS ----------------------\n")
+		tracer.debug("TABS", "TOTAL GLYPHS: %s", len(glyphs))
+		tracer.debug("TABS", "END TAB GLYPHS ----------------------\n")
 
 		return glyphs
 
@@ -4574,63 +4303,16 @@ class KernMarginSlider(object):
 
 		return True
 
-	def hasKerning(self, font, master_id, left, right):
+	def hasKerning(self, font, master_id, left, right, resolver=None):
 		"""
-		Comprova si existeix kerning directe o via grups.
-		Versión mejorada con más debug.
+		Comprova si existeix kerning directe o via grups (inclòs grup-grup).
+		Per a lots de parells, passa un kerning.KerningResolver creat una vegada.
 		"""
-		print(f"🧪 DEBUG hasKerning: Verificando {left} / {right}")
-	
 		if not isinstance(left, str) or not isinstance(right, str):
-			print(f"  ❌ Error: left o right no son strings")
-			return False
-
-		if left not in font.glyphs:
-			print(f"  ⚠️  Left glyph '{left}' no encontrado en font")
-			return False
-	
-		if right not in font.glyphs:
-			print(f"  ⚠️  Right glyph '{right}' no encontrado en font")
 			return False
-
-		# Kerning directe
-		try:
-			kern_value = font.kerningForPair(master_id, left, right)
-			if kern_value is not None:
-				print(f"  ✅ Kerning directo encontrado: {kern_value}")
-				return True
-			else:
-				print(f"  ℹ️  No kerning directo")
-		except Exception as e:
-			print(f"  ❌ Error verificando kerning directo: {e}")
-
-		gL = font.glyphs[left]
-		gR = font.glyphs[right]
-
-		# Grup esquerre
-		if gL.rightKerningGroup:
-			try:
-				group_left = f"@MMK_L_{gL.rightKerningGroup}"
-				kern_value = font.kerningForPair(master_id, group_left, right)
-				if kern_value is not None:
-					print(f"  ✅ Kerning via grupo izquierdo encontrado: {kern_value}")
-					return True
-			except Exception as e:
-				print(f"  ❌ Error verificando kerning via grupo izquierdo: {e}")
-
-		# Grup dret
-		if gR.leftKerningGroup:
-			try:
-				group_right = f"@MMK_R_{gR.leftKerningGroup}"
-				kern_value = font.kerningForPair(master_id, left, group_right)
-				if kern_value is not None:
-					print(f"  ✅ Kerning via grupo derecho encontrado: {kern_value}")
-					return True
-			except Exception as e:
-				print(f"  ❌ Error verificando kerning via grupo derecho: {e}")
-
-		print(f"  ❌ No se encontró kerning de ningún tipo")
-		return False
+		if resolver is None:
+			resolver = kerning.KerningResolver(font, master_id)
+		return resolver.isKerned(left, right)
 
 
 	def contextualPrefixSuffixCollision(self, l, r):
@@ -4660,36 +4342,33 @@ class KernMarginSlider(object):
 		if not font:
 			return []
 
-		try:
-			with open(jsonPath, "r", encoding="utf-8") as f:
-				data = json.load(f)
-		except Exception as e:
-			print("❌ JSON load error:", e)
-			return []
-
-		raw_pairs = data.get("pairs", [])
+		# Es validen a mesura que es llegeixen (.jsonl/.kcp en streaming, .json antic sencer)
 		validated = []
+		seen = set()
+		try:
+			for record in pairStream.readPairs(jsonPath):
+				left, right = record.left, record.right
 
-		for item in raw_pairs:
-			if not isinstance(item, (list, tuple)) or len(item) != 2:
-				continue
-
-			left, right = item
+				if (left, right) in seen:
+					continue
+				seen.add((left, right))
 
-			if left not in font.glyphs or right not in font.glyphs:
-				continue
+				if left not in font.glyphs or right not in font.glyphs:
+					continue
 
-			gL = font.glyphs[left]
-			gR = font.glyphs[right]
+				gL = font.glyphs[left]
+				gR = font.glyphs[right]
 
-			if not self.isKerningCandidate(gL, gR):
-				continue
+				if not self.isKerningCandidate(gL, gR):
+					continue
 
-			if (left, right) not in validated:
 				validated.append((left, right))
+		except Exception as e:
+			print("❌ JSON load error:", e)
+			return validated
 
 		print(f"✅ JSON validated pairs: {len(validated)}")
-		print("🧪 VALIDATED PAIRS:", validated)
+		tracer.debug("JSON", "VALIDATED PAIRS: %s", validated)
 
 		return validated
 
@@ -4801,6 +4480,27 @@ class KernMarginSlider(object):
 		image.unlockFocus()
 		return image
 
+	def showTraceCallback(self, sender):
+		"""Comptadors, temporitzadors i últims esdeveniments del tracer a la finestra Macro"""
+		for line in tracer.report() or ["No counters or timers recorded"]:
+			print(line)
+		for line in tracer.dump(last=TRACE_LINES):
+			print(line)
+		Glyphs.showMacroWindow()
+
+	def exportTraceCallback(self, sender):
+		from vanilla.dialogs import putFile
+
+		path = putFile("kernTrace.txt")
+		if not path:
+			return
+		try:
+			tracer.export(path)
+		except Exception as e:
+			print(f"❌ Could not export trace: {e}")
+			return
+		print(f"✅ Trace exported to {path}")
+
 	def exportTabToJSONCallback(self, sender):
 		font = Glyphs.font
 		if not font:
@@ -4812,9 +4512,8 @@ class KernMarginSlider(object):
 			return
 
 		from vanilla.dialogs import putFile
-		import json
 
-		path = putFile("kerningPairs.json")
+		path = putFile("kerningPairs.jsonl")
 		if not path:
 			return
 
@@ -4846,22 +4545,19 @@ class KernMarginSlider(object):
 				continue
 
 			seen.add((left, right))
-			pairs.append([left, right])
-
-		data = {
-			"name": "Exported from Glyphs tab",
-			"pairs": pairs
-		}
+			pairs.append((left, right))
 
+		# Un parell per línia (.jsonl) o binari compacte (.kcp)
 		try:
-			with open(path, "w", encoding="utf-8") as f:
-				json.dump(data, f, ensure_ascii=False, indent=2)
-			print(f"✅ Exported {len(pairs)} pairs to JSON")
+			with pairStream.PairWriter(path, {"name": "Exported from Glyphs tab"}) as writer:
+				for left, right in pairs:
+					writer.write(left, right)
+			print(f"✅ Exported {len(pairs)} pairs to {os.path.basename(path)}")
 		except Exception as e:
-			print("❌ Error writing JSON:", e)
+			print("❌ Error writing pairs:", e)
 
 	def checkKerningGroupsCallback(self, sender):
-		print("🧪 checkKerningGroupsCallback called")
+		tracer.debug("GROUPS", "checkKerningGroupsCallback called")
 
 		font = Glyphs.font
 		if not font:
@@ -4892,7 +4588,7 @@ class KernMarginSlider(object):
 		)
 
 	def fillEmptyKerningGroupsCallback(self, sender):
-		print("🧪 fillEmptyKerningGroupsCallback called")
+		tracer.debug("GROUPS", "fillEmptyKerningGroupsCallback called")
 
 		font = Glyphs.font
 		if not font:
@@ -4934,15 +4630,15 @@ class KernMarginSlider(object):
 		)
 
 		if not result:
-			print("🧪 User cancelled")
+			tracer.debug("GROUPS", "User cancelled")
 			return
 
 		# APPLY
 		for g, side in missingSides:
 			if side == "left":
-				g.leftKerningGroup = g.name
+				fontIndex.indexForFont(font).setKerningGroup(g, "left", g.name)
 			else:
-				g.rightKerningGroup = g.name
+				fontIndex.indexForFont(font).setKerningGroup(g, "right", g.name)
 
 		Message(
 			"Kerning Groups",
@@ -4951,10 +4647,10 @@ class KernMarginSlider(object):
 		)
 
 	def _debug(self, msg):
-		print("🧪 TOOLS DEBUG:", msg)
+		tracer.debug("GROUPS", "%s", msg)
 
 	def checkGroupsCallback(self, sender):
-		print("🧪 TOOLS: Check Kerning Groups callback executed")
+		tracer.debug("GROUPS", "Check Kerning Groups callback executed")
 
 		font = Glyphs.font
 		if not font:
@@ -4980,7 +4676,7 @@ class KernMarginSlider(object):
 		alert.runModal()
 
 	def fillEmptyGroupsCallback(self, sender):
-		print("🧪 TOOLS: Fill Empty Groups callback executed")
+		tracer.debug("GROUPS", "Fill Empty Groups callback executed")
 
 		font = Glyphs.font
 		if not font:
@@ -5018,10 +4714,10 @@ class KernMarginSlider(object):
 
 		for g, side in missingSides:
 			if side == "left" and not g.leftKerningGroup:
-				g.leftKerningGroup = g.name
+				fontIndex.indexForFont(font).setKerningGroup(g, "left", g.name)
 				applied += 1
 			elif side == "right" and not g.rightKerningGroup:
-				g.rightKerningGroup = g.name
+				fontIndex.indexForFont(font).setKerningGroup(g, "right", g.name)
 				applied += 1
 
 		Glyphs.showNotification(
@@ -5101,9 +4797,9 @@ class KernMarginSlider(object):
 				continue
 			glyph = font.glyphs[glyph_name]
 			if side == 'L' and not glyph.leftKerningGroup:
-				glyph.leftKerningGroup = f"@MMK_L_{glyph_name}"
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "left", f"@MMK_L_{glyph_name}")
 			elif side == 'R' and not glyph.rightKerningGroup:
-				glyph.rightKerningGroup = f"@MMK_R_{glyph_name}"
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "right", f"@MMK_R_{glyph_name}")
 		return True
 
 	def format_glyph_name(self, glyph_name): 
@@ -5134,9 +4830,8 @@ class KernMarginSlider(object):
 	def get_glyph_name_by_id(self, font, glyph_id):
 		"""Get glyph name from glyph ID"""
 		if isinstance(glyph_id, str) and len(glyph_id) == 36:
-			for glyph in font.glyphs:
-				if glyph.id == glyph_id: 
-					return glyph.name
+			glyph = fontIndex.indexForFont(font).glyphForID(glyph_id)
+			return glyph.name if glyph else None
 		return None
 
 	def find_glyph_for_group(self, font, group_name, target_side):
@@ -5145,31 +4840,20 @@ class KernMarginSlider(object):
 		group_name: group name without prefix (e.g., 'acir', 'bcir', 'tcir')
 		target_side: 'L' for left, 'R' for right
 		"""
-		found_glyphs = []
-	
-		for g in font.glyphs:
-			left_group = g.leftKerningGroup or ""
-			right_group = g.rightKerningGroup or ""
-		
-			if target_side == 'L':
-				# Search in left groups (compare with and without prefix)
-				if (left_group == group_name or 
-					left_group == f"@MMK_L_{group_name}" or
-					left_group.endswith(f"_{group_name}")):
-					found_glyphs.append(g.name)
-			elif target_side == 'R':
-				# Search in right groups (compare with and without prefix)
-				if (right_group == group_name or 
-					right_group == f"@MMK_R_{group_name}" or
-					right_group.endswith(f"_{group_name}")):
-					found_glyphs.append(g.name)
-	
-		return found_glyphs
+		side = {'L': "left", 'R': "right"}.get(target_side)
+		if not side:
+			return []
+		return fontIndex.indexForFont(font).groupMembers(group_name, side)
 
 	def get_all_convertible_pairs(self, font, master_id):
 		"""Convert all kerning pairs to displayable format with glyph names"""
 		convertible_pairs = []
 		all_pairs = self.get_all_kern_pairs(font, master_id)
+		# Representative glyphs for the special groups, looked up once
+		index = fontIndex.indexForFont(font)
+		special_groups = ["acir", "bcir", "tcir", "cometes"]
+		left_reps = index.representatives(special_groups, "right")
+		right_reps = index.representatives(special_groups, "left")
 		name_fixes = {
 			"a-sc": "a.sc",
 			"hypen": "hyphen", 
@@ -5198,13 +4882,8 @@ class KernMarginSlider(object):
 					group_name = left_key[7:]  # Extract group name without '@MMK_L_'
 					left_glyph = group_name
 				
-					# Find representative glyph for left group
-					if group_name in ["acir", "bcir", "tcir", "cometes"]:
-						# For a left group, we look for glyphs that have this group on the RIGHT side
-						found_glyphs = self.find_glyph_for_group(font, group_name, 'R')
-						if found_glyphs:
-							# Use the first found glyph as representative
-							left_glyph = found_glyphs[0]
+					# For a left group, the representative has this group on the RIGHT side
+					left_glyph = left_reps.get(group_name, left_glyph)
 				
 				elif left_key in font.glyphs:
 					left_glyph = left_key
@@ -5218,13 +4897,8 @@ class KernMarginSlider(object):
 					group_name = right_key[7:]	# Extract group name without '@MMK_R_'
 					right_glyph = group_name
 				
-					# Find representative glyph for right group
-					if group_name in ["acir", "bcir", "tcir", "cometes"]:
-						# For a right group, we look for glyphs that have this group on the LEFT side
-						found_glyphs = self.find_glyph_for_group(font, group_name, 'L')
-						if found_glyphs:
-							# Use the first found glyph as representative
-							right_glyph = found_glyphs[0]
+					# For a right group, the representative has this group on the LEFT side
+					right_glyph = right_reps.get(group_name, right_glyph)
 				
 				elif right_key in font.glyphs:
 					right_glyph = right_key
@@ -5362,9 +5036,7 @@ class KernMarginSlider(object):
 			print("⚠️ No font open")
 			return
 
-		print("\n" + "=" * 80)
-		print("🧪 DEBUG — LIST ALL KERN PAIRS (CON .sc SUPPORT)")
-		print("=" * 80)
+		tracer.debug("LISTING", "LIST ALL KERN PAIRS (CON .sc SUPPORT)")
 
 		# ============================================================
 		# OBTENER VALORES DE LA UI
@@ -5397,7 +5069,7 @@ class KernMarginSlider(object):
 		try:
 			new_prefix = tab.customPrefixInput.get().strip()
 			new_suffix = tab.customSuffixInput.get().strip()
-			print(f"🧪 DEBUG: Nuevos valores personalizados - Prefix: '{new_prefix}', Suffix: '{new_suffix}'")
+			tracer.debug("LISTING", "Nuevos valores personalizados - Prefix: '%s', Suffix: '%s'", new_prefix, new_suffix)
 	
 			# Usar los nuevos valores si están definidos
 			if new_prefix:
@@ -5405,9 +5077,9 @@ class KernMarginSlider(object):
 			if new_suffix:
 				custom_suffix_simple = new_suffix
 		
-			print(f"🧪 DEBUG: Valores finales - Prefix: '{custom_prefix_simple}', Suffix: '{custom_suffix_simple}'")
+			tracer.debug("LISTING", "Valores finales - Prefix: '%s', Suffix: '%s'", custom_prefix_simple, custom_suffix_simple)
 		except:
-			print("🧪 DEBUG: No se pudieron obtener los nuevos valores de prefix/suffix")
+			tracer.debug("LISTING", "No se pudieron obtener los nuevos valores de prefix/suffix")
 
 		master = font.selectedFontMaster
 		if not master:
@@ -5415,7 +5087,7 @@ class KernMarginSlider(object):
 			return
 
 		master_id = master.id
-		print(f"🧪 DEBUG: Master: {master.name} (ID: {master_id})")
+		tracer.debug("LISTING", "Master: %s (ID: %s)", master.name, master_id)
 
 		# ============================================================
 		# FUNCIONES LOCALES (CON SUPPORT PARA .sc)
@@ -5604,10 +5276,10 @@ class KernMarginSlider(object):
 		# ============================================================
 
 		# Auto-assign kerning groups
-		print(f"\n🧪 DEBUG: Auto-assigning kerning groups...")
+		tracer.debug("LISTING", "Auto-assigning kerning groups...")
 	
 		# Get all kerning pairs
-		print(f"\n🧪 DEBUG: Processing kerning pairs...")
+		tracer.debug("LISTING", "Processing kerning pairs...")
 		all_pairs = []
 		kerning_dict = font.kerning.get(master_id, {})
 
@@ -5627,18 +5299,18 @@ class KernMarginSlider(object):
 							'right_raw': right_key
 						})
 
-		print(f"🧪 DEBUG: Found {len(all_pairs)} total kerning pairs")
+		tracer.debug("LISTING", "Found %s total kerning pairs", len(all_pairs))
 
 		if not all_pairs:
 			print("⚠️ No kerning pairs found")
 			return
 
 		# Sort kerning pairs
-		print(f"🧪 DEBUG: Sorting pairs...")
+		tracer.debug("LISTING", "Sorting pairs...")
 	
 		# Crear tabs
 		total_tabs = (len(all_pairs) + pairs_per_tab - 1) // pairs_per_tab
-		print(f"🧪 DEBUG: Creating {total_tabs} tabs...")
+		tracer.debug("LISTING", "Creating %s tabs...", total_tabs)
 
 		for t in range(total_tabs):
 			start = t * pairs_per_tab
@@ -5663,20 +5335,19 @@ class KernMarginSlider(object):
 				tab_lines.append(display)  # Ya no se añaden espacios extras aquí
 	
 			tab_content = "\n".join(tab_lines)
-			print(f"🧪 DEBUG: Creating tab {t+1}/{total_tabs}")
-			print(f"  Content preview: {tab_content[:200]}...")
+			tracer.debug("LISTING", "Creating tab %s/%s", t+1, total_tabs)
+			tracer.debug("LISTING", "Content preview: %s...", tab_content[:200])
 	
 			font.newTab(tab_content)
 
 		print(f"✅ Created {total_tabs} tabs")
-		print("=" * 80)
 
 		# ============================================================
 		# CÓDIGO PRINCIPAL
 		# ============================================================
 
 		# Auto-assign kerning groups
-		print(f"\n🧪 DEBUG: Auto-assigning kerning groups...")
+		tracer.debug("LISTING", "Auto-assigning kerning groups...")
 		glyphs_needing_groups = set()
 		kerning_dict = font.kerning.get(master_id, {})
 
@@ -5713,13 +5384,17 @@ class KernMarginSlider(object):
 				continue
 			glyph = font.glyphs[glyph_name]
 			if side == 'L' and not glyph.leftKerningGroup:
-				glyph.leftKerningGroup = glyph_name
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "left", glyph_name)
 			elif side == 'R' and not glyph.rightKerningGroup:
-				glyph.rightKerningGroup = glyph_name
+				fontIndex.indexForFont(font).setKerningGroup(glyph, "right", glyph_name)
 
 		# Get all kerning pairs
-		print(f"\n🧪 DEBUG: Processing kerning pairs...")
+		tracer.debug("LISTING", "Processing kerning pairs...")
 		all_pairs = []
+		index = fontIndex.indexForFont(font)
+		special_groups = ["acir", "bcir", "tcir", "cometes"]
+		left_reps = index.representatives(special_groups, "right")
+		right_reps = index.representatives(special_groups, "left")
 		name_fixes = {
 			"a-sc": "a.sc",
 			"hypen": "hyphen", 
@@ -5747,11 +5422,8 @@ class KernMarginSlider(object):
 							group_name = left_key[7:]  # Extract group name without '@MMK_L_'
 							left_glyph = group_name
 					
-							# Find representative glyph for left group
-							if group_name in ["acir", "bcir", "tcir", "cometes"]:
-								found_glyphs = find_glyph_for_group(group_name, 'R')
-								if found_glyphs:
-									left_glyph = found_glyphs[0]
+							# Representative glyph for left group
+							left_glyph = left_reps.get(group_name, left_glyph)
 				
 						elif left_key in font.glyphs:
 							left_glyph = left_key
@@ -5765,11 +5437,8 @@ class KernMarginSlider(object):
 							group_name = right_key[7:]	# Extract group name without '@MMK_R_'
 							right_glyph = group_name
 					
-							# Find representative glyph for right group
-							if group_name in ["acir", "bcir", "tcir", "cometes"]:
-								found_glyphs = find_glyph_for_group(group_name, 'L')
-								if found_glyphs:
-									right_glyph = found_glyphs[0]
+							# Representative glyph for right group
+							right_glyph = right_reps.get(group_name, right_glyph)
 				
 						elif right_key in font.glyphs:
 							right_glyph = right_key
@@ -5795,14 +5464,14 @@ class KernMarginSlider(object):
 							'right_raw': right_key
 						})
 
-		print(f"🧪 DEBUG: Found {len(all_pairs)} total kerning pairs")
+		tracer.debug("LISTING", "Found %s total kerning pairs", len(all_pairs))
 
 		if not all_pairs:
 			Message("No Kerning Pairs", "No kerning pairs found for this master.", OKButton="OK")
 			return
 
 		# Sort kerning pairs by case type
-		print(f"🧪 DEBUG: Sorting pairs...")
+		tracer.debug("LISTING", "Sorting pairs...")
 		def sort_key(pair):
 			lt = get_glyph_case_type(pair['left'])
 			rt = get_glyph_case_type(pair['right'])
@@ -5819,7 +5488,7 @@ class KernMarginSlider(object):
 		partial = [p for p in sorted_pairs if p['status'] == "PARTIAL"]
 		missing = [p for p in sorted_pairs if p['status'] == "MISSING"]
 
-		print(f"🧪 DEBUG: Categorized:")
+		tracer.debug("LISTING", "Categorized:")
 		print(f"  VALID: {len(valid)} pairs")
 		print(f"  PARTIAL: {len(partial)} pairs")
 		print(f"  MISSING: {len(missing)} pairs")
@@ -5852,7 +5521,6 @@ class KernMarginSlider(object):
 		else:
 			Message("Info", "No kerning pairs to display", OKButton="OK")
 
-		print("=" * 80)
 	
 	
 	
@@ -5925,10 +5593,11 @@ class KernMarginSlider(object):
 	
 		applied_count = 0
 		skipped_count = 0
+		batch = kerningBatch.KerningBatch(font, "Kerning from JSON")
 	
 		for left_name, right_name in pairs:
 			if left_name not in font.glyphs or right_name not in font.glyphs:
-				print(f"❌ Glyph no encontrado: {left_name} / {right_name}")
+				tracer.error("AUTOKERN", "❌ Glyph no encontrado: %s / %s", left_name, right_name)
 				skipped_count += 1
 				continue
 			
@@ -5937,28 +5606,36 @@ class KernMarginSlider(object):
 		
 			# Verificar si es candidato para kerning
 			if not self.isKerningCandidate(gL, gR):
-				print(f"⚠️ No es candidato: {left_name} / {right_name}")
+				tracer.debug("AUTOKERN", "No es candidato: %s / %s", left_name, right_name)
 				skipped_count += 1
 				continue
 		
 			# Calcular distancia actual
 			current_distance = margin_for_pair(font, mid, left_name, right_name)
 			if current_distance is None or current_distance >= 10000:
-				print(f"⚠️ No se pudo calcular distancia: {left_name} / {right_name}")
+				tracer.warning("AUTOKERN", "⚠️ No se pudo calcular distancia: %s / %s", left_name, right_name)
 				skipped_count += 1
 				continue
 		
 			# Calcular kerning necesario
 			delta = int(round(-(current_distance - margin)))
 			if delta <= 0:
-				print(f"⚠️ Kerning <= 0 ({delta}): {left_name} / {right_name}")
+				tracer.debug("AUTOKERN", "Kerning <= 0 (%s): %s / %s", delta, left_name, right_name)
 				skipped_count += 1
 				continue
 		
-			# Aplicar kerning
-			font.setKerningForPair(mid, left_name, right_name, delta)
-			applied_count += 1
-			print(f"✅ Kerning aplicado: {left_name} / {right_name} = {delta}")
+			# Encolar kerning
+			batch.set(mid, left_name, right_name, delta)
+			tracer.debug("AUTOKERN", "Kerning encolado: %s / %s = %s", left_name, right_name, delta)
+	
+		# Aplicar todo en una pasada (un solo undo, sin redibujar por par)
+		report = batch.apply()
+		for m, left_name, right_name, e in report.failed:
+			tracer.error("AUTOKERN", "❌ %s / %s: %s", left_name, right_name, e)
+		for m, left_name, right_name, expected, actual in report.mismatched:
+			tracer.error("AUTOKERN", "❌ %s / %s: %s en lugar de %s", left_name, right_name, actual, expected)
+		applied_count = report.applied - len(report.mismatched)
+		skipped_count += report.errors
 	
 		# Mostrar resumen
 		if applied_count > 0:
@@ -5977,42 +5654,44 @@ class KernMarginSlider(object):
 		"""Aplica kerning automáticamente usando el motor para calcular valores"""
 		font = Glyphs.font
 		if not font:
-			print("🧪 DEBUG ERROR: No font open in applyAutoKerningFromPairs")
+			tracer.error("AUTOKERN", "No font open in applyAutoKerningFromPairs")
 			return
 		
 		master = font.selectedFontMaster
 		if not master:
-			print("🧪 DEBUG ERROR: No master selected")
+			tracer.error("AUTOKERN", "No master selected")
 			return
 		
-		mid = master.id
+		masterIDs, mode = self.positiveKerningMasters(font)
 	
 		# Obtener margen objetivo desde la UI o usar valor por defecto
 		try:
 			tab = self.w.tabs[0]  # Collision Detector tab
 			target_margin = float(tab.marginInput.get())
-			print(f"🧪 DEBUG: Using target margin from UI: {target_margin}")
+			tracer.debug("AUTOKERN", "Using target margin from UI: %s", target_margin)
 		except:
 			target_margin = 40
-			print(f"🧪 DEBUG: Using default margin: {target_margin}")
+			tracer.debug("AUTOKERN", "Using default margin: %s", target_margin)
 	
 		applied_count = 0
 		skipped_count = 0
 		error_count = 0
+		candidates = []
+		tracer.resetStats("autokern.")
 	
-		print(f"🧪 DEBUG: Starting kerning application for {len(pairs)} pairs...")
+		tracer.debug("AUTOKERN", "Starting kerning application for %s pairs in %s masters (%s)...", len(pairs), len(masterIDs), mode)
 	
 		for i, (left_name, right_name) in enumerate(pairs):
-			print(f"\n🧪 DEBUG: Processing pair {i+1}/{len(pairs)}: {left_name}/{right_name}")
+			tracer.debug("AUTOKERN", "Processing pair %d/%d: %s/%s", i + 1, len(pairs), left_name, right_name)
 		
 			# Verificar si los glifos existen
 			if left_name not in font.glyphs:
-				print(f"🧪 DEBUG ERROR: Left glyph '{left_name}' not found")
+				tracer.error("AUTOKERN", "Left glyph '%s' not found", left_name)
 				error_count += 1
 				continue
 			
 			if right_name not in font.glyphs:
-				print(f"🧪 DEBUG ERROR: Right glyph '{right_name}' not found")
+				tracer.error("AUTOKERN", "Right glyph '%s' not found", right_name)
 				error_count += 1
 				continue
 			
@@ -6021,66 +5700,56 @@ class KernMarginSlider(object):
 		
 			# Verificar si es candidato para kerning
 			if not self.isKerningCandidate(gL, gR):
-				print(f"🧪 DEBUG SKIP: Not a kerning candidate ({gL.category}/{gR.category})")
+				tracer.debug("AUTOKERN", "Skip: Not a kerning candidate (%s/%s)", gL.category, gR.category)
+				tracer.count("autokern.skipped.candidate")
 				skipped_count += 1
 				continue
 		
-			# Verificar si ya tiene kerning
-			if self.hasKerning(font, mid, gL, gR):
-				print(f"🧪 DEBUG SKIP: Already has kerning")
-				skipped_count += 1
-				continue
-		
-			# Calcular distancia actual usando el motor
-			print(f"🧪 DEBUG: Calculating current distance...")
-			current_distance = margin_for_pair(font, mid, left_name, right_name)
-		
-			if current_distance is None:
-				print(f"🧪 DEBUG ERROR: Could not calculate distance (None)")
+			candidates.append((left_name, right_name))
+	
+		# Calcular todos los másteres juntos: perfiles cargados una vez, kerning existente por máster
+		kerner = masters.MasterKerner(font, target_margin, masterIDs, mode, skipKerned=True)
+		with tracer.timer("autokern.distance"):
+			result = kerner.compute(candidates)
+	
+		for m, left_name, right_name in result.kerned:
+			tracer.debug("AUTOKERN", "Skip: Already has kerning (%s / %s) [%s]", left_name, right_name, m)
+		for m, left_name, right_name in result.unmeasured:
+			tracer.error("AUTOKERN", "Could not calculate distance (%s / %s) [%s]", left_name, right_name, m)
+	
+		# Escribir y verificar en bloque: todos los másteres, una sola pasada y un solo undo
+		batch = kerningBatch.KerningBatch(font, "Auto Kern from JSON")
+		kerner.queue(batch, result)
+		report = batch.apply()
+		bad_writes = set()
+		for m, left_name, right_name, e in report.failed:
+			tracer.error("AUTOKERN", "Exception applying kerning %s / %s: %s", left_name, right_name, e)
+			bad_writes.add((m, left_name, right_name))
+		for m, left_name, right_name, expected, actual in report.mismatched:
+			tracer.error("AUTOKERN", "%s / %s: applied %s but expected %s", left_name, right_name, actual, expected)
+			bad_writes.add((m, left_name, right_name))
+	
+		# Recuento por par, no por par y máster: aplicado si algún máster se escribió bien;
+		# error si no y algún máster no se pudo medir o escribir; omitido si ya tenía kerning o no hacía falta
+		unmeasured = set((l, r) for m, l, r in result.unmeasured)
+		kerned = set((l, r) for m, l, r in result.kerned)
+		for left_name, right_name in candidates:
+			row = result.values.get((left_name, right_name), {})
+			if any((m, left_name, right_name) not in bad_writes for m in row):
+				applied_count += 1
+			elif row or (left_name, right_name) in unmeasured:
 				error_count += 1
-				continue
-			
-			if current_distance >= 10000:
-				print(f"🧪 DEBUG ERROR: Distance too large ({current_distance})")
-				error_count += 1
-				continue
-		
-			print(f"🧪 DEBUG: Current distance: {current_distance:.1f}")
-			print(f"🧪 DEBUG: Target margin: {target_margin}")
-		
-			# Calcular kerning necesario
-			delta = int(round(-(current_distance - target_margin)))
-			print(f"🧪 DEBUG: Calculated delta: {delta}")
-		
-			if delta <= 0:
-				print(f"🧪 DEBUG SKIP: Delta <= 0 (no kerning needed)")
+			else:
+				tracer.count("autokern.skipped.kerned" if (left_name, right_name) in kerned else "autokern.skipped.delta")
 				skipped_count += 1
-				continue
-		
-			# Aplicar kerning
-			try:
-				print(f"🧪 DEBUG: Applying kerning: {left_name} / {right_name} = {delta}")
-				font.setKerningForPair(mid, left_name, right_name, delta)
-			
-				# Verificar que se aplicó correctamente
-				applied_value = font.kerningForPair(mid, left_name, right_name)
-				if applied_value == delta:
-					print(f"🧪 DEBUG SUCCESS: Kerning applied and verified")
-					applied_count += 1
-				else:
-					print(f"🧪 DEBUG ERROR: Applied {applied_value} but expected {delta}")
-					error_count += 1
-				
-			except Exception as e:
-				print(f"🧪 DEBUG ERROR: Exception applying kerning: {e}")
-				error_count += 1
 	
 		# Mostrar resumen
-		print(f"\n🧪 DEBUG SUMMARY:")
-		print(f"  Total pairs: {len(pairs)}")
-		print(f"  Applied: {applied_count}")
-		print(f"  Skipped: {skipped_count}")
-		print(f"  Errors: {error_count}")
+		tracer.count("autokern.pairs", len(pairs))
+		tracer.count("autokern.applied", applied_count)
+		tracer.info("AUTOKERN", "Summary: %d pairs, %d applied, %d skipped, %d errors",
+			len(pairs), applied_count, skipped_count, error_count)
+		for line in tracer.report("autokern."):
+			print(f"⏱ {line}")
 	
 		if applied_count > 0:
 			alert = NSAlert.alloc().init()
@@ -6114,64 +5783,34 @@ class KernMarginSlider(object):
 			alert.runModal()
 
 def margin_for_pair(font, masterID, leftName, rightName):
-	"""DEBUG VERSION: Obtiene la distancia entre dos glifos"""
-	print(f"🧪 DEBUG margin_for_pair: {leftName} / {rightName}")
-	
-	gL = font.glyphs[leftName]
-	gR = font.glyphs[rightName]
-	if not gL or not gR:
-		print(f"🧪 DEBUG ERROR: One or both glyphs not found")
-		return None
-
-	print(f"🧪 DEBUG: Getting layers...")
-	layerL = gL.layers[masterID]
-	layerR = gR.layers[masterID]
-
-	try:
-		layerL = layerL.copyDecomposedLayer()
-		print(f"🧪 DEBUG: Decomposed left layer")
-	except:
-		print(f"🧪 DEBUG: Could not decompose left layer")
-
-	try:
-		layerR = layerR.copyDecomposedLayer()
-		print(f"🧪 DEBUG: Decomposed right layer")
-	except:
-		print(f"🧪 DEBUG: Could not decompose right layer")
-
-	dx = layerL.width
-	print(f"🧪 DEBUG: Left width = {dx}")
-	
-	distance = minDistanceBetweenLayers(layerL, layerR, dx)
-	print(f"🧪 DEBUG: Calculated distance = {distance}")
-	
-	return distance
+	"""Distància entre dos glifs a partir dels perfils de tinta en memòria cau"""
+	return profiles.sharedCache.marginForPair(font, masterID, leftName, rightName)
 
 	def isKerningCandidate(self, gL, gR):
-		print(f"🧪 DEBUG isKerningCandidate: {gL.name if gL else 'None'} / {gR.name if gR else 'None'}")
+		tracer.debug("AUTOKERN", "isKerningCandidate: %s / %s", gL.name if gL else 'None', gR.name if gR else 'None')
 	
 		if not gL or not gR:
-			print(f"🧪 DEBUG: One or both glyphs are None")
+			tracer.debug("AUTOKERN", "One or both glyphs are None")
 			return False
 
 		# Nunca espacios
 		if gL.category == "Space" or gR.category == "Space":
-			print(f"🧪 DEBUG: Space glyph")
+			tracer.debug("AUTOKERN", "Space glyph")
 			return False
 
 		# Nunca marks combinantes
 		if gL.category == "Mark" or gR.category == "Mark":
-			print(f"🧪 DEBUG: Mark glyph")
+			tracer.debug("AUTOKERN", "Mark glyph")
 			return False
 
 		# Nunca símbolos
 		if gL.category == "Symbol" or gR.category == "Symbol":
-			print(f"🧪 DEBUG: Symbol glyph")
+			tracer.debug("AUTOKERN", "Symbol glyph")
 			return False
 
 		# Opcional: excluir puntuación
 		if gL.category == "Punctuation" or gR.category == "Punctuation":
-			print(f"🧪 DEBUG: Punctuation glyph")
+			tracer.debug("AUTOKERN", "Punctuation glyph")
 			return False
 
 		# Excluir glifos técnicos
@@ -6182,10 +5821,10 @@ def margin_for_pair(font, masterID, leftName, rightName):
 
 		for b in banned:
 			if b in gL.name or b in gR.name:
-				print(f"🧪 DEBUG: Contains banned substring '{b}'")
+				tracer.debug("AUTOKERN", "Contains banned substring '%s'", b)
 				return False
 
-		print(f"🧪 DEBUG: Is a valid kerning candidate")
+		tracer.debug("AUTOKERN", "Is a valid kerning candidate")
 		return True
 
 
@@ -6520,7 +6159,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 		custom_order = font.userData.get(key, {}).get(group, [])
 	
 		# Get all glyphs in this group
-		glyph_names = [g.name for g in font.glyphs if getattr(g, side + "KerningGroup") == group]
+		glyph_names = fontIndex.indexForFont(font).groupMembers(group, side)
 	
 		# Apply custom order if exists
 		if custom_order:
@@ -6558,6 +6197,9 @@ def margin_for_pair(font, masterID, leftName, rightName):
 			self.kgmShowNoGlyphSelected()
 			return
 	
+		# Refresh button: re-read groups edited outside the scripts
+		if sender is not None:
+			fontIndex.indexForFont(font).invalidate()
 		glyph = font.selectedLayers[0].parent
 		glyph_name = glyph.name
 	
@@ -6680,7 +6322,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 
 	def charToProductionNameTurbo(self, char_or_name):
 		"""TURBO: Fast character to production name conversion"""
-		print(f"🧪 DEBUG charToProductionNameTurbo: input='{char_or_name}' (type: {type(char_or_name)})")
+		tracer.debug("TABS", "charToProductionNameTurbo: input='%s' (type: %s)", char_or_name, type(char_or_name))
 	
 		font = Glyphs.font
 		if not font:
@@ -6689,7 +6331,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 		# TURBO: Cache for production names
 		if char_or_name in self._productionCacheTurbo:
 			result = self._productionCacheTurbo[char_or_name]
-			print(f"🧪 DEBUG: From cache: '{result}'")
+			tracer.debug("TABS", "From cache: '%s'", result)
 			return result
 		
 		result = char_or_name
@@ -6697,7 +6339,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 		# TURBO: Quick font glyph check
 		if char_or_name in font.glyphs:
 			result = char_or_name
-			print(f"🧪 DEBUG: Found in font glyphs: '{result}'")
+			tracer.debug("TABS", "Found in font glyphs: '%s'", result)
 		else:
 			# TURBO: Fast unicode lookup
 			for glyph in font.glyphs:
@@ -6705,7 +6347,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 					try:
 						if chr(int(glyph.unicode, 16)) == char_or_name:
 							result = glyph.name
-							print(f"🧪 DEBUG: Found by unicode '{char_or_name}': '{result}'")
+							tracer.debug("TABS", "Found by unicode '%s': '%s'", char_or_name, result)
 							break
 					except:
 						continue
@@ -6723,12 +6365,12 @@ def margin_for_pair(font, masterID, leftName, rightName):
 			}
 			if char_or_name in char_map:
 				result = char_map[char_or_name]
-				print(f"🧪 DEBUG: Mapped from char_map: '{result}'")
+				tracer.debug("TABS", "Mapped from char_map: '%s'", result)
 
 		# TURBO: Cache result
 		self._productionCacheTurbo[char_or_name] = result
 	
-		print(f"🧪 DEBUG: Returning: '{result}'")
+		tracer.debug("TABS", "Returning: '%s'", result)
 		return result
 
 	def nameToGraphicalRepresentationTurbo(self, name):
@@ -6791,7 +6433,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 
 	def contextualDisplayTurbo(self, L, R, val):
 		"""Genera líneas compactas para tab: /H/H/B/ì/H/H 1064"""
-		print(f"🧪 DEBUG contextualDisplayTurbo: L='{L}', R='{R}', val={val}")
+		tracer.debug("TABS", "contextualDisplayTurbo: L='%s', R='%s', val=%s", L, R, val)
 	
 		if isinstance(L, str): L = L.strip()
 		if isinstance(R, str): R = R.strip()
@@ -6804,7 +6446,7 @@ def margin_for_pair(font, masterID, leftName, rightName):
 		Rprod = str(Rprod).strip()[:8] if Rprod else ""
 	
 		result = f"/H/H/{Lprod}/{Rprod}/H/H {val}"
-		print(f"🧪 DEBUG: Final result='{result}' ({len(result)})")
+		tracer.debug("TABS", "Final result='%s' (%s)", result, len(result))
 		return result
 
 
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Description: Shared geometry and kerning core used by the Kern scripts
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# If you find this script useful, you can show your appreciation by purchasing any font at: https://www.myfonts.com/collections/tipo-pepel-foundry
+# License: Apache2
+__doc__ = """
+Shared core for the Kern scripts.
+
+This package has no GlyphsApp dependency: it only reads layers, paths and
+nodes through their public attributes, so it can also run outside the app.
+NumPy is used when it is available and a pure Python path is used otherwise.
+
+Scripts load it with:
+
+    import os, sys
+    _LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+    if _LIBRARIES not in sys.path:
+        sys.path.insert(0, _LIBRARIES)
+    from kernCore import geometry
+"""
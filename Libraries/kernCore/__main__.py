@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# Description: python -m kernCore entry point (see headless)
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import sys
+
+from kernCore import headless
+
+
+sys.exit(headless.main())
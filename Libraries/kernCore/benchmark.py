@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+# Description: Benchmarks for the kerning hot paths on synthetic fonts
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Kerning geometry benchmarks.
+
+syntheticFont() builds a sourceFont.SourceFont with N glyphs of about M
+nodes each (lines and cubic curves, different vertical zones, some
+composites), K masters, kerning groups and kerning at a given density, so
+every benchmark runs headless and is reproducible from its seed.
+
+Each benchmark times one hot path of the Kern scripts (best of `repeat`
+runs, caches cold unless the name says warm) and then runs it once more
+under tracemalloc for the peak memory:
+
+    distance        geometry.minDistanceBetweenLayers (pack + distance, per pair)
+    distancePacked  geometry.minDistancePacked on already packed layers
+    collisions      Check Collisions: geometry cache + CollisionSweep (broad phase included)
+    margins         margin_for_pair: ProfileCache.marginForPair, cold cache
+    marginsWarm     the same pairs again with every profile cached
+    kerningFilter   "hide existing pairs": KerningResolver build + unkerned()
+    autokern        masters.MasterKerner over every master
+    fontIndex       FontIndex build + every group member list
+
+From the Libraries folder:
+
+    python -m kernCore.benchmark --glyphs 300 --nodes 60 --masters 3 --save baseline.json
+    python -m kernCore.benchmark --glyphs 300 --nodes 60 --masters 3 --compare baseline.json
+
+--compare exits with 1 when a benchmark rate drops more than --tolerance
+below the baseline.
+"""
+
+import argparse
+import gc
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from kernCore import diskCache, fontIndex, geometry, kerning, masters, profiles, segmentIndex, sourceFont, sweep
+
+
+# ======== SYNTHETIC FONT ========
+
+# (base, alçada) de les zones verticals: versaleta/minúscula, majúscula, descendent, accent
+ZONES = ((0, 500), (0, 700), (-220, 500), (520, 180))
+
+
+def syntheticOutline(rng, nodes, x0, y0, width, height):
+    """Closed star-shaped contour of about `nodes` nodes, a third of its segments cubic."""
+    cx = x0 + width / 2.0
+    cy = y0 + height / 2.0
+    onCurve = max(4, nodes // 2)
+    points = []
+    for i in range(onCurve):
+        angle = 2.0 * math.pi * i / onCurve
+        r = rng.uniform(0.75, 1.0)
+        points.append((cx + math.cos(angle) * width / 2.0 * r, cy + math.sin(angle) * height / 2.0 * r))
+    out = []
+    for i, (x, y) in enumerate(points):
+        px, py = points[i - 1]
+        if i % 3 == 0:
+            # Corba cúbica: dos punts off-curve empesos cap enfora
+            for t in (1.0 / 3.0, 2.0 / 3.0):
+                mx = px + (x - px) * t
+                my = py + (y - py) * t
+                out.append(sourceFont.SourceNode(cx + (mx - cx) * 1.08, cy + (my - cy) * 1.08, "offcurve"))
+            out.append(sourceFont.SourceNode(x, y, "curve"))
+        else:
+            out.append(sourceFont.SourceNode(x, y, "line"))
+    return sourceFont.SourcePath(out, True)
+
+
+def syntheticFont(glyphs=200, nodes=40, masterCount=2, kerningDensity=0.02, compositeRatio=0.1, seed=1):
+    rng = random.Random(seed)
+    font = sourceFont.SourceFont()
+    for m in range(masterCount):
+        font.masters.append(sourceFont.SourceMaster("m%d" % m, "Master %d" % m, [100 + 800.0 * m / max(1, masterCount - 1)]))
+
+    groupCount = max(1, glyphs // 5)
+    names = []
+    for i in range(glyphs):
+        name = "g%04d" % i
+        glyph = sourceFont.SourceGlyph(name, ["%04X" % (0xE000 + i)], "Letter",
+                                       "L%d" % rng.randrange(groupCount), "R%d" % rng.randrange(groupCount))
+        base, height = ZONES[rng.randrange(len(ZONES))]
+        inkWidth = rng.uniform(200, 600)
+        lsb, rsb = rng.uniform(-10, 80), rng.uniform(-10, 80)
+        composite = names and rng.random() < compositeRatio
+        baseName = rng.choice(names) if composite else None
+        for m, master in enumerate(font.masters):
+            # Cada màster una mica més gruixut i més estret de marges
+            grow = 1.0 + 0.15 * m
+            path = syntheticOutline(rng, nodes, lsb, base, inkWidth * grow, height)
+            layer = sourceFont.SourceLayer(lsb + inkWidth * grow + rsb - 10 * m, [path])
+            if baseName:
+                layer.components.append(sourceFont.SourceComponent(baseName, (1, 0, 0, 1, rng.uniform(-20, 20), 0)))
+            glyph.setLayer(master.id, layer)
+        font.addGlyph(glyph)
+        names.append(name)
+
+    # Kerning: parells de glifs i de grups a la densitat demanada
+    entries = int(glyphs * glyphs * kerningDensity)
+    for master in font.masters:
+        table = font.kerning.setdefault(master.id, {})
+        for _ in range(entries):
+            if rng.random() < 0.5:
+                left, right = rng.choice(names), rng.choice(names)
+            else:
+                left = kerning.LEFT_PREFIX + "R%d" % rng.randrange(groupCount)
+                right = kerning.RIGHT_PREFIX + "L%d" % rng.randrange(groupCount)
+            table.setdefault(left, {})[right] = rng.randrange(-80, 40)
+    return font
+
+
+def randomPairs(font, count, seed=1):
+    rng = random.Random(seed)
+    names = font.glyphs.keys()
+    return [(rng.choice(names), rng.choice(names)) for _ in range(count)]
+
+
+# ======== BENCHMARKS ========
+
+def _layers(font, pairs, masterID):
+    return [(font.glyphs[l].layers[masterID].copyDecomposedLayer(), font.glyphs[r].layers[masterID].copyDecomposedLayer())
+            for l, r in pairs]
+
+
+def benchDistance(font, pairs, config):
+    mid = font.masters[0].id
+    layerPairs = _layers(font, pairs, mid)
+
+    def run():
+        for a, b in layerPairs:
+            geometry.minDistanceBetweenLayers(a, b, a.width)
+    return run, len(pairs)
+
+
+def benchDistancePacked(font, pairs, config):
+    mid = font.masters[0].id
+    packed = [(geometry.packSegments(a), geometry.packSegments(b), a.width) for a, b in _layers(font, pairs, mid)]
+
+    def run():
+        for a, b, dx in packed:
+            geometry.minDistancePacked(a, b, dx)
+    return run, len(pairs)
+
+
+def benchCollisions(font, pairs, config):
+    mid = font.masters[0].id
+    names = font.glyphs.keys()
+    specified = names[:config["specified"]]
+    rows = [(s, [r for r in names if r != s]) for s in specified]
+    rows += [(l, [s for s in specified if s != l]) for l in names]
+
+    def run():
+        cache = segmentIndex.IndexCache()
+        geometryTable = {}
+        for name in names:
+            entry = cache.geometry(font, name, mid)
+            if entry is not None:
+                geometryTable[name] = entry
+        sweep.CollisionSweep(geometryTable, rows, config["margin"], config["processes"]).run(interval=0.005)
+    return run, sum(len(rights) for _, rights in rows)
+
+
+def benchMargins(font, pairs, config):
+    mid = font.masters[0].id
+
+    def run():
+        cache = profiles.ProfileCache()
+        for l, r in pairs:
+            cache.marginForPair(font, mid, l, r)
+    return run, len(pairs)
+
+
+def benchMarginsWarm(font, pairs, config):
+    mid = font.masters[0].id
+    cache = profiles.ProfileCache()
+    for l, r in pairs:
+        cache.marginForPair(font, mid, l, r)
+
+    def run():
+        for l, r in pairs:
+            cache.marginForPair(font, mid, l, r)
+    return run, len(pairs)
+
+
+def benchKerningFilter(font, pairs, config):
+    mid = font.masters[0].id
+
+    def run():
+        kerning.KerningResolver(font, mid).unkerned(pairs)
+    return run, len(pairs)
+
+
+def benchAutokern(font, pairs, config):
+    def run():
+        kerner = masters.MasterKerner(font, config["margin"], None, masters.MONOTONIC, cache=profiles.ProfileCache())
+        kerner.compute(pairs)
+    return run, len(pairs) * len(font.masters)
+
+
+def benchFontIndex(font, pairs, config):
+    def run():
+        fontIndex.forgetFont(font)
+        index = fontIndex.indexForFont(font)
+        for side in ("left", "right"):
+            for group in index.groups(side):
+                index.groupMembers(group, side)
+    return run, len(font.glyphs)
+
+
+BENCHMARKS = (
+    ("distance", benchDistance),
+    ("distancePacked", benchDistancePacked),
+    ("collisions", benchCollisions),
+    ("margins", benchMargins),
+    ("marginsWarm", benchMarginsWarm),
+    ("kerningFilter", benchKerningFilter),
+    ("autokern", benchAutokern),
+    ("fontIndex", benchFontIndex),
+)
+
+
+def measure(run, items, repeat=3):
+    """{items, seconds (best run), rate (items/s), peakKB} of one benchmark."""
+    best = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "items": items,
+        "seconds": round(best, 6),
+        "rate": round(items / best, 1) if best > 0 else None,
+        "peakKB": round(peak / 1024.0, 1),
+    }
+
+
+def runBenchmarks(config, only=None):
+    """{"config": config, "results": {name: measure(...)}} for every (or only the named) benchmark."""
+    font = syntheticFont(config["glyphs"], config["nodes"], config["masters"], config["density"], seed=config["seed"])
+    pairs = randomPairs(font, config["pairs"], config["seed"])
+    disk = diskCache.sharedCache
+    wasEnabled = disk.enabled
+    disk.enabled = False
+    results = {}
+    try:
+        for name, factory in BENCHMARKS:
+            if only and name not in only:
+                continue
+            run, items = factory(font, pairs, config)
+            results[name] = measure(run, items, config["repeat"])
+    finally:
+        disk.enabled = wasEnabled
+    return {"config": config, "results": results}
+
+
+def compare(report, baseline, tolerance=0.2):
+    """[(name, baseline rate, rate, change)] for benchmarks slower than the baseline by more than tolerance."""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("rate") or not result.get("rate"):
+            continue
+        change = result["rate"] / base["rate"] - 1.0
+        if change < -tolerance:
+            regressions.append((name, base["rate"], result["rate"], change))
+    return regressions
+
+
+# ======== CLI ========
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m kernCore.benchmark", description="Benchmarks for the kerning hot paths.")
+    parser.add_argument("--glyphs", type=int, default=200)
+    parser.add_argument("--nodes", type=int, default=40, help="nodes per glyph")
+    parser.add_argument("--masters", type=int, default=2)
+    parser.add_argument("--density", type=float, default=0.02, help="kerning entries per glyph pair")
+    parser.add_argument("--pairs", type=int, default=2000, help="random pairs for the per-pair benchmarks")
+    parser.add_argument("--specified", type=int, default=10, help="glyphs to check in the collisions benchmark")
+    parser.add_argument("--margin", type=float, default=40.0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", default="", help="comma separated benchmark names")
+    parser.add_argument("--save", default=None, help="write the results as a baseline JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed rate drop against the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    config = dict((k, getattr(args, k)) for k in (
+        "glyphs", "nodes", "masters", "density", "pairs", "specified", "margin", "processes", "repeat", "seed"))
+    only = [n.strip() for n in args.only.split(",") if n.strip()]
+    report = runBenchmarks(config, only)
+
+    print("%-16s %10s %12s %14s %10s" % ("benchmark", "items", "seconds", "items/s", "peak KB"))
+    for name, _ in BENCHMARKS:
+        result = report["results"].get(name)
+        if result:
+            print("%-16s %10d %12.4f %14.1f %10.1f" % (name, result["items"], result["seconds"], result["rate"] or 0, result["peakKB"]))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("Baseline written: %s" % args.save)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("⚠️ Baseline recorded with a different configuration")
+        regressions = compare(report, baseline, args.tolerance)
+        for name, before, after, change in regressions:
+            print("REGRESSION %s: %.1f -> %.1f items/s (%+.0f%%)" % (name, before, after, change * 100))
+        if regressions:
+            return 1
+        print("No regressions against %s" % args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
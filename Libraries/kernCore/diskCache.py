@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# Description: Persistent on-disk cache of flattened geometry and profiles
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Disk-backed geometry cache.
+
+Entries are keyed by a stable hash of a master layer's outline: its nodes,
+its width, the master ID and, recursively, the outlines of its component
+sources in the same master. An unchanged glyph therefore maps to the same
+key across sessions and the next run skips decomposition and flattening.
+
+Every entry is one pickle file in the cache directory. When the directory
+grows over maxBytes, the least recently used files are deleted. Errors never
+reach the caller: a broken or missing cache simply behaves as a miss.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from kernCore import layers
+
+
+# Canviar-lo invalida totes les entrades (format o algorisme nous)
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# Un .tmp més vell que això és d'una escriptura que no va acabar
+STALE_TMP_SECONDS = 3600
+
+
+def defaultDirectory():
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "kernCore")
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ======== CONTENT HASH ========
+
+def _round(value):
+    return "%.3f" % float(value)
+
+
+def _layerDigest(font, layer, masterID, seen, memo):
+    h = hashlib.sha1()
+    h.update(("w%s|" % _round(getattr(layer, "width", 0) or 0)).encode("utf-8"))
+    for path in getattr(layer, "paths", None) or ():
+        h.update(b"P" if path.closed else b"p")
+        for n in path.nodes:
+            h.update(("%s,%s,%s;" % (_round(n.x), _round(n.y), n.type)).encode("utf-8"))
+    for component in getattr(layer, "components", None) or ():
+        name = component.componentName
+        transform = getattr(component, "transform", None)
+        values = tuple(transform) if transform is not None else ()
+        h.update(("C%s|%s|" % (name, ",".join(_round(v) for v in values))).encode("utf-8"))
+        smart = getattr(component, "smartComponentValues", None)
+        if smart:
+            try:
+                h.update(repr(sorted((str(k), float(v)) for k, v in dict(smart).items())).encode("utf-8"))
+            except Exception:
+                pass
+        h.update(_glyphDigest(font, name, masterID, seen, memo).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _glyphDigest(font, glyphName, masterID, seen, memo):
+    if glyphName in memo:
+        return memo[glyphName]
+    if glyphName in seen:
+        return "cycle"
+    seen.add(glyphName)
+    glyph, layer = layers.masterLayer(font, glyphName, masterID)
+    digest = "missing" if layer is None else _layerDigest(font, layer, masterID, seen, memo)
+    seen.discard(glyphName)
+    memo[glyphName] = digest
+    return digest
+
+
+def layerContentHash(font, glyphName, masterID):
+    """Stable hash of a master layer, its components' sources and the master ID."""
+    digest = _glyphDigest(font, glyphName, masterID, set(), {})
+    return hashlib.sha1(("%s|%s|%s" % (FORMAT_VERSION, masterID, digest)).encode("utf-8")).hexdigest()
+
+
+# ======== STORE ========
+
+class GeometryDiskCache(object):
+    """Pickle files named by key, evicted least recently used beyond maxBytes."""
+
+    def __init__(self, directory=None, maxBytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or defaultDirectory()
+        self.maxBytes = maxBytes
+        self.enabled = True
+        self._hashes = {}
+        self._writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def contentKey(self, font, glyphName, masterID):
+        """layerContentHash memoized by the dependency token for this session."""
+        glyph, layer = layers.masterLayer(font, glyphName, masterID)
+        if layer is None:
+            return None
+        memoKey = (glyphName, masterID)
+        token = layers.dependencyToken(font, glyphName, masterID)
+        cached = self._hashes.get(memoKey)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        key = layerContentHash(font, glyphName, masterID)
+        self._hashes[memoKey] = (token, key)
+        return key
+
+    def get(self, key, kind):
+        if not self.enabled or not key:
+            return None
+        path = self._path("%s-%s" % (key, kind))
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path, None)
+            return value
+        except Exception:
+            return None
+
+    def put(self, key, kind, value):
+        if not self.enabled or not key:
+            return
+        path = self._path("%s-%s" % (key, kind))
+        try:
+            folder = os.path.dirname(path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        except Exception:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except Exception:
+            _discard(tmp)
+            return
+        self._writes += 1
+        if self._writes % 200 == 0:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in maxBytes."""
+        entries = []
+        total = 0
+        try:
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    # Fitxers temporals d'una escriptura interrompuda (p. ex. Glyphs tancat a mitges)
+                    if name.endswith(".tmp") and time.time() - st.st_mtime > STALE_TMP_SECONDS:
+                        _discard(path)
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+        except Exception:
+            return
+        if total <= self.maxBytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.maxBytes:
+                break
+
+    def clear(self):
+        self._hashes.clear()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
+
+# Compartit per tots els scripts (es desactiva amb sharedCache.enabled = False)
+sharedCache = GeometryDiskCache()
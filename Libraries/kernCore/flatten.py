@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# Description: Adaptive Bézier flattening with cached polylines
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Curve-aware flattening for the geometry engines.
+
+Paths are split into their real segments (lines, cubic curves and TrueType
+quadratic splines) and every curve is subdivided adaptively until the
+control points lie within TOLERANCE units of the chord. The result is a
+Polyline per path: its points, whether it is closed, and for every polyline
+segment whether it comes from a curve.
+
+PolylineCache keeps the flattened decomposed outline per (glyph, master)
+and only flattens again when the glyph or a component source changes.
+Misses are looked up in the on-disk cache (diskCache) first, so an unchanged
+glyph is never decomposed again across sessions.
+"""
+
+import math
+from collections import namedtuple
+
+from kernCore import diskCache, layers
+
+
+TOLERANCE = 0.5
+MAX_DEPTH = 16
+
+LINE = "line"
+CURVE = "curve"
+QCURVE = "qcurve"
+OFFCURVE = "offcurve"
+
+Polyline = namedtuple("Polyline", ["points", "closed", "curved"])
+
+
+# ======== SEGMENTS ========
+
+def pathSegments(path):
+    """
+    (kind, controlPoints) for every segment of a path, where controlPoints
+    include the start and end points. kind is LINE, CURVE or QCURVE.
+    """
+    nodes = [(n.x, n.y, n.type) for n in path.nodes]
+    if not nodes:
+        return []
+    closed = bool(path.closed)
+
+    if closed:
+        start = next((i for i, n in enumerate(nodes) if n[2] != OFFCURVE), None)
+        if start is None:
+            # Contorn TrueType sense cap punt on-curve: es tracta com a polígon
+            pts = [(n[0], n[1]) for n in nodes]
+            return [(LINE, [pts[i], pts[(i + 1) % len(pts)]]) for i in range(len(pts))]
+        ordered = nodes[start + 1:] + nodes[:start + 1]
+        current = nodes[start]
+    else:
+        ordered = nodes[1:]
+        current = nodes[0]
+
+    segments = []
+    offcurves = []
+    previous = (current[0], current[1])
+    for x, y, kind in ordered:
+        if kind == OFFCURVE:
+            offcurves.append((x, y))
+            continue
+        point = (x, y)
+        if not offcurves:
+            segments.append((LINE, [previous, point]))
+        elif kind == CURVE and len(offcurves) == 2:
+            segments.append((CURVE, [previous] + offcurves + [point]))
+        else:
+            segments.append((QCURVE, [previous] + offcurves + [point]))
+        offcurves = []
+        previous = point
+    return segments
+
+
+# ======== FLATTENING ========
+
+def flattenCubic(p0, p1, p2, p3, tolerance=TOLERANCE, out=None):
+    """Append the adaptive polyline of a cubic (without p0) to out."""
+    if out is None:
+        out = []
+    tolSq = tolerance * tolerance
+    stack = [(p0, p1, p2, p3, 0)]
+    while stack:
+        a, b, c, d, depth = stack.pop()
+        if depth >= MAX_DEPTH or _cubicIsFlat(a, b, c, d, tolSq):
+            out.append(d)
+            continue
+        # de Casteljau a t = 0.5
+        ab = ((a[0] + b[0]) * 0.5, (a[1] + b[1]) * 0.5)
+        bc = ((b[0] + c[0]) * 0.5, (b[1] + c[1]) * 0.5)
+        cd = ((c[0] + d[0]) * 0.5, (c[1] + d[1]) * 0.5)
+        abc = ((ab[0] + bc[0]) * 0.5, (ab[1] + bc[1]) * 0.5)
+        bcd = ((bc[0] + cd[0]) * 0.5, (bc[1] + cd[1]) * 0.5)
+        mid = ((abc[0] + bcd[0]) * 0.5, (abc[1] + bcd[1]) * 0.5)
+        # La segona meitat primer a la pila perquè la primera surti abans
+        stack.append((mid, bcd, cd, d, depth + 1))
+        stack.append((a, ab, abc, mid, depth + 1))
+    return out
+
+
+def _cubicIsFlat(a, b, c, d, tolSq):
+    ux = d[0] - a[0]
+    uy = d[1] - a[1]
+    lengthSq = ux * ux + uy * uy
+    if lengthSq == 0:
+        e1 = (b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2
+        e2 = (c[0] - a[0]) ** 2 + (c[1] - a[1]) ** 2
+        return max(e1, e2) <= tolSq
+    c1 = ux * (b[1] - a[1]) - uy * (b[0] - a[0])
+    c2 = ux * (c[1] - a[1]) - uy * (c[0] - a[0])
+    return max(c1 * c1, c2 * c2) <= tolSq * lengthSq
+
+
+def flattenQuadSpline(points, tolerance=TOLERANCE, out=None):
+    """Append the polyline of a TrueType quadratic spline (implied on-curves)."""
+    if out is None:
+        out = []
+    start = points[0]
+    offs = points[1:-1]
+    end = points[-1]
+    for i, q in enumerate(offs):
+        if i + 1 < len(offs):
+            nxt = offs[i + 1]
+            stop = ((q[0] + nxt[0]) * 0.5, (q[1] + nxt[1]) * 0.5)
+        else:
+            stop = end
+        c1 = (start[0] + 2.0 / 3.0 * (q[0] - start[0]), start[1] + 2.0 / 3.0 * (q[1] - start[1]))
+        c2 = (stop[0] + 2.0 / 3.0 * (q[0] - stop[0]), stop[1] + 2.0 / 3.0 * (q[1] - stop[1]))
+        flattenCubic(start, c1, c2, stop, tolerance, out)
+        start = stop
+    return out
+
+
+def flattenSegment(kind, controlPoints, tolerance=TOLERANCE):
+    """Polyline points of one segment, including its start point."""
+    out = [controlPoints[0]]
+    if kind == CURVE:
+        flattenCubic(controlPoints[0], controlPoints[1], controlPoints[2], controlPoints[3], tolerance, out)
+    elif kind == QCURVE:
+        flattenQuadSpline(controlPoints, tolerance, out)
+    else:
+        out.append(controlPoints[-1])
+    return out
+
+
+def flattenPath(path, tolerance=TOLERANCE):
+    """Polyline of one path. For closed paths the start point is not repeated."""
+    segments = pathSegments(path)
+    if not segments:
+        return None
+    points = [segments[0][1][0]]
+    curved = []
+    for kind, controlPoints in segments:
+        pts = flattenSegment(kind, controlPoints, tolerance)
+        points.extend(pts[1:])
+        curved.extend([kind != LINE] * (len(pts) - 1))
+    closed = bool(path.closed)
+    if closed and len(points) > 1 and points[-1] == points[0]:
+        points.pop()
+    elif closed:
+        # El segment de tancament implícit és una recta
+        curved.append(False)
+    return Polyline(points, closed, curved)
+
+
+def flattenLayer(layer, tolerance=TOLERANCE):
+    """List of Polylines for every path of a (decomposed) layer."""
+    result = []
+    for path in getattr(layer, "paths", None) or ():
+        polyline = flattenPath(path, tolerance)
+        if polyline is not None and polyline.points:
+            result.append(polyline)
+    return result
+
+
+# ======== ARC LENGTH ========
+
+def polylineLengths(points, closed):
+    """Cumulative arc length at every point (plus the closing point if closed)."""
+    lengths = [0.0]
+    total = 0.0
+    count = len(points)
+    last = count if closed else count - 1
+    for i in range(last):
+        a = points[i]
+        b = points[(i + 1) % count]
+        total += math.hypot(b[0] - a[0], b[1] - a[1])
+        lengths.append(total)
+    return lengths
+
+
+def pointsAtDistances(points, closed, distances):
+    """Points at increasing arc-length distances along a polyline, in one pass."""
+    lengths = polylineLengths(points, closed)
+    count = len(points)
+    if len(lengths) < 2:
+        return [points[0] for _ in distances] if points else []
+    result = []
+    i = 0
+    for target in distances:
+        while i + 1 < len(lengths) - 1 and lengths[i + 1] < target:
+            i += 1
+        a = points[i % count]
+        b = points[(i + 1) % count]
+        span = lengths[i + 1] - lengths[i]
+        t = (target - lengths[i]) / span if span > 0 else 0.0
+        t = min(max(t, 0.0), 1.0)
+        result.append((a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])))
+    return result
+
+
+# ======== CACHE ========
+
+class PolylineCache(object):
+    """Flattened decomposed outline per (glyph, master), rebuilt only when the glyph or a component source changes."""
+
+    def __init__(self, tolerance=TOLERANCE):
+        self.tolerance = tolerance
+        self._polylines = {}
+
+    def polylines(self, font, glyphName, masterID):
+        """(polylines, width) of the decomposed master layer, or None."""
+        glyph, layer = layers.masterLayer(font, glyphName, masterID)
+        if layer is None:
+            return None
+        key = (glyphName, masterID)
+        token = layers.dependencyToken(font, glyphName, masterID)
+        cached = self._polylines.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        disk = diskCache.sharedCache
+        contentKey = disk.contentKey(font, glyphName, masterID)
+        kind = "polylines-%s" % self.tolerance
+        entry = disk.get(contentKey, kind)
+        if entry is None:
+            source = layers.decomposed(layer)
+            entry = (flattenLayer(source, self.tolerance), source.width)
+            disk.put(contentKey, kind, entry)
+        self._polylines[key] = (token, entry)
+        return entry
+
+    def invalidate(self, glyphName=None):
+        if glyphName is None:
+            self._polylines.clear()
+            return
+        for key in [k for k in self._polylines if k[0] == glyphName]:
+            del self._polylines[key]
+
+
+# Compartit per tots els scripts durant la sessió de Glyphs
+sharedCache = PolylineCache()
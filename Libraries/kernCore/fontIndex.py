@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+# Description: Per-font lookup tables for glyph IDs, names, unicodes and groups
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Font index service.
+
+FontIndex walks font.glyphs once and keeps dictionaries for glyph ID -> glyph,
+name -> glyph, unicode -> glyph, plus both directions of the kerning group
+membership (group -> member names, glyph -> its left and right groups), so
+resolving a kerning key or listing a group is a dict lookup instead of a
+loop over every glyph.
+
+Group names are compared without the @MMK_L_/@MMK_R_ prefix and without a
+leading "@", so "a", "@a" and "@MMK_R_a" are the same group.
+
+indexForFont(font) returns the shared index of a font. It stays current:
+it rebuilds itself when the number of glyphs changes, a missed name or ID
+is resolved through the font and added, and a stale hit (renamed glyph,
+changed unicode) is re-indexed. Edits made anywhere else (the Glyphs UI,
+another script) are picked up by a sweep that compares every glyph's
+record (name, unicodes, kerning groups) with the indexed one and
+re-indexes only the glyphs that differ. Group and unicode lookups sweep
+when the last sweep is older than SWEEP_SECONDS; a group or unicode that
+is not found is remembered as absent until the next sweep, so lookups
+inside pair loops never rescan the font. Scripts that change a glyph can
+still call glyphChanged(glyph) (or invalidate() after bulk edits); group
+assignments made through setKerningGroup(glyph, side, group) update the
+index in place.
+"""
+
+import time
+
+from kernCore.fontMap import FontMap
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX
+
+
+# Antiguitat màxima de l'índex per a les consultes de grups i unicodes
+SWEEP_SECONDS = 1.0
+
+
+def _unicodeKey(code):
+    """'0041', 'U+0041', 0x41 or 'A' -> '0041'."""
+    if code is None:
+        return None
+    if isinstance(code, int):
+        return "%04X" % code
+    code = str(code)
+    if len(code) == 1:
+        return "%04X" % ord(code)
+    if code[:2].upper() == "U+":
+        code = code[2:]
+    try:
+        return "%04X" % int(code, 16)
+    except ValueError:
+        return None
+
+
+def _glyphUnicodes(glyph):
+    codes = getattr(glyph, "unicodes", None) or [getattr(glyph, "unicode", None)]
+    return tuple(k for k in (_unicodeKey(c) for c in codes if c) if k)
+
+
+def _glyphRecord(glyph):
+    """(name, unicodes, left group, right group) as indexed."""
+    return (glyph.name, _glyphUnicodes(glyph), _groupKey(glyph.leftKerningGroup), _groupKey(glyph.rightKerningGroup))
+
+
+def groupName(group):
+    """Group name without the @MMK_L_/@MMK_R_ prefix."""
+    if group and (group.startswith(LEFT_PREFIX) or group.startswith(RIGHT_PREFIX)):
+        return group[len(LEFT_PREFIX):]
+    return group
+
+
+def _groupKey(group):
+    return groupName(group).lstrip("@") if group else None
+
+
+def sideForKey(key):
+    """
+    Glyph attribute side whose groups a kerning key refers to: "@MMK_L_x"
+    (left position of a pair) is the rightKerningGroup x, and vice versa.
+    """
+    if key.startswith(LEFT_PREFIX):
+        return "right"
+    if key.startswith(RIGHT_PREFIX):
+        return "left"
+    return None
+
+
+class FontIndex(object):
+    """ID, name, unicode and kerning-group lookups for one font."""
+
+    def __init__(self, font):
+        self.font = font
+        self.rebuild()
+
+    def rebuild(self):
+        self._byID = {}
+        self._byName = {}
+        self._byUnicode = {}
+        # grup -> {noms}; "left" = leftKerningGroup, "right" = rightKerningGroup
+        self._members = {"left": {}, "right": {}}
+        # id del glif -> (nom, unicodes, grup esquerre, grup dret) indexats
+        self._records = {}
+        # nom -> posició a la font (per triar el representant d'un grup)
+        self._order = {}
+        # ("left"/"right"/"unicode", clau) sense cap glif des de l'última passada
+        self._absent = set()
+        glyphs = self.font.glyphs
+        for glyph in glyphs:
+            self._add(glyph)
+        self._count = len(glyphs)
+        self._swept = time.time()
+
+    def invalidate(self):
+        self._count = -1
+
+    def _fresh(self):
+        if len(self.font.glyphs) != self._count:
+            self.rebuild()
+            return True
+        return False
+
+    def sweep(self):
+        """Re-index the glyphs whose name, unicodes or kerning groups changed since they were indexed."""
+        if self._fresh():
+            return
+        records = self._records
+        seen = set()
+        for glyph in self.font.glyphs:
+            key = self._glyphKey(glyph)
+            seen.add(key)
+            if records.get(key) != _glyphRecord(glyph):
+                self.glyphChanged(glyph)
+        for key in [k for k in records if k not in seen]:
+            self._remove(key)
+        self._absent.clear()
+        self._swept = time.time()
+
+    def _current(self, maxAge=SWEEP_SECONDS):
+        """Sweep if the last sweep is older than maxAge (group and unicode lookups)."""
+        if self._fresh():
+            return
+        if time.time() - self._swept >= maxAge:
+            self.sweep()
+
+    # ======== MAINTENANCE ========
+
+    def _glyphKey(self, glyph):
+        return str(getattr(glyph, "id", None) or glyph.name).upper()
+
+    def _add(self, glyph):
+        key = self._glyphKey(glyph)
+        record = _glyphRecord(glyph)
+        unicodes = record[1]
+        self._records[key] = record
+        self._byID[key] = glyph
+        self._byName[glyph.name] = glyph
+        self._order.setdefault(glyph.name, len(self._order))
+        absent = self._absent
+        for u in unicodes:
+            self._byUnicode[u] = glyph
+            absent.discard(("unicode", u))
+        if record[2]:
+            self._members["left"].setdefault(record[2], set()).add(glyph.name)
+            absent.discard(("left", record[2]))
+        if record[3]:
+            self._members["right"].setdefault(record[3], set()).add(glyph.name)
+            absent.discard(("right", record[3]))
+
+    def _remove(self, key):
+        record = self._records.pop(key, None)
+        if record is None:
+            return
+        name, unicodes, leftGroup, rightGroup = record
+        glyph = self._byID.pop(key, None)
+        if self._byName.get(name) is glyph:
+            del self._byName[name]
+        for u in unicodes:
+            if self._byUnicode.get(u) is glyph:
+                del self._byUnicode[u]
+        for side, group in (("left", leftGroup), ("right", rightGroup)):
+            if group:
+                members = self._members[side].get(group)
+                if members is not None:
+                    members.discard(name)
+                    if not members:
+                        del self._members[side][group]
+
+    def glyphChanged(self, glyph):
+        """Re-index one glyph after its name, unicodes or kerning groups changed."""
+        key = self._glyphKey(glyph)
+        self._remove(key)
+        self._add(glyph)
+
+    def glyphRemoved(self, glyph):
+        self._remove(self._glyphKey(glyph))
+        self._order.pop(glyph.name, None)
+        self._count -= 1
+
+    def setKerningGroup(self, glyph, side, group):
+        """Assign glyph.leftKerningGroup (side "left") or rightKerningGroup and re-index it."""
+        setattr(glyph, side + "KerningGroup", group)
+        self.glyphChanged(glyph)
+
+    # ======== LOOKUPS ========
+
+    def glyphForID(self, glyphID):
+        if not glyphID:
+            return None
+        self._fresh()
+        key = str(glyphID).upper()
+        glyph = self._byID.get(key)
+        if glyph is None:
+            finder = getattr(self.font, "glyphForId_", None)
+            glyph = finder(glyphID) if finder else None
+            if glyph is not None:
+                self.glyphChanged(glyph)
+        return glyph
+
+    def nameForID(self, key):
+        """Glyph name for a kerning key: group keys are returned as they are, unknown IDs as None."""
+        if not key:
+            return None
+        key = str(key)
+        if key.startswith("@"):
+            return key
+        glyph = self.glyphForID(key)
+        return glyph.name if glyph is not None else None
+
+    def glyph(self, name):
+        if not name:
+            return None
+        self._fresh()
+        glyph = self._byName.get(name)
+        if glyph is not None and glyph.name == name:
+            return glyph
+        if glyph is not None:
+            self.glyphChanged(glyph)
+        glyph = self.font.glyphs[name]
+        if glyph is not None and glyph.name == name:
+            self.glyphChanged(glyph)
+            return glyph
+        return None
+
+    def glyphForKey(self, key):
+        """Glyph for a glyph ID or name (not for group keys)."""
+        if not key or str(key).startswith("@"):
+            return None
+        return self.glyphForID(key) or self.glyph(key)
+
+    def glyphForUnicode(self, code):
+        key = _unicodeKey(code)
+        if key is None:
+            return None
+        self._current()
+        if ("unicode", key) in self._absent:
+            return None
+        glyph = self._byUnicode.get(key)
+        if glyph is not None:
+            if key in _glyphUnicodes(glyph):
+                return glyph
+            self.glyphChanged(glyph)
+            glyph = self._byUnicode.get(key)
+        if glyph is None:
+            self._absent.add(("unicode", key))
+        return glyph
+
+    def _checkedMembers(self, key, side):
+        """
+        Indexed members of a group, each checked against the glyph's current
+        group on that side: a glyph moved to another group is re-indexed and
+        left out.
+        """
+        members = self._members[side].get(key)
+        if not members:
+            self._absent.add((side, key))
+            return set()
+        attribute = side + "KerningGroup"
+        for name in list(members):
+            glyph = self._byName.get(name)
+            if glyph is None:
+                members.discard(name)
+            elif glyph.name != name or _groupKey(getattr(glyph, attribute)) != key:
+                self.glyphChanged(glyph)
+        members = self._members[side].get(key)
+        if members is not None and not members:
+            del self._members[side][key]
+        if not members:
+            self._absent.add((side, key))
+        return set(members or ())
+
+    def groupMembers(self, group, side, subgroups=False):
+        """
+        Names of the glyphs whose leftKerningGroup (side "left") or
+        rightKerningGroup (side "right") is group (with or without prefix).
+        With subgroups, members of "group.*" (e.g. h.sc.alt for h.sc) too.
+        """
+        self._current()
+        key = _groupKey(group)
+        if not key:
+            return []
+        members = self._checkedMembers(key, side)
+        if subgroups:
+            prefix = key + "."
+            for other in [g for g in self._members[side] if g.startswith(prefix)]:
+                members.update(self._checkedMembers(other, side))
+        return sorted(members)
+
+    def keyMembers(self, key):
+        """Members of the group a kerning key ("@MMK_L_x" / "@MMK_R_x") refers to."""
+        side = sideForKey(key)
+        return self.groupMembers(key, side) if side else []
+
+    def kerningGroups(self, name):
+        """(leftKerningGroup, rightKerningGroup) of a glyph, without prefixes."""
+        glyph = self.glyph(name)
+        if glyph is None:
+            return None, None
+        record = _glyphRecord(glyph)
+        if self._records.get(self._glyphKey(glyph)) != record:
+            self.glyphChanged(glyph)
+        return record[2], record[3]
+
+    def _representative(self, key, side):
+        members = self._checkedMembers(key, side)
+        if not members:
+            return None
+        if key in members:
+            return key
+        order = self._order
+        return min(members, key=lambda name: order.get(name, len(order)))
+
+    def representative(self, group, side):
+        """
+        One glyph name standing for the group: the member named like the
+        group if there is one, otherwise the first member in font order.
+        """
+        return self.representatives([group], side).get(group)
+
+    def representatives(self, groups, side):
+        """{group: representative name} for many groups at once (groups without members are left out)."""
+        self._current()
+        out = {}
+        for group in groups:
+            name = self._representative(_groupKey(group), side) if group else None
+            if name is not None:
+                out[group] = name
+        return out
+
+    def groups(self, side):
+        self._current()
+        return sorted(self._members[side])
+
+
+_indexes = FontMap()
+
+
+def indexForFont(font):
+    """Shared FontIndex of a font, built on first use."""
+    entry = _indexes.get(font)
+    if entry is None:
+        entry = _indexes[font] = FontIndex(font)
+    return entry
+
+
+def forgetFont(font):
+    """Drop the index of a closed font."""
+    _indexes.pop(font, None)
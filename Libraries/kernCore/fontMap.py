@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# Description: Per-font tables that do not keep closed fonts alive for the whole session
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Per-font storage for the shared kernCore tables (font indexes, pair tables,
+kerning versions).
+
+A plain dict keyed by font keeps every font of the Glyphs session, and all
+its glyph records, alive after the document is closed. Weak keys do not
+help: GSFont objects are PyObjC proxies, which cannot be weakly referenced,
+and the stored tables refer back to their font and its glyphs anyway.
+
+FontMap keeps its fonts in least-recently-used order and only the last
+MAX_FONTS fonts used, so a closed font is released once other fonts have
+been used after it; fontIndex.forgetFont() and sharedWatch.forgetFont() drop
+one at once.
+"""
+
+import collections
+
+
+MAX_FONTS = 4
+
+
+class FontMap(object):
+    """font -> value for the maxFonts fonts used last."""
+
+    def __init__(self, maxFonts=MAX_FONTS):
+        self.maxFonts = maxFonts
+        # el font usat més recentment al final
+        self._entries = collections.OrderedDict()
+
+    def get(self, font, default=None):
+        entries = self._entries
+        if font not in entries:
+            return default
+        entries.move_to_end(font)
+        return entries[font]
+
+    def __getitem__(self, font):
+        if font not in self._entries:
+            raise KeyError(font)
+        return self.get(font)
+
+    def __setitem__(self, font, value):
+        entries = self._entries
+        entries[font] = value
+        entries.move_to_end(font)
+        while len(entries) > self.maxFonts:
+            entries.popitem(last=False)
+
+    def __contains__(self, font):
+        return font in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def pop(self, font, default=None):
+        return self._entries.pop(font, default)
+
+    def clear(self):
+        self._entries.clear()
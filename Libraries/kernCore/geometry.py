@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+# Description: Packed outline segments and batched segment-distance kernel
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Segment-distance kernel shared by the kerning engines.
+
+A layer's outline is packed once into contiguous coordinate arrays
+(SegmentArray). Distances between two packed layers are then computed in
+batched NumPy operations, chunk by chunk, so the search can stop as soon as
+a distance below the margin is found. Without NumPy the same search runs in
+plain Python with a per-segment bounding box prefilter.
+"""
+
+import math
+from array import array
+
+from kernCore import flatten
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DEFAULT_LIMIT = 10000
+
+# Maxim nombre de parelles de segments per bloc vectoritzat
+CHUNK_PAIRS = 65536
+
+
+# ======== PACKING ========
+
+class SegmentArray(object):
+    """All segments of one layer as flat x1/y1/x2/y2 arrays plus their bounds."""
+
+    __slots__ = ("x1", "y1", "x2", "y2", "bounds", "width")
+
+    def __init__(self, x1, y1, x2, y2, width=0.0):
+        if np is not None:
+            self.x1 = np.asarray(x1, dtype=np.float64)
+            self.y1 = np.asarray(y1, dtype=np.float64)
+            self.x2 = np.asarray(x2, dtype=np.float64)
+            self.y2 = np.asarray(y2, dtype=np.float64)
+        else:
+            self.x1 = array("d", x1)
+            self.y1 = array("d", y1)
+            self.x2 = array("d", x2)
+            self.y2 = array("d", y2)
+        self.width = float(width or 0.0)
+        self.bounds = _bounds(self.x1, self.y1, self.x2, self.y2)
+
+    def __len__(self):
+        return len(self.x1)
+
+    def __getstate__(self):
+        return (list(self.x1), list(self.y1), list(self.x2), list(self.y2), self.width)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def segments(self):
+        """Iterate ((x1, y1), (x2, y2)) tuples."""
+        for i in range(len(self.x1)):
+            yield (self.x1[i], self.y1[i]), (self.x2[i], self.y2[i])
+
+
+def _bounds(x1, y1, x2, y2):
+    if not len(x1):
+        return None
+    if np is not None:
+        return (
+            float(min(x1.min(), x2.min())), float(min(y1.min(), y2.min())),
+            float(max(x1.max(), x2.max())), float(max(y1.max(), y2.max())),
+        )
+    return (min(min(x1), min(x2)), min(min(y1), min(y2)),
+            max(max(x1), max(x2)), max(max(y1), max(y2)))
+
+
+def packPolygons(polygons, width=0.0):
+    """Pack an iterable of (points, closed, ...) polylines into a SegmentArray."""
+    x1, y1, x2, y2 = [], [], [], []
+    for polygon in polygons:
+        pts = polygon[0]
+        count = len(pts)
+        last = count if polygon[1] else count - 1
+        for i in range(last):
+            a = pts[i]
+            b = pts[(i + 1) % count]
+            x1.append(a[0]); y1.append(a[1])
+            x2.append(b[0]); y2.append(b[1])
+    return SegmentArray(x1, y1, x2, y2, width)
+
+
+def packSegments(layer):
+    """
+    Pack a (decomposed) layer into a SegmentArray. Curves are flattened
+    (flatten.flattenLayer), so distances are measured to the real outline and
+    not to the control polygon. A (polylines, width) tuple from
+    flatten.PolylineCache is accepted as well.
+    """
+    if isinstance(layer, SegmentArray):
+        return layer
+    if isinstance(layer, tuple):
+        return packPolygons(layer[0], layer[1])
+    return packPolygons(flatten.flattenLayer(layer), getattr(layer, "width", 0.0))
+
+
+# ======== DISTANCE KERNEL ========
+
+def minDistancePacked(segsA, segsB, dx=0.0, limit=DEFAULT_LIMIT, stopBelow=None):
+    """
+    Minimum distance between the segments of A and the segments of B shifted
+    by dx. Returns `limit` when either side is empty or nothing is closer.
+    With stopBelow, returns as soon as a distance below it is found.
+    """
+    if not len(segsA) or not len(segsB):
+        return limit
+    if np is not None:
+        return _minDistanceNumpy(segsA, segsB, dx, limit, stopBelow)
+    return _minDistancePython(segsA, segsB, dx, limit, stopBelow)
+
+
+def packedAreClose(segsA, segsB, dx, margin):
+    """True if any segment of A is closer than margin to B shifted by dx."""
+    return minDistancePacked(segsA, segsB, dx, DEFAULT_LIMIT, stopBelow=margin) < margin
+
+
+def minDistanceBetweenLayers(layer1, layer2, dx, limit=DEFAULT_LIMIT):
+    """Drop-in replacement for the old per-script helper."""
+    return minDistancePacked(packSegments(layer1), packSegments(layer2), dx, limit)
+
+
+def layersAreClose(layer1, layer2, dx, margin):
+    return packedAreClose(packSegments(layer1), packSegments(layer2), dx, margin)
+
+
+def _minDistanceNumpy(segsA, segsB, dx, limit, stopBelow):
+    ax1 = segsA.x1[:, None]; ay1 = segsA.y1[:, None]
+    ax2 = segsA.x2[:, None]; ay2 = segsA.y2[:, None]
+    bx1 = (segsB.x1 + dx)[None, :]; by1 = segsB.y1[None, :]
+    bx2 = (segsB.x2 + dx)[None, :]; by2 = segsB.y2[None, :]
+
+    rows = max(1, CHUNK_PAIRS // len(segsB))
+    stopSq = stopBelow * stopBelow if stopBelow is not None else None
+    best = float(limit) * float(limit)
+
+    for start in range(0, len(segsA), rows):
+        end = start + rows
+        d = _segmentDistanceSqNumpy(
+            ax1[start:end], ay1[start:end], ax2[start:end], ay2[start:end],
+            bx1, by1, bx2, by2,
+        )
+        chunkMin = float(d.min())
+        if chunkMin < best:
+            best = chunkMin
+        if best <= 0.0:
+            return 0.0
+        if stopSq is not None and best < stopSq:
+            break
+
+    return math.sqrt(best)
+
+
+def minDistanceSubset(segsA, indicesA, segsB, indicesB, dx=0.0, limit=DEFAULT_LIMIT):
+    """Minimum distance between selected segments of A and of B shifted by dx."""
+    if np is not None:
+        ia = np.asarray(indicesA, dtype=np.intp)
+        ib = np.asarray(indicesB, dtype=np.intp)
+        d = _segmentDistanceSqNumpy(
+            segsA.x1[ia][:, None], segsA.y1[ia][:, None],
+            segsA.x2[ia][:, None], segsA.y2[ia][:, None],
+            (segsB.x1[ib] + dx)[None, :], segsB.y1[ib][None, :],
+            (segsB.x2[ib] + dx)[None, :], segsB.y2[ib][None, :],
+        )
+        return min(float(limit), math.sqrt(float(d.min())))
+    bestSq = float(limit) * float(limit)
+    bx = segsB.x1; by = segsB.y1; bx2 = segsB.x2; by2 = segsB.y2
+    for i in indicesA:
+        ax1 = segsA.x1[i]; ay1 = segsA.y1[i]; ax2 = segsA.x2[i]; ay2 = segsA.y2[i]
+        for j in indicesB:
+            d = segmentDistanceSq(ax1, ay1, ax2, ay2, bx[j] + dx, by[j], bx2[j] + dx, by2[j])
+            if d < bestSq:
+                bestSq = d
+    return math.sqrt(bestSq)
+
+
+def _pointSegmentDistanceSqNumpy(px, py, x1, y1, x2, y2):
+    vx = x2 - x1
+    vy = y2 - y1
+    denom = vx * vx + vy * vy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = ((px - x1) * vx + (py - y1) * vy) / denom
+    t = np.where(denom == 0, 0.0, np.clip(t, 0.0, 1.0))
+    ex = px - (x1 + t * vx)
+    ey = py - (y1 + t * vy)
+    return ex * ex + ey * ey
+
+
+def _segmentDistanceSqNumpy(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
+    d = _pointSegmentDistanceSqNumpy(ax1, ay1, bx1, by1, bx2, by2)
+    d = np.minimum(d, _pointSegmentDistanceSqNumpy(ax2, ay2, bx1, by1, bx2, by2))
+    d = np.minimum(d, _pointSegmentDistanceSqNumpy(bx1, by1, ax1, ay1, ax2, ay2))
+    d = np.minimum(d, _pointSegmentDistanceSqNumpy(bx2, by2, ax1, ay1, ax2, ay2))
+
+    # Segments que es creuen: distància zero
+    rx = ax2 - ax1; ry = ay2 - ay1
+    sx = bx2 - bx1; sy = by2 - by1
+    o1 = rx * (by1 - ay1) - ry * (bx1 - ax1)
+    o2 = rx * (by2 - ay1) - ry * (bx2 - ax1)
+    o3 = sx * (ay1 - by1) - sy * (ax1 - bx1)
+    o4 = sx * (ay2 - by1) - sy * (ax2 - bx1)
+    crossing = (o1 * o2 < 0) & (o3 * o4 < 0)
+    return np.where(crossing, 0.0, d)
+
+
+def _pointSegmentDistanceSq(px, py, x1, y1, x2, y2):
+    vx = x2 - x1
+    vy = y2 - y1
+    denom = vx * vx + vy * vy
+    if denom == 0:
+        ex = px - x1
+        ey = py - y1
+        return ex * ex + ey * ey
+    t = ((px - x1) * vx + (py - y1) * vy) / denom
+    if t < 0.0:
+        t = 0.0
+    elif t > 1.0:
+        t = 1.0
+    ex = px - (x1 + t * vx)
+    ey = py - (y1 + t * vy)
+    return ex * ex + ey * ey
+
+
+def segmentDistanceSq(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2):
+    """Squared distance between segments A and B (zero when they cross)."""
+    rx = ax2 - ax1; ry = ay2 - ay1
+    sx = bx2 - bx1; sy = by2 - by1
+    o1 = rx * (by1 - ay1) - ry * (bx1 - ax1)
+    o2 = rx * (by2 - ay1) - ry * (bx2 - ax1)
+    if o1 * o2 < 0:
+        o3 = sx * (ay1 - by1) - sy * (ax1 - bx1)
+        o4 = sx * (ay2 - by1) - sy * (ax2 - bx1)
+        if o3 * o4 < 0:
+            return 0.0
+    return min(
+        _pointSegmentDistanceSq(ax1, ay1, bx1, by1, bx2, by2),
+        _pointSegmentDistanceSq(ax2, ay2, bx1, by1, bx2, by2),
+        _pointSegmentDistanceSq(bx1, by1, ax1, ay1, ax2, ay2),
+        _pointSegmentDistanceSq(bx2, by2, ax1, ay1, ax2, ay2),
+    )
+
+
+def _minDistancePython(segsA, segsB, dx, limit, stopBelow):
+    a = list(zip(segsA.x1, segsA.y1, segsA.x2, segsA.y2))
+    b = []
+    for x1, y1, x2, y2 in zip(segsB.x1, segsB.y1, segsB.x2, segsB.y2):
+        x1 += dx
+        x2 += dx
+        b.append((x1, y1, x2, y2,
+                  min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+    best = float(limit)
+    bestSq = best * best
+    for ax1, ay1, ax2, ay2 in a:
+        aMinX = min(ax1, ax2); aMaxX = max(ax1, ax2)
+        aMinY = min(ay1, ay2); aMaxY = max(ay1, ay2)
+        for bx1, by1, bx2, by2, bMinX, bMinY, bMaxX, bMaxY in b:
+            # Prefiltre per caixa: si les caixes ja estan més lluny, no cal calcular
+            if (bMinX - aMaxX >= best or aMinX - bMaxX >= best or
+                    bMinY - aMaxY >= best or aMinY - bMaxY >= best):
+                continue
+            d = segmentDistanceSq(ax1, ay1, ax2, ay2, bx1, by1, bx2, by2)
+            if d < bestSq:
+                bestSq = d
+                best = math.sqrt(d)
+                if best <= 0.0:
+                    return 0.0
+                if stopBelow is not None and best < stopBelow:
+                    return best
+    return best
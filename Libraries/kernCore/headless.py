@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+# Description: Command-line collision check and positive-kerning proposal
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Headless runner for build servers.
+
+Runs the collision sweep and the positive-kerning proposal of Positive
+Kerning Engine on a .glyphs, UFO or stand-in .json source (see sourceFont),
+without GlyphsApp. From the Libraries folder:
+
+    python -m kernCore collisions Font.glyphs --glyphs A,T,V --margin 40 --report collisions.csv --fail
+    python -m kernCore autokern Font.glyphs --pairs kerningPairs.jsonl --masters all --kerning proposed.jsonl
+
+collisions exits with 1 when --fail is given and a collision is found, so a
+CI job can be gated on it. autokern takes the pairs from a pair file
+written by Tab to JSON (any format pairStream reads) or, without --pairs,
+from the collisions of --glyphs, and writes the proposed values as a report
+and, with --kerning, one pairStream file with a section per master (ready
+for "Restore kerning from JSON backup" in Kern Tools). The font source is
+never modified.
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from kernCore import diskCache, masters, pairStream, segmentIndex, sourceFont, sweep
+
+
+# Mateixos sufixos que descarta Check Collisions a Positive Kerning Engine
+EXCLUDED_SUFFIXES = (
+    ".sc", ".dnom", ".numr", ".subs", ".sups", ".titl",
+    ".case", ".comb", ".init", ".medi", ".fina", ".isol",
+    ".liga", ".calt", ".locl",
+) + tuple(".ss%02d" % i for i in range(1, 21))
+
+
+def _excluded(name, suffixes):
+    return any(s in name for s in suffixes)
+
+
+def resolveMasterIDs(font, keys=None):
+    """Master IDs for names/IDs in keys, every master for "all", the first one for None."""
+    if not keys:
+        return [font.masters[0].id]
+    if keys == ["all"]:
+        return [m.id for m in font.masters]
+    ids = []
+    for key in keys:
+        master = font.master(key)
+        if master is None:
+            raise ValueError("Unknown master: %s" % key)
+        ids.append(master.id)
+    return ids
+
+
+def _masterName(font, masterID):
+    master = font.master(masterID)
+    return master.name if master is not None else masterID
+
+
+# ======== COLLISIONS ========
+
+def collisionRows(font, glyphs, neighbors=None, exclude=EXCLUDED_SUFFIXES):
+    """Rows for CollisionSweep, as Check Collisions builds them (both sides of each glyph)."""
+    specified = [n for n in glyphs if n in font.glyphs and not _excluded(n, exclude)]
+    if neighbors:
+        others = [n for n in neighbors if n in font.glyphs and not _excluded(n, exclude)]
+    else:
+        others = [n for n in font.glyphs.keys() if not _excluded(n, exclude)]
+    rows = [(s, [r for r in others if r != s]) for s in specified]
+    rows += [(l, [s for s in specified if s != l]) for l in others]
+    return rows
+
+
+def checkCollisions(font, masterIDs, glyphs, neighbors=None, margin=40.0, processes=None):
+    """[{master, left, right, distance}] for every colliding pair in every master."""
+    rows = collisionRows(font, glyphs, neighbors)
+    names = set(left for left, _ in rows)
+    for _, rights in rows:
+        names.update(rights)
+    results = []
+    for masterID in masterIDs:
+        geometry = {}
+        for name in names:
+            entry = segmentIndex.sharedCache.geometry(font, name, masterID)
+            if entry is not None:
+                geometry[name] = entry
+        hits = sweep.CollisionSweep(geometry, rows, margin, processes).run()
+        seen = set()
+        for left, right in hits:
+            if (left, right) in seen:
+                continue
+            seen.add((left, right))
+            indexL, _, dx = geometry[left]
+            distance = segmentIndex.minDistanceIndexed(indexL, geometry[right][0], dx)
+            results.append({
+                "master": _masterName(font, masterID),
+                "left": left,
+                "right": right,
+                "distance": round(distance, 1),
+            })
+    return results
+
+
+# ======== AUTO KERN ========
+
+def loadPairs(path):
+    """(left, right) pairs of a pair file (.jsonl, .kcp or the old {"pairs": [...]} JSON)."""
+    return list(dict.fromkeys((r.left, r.right) for r in pairStream.readPairs(path)))
+
+
+def proposeKerning(font, pairs, masterIDs, margin=40.0, mode=masters.INDEPENDENT, skipKerned=True):
+    pairs = [(l, r) for l, r in pairs if l in font.glyphs and r in font.glyphs]
+    kerner = masters.MasterKerner(font, margin, masterIDs, mode, skipKerned)
+    return kerner.compute(pairs)
+
+
+def proposalRows(font, result):
+    rows = []
+    for (left, right), values in result.values.items():
+        for masterID, value in values.items():
+            rows.append({"master": _masterName(font, masterID), "left": left, "right": right, "value": value})
+    return rows
+
+
+def writeKerning(font, result, path):
+    """Proposed values as a pairStream file (.jsonl or .kcp) with one section per master."""
+    with pairStream.PairWriter(path, {"name": "Proposed positive kerning"}) as writer:
+        for masterID in result.masterIDs:
+            writer.master(masterID, _masterName(font, masterID))
+            for (left, right), values in result.values.items():
+                if masterID in values:
+                    writer.write(left, right, values[masterID])
+    return path
+
+
+# ======== REPORTS ========
+
+def writeReport(rows, path, fields):
+    """Rows as CSV (.csv) or JSON (anything else)."""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    return path
+
+
+# ======== CLI ========
+
+def _names(text):
+    """Glyph names from "A, T, V" or from a file (one or more per line)."""
+    if not text:
+        return []
+    if os.path.isfile(text):
+        with open(text, "r", encoding="utf-8") as f:
+            text = f.read()
+    return [n.strip() for n in text.replace("\n", ",").split(",") if n.strip()]
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="python -m kernCore", description="Headless collision check and positive kerning.")
+    parser.add_argument("--no-disk-cache", action="store_true", help="do not read or write the kernCore disk cache")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    def common(command):
+        command.add_argument("source", help=".glyphs, .glyphspackage, .ufo or stand-in .json font")
+        command.add_argument("--glyphs", default="", help="glyphs to check: \"A, T, V\" or a file")
+        command.add_argument("--neighbors", default="", help="only check against these glyphs (default: every glyph)")
+        command.add_argument("--masters", default="", help="master names or IDs, comma separated, or \"all\" (default: first master)")
+        command.add_argument("--margin", type=float, default=40.0)
+        command.add_argument("--processes", type=int, default=None)
+        command.add_argument("--report", default=None, help="write a .json or .csv report")
+
+    collisions = commands.add_parser("collisions", help="list glyph pairs closer than the margin")
+    common(collisions)
+    collisions.add_argument("--fail", action="store_true", help="exit with 1 when a collision is found")
+
+    autokern = commands.add_parser("autokern", help="propose positive kerning")
+    common(autokern)
+    autokern.add_argument("--pairs", default=None, help="pair file from Tab to JSON (default: the collisions of --glyphs)")
+    autokern.add_argument("--mode", choices=masters.MODES, default=masters.INDEPENDENT)
+    autokern.add_argument("--include-kerned", action="store_true", help="also propose values for pairs that already have kerning")
+    autokern.add_argument("--kerning", default=None, help="write the proposed kerning as .jsonl or .kcp (one section per master)")
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    if args.no_disk_cache:
+        diskCache.sharedCache.enabled = False
+    start = time.perf_counter()
+    font = sourceFont.loadFont(args.source)
+    masterIDs = resolveMasterIDs(font, _names(args.masters))
+    glyphs = _names(args.glyphs)
+    neighbors = _names(args.neighbors)
+    print("%s: %d glyphs, %d masters" % (args.source, len(font.glyphs), len(masterIDs)))
+
+    if args.command == "collisions":
+        if not glyphs:
+            print("No glyphs to check (--glyphs)")
+            return 2
+        rows = checkCollisions(font, masterIDs, glyphs, neighbors, args.margin, args.processes)
+        for row in rows:
+            print("%(master)s  %(left)s / %(right)s  %(distance)s" % row)
+        if args.report:
+            writeReport(rows, args.report, ["master", "left", "right", "distance"])
+        print("%d collisions (%.2f s)" % (len(rows), time.perf_counter() - start))
+        return 1 if args.fail and rows else 0
+
+    if args.pairs:
+        pairs = loadPairs(args.pairs)
+    elif glyphs:
+        hits = checkCollisions(font, masterIDs, glyphs, neighbors, args.margin, args.processes)
+        pairs = list(dict.fromkeys((h["left"], h["right"]) for h in hits))
+    else:
+        print("No pairs (--pairs) and no glyphs to check (--glyphs)")
+        return 2
+    result = proposeKerning(font, pairs, masterIDs, args.margin, args.mode, not args.include_kerned)
+    rows = proposalRows(font, result)
+    for row in rows:
+        print("%(master)s  %(left)s / %(right)s  %(value)+d" % row)
+    if args.report:
+        writeReport(rows, args.report, ["master", "left", "right", "value"])
+    if args.kerning:
+        print("Written %s" % writeKerning(font, result, args.kerning))
+    print("%s (%.2f s)" % (result.summary(), time.perf_counter() - start))
+    return 0
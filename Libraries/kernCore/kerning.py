@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# Description: Effective-kerning resolver over one kerning snapshot
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Effective-kerning resolver.
+
+KerningResolver reads font.kerning[masterID] once, plus the left and right
+kerning groups of every glyph, and then tells for any (left, right) glyph
+pair which entry the pair resolves to, in the same order the kerning is
+applied: DIRECT (glyph/glyph), GLYPH_GROUP (left glyph exception against the
+right group), GROUP_GLYPH (left group against the right glyph exception),
+GROUP_GROUP, or NONE. Every query is a handful of dict lookups.
+
+Glyph keys are looked up both by glyph ID (Glyphs 3) and by name (older
+files and scripts that write names). After writing kerning, keep the
+resolver current with setPair instead of rebuilding it.
+"""
+
+LEFT_PREFIX = "@MMK_L_"
+RIGHT_PREFIX = "@MMK_R_"
+
+DIRECT = "direct"
+GLYPH_GROUP = "glyph-group"
+GROUP_GLYPH = "group-glyph"
+GROUP_GROUP = "group-group"
+NONE = "none"
+
+
+def kerningSnapshot(font, masterID):
+    """Plain {leftKey: {rightKey: value}} copy of a master's kerning."""
+    snapshot = {}
+    try:
+        masterKerning = font.kerning.get(masterID) or {}
+    except Exception:
+        return snapshot
+    for leftKey, rights in masterKerning.items():
+        snapshot[str(leftKey)] = dict((str(rightKey), value) for rightKey, value in rights.items())
+    return snapshot
+
+
+class KerningResolver(object):
+    """O(1) "already kerned?" queries for one master."""
+
+    def __init__(self, font, masterID):
+        self.font = font
+        self.masterID = masterID
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild from the current kerning and groups."""
+        self._pairs = kerningSnapshot(self.font, self.masterID)
+        self._glyphs = {}
+        for glyph in self.font.glyphs:
+            keys = tuple(k for k in (getattr(glyph, "id", None), glyph.name) if k)
+            leftGroup = LEFT_PREFIX + glyph.rightKerningGroup if glyph.rightKerningGroup else None
+            rightGroup = RIGHT_PREFIX + glyph.leftKerningGroup if glyph.leftKerningGroup else None
+            # (claus quan fa d'esquerre, grup esquerre, grup dret)
+            self._glyphs[glyph.name] = (keys, leftGroup, rightGroup)
+
+    def setPair(self, leftKey, rightKey, value):
+        """Mirror a kerning write (value None removes the pair)."""
+        if value is None:
+            rights = self._pairs.get(leftKey)
+            if rights is not None:
+                rights.pop(rightKey, None)
+            return
+        self._pairs.setdefault(leftKey, {})[rightKey] = value
+
+    def resolve(self, left, right):
+        """(kind, value) of the entry that applies to the glyph pair."""
+        infoL = self._glyphs.get(left)
+        infoR = self._glyphs.get(right)
+        if infoL is None or infoR is None:
+            return NONE, None
+        keysL, groupL, _ = infoL
+        keysR, _, groupR = infoR
+        pairs = self._pairs
+        for kind, leftKeys, rightKeys in (
+            (DIRECT, keysL, keysR),
+            (GLYPH_GROUP, keysL, (groupR,)),
+            (GROUP_GLYPH, (groupL,), keysR),
+            (GROUP_GROUP, (groupL,), (groupR,)),
+        ):
+            for lk in leftKeys:
+                rights = pairs.get(lk)
+                if not rights:
+                    continue
+                for rk in rightKeys:
+                    if rk is not None and rk in rights:
+                        return kind, rights[rk]
+        return NONE, None
+
+    def kind(self, left, right):
+        return self.resolve(left, right)[0]
+
+    def isKerned(self, left, right):
+        return self.resolve(left, right)[0] != NONE
+
+    def resolveMany(self, pairs):
+        """[(kind, value)] for an iterable of (left, right) glyph names."""
+        resolve = self.resolve
+        return [resolve(left, right) for left, right in pairs]
+
+    def unkerned(self, pairs, key=None):
+        """Items of pairs whose (left, right) (or key(item)) has no kerning at all."""
+        resolve = self.resolve
+        if key is None:
+            return [p for p in pairs if resolve(p[0], p[1])[0] == NONE]
+        out = []
+        for item in pairs:
+            left, right = key(item)
+            if resolve(left, right)[0] == NONE:
+                out.append(item)
+        return out
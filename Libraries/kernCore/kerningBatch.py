@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# Description: Transactional batch writer for kerning pairs
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Batch kerning writer.
+
+KerningBatch collects pair writes (and removals) instead of touching the font
+one pair at a time. apply() then writes them all in one pass with the
+interface updates disabled and inside a single undo group, reads each
+master's kerning back once to verify every write, and returns a BatchReport
+(applied, removed, failed, mismatched, time).
+
+Keys can be glyph names, glyph IDs (as stored in font.kerning) or group keys
+(@MMK_L_x / @MMK_R_x). Writing the same pair twice keeps the last value.
+"""
+
+import collections
+import time
+
+from kernCore import fontIndex, kerningWatch, trace
+from kernCore.kerning import kerningSnapshot
+
+
+class BatchReport(object):
+    """Outcome of KerningBatch.apply()."""
+
+    def __init__(self):
+        self.requested = 0
+        self.applied = 0
+        self.removed = 0
+        # (masterID, left, right, error)
+        self.failed = []
+        # (masterID, left, right, expected, actual); expected None = removal
+        self.mismatched = []
+        self.seconds = 0.0
+
+    @property
+    def ok(self):
+        return not self.failed and not self.mismatched
+
+    @property
+    def errors(self):
+        return len(self.failed) + len(self.mismatched)
+
+    def summary(self):
+        return "%d pairs: %d written, %d removed, %d failed, %d not verified (%.2f s)" % (
+            self.requested, self.applied, self.removed, len(self.failed), len(self.mismatched), self.seconds)
+
+
+def _undoManager(font):
+    for owner in (font, getattr(font, "parent", None)):
+        if owner is None:
+            continue
+        try:
+            manager = owner.undoManager()
+        except Exception:
+            continue
+        if manager is not None:
+            return manager
+    return None
+
+
+def storedKeys(index, key):
+    """Keys under which font.kerning may hold a pair side (glyph ID and name)."""
+    key = str(key)
+    if key.startswith("@"):
+        return (key,)
+    glyph = index.glyphForKey(key)
+    if glyph is None:
+        return (key,)
+    return tuple(k for k in (getattr(glyph, "id", None), glyph.name) if k)
+
+
+def _cachedKeys(index, key, cache):
+    keys = cache.get(key)
+    if keys is None:
+        keys = cache[key] = storedKeys(index, key)
+    return keys
+
+
+def storedValue(snapshot, index, left, right, cache=None):
+    """
+    Value of a pair in a kerningSnapshot, whichever of ID or name it is stored
+    under, or None. cache (a dict) keeps the resolved keys between calls.
+    """
+    if cache is None:
+        cache = {}
+    for lk in _cachedKeys(index, left, cache):
+        rights = snapshot.get(lk)
+        if not rights:
+            continue
+        for rk in _cachedKeys(index, right, cache):
+            if rk in rights:
+                return rights[rk]
+    return None
+
+
+class KerningBatch(object):
+    """Pending kerning writes for one font, applied together by apply()."""
+
+    def __init__(self, font, undoName="Kerning"):
+        self.font = font
+        self.undoName = undoName
+        # (masterID, leftKey, rightKey) -> valor (None = esborrar)
+        self._writes = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, masterID, left, right, value):
+        self._writes[(masterID, left, right)] = value
+
+    def remove(self, masterID, left, right):
+        self._writes[(masterID, left, right)] = None
+
+    def clear(self):
+        self._writes.clear()
+
+    # ======== KEYS ========
+
+    def _writeKey(self, index, key):
+        """Key accepted by setKerningForPair: group keys and names as they are, IDs as names."""
+        key = str(key)
+        if key.startswith("@"):
+            return key
+        glyph = index.glyphForKey(key)
+        return glyph.name if glyph is not None else key
+
+    # ======== APPLY ========
+
+    def apply(self, verify=True):
+        report = BatchReport()
+        report.requested = len(self._writes)
+        if not self._writes:
+            return report
+        font = self.font
+        index = fontIndex.indexForFont(font)
+        tracer = trace.sharedTracer
+        start = time.perf_counter()
+
+        undo = _undoManager(font)
+        disable = getattr(font, "disableUpdateInterface", None)
+        if disable:
+            disable()
+        if undo is not None:
+            undo.beginUndoGrouping()
+        try:
+            with tracer.timer("batch.write"):
+                writeKeys = {}
+                for (masterID, left, right), value in self._writes.items():
+                    leftKey = writeKeys.get(left)
+                    if leftKey is None:
+                        leftKey = writeKeys[left] = self._writeKey(index, left)
+                    rightKey = writeKeys.get(right)
+                    if rightKey is None:
+                        rightKey = writeKeys[right] = self._writeKey(index, right)
+                    try:
+                        if value is None:
+                            font.removeKerningForPair(masterID, leftKey, rightKey)
+                            report.removed += 1
+                        else:
+                            font.setKerningForPair(masterID, leftKey, rightKey, value)
+                            report.applied += 1
+                    except Exception as e:
+                        report.failed.append((masterID, left, right, e))
+        finally:
+            if undo is not None:
+                try:
+                    undo.setActionName_(self.undoName)
+                except Exception:
+                    pass
+                undo.endUndoGrouping()
+            enable = getattr(font, "enableUpdateInterface", None)
+            if enable:
+                enable()
+
+        kerningWatch.sharedWatch.markDirty(font, set(m for m, _, _ in self._writes))
+
+        if verify:
+            with tracer.timer("batch.verify"):
+                self._verify(index, report)
+
+        report.seconds = time.perf_counter() - start
+        tracer.count("batch.pairs", report.requested)
+        tracer.count("batch.errors", report.errors)
+        tracer.info("BATCH", "%s", report.summary())
+        self._writes.clear()
+        return report
+
+    def _verify(self, index, report):
+        failed = set((m, l, r) for m, l, r, _ in report.failed)
+        snapshots = {}
+        keys = {}
+        for (masterID, left, right), expected in self._writes.items():
+            if (masterID, left, right) in failed:
+                continue
+            snapshot = snapshots.get(masterID)
+            if snapshot is None:
+                snapshot = snapshots[masterID] = kerningSnapshot(self.font, masterID)
+            actual = storedValue(snapshot, index, left, right, keys)
+            if expected is None:
+                if actual is not None:
+                    report.mismatched.append((masterID, left, right, None, actual))
+            elif actual is None or abs(float(actual) - float(expected)) > 1e-6:
+                report.mismatched.append((masterID, left, right, expected, actual))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# Description: Per-master kerning version counters for cheap change polling
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Kerning change tracking.
+
+KerningWatch keeps a version number per master that only moves when that
+master's kerning changes, so a view can poll it on every timer tick at the
+cost of a dict lookup and relayout only for the masters that changed.
+
+Nothing is rescanned until a master is marked dirty: from a font or undo
+notification (markDirty(font)), or by KerningBatch for the masters it wrote.
+A dirty master is read once and its order-independent digest (the sum of
+the hashes of its pairs, no sorting, no strings) compared with the last one.
+maxAge optionally rescans masters that have not been checked for that many
+seconds, for edits that post no notification.
+"""
+
+import time
+
+from kernCore.fontMap import FontMap
+
+
+_MASK = (1 << 64) - 1
+
+
+def kerningDigest(font, masterID):
+    """(digest, pairs) of a master's kerning; the digest does not depend on the order."""
+    digest = 0
+    count = 0
+    try:
+        masterKerning = font.kerning.get(masterID) or {}
+    except Exception:
+        return 0, 0
+    for leftKey, rights in masterKerning.items():
+        leftKey = str(leftKey)
+        for rightKey, value in rights.items():
+            digest = (digest + hash((leftKey, str(rightKey), float(value)))) & _MASK
+            count += 1
+    return digest, count
+
+
+class _MasterState(object):
+    __slots__ = ("version", "digest", "count", "checked", "dirty")
+
+    def __init__(self):
+        self.version = 0
+        self.digest = None
+        self.count = 0
+        self.checked = 0.0
+        self.dirty = True
+
+
+class KerningWatch(object):
+    """Kerning version per (font, master)."""
+
+    def __init__(self, maxAge=None):
+        self.maxAge = maxAge
+        # font -> {masterID: _MasterState}
+        self._fonts = FontMap()
+
+    def _states(self, font):
+        states = self._fonts.get(font)
+        if states is None:
+            states = self._fonts[font] = {}
+        return states
+
+    def markDirty(self, font, masterIDs=None):
+        """Re-read these masters (every master for None) on the next poll."""
+        states = self._states(font)
+        if masterIDs is None:
+            for state in states.values():
+                state.dirty = True
+            return
+        for masterID in masterIDs:
+            state = states.get(masterID)
+            if state is not None:
+                state.dirty = True
+
+    def poll(self, font, masterIDs=None, maxAge=None):
+        """
+        Masters (of masterIDs, or every master) whose kerning changed since the
+        last poll. Only dirty or, with maxAge, stale masters are read.
+        """
+        if maxAge is None:
+            maxAge = self.maxAge
+        if masterIDs is None:
+            masterIDs = [m.id for m in font.masters]
+        states = self._states(font)
+        now = time.time()
+        changed = []
+        for masterID in masterIDs:
+            state = states.get(masterID)
+            if state is None:
+                state = states[masterID] = _MasterState()
+            stale = maxAge is not None and now - state.checked >= maxAge
+            if not state.dirty and not stale:
+                continue
+            digest, count = kerningDigest(font, masterID)
+            state.dirty = False
+            state.checked = now
+            if digest != state.digest or count != state.count:
+                if state.digest is not None:
+                    state.version += 1
+                    changed.append(masterID)
+                state.digest = digest
+                state.count = count
+        return changed
+
+    def version(self, font, masterID, maxAge=None):
+        """Current version of a master after polling it; cheap while it is clean."""
+        self.poll(font, [masterID], maxAge)
+        return self._fonts[font][masterID].version
+
+    def forgetFont(self, font):
+        self._fonts.pop(font, None)
+
+
+# Compartit per tots els scripts durant la sessió de Glyphs
+sharedWatch = KerningWatch()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Description: Layer access helpers shared by the kernCore caches
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Small helpers to reach a master layer, decompose it and tell whether it
+(or any glyph it uses as a component) changed since it was cached. Only public GSGlyph/GSLayer attributes are used,
+so any object with the same attributes works as well.
+"""
+
+
+def masterLayer(font, glyphName, masterID):
+    """(glyph, layer) for a glyph name and master ID, or (None, None)."""
+    glyph = font.glyphs[glyphName]
+    if not glyph:
+        return None, None
+    return glyph, glyph.layers[masterID]
+
+
+def decomposed(layer):
+    """Decomposed copy of the layer, or the layer itself if it cannot be decomposed."""
+    try:
+        return layer.copyDecomposedLayer()
+    except Exception:
+        return layer
+
+
+def layerToken(glyph, layer):
+    """Cheap version token: changes whenever the glyph is edited."""
+    return (getattr(glyph, "lastChange", None), getattr(layer, "width", None))
+
+
+def dependencyToken(font, glyphName, masterID):
+    """
+    Version token of a master layer and, recursively, of the source glyphs of
+    its components in the same master. It changes when any of them is edited,
+    so a cached decomposed outline is never stale.
+    """
+    token = []
+    stack = [glyphName]
+    seen = set()
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        glyph, layer = masterLayer(font, name, masterID)
+        if layer is None:
+            token.append((name, None))
+            continue
+        token.append((name, layerToken(glyph, layer)))
+        for component in getattr(layer, "components", None) or ():
+            stack.append(component.componentName)
+    return tuple(token)
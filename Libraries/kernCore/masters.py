@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Description: Positive kerning for every master in one pass
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Multi-master positive kerning.
+
+MasterKerner loads the profile of every glyph used by the requested pairs
+once per master, then computes the positive kerning of every pair in every
+master from those profiles: target margin minus current margin, kept only
+when it is positive. With skipKerned=True a master where the pair already
+has kerning (direct or through groups) is left untouched.
+
+The values of one pair across masters can then be made consistent:
+
+    INDEPENDENT   every master keeps its own value
+    INTERPOLATE   a pair kerned in one master is written in every master
+                  (0 where nothing is needed), so instances interpolate
+                  between explicit values instead of falling back to
+                  group kerning in some masters only
+    MONOTONIC     as INTERPOLATE, and along the masters ordered by axis
+                  position the values are raised until they never change
+                  direction; raising only opens the pair, so no collision
+                  comes back
+
+queue(batch) adds the result to a kerningBatch.KerningBatch, so every master
+is written, verified and undone together.
+"""
+
+import collections
+
+from kernCore import geometry, kerning, profiles, trace
+
+
+INDEPENDENT = "independent"
+INTERPOLATE = "interpolate"
+MONOTONIC = "monotonic"
+
+MODES = (INDEPENDENT, INTERPOLATE, MONOTONIC)
+
+
+# ======== MASTERS ========
+
+def masterPosition(master, index=0):
+    """Axis coordinates of a master (Glyphs 3 axes, Glyphs 2 weight/width), or its index."""
+    axes = getattr(master, "axes", None)
+    if axes:
+        try:
+            return tuple(float(a) for a in axes)
+        except (TypeError, ValueError):
+            pass
+    values = []
+    for attr in ("weightValue", "widthValue", "customValue"):
+        value = getattr(master, attr, None)
+        if value is not None:
+            try:
+                values.append(float(value))
+            except (TypeError, ValueError):
+                pass
+    if values:
+        return tuple(values)
+    return (float(index),)
+
+
+def orderedMasterIDs(font, masterIDs=None):
+    """Master IDs of the font (or only masterIDs) ordered by axis position."""
+    wanted = set(masterIDs) if masterIDs is not None else None
+    masters = []
+    for i, master in enumerate(font.masters):
+        if wanted is None or master.id in wanted:
+            masters.append((masterPosition(master, i), i, master.id))
+    masters.sort()
+    return [mid for _, _, mid in masters]
+
+
+def monotonicRaise(values):
+    """
+    Smallest raise of values that makes them monotonic: the running maximum
+    forwards (non-decreasing) or backwards (non-increasing), whichever adds less.
+    """
+    if len(values) < 3:
+        return list(values)
+    up = []
+    top = None
+    for v in values:
+        top = v if top is None or v > top else top
+        up.append(top)
+    down = []
+    top = None
+    for v in reversed(values):
+        top = v if top is None or v > top else top
+        down.append(top)
+    down.reverse()
+    return up if sum(up) <= sum(down) else down
+
+
+# ======== KERNER ========
+
+class MasterKerningResult(object):
+    """Positive kerning per pair and master, as computed by MasterKerner."""
+
+    def __init__(self, masterIDs):
+        self.masterIDs = list(masterIDs)
+        # (left, right) -> {masterID: valor}
+        self.values = collections.OrderedDict()
+        # (masterID, left, right) amb kerning previ
+        self.kerned = []
+        # (masterID, left, right) sense mesura (capa buida o glifs que no es troben)
+        self.unmeasured = []
+        self.raised = 0
+
+    def __len__(self):
+        return sum(len(v) for v in self.values.values())
+
+    def pairs(self):
+        return list(self.values)
+
+    def summary(self):
+        return "%d pairs, %d values in %d masters (%d kerned skipped, %d unmeasured, %d raised)" % (
+            len(self.values), len(self), len(self.masterIDs), len(self.kerned), len(self.unmeasured), self.raised)
+
+
+class MasterKerner(object):
+    """Positive kerning of a list of pairs in several masters at once."""
+
+    def __init__(self, font, targetMargin, masterIDs=None, mode=INDEPENDENT, skipKerned=True, cache=None):
+        if mode not in MODES:
+            raise ValueError("Unknown consistency mode: %r" % (mode,))
+        self.font = font
+        self.targetMargin = float(targetMargin)
+        self.masterIDs = orderedMasterIDs(font, masterIDs)
+        self.mode = mode
+        self.skipKerned = skipKerned
+        self.cache = cache if cache is not None else profiles.sharedCache
+
+    def _loadProfiles(self, names):
+        """{masterID: {glyphName: profile}} with every profile read once."""
+        loaded = {}
+        for mid in self.masterIDs:
+            table = loaded[mid] = {}
+            for name in names:
+                profile = self.cache.profile(self.font, name, mid)
+                if profile is not None:
+                    table[name] = profile
+        return loaded
+
+    def compute(self, pairs):
+        tracer = trace.sharedTracer
+        result = MasterKerningResult(self.masterIDs)
+        pairs = list(collections.OrderedDict.fromkeys((l, r) for l, r in pairs))
+        names = sorted(set(n for pair in pairs for n in pair))
+
+        with tracer.timer("masters.profiles"):
+            loaded = self._loadProfiles(names)
+        resolvers = {}
+        if self.skipKerned:
+            for mid in self.masterIDs:
+                resolvers[mid] = kerning.KerningResolver(self.font, mid)
+
+        target = self.targetMargin
+        limit = geometry.DEFAULT_LIMIT
+        with tracer.timer("masters.margins"):
+            for left, right in pairs:
+                row = collections.OrderedDict()
+                for mid in self.masterIDs:
+                    resolver = resolvers.get(mid)
+                    if resolver is not None and resolver.isKerned(left, right):
+                        result.kerned.append((mid, left, right))
+                        continue
+                    profileL = loaded[mid].get(left)
+                    profileR = loaded[mid].get(right)
+                    if profileL is None or profileR is None:
+                        result.unmeasured.append((mid, left, right))
+                        continue
+                    current = profiles.marginBetweenProfiles(profileL, profileR, profileL.width, True, limit)
+                    if current >= limit:
+                        row[mid] = 0
+                        continue
+                    delta = int(round(target - current))
+                    row[mid] = delta if delta > 0 else 0
+                    tracer.debug("MASTERS", "%s/%s [%s] margin %.1f delta %s", left, right, mid, current, row[mid])
+                self._settle(left, right, row, result)
+
+        tracer.count("masters.pairs", len(pairs))
+        tracer.count("masters.values", len(result))
+        tracer.info("MASTERS", "%s", result.summary())
+        return result
+
+    def _settle(self, left, right, row, result):
+        """Apply the consistency mode to the values of one pair and keep the ones to write."""
+        if not any(row.values()):
+            return
+        if self.mode == INDEPENDENT:
+            row = collections.OrderedDict((mid, v) for mid, v in row.items() if v > 0)
+        elif self.mode == MONOTONIC:
+            raised = monotonicRaise(list(row.values()))
+            for (mid, before), after in zip(list(row.items()), raised):
+                if after != before:
+                    result.raised += 1
+                    row[mid] = after
+        result.values[(left, right)] = row
+
+    def queue(self, batch, result):
+        """Add every value of result to a KerningBatch; returns the number queued."""
+        queued = 0
+        for (left, right), row in result.values.items():
+            for mid, value in row.items():
+                batch.set(mid, left, right, value)
+                queued += 1
+        return queued
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# Description: Cross-font kerning merge with key translation and conflict policies
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Kerning merge between fonts.
+
+Glyph IDs are unique per font, so a source kerning key is only meaningful in
+the target once it is translated. KeyTranslation builds that table once per
+source font: every source glyph ID and name maps to the target glyph of the
+same name, and a group key is kept when the target has a glyph in that
+group. Keys without a counterpart are counted and skipped.
+
+KerningMerger queues (source font, source master, target master) jobs and
+merges them pair by pair into the target, all in one KerningBatch. When a
+pair already has a different value, or several sources disagree, the policy
+decides: OVERWRITE (last source wins), KEEP (target value, or the first
+source), MAX, MIN or AVERAGE (of the target value and every source value).
+Every such pair is reported as a conflict.
+"""
+
+import collections
+
+from kernCore import fontIndex, kerningBatch
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX, kerningSnapshot
+
+
+OVERWRITE = "overwrite"
+KEEP = "keep"
+MAX = "max"
+MIN = "min"
+AVERAGE = "average"
+POLICIES = (OVERWRITE, KEEP, MAX, MIN, AVERAGE)
+
+Conflict = collections.namedtuple("Conflict", "masterID left right existing incoming result")
+
+
+def matchMasters(source, target, byName=True):
+    """{source master ID: target master} by master name (or by ID)."""
+    targets = dict(((m.name if byName else m.id), m) for m in target.masters)
+    matched = {}
+    for master in source.masters:
+        found = targets.get(master.name if byName else master.id)
+        if found is not None:
+            matched[master.id] = found
+    return matched
+
+
+class KeyTranslation(object):
+    """Source kerning key -> target kerning key, built once per source font."""
+
+    def __init__(self, source, target):
+        targetIDs = dict((g.name, getattr(g, "id", None)) for g in target.glyphs)
+        self.glyphs = {}
+        # ID de l'origen -> nom, per informar de les claus que falten
+        self.sourceNames = {}
+        # nom al destí -> claus amb què el destí pot guardar-lo (ID i nom)
+        self.storedKeys = {}
+        for glyph in source.glyphs:
+            if getattr(glyph, "id", None):
+                self.sourceNames[str(glyph.id)] = glyph.name
+            if glyph.name in targetIDs:
+                self.glyphs[glyph.name] = glyph.name
+                glyphID = getattr(glyph, "id", None)
+                if glyphID:
+                    self.glyphs[str(glyphID)] = glyph.name
+                targetID = targetIDs[glyph.name]
+                self.storedKeys[glyph.name] = (str(targetID), glyph.name) if targetID else (glyph.name,)
+        index = fontIndex.indexForFont(target)
+        # @MMK_L_x és el grup dret (rightKerningGroup) x, i a l'inrevés
+        self.leftGroups = set(index.groups("right"))
+        self.rightGroups = set(index.groups("left"))
+        self.missing = collections.Counter()
+
+    def translate(self, key):
+        """Target key for a source key, or None."""
+        key = str(key)
+        if key.startswith(LEFT_PREFIX):
+            found = key if key[len(LEFT_PREFIX):] in self.leftGroups else None
+        elif key.startswith(RIGHT_PREFIX):
+            found = key if key[len(RIGHT_PREFIX):] in self.rightGroups else None
+        else:
+            found = self.glyphs.get(key)
+        if found is None:
+            self.missing[self.sourceNames.get(key, key)] += 1
+        return found
+
+
+class MergeReport(object):
+
+    def __init__(self):
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.conflicts = []
+        self.missing = collections.Counter()
+        self.batch = None
+
+    def summary(self):
+        text = "%d pairs written, %d unchanged, %d conflicts, %d skipped (%d keys not in the target)" % (
+            self.written, self.unchanged, len(self.conflicts), self.skipped, len(self.missing))
+        if self.batch is not None:
+            text += "; " + self.batch.summary()
+        return text
+
+
+class KerningMerger(object):
+    """Merges the kerning of source masters into a target font in one transaction."""
+
+    def __init__(self, target, policy=OVERWRITE):
+        if policy not in POLICIES:
+            raise ValueError("Unknown merge policy: %s" % policy)
+        self.target = target
+        self.policy = policy
+        self.jobs = []
+        self._translations = {}
+
+    def add(self, source, sourceMasterID, targetMasterID):
+        self.jobs.append((source, sourceMasterID, targetMasterID))
+
+    def _translation(self, source):
+        translation = self._translations.get(source)
+        if translation is None:
+            translation = self._translations[source] = KeyTranslation(source, self.target)
+        return translation
+
+    def _resolve(self, existing, incoming):
+        policy = self.policy
+        if policy == OVERWRITE:
+            return incoming[-1]
+        if policy == KEEP:
+            return existing if existing is not None else incoming[0]
+        values = list(incoming) if existing is None else [existing] + list(incoming)
+        if policy == MAX:
+            return max(values)
+        if policy == MIN:
+            return min(values)
+        return int(round(float(sum(values)) / len(values)))
+
+    def plan(self, report=None):
+        """{(targetMasterID, left, right): [source values]} for every queued job."""
+        report = report if report is not None else MergeReport()
+        pending = collections.OrderedDict()
+        for translation in self._translations.values():
+            translation.missing.clear()
+        for source, sourceMasterID, targetMasterID in self.jobs:
+            translation = self._translation(source)
+            translate = translation.translate
+            cache = {}
+            for left, rights in kerningSnapshot(source, sourceMasterID).items():
+                if left not in cache:
+                    cache[left] = translate(left)
+                targetLeft = cache[left]
+                for right, value in rights.items():
+                    if right not in cache:
+                        cache[right] = translate(right)
+                    targetRight = cache[right]
+                    if targetLeft is None or targetRight is None:
+                        report.skipped += 1
+                        continue
+                    pending.setdefault((targetMasterID, targetLeft, targetRight), []).append(value)
+        for translation in self._translations.values():
+            report.missing.update(translation.missing)
+        return pending
+
+    def merge(self, undoName="Merge Kerning"):
+        """Merge every queued job; returns a MergeReport."""
+        report = MergeReport()
+        pending = self.plan(report)
+        index = fontIndex.indexForFont(self.target)
+        # Claus del destí ja resoltes per les traduccions
+        keys = {}
+        for translation in self._translations.values():
+            keys.update(translation.storedKeys)
+        snapshots = {}
+        batch = kerningBatch.KerningBatch(self.target, undoName)
+        for (masterID, left, right), incoming in pending.items():
+            snapshot = snapshots.get(masterID)
+            if snapshot is None:
+                snapshot = snapshots[masterID] = kerningSnapshot(self.target, masterID)
+            existing = kerningBatch.storedValue(snapshot, index, left, right, keys)
+            result = self._resolve(existing, incoming)
+            disagree = len(set(incoming)) > 1
+            if (existing is not None and any(v != existing for v in incoming)) or disagree:
+                report.conflicts.append(Conflict(masterID, left, right, existing, list(incoming), result))
+            if existing is not None and existing == result:
+                report.unchanged += 1
+                continue
+            batch.set(masterID, left, right, result)
+        report.batch = batch.apply()
+        report.written = report.batch.applied - len(report.batch.mismatched)
+        self.jobs = []
+        return report
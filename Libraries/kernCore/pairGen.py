@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Description: Per-font-version glyph tables and memoized pieces for kerning pair generation
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Pair-generation engine.
+
+Generating the test tabs of a base glyph needs the same things every time:
+the neighbour glyphs of each category, the variants of a glyph, one glyph
+per kerning group and the context (prefix / suffix) of every pair. None of
+them depend on the base glyph, only on the font.
+
+PairTables reads what they depend on (name, category, subCategory, unicode
+and kerning groups of every glyph) in one pass and keeps everything derived
+from it: the variants of each base name, and whatever a script memoizes
+with memo(key, build) – its category neighbour lists, group representatives
+or display strings – plus the affix strings of every pair already built.
+
+tablesForFont(font) returns the shared tables of a font and rebuilds them
+only when one of those glyph properties changed, so one scan per Generate
+click replaces a loop over every glyph for each category, neighbour and
+base. iterTabs walks many base glyphs lazily: the content of a tab is only
+built when the caller asks for it.
+
+GlyphRecord has the attribute names of a glyph, so category predicates
+written for glyphs (glyph.category, glyph.unicode, …) work on records.
+"""
+
+import collections
+
+from kernCore.fontMap import FontMap
+
+
+GlyphRecord = collections.namedtuple(
+    "GlyphRecord", "name category subCategory unicode leftKerningGroup rightKerningGroup")
+
+
+def glyphBase(name):
+    """Name without extension: "a.sc" -> "a"."""
+    return name.split(".")[0] if name else ""
+
+
+def withoutVariations(names):
+    """Names without the variations (.sc, .ss01…) whose base is also in the list; order is kept."""
+    present = set(names)
+    return [n for n in names if "." not in n or glyphBase(n) not in present]
+
+
+def scanFont(font):
+    """GlyphRecord of every glyph, in font order."""
+    return tuple(
+        GlyphRecord(g.name, g.category, g.subCategory, g.unicode, g.leftKerningGroup, g.rightKerningGroup)
+        for g in font.glyphs)
+
+
+class PairTables(object):
+    """Glyph tables of one version of a font, with memoized neighbour lists and affixes."""
+
+    def __init__(self, font, records):
+        self.font = font
+        self.records = records
+        self.names = [r.name for r in records]
+        self.info = dict((r.name, r) for r in records)
+        # nom base -> variants amb extensió (a -> a.sc, a.ss01), en ordre de la font
+        self.variants = {}
+        for name in self.names:
+            base = glyphBase(name)
+            if base != name:
+                self.variants.setdefault(base, []).append(name)
+        self._memo = {}
+        self._affixes = {}
+
+    def __contains__(self, name):
+        return name in self.info
+
+    def record(self, name):
+        return self.info.get(name)
+
+    def existing(self, names):
+        """The names that are glyphs of the font, in the given order."""
+        info = self.info
+        return [n for n in names if n in info]
+
+    def variantsOf(self, base):
+        """Glyphs named base.<extension>."""
+        return list(self.variants.get(base, ()))
+
+    def memo(self, key, build):
+        """build() once per font version for this key."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = build()
+            return value
+
+    def select(self, key, predicate):
+        """Names whose record passes predicate, in font order; memoized under key."""
+        return self.memo(("select", key), lambda: [r.name for r in self.records if predicate(r)])
+
+    def uniqueByGroup(self, names, side="left"):
+        """
+        One glyph per kerning group of that side: the first of names in each
+        group, glyphs without a group kept. Memoized per list of names.
+        """
+        def build():
+            seen = set()
+            out = []
+            attribute = side + "KerningGroup"
+            for name in names:
+                record = self.info.get(name)
+                if record is None:
+                    continue
+                group = getattr(record, attribute) or "NO_GROUP_" + name
+                if group in seen:
+                    continue
+                seen.add(group)
+                out.append(name)
+            return out
+        return self.memo(("uniqueByGroup", side, tuple(names)), build)
+
+    def affixes(self, key, left, right, build):
+        """
+        build(left, right) once per version and key: key holds the settings
+        the result depends on (prefix and suffix typed by the user…).
+        """
+        cacheKey = (key, left, right)
+        try:
+            return self._affixes[cacheKey]
+        except KeyError:
+            value = self._affixes[cacheKey] = build(left, right)
+            return value
+
+
+_tables = FontMap()
+
+
+def tablesForFont(font, refresh=True):
+    """
+    Shared PairTables of a font. With refresh the glyphs are scanned and the
+    tables rebuilt if anything they depend on changed; without it the last
+    tables are returned as they are (for helpers called inside one run).
+    """
+    tables = _tables.get(font)
+    if tables is not None and not refresh:
+        return tables
+    records = scanFont(font)
+    if tables is None or tables.records != records:
+        tables = _tables[font] = PairTables(font, records)
+    return tables
+
+
+def iterTabs(bases, categories, build):
+    """
+    Lazily yields (base, category, content) for each base glyph and category
+    (categories None: one tab per base, category None) for which
+    build(base, category) returns something.
+    """
+    for base in bases:
+        for category in (categories if categories is not None else (None,)):
+            content = build(base, category)
+            if content:
+                yield base, category, content
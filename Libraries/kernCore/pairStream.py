@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# Description: Streaming line-delimited and binary formats for pair lists and kerning backups
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Streaming pair files.
+
+Pair lists and kerning backups are written and read one record at a time,
+so a large file is never held in memory as a whole document.
+
+Line-delimited (.jsonl): a header object, then one JSON array per line.
+A {"master": ID} line starts the pairs of a master.
+
+    {"format": "kernCore.pairs", "version": 1, "name": "Exported from Glyphs tab"}
+    {"master": "m01", "masterName": "Regular"}
+    ["A", "V"]
+    ["@MMK_L_T", "o", -40]
+
+Binary (.kcp): the same records with every string stored once and then
+referenced by number (see the tags below).
+
+readPairs(path) yields PairRecord(master, left, right, value) as it reads;
+value is None in pair lists. The old whole-document files are still read:
+{"pairs": [[left, right], ...]} (Positive Kerning Engine) and
+{left: {right: value}} (Kern Tools backup), but those are loaded at once.
+
+Group keys are normalized on read and write: public.kern1.x / public.kern2.x
+(UFO) and a bare "@x" become @MMK_L_x on the left and @MMK_R_x on the right.
+"""
+
+import collections
+import json
+import struct
+
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX
+
+
+FORMAT = "kernCore.pairs"
+VERSION = 1
+
+MAGIC = b"KCP\x01"
+
+# Etiquetes del format binari
+TAG_HEADER = b"H"   # uint32 llargada + objecte JSON
+TAG_MASTER = b"M"   # uint32 llargada + objecte JSON
+TAG_STRING = b"S"   # uint16 llargada + utf-8; rep el número següent
+TAG_PAIR = b"P"     # uint32 esquerre, uint32 dret
+TAG_INT = b"K"      # uint32, uint32, int32
+TAG_FLOAT = b"F"    # uint32, uint32, float64
+
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+_PAIR = struct.Struct("<II")
+_INT = struct.Struct("<IIi")
+_FLOAT = struct.Struct("<IId")
+
+PairRecord = collections.namedtuple("PairRecord", "master left right value")
+
+
+def normalizeKey(key, side):
+    """Kerning key in Glyphs form; side is "left" (first glyph of the pair) or "right"."""
+    key = str(key)
+    if key.startswith("public.kern1."):
+        return LEFT_PREFIX + key[len("public.kern1."):]
+    if key.startswith("public.kern2."):
+        return RIGHT_PREFIX + key[len("public.kern2."):]
+    if key.startswith("@") and not (key.startswith(LEFT_PREFIX) or key.startswith(RIGHT_PREFIX)):
+        return (LEFT_PREFIX if side == "left" else RIGHT_PREFIX) + key[1:]
+    return key
+
+
+def isBinary(path):
+    return str(path).lower().endswith(".kcp")
+
+
+# ======== WRITER ========
+
+class PairWriter(object):
+    """
+    Writes pairs one by one. binary=None picks the format from the extension
+    (.kcp binary, anything else line-delimited JSON).
+    """
+
+    def __init__(self, path, header=None, binary=None):
+        self.path = path
+        self.binary = isBinary(path) if binary is None else binary
+        self.count = 0
+        self._strings = {}
+        self._file = open(path, "wb" if self.binary else "w", **({} if self.binary else {"encoding": "utf-8"}))
+        header = dict(header or {})
+        header["format"] = FORMAT
+        header["version"] = VERSION
+        if self.binary:
+            self._file.write(MAGIC)
+            self._writeObject(TAG_HEADER, header)
+        else:
+            self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _writeObject(self, tag, obj):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self._file.write(tag + _UINT32.pack(len(data)) + data)
+
+    def _string(self, text):
+        number = self._strings.get(text)
+        if number is None:
+            number = self._strings[text] = len(self._strings)
+            data = text.encode("utf-8")
+            self._file.write(TAG_STRING + _UINT16.pack(len(data)) + data)
+        return number
+
+    def master(self, masterID, name=None):
+        """Start the pairs of a master."""
+        section = {"master": masterID}
+        if name:
+            section["masterName"] = name
+        if self.binary:
+            self._writeObject(TAG_MASTER, section)
+        else:
+            self._file.write(json.dumps(section, ensure_ascii=False) + "\n")
+
+    def write(self, left, right, value=None):
+        left = normalizeKey(left, "left")
+        right = normalizeKey(right, "right")
+        if self.binary:
+            l = self._string(left)
+            r = self._string(right)
+            if value is None:
+                self._file.write(TAG_PAIR + _PAIR.pack(l, r))
+            elif float(value).is_integer():
+                self._file.write(TAG_INT + _INT.pack(l, r, int(value)))
+            else:
+                self._file.write(TAG_FLOAT + _FLOAT.pack(l, r, float(value)))
+        else:
+            record = [left, right] if value is None else [left, right, value]
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def writeKerning(self, masterID, kerning, name=None, keyName=None):
+        """A {left: {right: value}} table as one master section; keyName(key) can rename the keys."""
+        self.master(masterID, name)
+        for left, rights in kerning.items():
+            left = keyName(left) if keyName else left
+            for right, value in rights.items():
+                self.write(left, keyName(right) if keyName else right, value)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ======== READER ========
+
+class PairReader(object):
+    """Iterates the PairRecords of a pair file; header and masters fill in while reading."""
+
+    def __init__(self, path, normalize=True):
+        self.path = path
+        self.normalize = normalize
+        self.header = {}
+        # masterID -> nom, en l'ordre del fitxer
+        self.masters = collections.OrderedDict()
+        self.legacy = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            start = f.read(len(MAGIC))
+        if start == MAGIC:
+            records = self._readBinary()
+        else:
+            records = self._readText()
+        for master, left, right, value in records:
+            if self.normalize:
+                left = normalizeKey(left, "left")
+                right = normalizeKey(right, "right")
+            yield PairRecord(master, left, right, value)
+
+    def _section(self, section):
+        master = section.get("master")
+        self.masters[master] = section.get("masterName") or master
+        return master
+
+    def _readText(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            first = f.readline()
+            try:
+                header = json.loads(first)
+            except ValueError:
+                header = None
+            if not isinstance(header, dict) or header.get("format") != FORMAT:
+                f.seek(0)
+                for record in self._readLegacy(json.load(f)):
+                    yield record
+                return
+            self.header = header
+            master = header.get("master")
+            if master is not None:
+                self._section(header)
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    master = self._section(item)
+                    continue
+                yield master, item[0], item[1], item[2] if len(item) > 2 else None
+
+    def _readLegacy(self, data):
+        self.legacy = True
+        if isinstance(data, dict) and isinstance(data.get("pairs"), list):
+            self.header = dict((k, v) for k, v in data.items() if k != "pairs")
+            for item in data["pairs"]:
+                if isinstance(item, (list, tuple)) and len(item) == 2:
+                    yield None, item[0], item[1], None
+            return
+        if isinstance(data, dict):
+            for left, rights in data.items():
+                if isinstance(rights, dict):
+                    for right, value in rights.items():
+                        yield None, left, right, value
+
+    def _readBinary(self):
+        strings = []
+        master = None
+        with open(self.path, "rb") as f:
+            f.read(len(MAGIC))
+            while True:
+                tag = f.read(1)
+                if not tag:
+                    break
+                if tag == TAG_STRING:
+                    size = _UINT16.unpack(f.read(_UINT16.size))[0]
+                    strings.append(f.read(size).decode("utf-8"))
+                elif tag == TAG_PAIR:
+                    l, r = _PAIR.unpack(f.read(_PAIR.size))
+                    yield master, strings[l], strings[r], None
+                elif tag == TAG_INT:
+                    l, r, v = _INT.unpack(f.read(_INT.size))
+                    yield master, strings[l], strings[r], v
+                elif tag == TAG_FLOAT:
+                    l, r, v = _FLOAT.unpack(f.read(_FLOAT.size))
+                    yield master, strings[l], strings[r], v
+                elif tag in (TAG_HEADER, TAG_MASTER):
+                    size = _UINT32.unpack(f.read(_UINT32.size))[0]
+                    obj = json.loads(f.read(size).decode("utf-8"))
+                    if tag == TAG_HEADER:
+                        self.header = obj
+                        if obj.get("master") is not None:
+                            master = self._section(obj)
+                    else:
+                        master = self._section(obj)
+                else:
+                    raise ValueError("Corrupt pair file %s: unknown tag %r" % (self.path, tag))
+
+
+def readPairs(path, normalize=True):
+    """PairRecords of a pair file (streamed, or loaded at once for the old JSON documents)."""
+    return iter(PairReader(path, normalize))
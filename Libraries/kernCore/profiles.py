@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# Description: Cached left/right ink profiles for O(slices) pair margins
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Sidebearing contour profiles.
+
+A profile stores, for every horizontal slice of SLICE_HEIGHT units, the
+leftmost and rightmost ink x of a decomposed layer. The margin of a pair is
+then a min over slice differences: the left profile of the right glyph
+(shifted by the advance of the left glyph) minus the right profile of the
+left glyph. With dilate=True neighbouring slices are also compared, using
+the vertical slice offset, which approximates the Euclidean distance.
+
+Profiles are cached per (glyph, master) in ProfileCache and reused by every
+pair that shares a glyph, and persisted through diskCache between sessions.
+"""
+
+import math
+
+from kernCore import diskCache, flatten, geometry, layers
+from kernCore.geometry import np
+
+
+SLICE_HEIGHT = 5.0
+
+# Distància vertical màxima que es té en compte en dilatar (None = sense límit)
+DILATE_REACH = None
+
+INF = float("inf")
+
+
+class SidebearingProfile(object):
+    """Extreme ink x per slice. Empty slices hold +inf (left) and -inf (right)."""
+
+    __slots__ = ("start", "left", "right", "sliceHeight", "width")
+
+    def __init__(self, start, left, right, sliceHeight, width):
+        self.start = start
+        self.sliceHeight = sliceHeight
+        self.width = width
+        if np is not None:
+            self.left = np.asarray(left, dtype=np.float64)
+            self.right = np.asarray(right, dtype=np.float64)
+        else:
+            self.left = list(left)
+            self.right = list(right)
+
+    def __len__(self):
+        return len(self.left)
+
+    def __getstate__(self):
+        return (self.start, list(self.left), list(self.right), self.sliceHeight, self.width)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+def buildProfile(segments, sliceHeight=SLICE_HEIGHT):
+    """SidebearingProfile from a SegmentArray (or anything packSegments accepts)."""
+    segments = geometry.packSegments(segments)
+    width = segments.width
+    if not len(segments):
+        return SidebearingProfile(0, [], [], sliceHeight, width)
+
+    h = float(sliceHeight)
+    bounds = segments.bounds
+    start = int(math.floor(bounds[1] / h))
+    count = int(math.floor(bounds[3] / h)) - start + 1
+    left = [INF] * count
+    right = [-INF] * count
+
+    for (x1, y1), (x2, y2) in segments.segments():
+        if y1 > y2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        lo = int(math.floor(y1 / h))
+        hi = int(math.floor(y2 / h))
+        dy = y2 - y1
+        for s in range(lo, hi + 1):
+            if dy == 0:
+                xa, xb = x1, x2
+            else:
+                # Retalla el segment a la franja [s*h, (s+1)*h]
+                ya = max(y1, s * h)
+                yb = min(y2, (s + 1) * h)
+                xa = x1 + (x2 - x1) * (ya - y1) / dy
+                xb = x1 + (x2 - x1) * (yb - y1) / dy
+            i = s - start
+            lowX = xa if xa < xb else xb
+            highX = xb if xa < xb else xa
+            if lowX < left[i]:
+                left[i] = lowX
+            if highX > right[i]:
+                right[i] = highX
+
+    return SidebearingProfile(start, left, right, h, width)
+
+
+def marginBetweenProfiles(profileL, profileR, dx, dilate=True, limit=geometry.DEFAULT_LIMIT, reach=DILATE_REACH):
+    """
+    Approximate minimum distance between the left glyph and the right glyph
+    shifted by dx. Returns `limit` when the profiles never face each other.
+    """
+    if not len(profileL) or not len(profileR):
+        return limit
+    if profileL.sliceHeight != profileR.sliceHeight:
+        raise ValueError("SidebearingProfile slice heights differ")
+    h = profileL.sliceHeight
+    maxOffset = max(len(profileL), len(profileR)) if dilate else 0
+    if dilate and reach is not None:
+        maxOffset = min(maxOffset, int(reach // h))
+    offsets = [0]
+    for k in range(1, maxOffset + 1):
+        offsets.append(k)
+        offsets.append(-k)
+
+    best = float(limit)
+    endL = profileL.start + len(profileL)
+    endR = profileR.start + len(profileR)
+    for k in offsets:
+        vertical = abs(k) * h
+        if vertical >= best:
+            break
+        # Franja s de L contra franja s+k de R
+        lo = max(profileL.start, profileR.start - k)
+        hi = min(endL, endR - k)
+        if hi <= lo:
+            continue
+        iL = lo - profileL.start
+        iR = lo + k - profileR.start
+        n = hi - lo
+        if np is not None:
+            gaps = profileR.left[iR:iR + n] + dx - profileL.right[iL:iL + n]
+            gap = float(gaps.min())
+        else:
+            rightL = profileL.right
+            leftR = profileR.left
+            gap = min(leftR[iR + j] + dx - rightL[iL + j] for j in range(n))
+        if gap == INF:
+            continue
+        d = math.hypot(max(gap, 0.0), vertical)
+        if d < best:
+            best = d
+            if best <= 0.0:
+                return 0.0
+    return best
+
+
+# ======== CACHE ========
+
+class ProfileCache(object):
+    """Profiles per (glyph, master), rebuilt only when the glyph or a component source changes."""
+
+    def __init__(self, sliceHeight=SLICE_HEIGHT):
+        self.sliceHeight = sliceHeight
+        self._profiles = {}
+
+    def profile(self, font, glyphName, masterID):
+        glyph, layer = layers.masterLayer(font, glyphName, masterID)
+        if layer is None:
+            return None
+        key = (glyphName, masterID)
+        token = layers.dependencyToken(font, glyphName, masterID)
+        cached = self._profiles.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        disk = diskCache.sharedCache
+        contentKey = disk.contentKey(font, glyphName, masterID)
+        kind = "profile-%s-%s" % (self.sliceHeight, flatten.sharedCache.tolerance)
+        profile = disk.get(contentKey, kind)
+        if profile is None:
+            # Contorn aplanat compartit: cada glif s'aplana una sola vegada per sessió
+            polylines = flatten.sharedCache.polylines(font, glyphName, masterID)
+            profile = buildProfile(polylines, self.sliceHeight)
+            disk.put(contentKey, kind, profile)
+        self._profiles[key] = (token, profile)
+        return profile
+
+    def marginForPair(self, font, masterID, leftName, rightName, dilate=True, limit=geometry.DEFAULT_LIMIT):
+        """Margin between two glyphs at their current spacing (kerning not applied)."""
+        profileL = self.profile(font, leftName, masterID)
+        profileR = self.profile(font, rightName, masterID)
+        if profileL is None or profileR is None:
+            return None
+        return marginBetweenProfiles(profileL, profileR, profileL.width, dilate, limit)
+
+    def invalidate(self, glyphName=None):
+        if glyphName is None:
+            self._profiles.clear()
+            return
+        for key in [k for k in self._profiles if k[0] == glyphName]:
+            del self._profiles[key]
+
+
+# Compartit per tots els scripts durant la sessió de Glyphs
+sharedCache = ProfileCache()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Description: Bulk removal of small kerning values across masters
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Small-kerning pruning.
+
+KerningTable flattens one master's kerning into three parallel arrays
+(left key, right key, value) plus the kind of each pair (glyph or group on
+each side). Threshold, sign and kind filters are evaluated over the whole
+array at once (numpy when available, array otherwise).
+
+Pruner keeps a table per master, previews how many pairs each master would
+lose and removes them with one KerningBatch per master. With everyMaster,
+a pair is only removed when it is small in every master (a master without
+the pair counts as 0), so the masters keep interpolating the same way.
+
+Sign filters, as in Kern Tools: NEGATIVE -threshold < v < 0, POSITIVE
+0 < v < threshold, ANY |v| <= threshold.
+"""
+
+from array import array
+
+from kernCore import kerningBatch
+from kernCore.kerning import kerningSnapshot
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+NEGATIVE = "negative"
+POSITIVE = "positive"
+ANY = "any"
+SIGNS = (NEGATIVE, POSITIVE, ANY)
+
+# Tipus de parella: bit 1 = grup a l'esquerra, bit 2 = grup a la dreta
+GLYPH_GLYPH = 0
+GROUP_GLYPH = 1
+GLYPH_GROUP = 2
+GROUP_GROUP = 3
+
+ALL = "all"
+GROUPS = "groups"
+EXCEPTIONS = "exceptions"
+GLYPHS = "glyphs"
+KINDS = {
+    ALL: (GLYPH_GLYPH, GROUP_GLYPH, GLYPH_GROUP, GROUP_GROUP),
+    GROUPS: (GROUP_GROUP,),
+    EXCEPTIONS: (GLYPH_GLYPH, GROUP_GLYPH, GLYPH_GROUP),
+    GLYPHS: (GLYPH_GLYPH,),
+}
+
+
+def _pairKind(left, right):
+    return (1 if left.startswith("@") else 0) | (2 if right.startswith("@") else 0)
+
+
+class KerningTable(object):
+    """One master's kerning as flat left / right / value / kind arrays."""
+
+    def __init__(self, masterID, snapshot):
+        self.masterID = masterID
+        self.lefts = []
+        self.rights = []
+        values = array("d")
+        kinds = array("b")
+        for left, rights in snapshot.items():
+            for right, value in rights.items():
+                self.lefts.append(left)
+                self.rights.append(right)
+                values.append(float(value))
+                kinds.append(_pairKind(left, right))
+        if np is not None:
+            self.values = np.frombuffer(values, dtype=np.float64) if len(values) else np.zeros(0)
+            self.kinds = np.frombuffer(kinds, dtype=np.int8) if len(kinds) else np.zeros(0, dtype=np.int8)
+        else:
+            self.values = values
+            self.kinds = kinds
+        self._pairs = None
+
+    def __len__(self):
+        return len(self.lefts)
+
+    def pairs(self):
+        """{(left, right): index}, built on first use."""
+        if self._pairs is None:
+            self._pairs = dict(((l, r), i) for i, (l, r) in enumerate(zip(self.lefts, self.rights)))
+        return self._pairs
+
+    def select(self, threshold, sign=NEGATIVE, kinds=ALL):
+        """Indices of the pairs that pass the filters."""
+        threshold = abs(float(threshold))
+        allowed = KINDS[kinds]
+        if np is not None:
+            v = self.values
+            if sign == NEGATIVE:
+                mask = (v < 0) & (v > -threshold)
+            elif sign == POSITIVE:
+                mask = (v > 0) & (v < threshold)
+            else:
+                mask = np.abs(v) <= threshold
+            if len(allowed) < 4:
+                mask &= np.isin(self.kinds, allowed)
+            return np.nonzero(mask)[0].tolist()
+        if sign == NEGATIVE:
+            small = lambda v: -threshold < v < 0
+        elif sign == POSITIVE:
+            small = lambda v: 0 < v < threshold
+        else:
+            small = lambda v: abs(v) <= threshold
+        return [i for i, (v, k) in enumerate(zip(self.values, self.kinds)) if k in allowed and small(v)]
+
+    def pair(self, i):
+        return self.lefts[i], self.rights[i], float(self.values[i])
+
+
+class Pruner(object):
+    """Small-value candidates and their removal for several masters."""
+
+    def __init__(self, font, masterIDs=None):
+        self.font = font
+        self.masterIDs = list(masterIDs) if masterIDs is not None else [m.id for m in font.masters]
+        self.tables = dict((mid, KerningTable(mid, kerningSnapshot(font, mid))) for mid in self.masterIDs)
+
+    def candidates(self, threshold, sign=NEGATIVE, kinds=ALL, everyMaster=False):
+        """{masterID: [(left, right, value)]} of the pairs to remove."""
+        selected = dict((mid, table.select(threshold, sign, kinds)) for mid, table in self.tables.items())
+        if everyMaster:
+            small = dict((mid, set((self.tables[mid].lefts[i], self.tables[mid].rights[i]) for i in indices))
+                         for mid, indices in selected.items())
+            # Un master sense la parella compta com a 0, que també és petit
+            safe = set(p for p in set().union(*small.values())
+                       if all(p in small[mid] or p not in table.pairs() for mid, table in self.tables.items()))
+            for mid, table in self.tables.items():
+                selected[mid] = [i for i in selected[mid] if (table.lefts[i], table.rights[i]) in safe]
+        return dict((mid, [self.tables[mid].pair(i) for i in indices]) for mid, indices in selected.items())
+
+    def counts(self, threshold, sign=NEGATIVE, kinds=ALL, everyMaster=False):
+        """{masterID: number of pairs that would be removed}."""
+        return dict((mid, len(pairs)) for mid, pairs in self.candidates(threshold, sign, kinds, everyMaster).items())
+
+    def prune(self, candidates, undoName="Delete Small Kerning"):
+        """Remove the candidates, one KerningBatch per master. {masterID: BatchReport}."""
+        reports = {}
+        for mid, pairs in candidates.items():
+            if not pairs:
+                continue
+            batch = kerningBatch.KerningBatch(self.font, undoName)
+            for left, right, _ in pairs:
+                batch.remove(mid, left, right)
+            reports[mid] = batch.apply()
+        self.tables = dict((mid, KerningTable(mid, kerningSnapshot(self.font, mid))) for mid in self.masterIDs)
+        return reports
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# Description: Multi-master kerning scaling with precompiled key filters
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Kerning scaling engine.
+
+KeyFilter turns a group filter ("@A @V") or a list of glyphs into the sets
+of kerning keys it matches on the left and on the right (glyph IDs, names
+and @MMK_ group keys), once, so testing a pair is two set lookups.
+
+planScale reads each selected master into a flat KerningTable, multiplies
+the values of the matching pairs by that master's factor in one array
+operation (numpy when available) and rounds them with a rounding policy.
+applyPlan writes every master in one KerningBatch (one undo step);
+scaleKerning does both.
+
+Used by Kerning Scale Tool, the Scale % tab of Kern Tools and Inspect Kern
+by Glyph.
+"""
+
+import math
+
+from kernCore import fontIndex, kerningBatch
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX, kerningSnapshot
+from kernCore.pruning import KerningTable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ROUND = "round"
+FLOOR = "floor"
+CEIL = "ceil"
+TOWARD_ZERO = "toward zero"
+KEEP = "keep"
+ROUNDINGS = (ROUND, FLOOR, CEIL, TOWARD_ZERO, KEEP)
+
+_ROUNDERS = {
+    ROUND: lambda v: int(round(v)),
+    FLOOR: lambda v: int(math.floor(v)),
+    CEIL: lambda v: int(math.ceil(v)),
+    TOWARD_ZERO: lambda v: int(v),
+    KEEP: float,
+}
+
+
+# ======== FILTERS ========
+
+class KeyFilter(object):
+    """Kerning keys matched on each side; a pair matches if either side does."""
+
+    def __init__(self, left=None, right=None):
+        self.left = set(left or ())
+        self.right = set(right or ())
+
+    @classmethod
+    def forGroups(cls, groups):
+        """Filter for group names as typed: "@A", "A" or "@MMK_L_A" match @MMK_L_A and @MMK_R_A."""
+        keys = set()
+        for group in groups:
+            group = str(group).strip()
+            if not group:
+                continue
+            if group.startswith(LEFT_PREFIX) or group.startswith(RIGHT_PREFIX):
+                group = group[len(LEFT_PREFIX):]
+            group = group.lstrip("@")
+            keys.update(("@" + group, LEFT_PREFIX + group, RIGHT_PREFIX + group))
+        return cls(keys, keys)
+
+    @classmethod
+    def forGlyphs(cls, font, names):
+        """Filter for pairs of these glyphs: their ID or name, or the group they kern with on that side."""
+        index = fontIndex.indexForFont(font)
+        left = set()
+        right = set()
+        for name in names:
+            glyph = index.glyph(name)
+            if glyph is None:
+                continue
+            keys = set(k for k in (getattr(glyph, "id", None), glyph.name) if k)
+            left.update(keys)
+            right.update(keys)
+            if glyph.rightKerningGroup:
+                left.add(LEFT_PREFIX + glyph.rightKerningGroup)
+            if glyph.leftKerningGroup:
+                right.add(RIGHT_PREFIX + glyph.leftKerningGroup)
+        return cls(left, right)
+
+    def matches(self, left, right):
+        return left in self.left or right in self.right
+
+
+# ======== SCALE ========
+
+def _scaled(values, factor, rounding):
+    """values * factor rounded, for a numpy array or a list."""
+    if np is not None:
+        scaled = np.asarray(values, dtype=np.float64) * factor
+        if rounding == ROUND:
+            scaled = np.round(scaled)
+        elif rounding == FLOOR:
+            scaled = np.floor(scaled)
+        elif rounding == CEIL:
+            scaled = np.ceil(scaled)
+        elif rounding == TOWARD_ZERO:
+            scaled = np.trunc(scaled)
+        if rounding == KEEP:
+            return scaled.tolist()
+        return [int(v) for v in scaled.tolist()]
+    rounder = _ROUNDERS[rounding]
+    return [rounder(v * factor) for v in values]
+
+
+def planScale(font, factors, keyFilter=None, rounding=ROUND, skipUnchanged=True):
+    """
+    {masterID: [(left, right, old, new)]} for factors {masterID: factor}.
+    keyFilter None scales every pair.
+    """
+    plan = {}
+    for masterID, factor in factors.items():
+        table = KerningTable(masterID, kerningSnapshot(font, masterID))
+        if keyFilter is None:
+            indices = list(range(len(table)))
+        else:
+            left, right = keyFilter.left, keyFilter.right
+            indices = [i for i, (l, r) in enumerate(zip(table.lefts, table.rights)) if l in left or r in right]
+        if np is not None:
+            old = table.values[indices].tolist() if indices else []
+        else:
+            old = [float(table.values[i]) for i in indices]
+        new = _scaled(old, float(factor), rounding)
+        changes = []
+        for i, before, after in zip(indices, old, new):
+            if skipUnchanged and after == before:
+                continue
+            changes.append((table.lefts[i], table.rights[i], before, after))
+        plan[masterID] = changes
+    return plan
+
+
+def applyPlan(font, plan, undoName="Scale Kerning"):
+    """Write a plan from planScale in one KerningBatch; returns the BatchReport."""
+    batch = kerningBatch.KerningBatch(font, undoName)
+    for masterID, changes in plan.items():
+        for left, right, _, value in changes:
+            batch.set(masterID, left, right, value)
+    return batch.apply()
+
+
+def scaleKerning(font, factors, keyFilter=None, rounding=ROUND, undoName="Scale Kerning", skipUnchanged=True):
+    """(plan, report): scale the masters in factors and write them in one undo step."""
+    plan = planScale(font, factors, keyFilter, rounding, skipUnchanged)
+    return plan, applyPlan(font, plan, undoName)
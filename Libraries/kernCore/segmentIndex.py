@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# Description: Y-banded spatial index over packed outline segments
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Y-banded index for collision and margin queries.
+
+Every segment is bucketed into the horizontal bands (of BAND_HEIGHT units)
+its vertical range touches. Each band keeps the horizontal ink extent of its
+segments, which gives a cheap lower bound for the distance between a band of
+the left glyph and a band of the right glyph. A pair query only visits band
+pairs whose lower bound is under the margin, nearest first: the right edge
+of the left glyph against the left edge of the right glyph.
+
+IndexCache hands out (index, bbox, advance) per (glyph, master) for the
+collision sweeps, built from flatten.sharedCache (and so from the on-disk
+cache when the glyph has not changed since an earlier run).
+"""
+
+import math
+
+from kernCore import flatten, geometry, layers
+from kernCore.geometry import np
+
+
+BAND_HEIGHT = 40.0
+
+
+class SegmentIndex(object):
+    """Bands of segment indices plus per-band x extents for one layer."""
+
+    __slots__ = ("segments", "bandHeight", "bands", "width")
+
+    def __init__(self, segments, bandHeight=BAND_HEIGHT):
+        self.segments = segments
+        self.bandHeight = float(bandHeight)
+        self.width = segments.width
+        # band -> [indices, minX, maxX]
+        bands = {}
+        h = self.bandHeight
+        for i, ((x1, y1), (x2, y2)) in enumerate(segments.segments()):
+            lo = int(math.floor(min(y1, y2) / h))
+            hi = int(math.floor(max(y1, y2) / h))
+            sMin = min(x1, x2)
+            sMax = max(x1, x2)
+            for b in range(lo, hi + 1):
+                entry = bands.get(b)
+                if entry is None:
+                    bands[b] = [[i], sMin, sMax]
+                else:
+                    entry[0].append(i)
+                    if sMin < entry[1]:
+                        entry[1] = sMin
+                    if sMax > entry[2]:
+                        entry[2] = sMax
+        if np is not None:
+            for entry in bands.values():
+                entry[0] = np.asarray(entry[0], dtype=np.intp)
+        self.bands = bands
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def bounds(self):
+        return self.segments.bounds
+
+
+def indexSegments(layer, bandHeight=BAND_HEIGHT):
+    """SegmentIndex for a layer, a SegmentArray or an existing index."""
+    if isinstance(layer, SegmentIndex):
+        return layer
+    return SegmentIndex(geometry.packSegments(layer), bandHeight)
+
+
+def facingBandPairs(indexL, indexR, dx, pad):
+    """
+    (lowerBound, bandL, bandR) for every band pair that can come closer than
+    pad once the right glyph is shifted by dx, sorted nearest first.
+    """
+    if indexL.bandHeight != indexR.bandHeight:
+        raise ValueError("SegmentIndex band heights differ")
+    h = indexL.bandHeight
+    reach = int(math.ceil(pad / h)) + 1
+    bandsR = indexR.bands
+    pairs = []
+    for bL, (_, _, maxXL) in indexL.bands.items():
+        for bR in range(bL - reach, bL + reach + 1):
+            entry = bandsR.get(bR)
+            if entry is None:
+                continue
+            gapY = (abs(bL - bR) - 1) * h
+            gapX = entry[1] + dx - maxXL
+            lower = max(gapX, gapY, 0.0)
+            if lower < pad:
+                pairs.append((lower, bL, bR))
+    pairs.sort()
+    return pairs
+
+
+def minDistanceIndexed(indexL, indexR, dx=0.0, limit=geometry.DEFAULT_LIMIT, stopBelow=None):
+    """
+    Same result as geometry.minDistancePacked, but only band pairs that can
+    beat the current best are compared. With stopBelow, returns as soon as a
+    distance below it is found.
+    """
+    if not len(indexL) or not len(indexR):
+        return limit
+    best = float(limit)
+    segsL = indexL.segments
+    segsR = indexR.segments
+    for lower, bL, bR in facingBandPairs(indexL, indexR, dx, best):
+        if lower >= best:
+            break
+        d = geometry.minDistanceSubset(
+            segsL, indexL.bands[bL][0], segsR, indexR.bands[bR][0], dx, best)
+        if d < best:
+            best = d
+            if best <= 0.0:
+                return 0.0
+            if stopBelow is not None and best < stopBelow:
+                return best
+    return best
+
+
+def indexedAreClose(indexL, indexR, dx, margin):
+    """True if the two indexed layers come closer than margin at offset dx."""
+    return minDistanceIndexed(indexL, indexR, dx, limit=margin, stopBelow=margin) < margin
+
+
+# ======== CACHE ========
+
+class IndexCache(object):
+    """(SegmentIndex, bbox, advance) per (glyph, master), rebuilt only when the glyph or a component source changes."""
+
+    def __init__(self, bandHeight=BAND_HEIGHT):
+        self.bandHeight = bandHeight
+        self._entries = {}
+
+    def geometry(self, font, glyphName, masterID):
+        """(index, (xMin, yMin, xMax, yMax), width) of the decomposed master layer, or None."""
+        glyph, layer = layers.masterLayer(font, glyphName, masterID)
+        if layer is None:
+            return None
+        key = (glyphName, masterID)
+        token = layers.dependencyToken(font, glyphName, masterID)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        polylines = flatten.sharedCache.polylines(font, glyphName, masterID)
+        index = SegmentIndex(geometry.packSegments(polylines), self.bandHeight)
+        entry = (index, index.bounds or (0, 0, 0, 0), index.width)
+        self._entries[key] = (token, entry)
+        return entry
+
+    def invalidate(self, glyphName=None):
+        if glyphName is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == glyphName]:
+            del self._entries[key]
+
+
+# Compartit per tots els scripts durant la sessió de Glyphs
+sharedCache = IndexCache()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# Description: Uppercase to small-cap kerning key table and transfer passes
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Small-cap kerning transfer.
+
+SmallCapMap reads the glyph names and the kerning of the masters once and
+builds every table the Kern to SC transfer needs: for each kerning key its
+glyph name, case, the key to write with, and its small-cap key (glyph and
+group keys), plus the group analysis of the group aware mode. The transfer
+passes are then one loop over the kerning snapshot with dict lookups; they
+return the writes, to be applied in one KerningBatch.
+
+Two modes, as in Kern Tools:
+
+* upperToUpperSC – every pair whose keys both have a .sc glyph
+  (A -> a.sc / A.sc, @MMK_L_A -> @MMK_L_a.sc), selected master
+* upperLowerSC – uppercase against lowercase in both orders, the lowercase
+  side replaced by its small cap; a group side is expanded to the small caps
+  of the glyphs kerned against that group
+"""
+
+import collections
+
+from kernCore import fontIndex
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX, kerningSnapshot
+from kernCore.kerningBatch import storedValue
+
+
+SUFFIX = ".sc"
+
+UPPER = "upper"
+LOWER = "lower"
+
+# Una escriptura proposada: valor nou i valor que ja hi havia (None si no n'hi havia)
+SCWrite = collections.namedtuple("SCWrite", "left right value existing")
+
+
+def scCandidates(name):
+    """Small-cap names tried for a glyph, in order."""
+    return (name + SUFFIX, name.lower() + SUFFIX, name.upper() + SUFFIX, name.capitalize() + SUFFIX)
+
+
+def _isGroup(key):
+    return key.startswith(LEFT_PREFIX) or key.startswith(RIGHT_PREFIX)
+
+
+class SmallCapMap(object):
+    """Every kerning key of the masters mapped once to its small-cap key."""
+
+    def __init__(self, font, masterIDs=None):
+        self.font = font
+        self.index = fontIndex.indexForFont(font)
+        self.masterIDs = list(masterIDs) if masterIDs is not None else [m.id for m in font.masters]
+        self.snapshots = dict((mid, kerningSnapshot(font, mid)) for mid in self.masterIDs)
+        self.glyphNames = set(g.name for g in font.glyphs)
+        # key -> nom del glif (nom del grup per a les claus de grup)
+        self.names = {}
+        # key -> clau per setKerningForPair (grups tal qual, IDs com a noms)
+        self.settingKeys = {}
+        # key -> UPPER / LOWER / None
+        self.cases = {}
+        # key -> clau .sc del mode Uppercase → Uppercase (.sc)
+        self.fixed = {}
+        # key -> clau .sc del mode Uppercase-Lowercase → SC
+        self.equivalents = {}
+        # grup -> {"left": noms, "right": noms} dels glifs kernejats contra el grup
+        self.groups = {}
+        # nom del glif -> nom del seu .sc
+        self.memberSC = {}
+        self._build()
+
+    def _build(self):
+        keys = set()
+        for snapshot in self.snapshots.values():
+            for left, rights in snapshot.items():
+                keys.add(left)
+                keys.update(rights)
+        for key in keys:
+            self._addKey(key)
+
+        names = self.names
+        for snapshot in self.snapshots.values():
+            for left, rights in snapshot.items():
+                leftName = names[left]
+                for right in rights:
+                    if right.startswith(RIGHT_PREFIX) and leftName in self.glyphNames:
+                        self._group(right[len(RIGHT_PREFIX):])["left"].add(leftName)
+                    if left.startswith(LEFT_PREFIX):
+                        rightName = names[right]
+                        if rightName in self.glyphNames:
+                            self._group(left[len(LEFT_PREFIX):])["right"].add(rightName)
+
+        for members in self.groups.values():
+            for name in members["left"] | members["right"]:
+                if name not in self.memberSC:
+                    self.memberSC[name] = self._scName(name)
+
+    def _group(self, name):
+        members = self.groups.get(name)
+        if members is None:
+            members = self.groups[name] = {"left": set(), "right": set()}
+        return members
+
+    def _scName(self, name):
+        for candidate in scCandidates(name):
+            if candidate in self.glyphNames:
+                return candidate
+        return None
+
+    def _addKey(self, key):
+        if _isGroup(key):
+            prefix, name = key[:len(LEFT_PREFIX)], key[len(LEFT_PREFIX):]
+            settingKey = key
+            sc = name.lower() + SUFFIX
+            fixed = prefix + sc if sc in self.glyphNames else None
+        else:
+            glyph = self.index.glyphForKey(key)
+            name = glyph.name if glyph is not None else None
+            settingKey = name
+            prefix = ""
+            fixed = name + SUFFIX if name and name + SUFFIX in self.glyphNames else None
+        equivalent = None
+        if name:
+            sc = self._scName(name)
+            if sc:
+                equivalent = prefix + sc
+        case = None
+        if name:
+            if name[0].isupper():
+                case = UPPER
+            elif name[0].islower():
+                case = LOWER
+        self.names[key] = name
+        self.settingKeys[key] = settingKey
+        self.cases[key] = case
+        self.fixed[key] = fixed
+        self.equivalents[key] = equivalent
+
+    def existing(self, masterID, left, right):
+        """Value already stored for the pair before the transfer, or None."""
+        return storedValue(self.snapshots[masterID], self.index, left, right)
+
+
+# ======== TRANSFER ========
+
+def upperToUpperSC(scMap, masterID, factor, overwrite=True):
+    """(writes, skipped) of Uppercase → Uppercase (.sc); the first pair wins for each .sc pair."""
+    writes = []
+    skipped = collections.Counter()
+    seen = set()
+    fixed = scMap.fixed
+    for left, rights in scMap.snapshots[masterID].items():
+        leftSC = fixed[left]
+        for right, value in rights.items():
+            if SUFFIX in left or SUFFIX in right:
+                skipped["already small cap"] += 1
+                continue
+            rightSC = fixed[right]
+            if not leftSC or not rightSC:
+                skipped["no .sc glyph"] += 1
+                continue
+            if (leftSC, rightSC) in seen:
+                continue
+            seen.add((leftSC, rightSC))
+            try:
+                newValue = int(round(float(value) * factor))
+            except (TypeError, ValueError):
+                continue
+            existing = scMap.existing(masterID, leftSC, rightSC)
+            if existing is not None and not overwrite:
+                skipped["exists"] += 1
+                continue
+            writes.append(SCWrite(leftSC, rightSC, newValue, existing))
+    return writes, skipped
+
+
+def upperLowerSC(scMap, masterID, factor, overwrite=True):
+    """(writes, skipped) of Uppercase-Lowercase → SC (group aware) for one master."""
+    writes = []
+    skipped = collections.Counter()
+    seen = set()
+    cases = scMap.cases
+    names = scMap.names
+    settingKeys = scMap.settingKeys
+
+    def propose(left, right, value):
+        if (left, right) in seen:
+            return
+        seen.add((left, right))
+        existing = scMap.existing(masterID, left, right)
+        if existing is not None and not overwrite:
+            skipped["exists"] += 1
+            return
+        writes.append(SCWrite(left, right, round(value * factor), existing))
+
+    for left, rights in scMap.snapshots[masterID].items():
+        for right, value in rights.items():
+            # Cas 1: majúscula a l'esquerra, minúscula a la dreta (T + @MMK_R_o)
+            if cases[left] == UPPER and cases[right] == LOWER:
+                base = settingKeys[left]
+                if right.startswith(RIGHT_PREFIX):
+                    members = scMap.groups.get(right[len(RIGHT_PREFIX):])
+                    if members is None or names[left] not in members["left"]:
+                        skipped["not a group member"] += 1
+                        continue
+                    for member in sorted(members["right"]):
+                        sc = scMap.memberSC.get(member)
+                        if sc:
+                            propose(base, RIGHT_PREFIX + sc, value)
+                else:
+                    target = scMap.equivalents[right]
+                    if not target or not base:
+                        skipped["no .sc glyph"] += 1
+                        continue
+                    propose(base, target, value)
+
+            # Cas 2: minúscula a l'esquerra, majúscula a la dreta (@MMK_L_o + T)
+            elif cases[left] == LOWER and cases[right] == UPPER:
+                base = settingKeys[right]
+                if left.startswith(LEFT_PREFIX):
+                    members = scMap.groups.get(left[len(LEFT_PREFIX):])
+                    if members is None or names[right] not in members["right"]:
+                        skipped["not a group member"] += 1
+                        continue
+                    for member in sorted(members["left"]):
+                        sc = scMap.memberSC.get(member)
+                        if sc:
+                            propose(LEFT_PREFIX + sc, base, value)
+                else:
+                    target = scMap.equivalents[left]
+                    if not target or not base:
+                        skipped["no .sc glyph"] += 1
+                        continue
+                    propose(target, base, value)
+    return writes, skipped
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+# Description: Incremental kerning checkpoints with differential restore
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Kerning checkpoints.
+
+A SnapshotStore keeps, per master, a chain of checkpoints: a base file with
+the whole kerning and then delta files with only the pairs that changed
+since the previous checkpoint (value None = pair removed). Any checkpoint is
+rebuilt by reading its base and replaying the deltas up to it.
+
+Restoring never replays a whole backup: diff() compares the current kerning
+with the checkpoint and restore() writes only those changes and removals,
+in one KerningBatch (one undo step).
+
+Pairs are kept as stored in font.kerning (glyph IDs in Glyphs 3, group keys
+as @MMK_L_x / @MMK_R_x), so a diff against the live font is exact. Files
+are pairStream .kcp; index.json lists the checkpoints. Stores live outside
+the geometry cache folder so its eviction never deletes them.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from kernCore import kerning, kerningBatch, pairStream
+
+
+BASE = "base"
+DELTA = "delta"
+
+# Nova base quan la cadena de deltes és massa llarga o el canvi és massa gran
+MAX_CHAIN = 20
+MAX_DELTA_RATIO = 0.5
+
+
+def defaultDirectory():
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "kernCore", "snapshots")
+
+
+def fontKey(font):
+    """Stable folder name for a font: its file path, or the family name for unsaved fonts."""
+    source = getattr(font, "filepath", None) or getattr(font, "familyName", None) or "Untitled"
+    return hashlib.sha1(str(source).encode("utf-8")).hexdigest()[:16]
+
+
+def flatKerning(font, masterID):
+    """{(leftKey, rightKey): value} of a master's kerning."""
+    pairs = {}
+    for left, rights in kerning.kerningSnapshot(font, masterID).items():
+        for right, value in rights.items():
+            pairs[(left, right)] = value
+    return pairs
+
+
+def diff(current, target):
+    """
+    (changes, removals) that turn current into target, both {(left, right): value}:
+    changes is {(left, right): value}, removals a list of (left, right).
+    """
+    changes = {}
+    for pair, value in target.items():
+        if current.get(pair) != value:
+            changes[pair] = value
+    removals = [pair for pair in current if pair not in target]
+    return changes, removals
+
+
+class Snapshot(object):
+    """One checkpoint of one master, as listed in index.json."""
+
+    __slots__ = ("id", "masterID", "kind", "parent", "label", "time", "pairs", "changes", "file")
+
+    def __init__(self, id, masterID, kind, parent=None, label="", time=0.0, pairs=0, changes=0, file=""):
+        self.id = id
+        self.masterID = masterID
+        self.kind = kind
+        self.parent = parent
+        self.label = label
+        self.time = time
+        self.pairs = pairs
+        self.changes = changes
+        self.file = file
+
+    def toDict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def title(self):
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.time))
+        text = "#%d  %s  (%d pairs" % (self.id, stamp, self.pairs)
+        if self.kind == DELTA:
+            text += ", %d changed" % self.changes
+        text += ")"
+        if self.label:
+            text += "  %s" % self.label
+        return text
+
+
+class SnapshotStore(object):
+    """Checkpoints of one font, in their own folder."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._snapshots = []
+        # masterID -> (snapshotID, estat) de l'últim estat reconstruït
+        self._states = {}
+        self._load()
+
+    def _indexPath(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load(self):
+        try:
+            with open(self._indexPath(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data.get("snapshots", []):
+            try:
+                self._snapshots.append(Snapshot(**item))
+            except TypeError:
+                continue
+
+    def _save(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"snapshots": [s.toDict() for s in self._snapshots]}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self._indexPath())
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    # ======== QUERIES ========
+
+    def snapshots(self, masterID=None):
+        """Checkpoints, oldest first, of one master or of every master."""
+        return [s for s in self._snapshots if masterID is None or s.masterID == masterID]
+
+    def snapshot(self, snapshotID):
+        for s in self._snapshots:
+            if s.id == snapshotID:
+                return s
+        raise KeyError("No checkpoint %r" % snapshotID)
+
+    def latest(self, masterID):
+        found = self.snapshots(masterID)
+        return found[-1] if found else None
+
+    def _chain(self, snapshot):
+        """Snapshots from the base up to snapshot."""
+        chain = [snapshot]
+        while chain[-1].kind != BASE:
+            chain.append(self.snapshot(chain[-1].parent))
+        chain.reverse()
+        return chain
+
+    def state(self, snapshotID):
+        """{(left, right): value} of a checkpoint (base plus its deltas)."""
+        snapshot = self.snapshot(snapshotID)
+        cached = self._states.get(snapshot.masterID)
+        if cached is not None and cached[0] == snapshot.id:
+            return dict(cached[1])
+        pairs = {}
+        for link in self._chain(snapshot):
+            if link.kind == BASE:
+                pairs = {}
+            for record in pairStream.readPairs(os.path.join(self.directory, link.file), normalize=False):
+                if record.value is None:
+                    pairs.pop((record.left, record.right), None)
+                else:
+                    pairs[(record.left, record.right)] = record.value
+        self._states[snapshot.masterID] = (snapshot.id, pairs)
+        return dict(pairs)
+
+    # ======== WRITE ========
+
+    def checkpoint(self, font, masterID, label=""):
+        """
+        Store the master's current kerning. Writes a delta against the latest
+        checkpoint, or a new base; returns None when nothing changed.
+        """
+        current = flatKerning(font, masterID)
+        latest = self.latest(masterID)
+        kind = BASE
+        changes, removals = current, []
+        if latest is not None:
+            changes, removals = diff(self.state(latest.id), current)
+            if not changes and not removals:
+                return None
+            size = len(changes) + len(removals)
+            if len(self._chain(latest)) <= MAX_CHAIN and size <= MAX_DELTA_RATIO * max(len(current), 1):
+                kind = DELTA
+            else:
+                changes, removals = current, []
+
+        snapshotID = max([s.id for s in self._snapshots] or [0]) + 1
+        snapshot = Snapshot(
+            snapshotID, masterID, kind,
+            parent=latest.id if kind == DELTA else None,
+            label=label or "", time=time.time(), pairs=len(current),
+            changes=len(changes) + len(removals),
+            file="%s-%04d.kcp" % (kind, snapshotID),
+        )
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        header = {"kind": kind, "parent": snapshot.parent, "label": snapshot.label}
+        with pairStream.PairWriter(os.path.join(self.directory, snapshot.file), header) as writer:
+            writer.master(masterID)
+            for (left, right), value in changes.items():
+                writer.write(left, right, value)
+            for left, right in removals:
+                writer.write(left, right, None)
+        self._snapshots.append(snapshot)
+        self._save()
+        self._states[masterID] = (snapshotID, current)
+        return snapshot
+
+    def restore(self, font, masterID, snapshotID, undoName="Restore Kerning Checkpoint"):
+        """
+        Bring the master back to a checkpoint writing only the pairs that differ.
+        The checkpoint may come from another master (copies its kerning). Returns
+        the BatchReport.
+        """
+        changes, removals = diff(flatKerning(font, masterID), self.state(snapshotID))
+        batch = kerningBatch.KerningBatch(font, undoName)
+        for (left, right), value in changes.items():
+            batch.set(masterID, left, right, value)
+        for left, right in removals:
+            batch.remove(masterID, left, right)
+        return batch.apply()
+
+    def delete(self, masterID=None):
+        """Forget the checkpoints of a master (or of every master) and their files."""
+        keep = []
+        for s in self._snapshots:
+            if masterID is None or s.masterID == masterID:
+                try:
+                    os.remove(os.path.join(self.directory, s.file))
+                except OSError:
+                    pass
+            else:
+                keep.append(s)
+        self._snapshots = keep
+        if masterID is None:
+            self._states.clear()
+        else:
+            self._states.pop(masterID, None)
+        self._save()
+
+
+_stores = {}
+
+
+def storeForFont(font, directory=None):
+    """The SnapshotStore of a font, shared for the session."""
+    path = os.path.join(directory or defaultDirectory(), fontKey(font))
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = SnapshotStore(path)
+    return store
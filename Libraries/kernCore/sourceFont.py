@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+# Description: Plain font model and loaders for .glyphs, UFO and JSON sources
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Font-object adapter for running kernCore outside GlyphsApp.
+
+SourceFont, SourceGlyph, SourceLayer, SourcePath, SourceNode and
+SourceComponent expose the same attributes kernCore reads from a GSFont
+(font.glyphs[name].layers[masterID].paths/nodes/components/width,
+font.masters, font.kerning, kerning groups, setKerningForPair...), so every
+kernCore module runs on them unchanged.
+
+loadFont(path) reads:
+
+    .glyphs / .glyphspackage   through glyphsLib (optional)
+    .ufo                       through fontTools.ufoLib (optional), one master
+    .json                      the stand-in model written by dumpFont()
+
+Missing optional libraries raise ImportError with the package to install.
+"""
+
+import json
+import os
+
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX
+
+
+UFO_LEFT_PREFIX = "public.kern1."
+UFO_RIGHT_PREFIX = "public.kern2."
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+# ======== MODEL ========
+
+class SourceNode(object):
+
+    __slots__ = ("x", "y", "type")
+
+    def __init__(self, x, y, type="line"):
+        self.x = float(x)
+        self.y = float(y)
+        self.type = type
+
+
+class SourcePath(object):
+
+    def __init__(self, nodes, closed=True):
+        self.nodes = list(nodes)
+        self.closed = closed
+
+    def transformed(self, t):
+        a, b, c, d, e, f = t
+        return SourcePath([SourceNode(a * n.x + c * n.y + e, b * n.x + d * n.y + f, n.type) for n in self.nodes], self.closed)
+
+
+class SourceComponent(object):
+
+    def __init__(self, componentName, transform=IDENTITY):
+        self.componentName = componentName
+        self.transform = tuple(float(v) for v in transform)
+
+
+def _compose(outer, inner):
+    """Transform that applies inner first and then outer."""
+    a1, b1, c1, d1, e1, f1 = outer
+    a2, b2, c2, d2, e2, f2 = inner
+    return (
+        a1 * a2 + c1 * b2, b1 * a2 + d1 * b2,
+        a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+        a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1,
+    )
+
+
+class SourceLayer(object):
+
+    def __init__(self, width=0, paths=(), components=(), associatedMasterId=None):
+        self.width = float(width)
+        self.paths = list(paths)
+        self.components = list(components)
+        self.associatedMasterId = associatedMasterId
+        self.layerId = associatedMasterId
+        self.parent = None
+
+    def copyDecomposedLayer(self):
+        """Copy with every component (recursively) replaced by its transformed outlines."""
+        layer = SourceLayer(self.width, associatedMasterId=self.associatedMasterId)
+        layer.parent = self.parent
+        font = self.parent.parent if self.parent is not None else None
+        stack = [(self, IDENTITY, ())]
+        while stack:
+            source, transform, chain = stack.pop()
+            for path in source.paths:
+                layer.paths.append(path.transformed(transform) if transform != IDENTITY else SourcePath(path.nodes, path.closed))
+            if font is None:
+                continue
+            for component in source.components:
+                name = component.componentName
+                glyph = font.glyphs[name]
+                if glyph is None or name in chain:
+                    continue
+                base = glyph.layers[self.associatedMasterId]
+                if base is not None:
+                    stack.append((base, _compose(transform, component.transform), chain + (name,)))
+        return layer
+
+
+class SourceLayers(dict):
+    """Layers by master ID; a missing master gives None, as in GlyphsApp."""
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+
+class SourceGlyph(object):
+
+    def __init__(self, name, unicodes=(), category=None, leftKerningGroup=None, rightKerningGroup=None, id=None):
+        self.name = name
+        self.id = id or name
+        self.unicodes = list(unicodes)
+        self.category = category
+        self.leftKerningGroup = leftKerningGroup
+        self.rightKerningGroup = rightKerningGroup
+        self.lastChange = 0
+        self.layers = SourceLayers()
+        self.parent = None
+
+    @property
+    def unicode(self):
+        return self.unicodes[0] if self.unicodes else None
+
+    def setLayer(self, masterID, layer):
+        layer.parent = self
+        layer.associatedMasterId = layer.layerId = masterID
+        self.layers[masterID] = layer
+
+
+class SourceGlyphs(object):
+    """font.glyphs: iterable, indexed by name (None when missing), `in` by name."""
+
+    def __init__(self):
+        self._glyphs = []
+        self._byName = {}
+
+    def __iter__(self):
+        return iter(self._glyphs)
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def __contains__(self, name):
+        return name in self._byName
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._glyphs[key]
+        return self._byName.get(key)
+
+    def keys(self):
+        return [g.name for g in self._glyphs]
+
+    def append(self, glyph):
+        self._glyphs.append(glyph)
+        self._byName[glyph.name] = glyph
+
+
+class SourceMaster(object):
+
+    def __init__(self, id, name=None, axes=()):
+        self.id = id
+        self.name = name or id
+        self.axes = list(axes)
+
+
+class SourceFont(object):
+
+    def __init__(self, path=None):
+        self.filepath = path
+        self.masters = []
+        self.glyphs = SourceGlyphs()
+        # {masterID: {leftKey: {rightKey: valor}}}
+        self.kerning = {}
+
+    def addGlyph(self, glyph):
+        glyph.parent = self
+        self.glyphs.append(glyph)
+        return glyph
+
+    def master(self, key):
+        """Master by ID or name."""
+        for master in self.masters:
+            if key in (master.id, master.name):
+                return master
+        return None
+
+    def _storedKey(self, key):
+        # com GSFont: els noms de glif es desen sota l'ID del glif
+        glyph = None if key.startswith("@") else self.glyphs[key]
+        return glyph.id if glyph is not None else key
+
+    def setKerningForPair(self, masterID, leftKey, rightKey, value):
+        leftKey, rightKey = self._storedKey(leftKey), self._storedKey(rightKey)
+        self.kerning.setdefault(masterID, {}).setdefault(leftKey, {})[rightKey] = value
+
+    def removeKerningForPair(self, masterID, leftKey, rightKey):
+        rights = self.kerning.get(masterID, {}).get(self._storedKey(leftKey))
+        if rights is not None:
+            rights.pop(self._storedKey(rightKey), None)
+
+
+# ======== JSON ========
+
+def fontFromDict(data, path=None):
+    font = SourceFont(path)
+    for m in data.get("masters", []):
+        font.masters.append(SourceMaster(m["id"], m.get("name"), m.get("axes", ())))
+    for g in data.get("glyphs", []):
+        glyph = SourceGlyph(g["name"], g.get("unicodes", ()), g.get("category"),
+                            g.get("leftKerningGroup"), g.get("rightKerningGroup"), g.get("id"))
+        for masterID, l in g.get("layers", {}).items():
+            paths = [SourcePath([SourceNode(*n) for n in p["nodes"]], p.get("closed", True)) for p in l.get("paths", [])]
+            components = [SourceComponent(c["name"], c.get("transform", IDENTITY)) for c in l.get("components", [])]
+            glyph.setLayer(masterID, SourceLayer(l.get("width", 0), paths, components))
+        font.addGlyph(glyph)
+    for masterID, pairs in data.get("kerning", {}).items():
+        font.kerning[masterID] = dict((left, dict(rights)) for left, rights in pairs.items())
+    return font
+
+
+def fontToDict(font):
+    glyphs = []
+    for glyph in font.glyphs:
+        layers = {}
+        for masterID, layer in glyph.layers.items():
+            layers[masterID] = {
+                "width": layer.width,
+                "paths": [{"closed": p.closed, "nodes": [[n.x, n.y, n.type] for n in p.nodes]} for p in layer.paths],
+                "components": [{"name": c.componentName, "transform": list(c.transform)} for c in layer.components],
+            }
+        glyphs.append({
+            "name": glyph.name, "unicodes": glyph.unicodes, "category": glyph.category,
+            "leftKerningGroup": glyph.leftKerningGroup, "rightKerningGroup": glyph.rightKerningGroup,
+            "layers": layers,
+        })
+    return {
+        "masters": [{"id": m.id, "name": m.name, "axes": m.axes} for m in font.masters],
+        "glyphs": glyphs,
+        "kerning": font.kerning,
+    }
+
+
+def dumpFont(font, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fontToDict(font), f, ensure_ascii=False, indent=1)
+    return path
+
+
+# ======== GLYPHS ========
+
+def loadGlyphsFile(path):
+    try:
+        import glyphsLib
+    except ImportError:
+        raise ImportError("Reading .glyphs files needs glyphsLib (pip install glyphsLib)")
+    gsFont = glyphsLib.GSFont(path)
+    font = SourceFont(path)
+    masterIDs = set()
+    for m in gsFont.masters:
+        axes = list(getattr(m, "axes", None) or ())
+        if not axes:
+            axes = [getattr(m, "weightValue", 0) or 0, getattr(m, "widthValue", 0) or 0]
+        font.masters.append(SourceMaster(m.id, getattr(m, "name", None), axes))
+        masterIDs.add(m.id)
+    for g in gsFont.glyphs:
+        glyph = SourceGlyph(g.name, g.unicodes or (), getattr(g, "category", None),
+                            g.leftKerningGroup, g.rightKerningGroup, getattr(g, "id", None))
+        for l in g.layers:
+            # Només les capes de màster (no les intermèdies ni les alternatives)
+            if l.layerId not in masterIDs:
+                continue
+            paths = []
+            for p in l.paths:
+                nodes = [SourceNode(n.position.x, n.position.y, n.type) for n in p.nodes]
+                paths.append(SourcePath(nodes, p.closed))
+            components = []
+            for c in l.components:
+                name = getattr(c, "componentName", None) or c.name
+                components.append(SourceComponent(name, tuple(c.transform)))
+            glyph.setLayer(l.layerId, SourceLayer(l.width, paths, components))
+        font.addGlyph(glyph)
+    for masterID, pairs in (gsFont.kerning or {}).items():
+        font.kerning[masterID] = dict((str(left), dict((str(r), v) for r, v in rights.items())) for left, rights in pairs.items())
+    return font
+
+
+# ======== UFO ========
+
+class _PointCollector(object):
+    """Point pen that builds SourcePaths and SourceComponents."""
+
+    def __init__(self):
+        self.paths = []
+        self.components = []
+        self._nodes = None
+        self._closed = True
+
+    def beginPath(self, identifier=None, **kwargs):
+        self._nodes = []
+        self._closed = True
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        if segmentType == "move":
+            self._closed = False
+            segmentType = "line"
+        self._nodes.append(SourceNode(pt[0], pt[1], segmentType or "offcurve"))
+
+    def endPath(self):
+        self.paths.append(SourcePath(self._nodes, self._closed))
+        self._nodes = None
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.components.append(SourceComponent(baseGlyphName, transformation))
+
+
+class _GlyphAttributes(object):
+    def __init__(self):
+        self.width = 0
+        self.unicodes = []
+
+
+def _ufoGroupKey(key):
+    if key.startswith(UFO_LEFT_PREFIX):
+        return LEFT_PREFIX + key[len(UFO_LEFT_PREFIX):]
+    if key.startswith(UFO_RIGHT_PREFIX):
+        return RIGHT_PREFIX + key[len(UFO_RIGHT_PREFIX):]
+    return key
+
+
+def loadUFO(path, masterID=None):
+    try:
+        from fontTools.ufoLib import UFOReader
+    except ImportError:
+        raise ImportError("Reading UFO sources needs fontTools (pip install fonttools)")
+    reader = UFOReader(path, validate=False)
+    masterID = masterID or os.path.splitext(os.path.basename(path.rstrip("/")))[0]
+    font = SourceFont(path)
+    font.masters.append(SourceMaster(masterID))
+
+    # Al UFO, kern1 és el costat esquerre del parell: el grup de la dreta del glif
+    rightGroups = {}
+    leftGroups = {}
+    for group, members in reader.readGroups().items():
+        if group.startswith(UFO_LEFT_PREFIX):
+            for name in members:
+                rightGroups[name] = group[len(UFO_LEFT_PREFIX):]
+        elif group.startswith(UFO_RIGHT_PREFIX):
+            for name in members:
+                leftGroups[name] = group[len(UFO_RIGHT_PREFIX):]
+
+    glyphSet = reader.getGlyphSet()
+    for name in sorted(glyphSet.keys()):
+        attributes = _GlyphAttributes()
+        pen = _PointCollector()
+        glyphSet.readGlyph(name, attributes, pen)
+        codes = ["%04X" % u for u in attributes.unicodes]
+        glyph = SourceGlyph(name, codes, None, leftGroups.get(name), rightGroups.get(name))
+        glyph.setLayer(masterID, SourceLayer(attributes.width, pen.paths, pen.components))
+        font.addGlyph(glyph)
+
+    kerning = font.kerning.setdefault(masterID, {})
+    for (left, right), value in reader.readKerning().items():
+        kerning.setdefault(_ufoGroupKey(left), {})[_ufoGroupKey(right)] = value
+    return font
+
+
+# ======== ENTRY ========
+
+def loadFont(path):
+    """SourceFont from a .glyphs, .glyphspackage, .ufo or stand-in .json file."""
+    extension = os.path.splitext(path.rstrip("/"))[1].lower()
+    if extension in (".glyphs", ".glyphspackage"):
+        return loadGlyphsFile(path)
+    if extension == ".ufo":
+        return loadUFO(path)
+    if extension == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return fontFromDict(json.load(f), path)
+    raise ValueError("Unsupported font source: %s" % path)
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+# Description: Parallel collision sweep over a multiprocessing pool
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Parallel collision sweep.
+
+The compact geometry of every glyph (packed segments, bbox and advance) is
+pickled once and handed to each worker of a multiprocessing pool when it
+starts. The (left, right) pair space is then sent in chunks of CHUNK_SIZE
+right glyphs per left glyph, and every chunk returns its collision hits as
+soon as it finishes. The caller polls the sweep (for example from an NSTimer)
+to fill its results list progressively, and can cancel it at any time.
+
+Workers are spawned, never forked, because forking a process that runs
+AppKit is not safe. When no pool can be started (no Python executable next
+to the running interpreter, a single core, a sweep under PARALLEL_MIN_PAIRS
+pairs) the same chunks run in a background thread instead. The same thread
+takes over the chunks not done yet when the workers cannot start: a worker
+whose initializer failed reports it instead of being respawned, and a pool
+that returns nothing within STARTUP_SECONDS (a worker that cannot even
+import kernCore) is terminated.
+
+Before any chunk is built, BroadPhase prunes every row (sweep and prune over
+the glyph ink boxes): a right glyph is kept only when its ink rows overlap
+the left glyph's vertically and its left ink edge, placed at the left
+glyph's advance, can come within margin of the left glyph's right ink edge.
+
+SweepMemory keeps the settings, pair rows, glyph version tokens and hits of
+the last complete sweep, so the next check only sweeps the pairs that touch
+a glyph (or a component source) edited since then and keeps the other hits.
+"""
+
+import bisect
+import contextlib
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import time
+import types
+
+from kernCore import layers, segmentIndex
+
+
+CHUNK_SIZE = 256
+
+# Per sota d'aquest nombre de parells, arrencar el pool costa més que el sweep
+PARALLEL_MIN_PAIRS = 20000
+
+# Si cap worker no retorna res en aquest temps, el sweep passa al fil
+STARTUP_SECONDS = 20.0
+
+_GEOMETRY = None
+_MARGIN = None
+_INIT_ERROR = None
+
+
+# ======== PAIR TEST ========
+
+def boxesClose(boxL, boxR, dx, margin):
+    """Ink boxes within margin, with the right box shifted by dx."""
+    return not (boxL[2] + margin < boxR[0] + dx or boxR[2] + dx + margin < boxL[0] or
+                boxL[3] + margin < boxR[1] or boxR[3] + margin < boxL[1])
+
+
+def pairCollides(entryL, entryR, margin):
+    """True if right glyph, placed at the advance of the left one, comes closer than margin."""
+    indexL, boxL, dx = entryL
+    indexR, boxR, _ = entryR
+    if not len(indexL) or not len(indexR):
+        return False
+    if not boxesClose(boxL, boxR, dx, margin):
+        return False
+    return segmentIndex.indexedAreClose(indexL, indexR, dx, margin)
+
+
+# ======== BROAD PHASE ========
+
+class BroadPhase(object):
+    """
+    Sweep and prune over the ink boxes of a geometry table. Glyphs are sorted
+    once by left ink edge, bottom and top; a row is pruned with three bisects
+    and a box test over the shortest of the three slices.
+    """
+
+    # Files curtes: el test de caixes directe surt més a compte que els bisects
+    DIRECT_BELOW = 32
+
+    def __init__(self, geometry, margin):
+        self.margin = float(margin)
+        self.entries = {}
+        for name, entry in geometry.items():
+            if len(entry[0]):
+                self.entries[name] = (entry[1], entry[2])
+        boxes = [(box, name) for name, (box, _) in self.entries.items()]
+        byLeft = sorted((box[0], name) for box, name in boxes)
+        byBottom = sorted((box[1], name) for box, name in boxes)
+        byTop = sorted((box[3], name) for box, name in boxes)
+        self._left = [v for v, _ in byLeft]
+        self._leftNames = [n for _, n in byLeft]
+        self._bottom = [v for v, _ in byBottom]
+        self._bottomNames = [n for _, n in byBottom]
+        self._top = [v for v, _ in byTop]
+        self._topNames = [n for _, n in byTop]
+
+    def prune(self, left, rights):
+        """The items of rights that can come within margin of left, in their original order."""
+        entryL = self.entries.get(left)
+        if entryL is None:
+            return []
+        boxL, dx = entryL
+        margin = self.margin
+        entries = self.entries
+        if len(rights) < self.DIRECT_BELOW:
+            return [r for r in rights if r in entries and boxesClose(boxL, entries[r][0], dx, margin)]
+
+        # Vora esquerra del dret prou a prop, base per sota del sostre, sostre per sobre de la base
+        nLeft = bisect.bisect_right(self._left, boxL[2] + margin - dx)
+        nBottom = bisect.bisect_right(self._bottom, boxL[3] + margin)
+        firstTop = bisect.bisect_left(self._top, boxL[1] - margin)
+        slices = (
+            (nLeft, self._leftNames, 0),
+            (nBottom, self._bottomNames, 0),
+            (len(self._top) - firstTop, self._topNames, firstTop),
+        )
+        count, names, start = min(slices, key=lambda item: item[0])
+        passing = set(
+            name for name in names[start:start + count]
+            if boxesClose(boxL, entries[name][0], dx, margin)
+        )
+        if not passing:
+            return []
+        return [r for r in rights if r in passing]
+
+    def pruneRows(self, rows):
+        pruned = []
+        for left, rights in rows:
+            rights = self.prune(left, list(rights))
+            if rights:
+                pruned.append((left, rights))
+        return pruned
+
+
+def sweepChunk(geometry, left, rights, margin):
+    """Collision hits (left, right) of one chunk."""
+    hits = []
+    entryL = geometry.get(left)
+    if entryL is None:
+        return hits
+    for right in rights:
+        entryR = geometry.get(right)
+        if entryR is not None and pairCollides(entryL, entryR, margin):
+            hits.append((left, right))
+    return hits
+
+
+# ======== WORKERS ========
+
+class WorkerStartError(Exception):
+    """A pool worker could not load the geometry."""
+
+
+def _initWorker(payload, margin):
+    global _GEOMETRY, _MARGIN, _INIT_ERROR
+    # Un inicialitzador que falla fa que el pool reemplaci el worker sense fi;
+    # es guarda l'error i cada tasca el retorna
+    try:
+        packed = pickle.loads(payload)
+        _GEOMETRY = dict(
+            (name, (segmentIndex.SegmentIndex(segments), bbox, width))
+            for name, (segments, bbox, width) in packed.items()
+        )
+        _MARGIN = margin
+    except Exception as e:
+        _INIT_ERROR = "%s: %s" % (type(e).__name__, e)
+
+
+def _workerChunk(task):
+    if _INIT_ERROR is not None:
+        raise WorkerStartError(_INIT_ERROR)
+    left, rights = task
+    return len(rights), sweepChunk(_GEOMETRY, left, rights, _MARGIN)
+
+
+def pythonExecutable():
+    """A Python interpreter matching the running one, or None (e.g. embedded without one)."""
+    candidates = [
+        sys.executable,
+        os.path.join(sys.exec_prefix, "bin", "python%d.%d" % sys.version_info[:2]),
+        os.path.join(sys.exec_prefix, "bin", "python3"),
+    ]
+    for path in candidates:
+        if path and os.path.basename(path).startswith("python") and os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+@contextlib.contextmanager
+def _plainMain():
+    # Els workers "spawn" reimporten el __main__ del pare; dins de Glyphs això
+    # tornaria a executar l'script (GlyphsApp, vanilla...), així que s'amaga
+    main = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        if main is not None:
+            sys.modules["__main__"] = main
+
+
+# ======== SWEEP ========
+
+class CollisionSweep(object):
+    """
+    Streams collision hits for rows of (leftName, [rightNames]).
+
+    geometry maps glyph name to (SegmentIndex, bbox, advance), as returned by
+    segmentIndex.sharedCache.geometry.
+    """
+
+    def __init__(self, geometry, rows, margin, processes=None, chunkSize=CHUNK_SIZE, prune=True):
+        self.geometry = geometry
+        self.margin = float(margin)
+        self.requested = sum(len(rights) for _, rights in rows)
+        if prune:
+            rows = BroadPhase(geometry, self.margin).pruneRows(rows)
+        self.tasks = []
+        for left, rights in rows:
+            rights = list(rights)
+            for i in range(0, len(rights), chunkSize):
+                self.tasks.append((left, rights[i:i + chunkSize]))
+        self.total = sum(len(rights) for _, rights in self.tasks)
+        self.processes = processes or max(1, (os.cpu_count() or 1) - 1)
+        self.checked = 0
+        self.parallel = False
+        self.cancelled = False
+        self.error = None
+        self._remaining = len(self.tasks)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._pool = None
+        self._thread = None
+        # Índexs de les tasques acabades, per reprendre només les que falten
+        self._finished = set()
+        # Les respostes d'un pool abandonat porten una generació antiga
+        self._generation = 0
+        self._poolStarted = None
+        self._startError = None
+
+    @property
+    def done(self):
+        return self.cancelled or self._remaining <= 0
+
+    @property
+    def progress(self):
+        return float(self.checked) / self.total if self.total else 1.0
+
+    def start(self):
+        if not self.tasks:
+            return self
+        if (self.processes > 1 and len(self.tasks) > 1 and self.total >= PARALLEL_MIN_PAIRS
+                and self._startPool()):
+            self.parallel = True
+        else:
+            self._startThread()
+        return self
+
+    def _startPool(self):
+        executable = pythonExecutable()
+        if not executable:
+            return False
+        try:
+            context = multiprocessing.get_context("spawn")
+            context.set_executable(executable)
+            # Només la geometria dels glifs que surten a alguna tasca
+            names = set(left for left, _ in self.tasks)
+            for _, rights in self.tasks:
+                names.update(rights)
+            payload = pickle.dumps(
+                dict((name, (entry[0].segments, entry[1], entry[2]))
+                     for name, entry in self.geometry.items() if name in names),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            with _plainMain():
+                pool = context.Pool(min(self.processes, len(self.tasks)), _initWorker, (payload, self.margin))
+        except Exception:
+            return False
+        self._poolStarted = time.time()
+        for index, task in enumerate(self.tasks):
+            collect, fail = self._poolCallbacks(index, self._generation)
+            pool.apply_async(_workerChunk, (task,), callback=collect, error_callback=fail)
+        pool.close()
+        self._pool = pool
+        return True
+
+    def _poolCallbacks(self, index, generation):
+        # La generació es compara dins del lock, a _collect / _fail
+        def collect(result):
+            self._collect(result, index, generation)
+
+        def fail(error):
+            if isinstance(error, WorkerStartError):
+                with self._lock:
+                    if generation == self._generation:
+                        self._startError = error
+            else:
+                self._fail(error, index, generation)
+        return collect, fail
+
+    def _startThread(self, indices=None):
+        if indices is None:
+            indices = range(len(self.tasks))
+        generation = self._generation
+
+        def run():
+            for index in indices:
+                if self.cancelled:
+                    break
+                left, rights = self.tasks[index]
+                try:
+                    self._collect((len(rights), sweepChunk(self.geometry, left, rights, self.margin)), index, generation)
+                except Exception as e:
+                    self._fail(e, index, generation)
+        self._thread = threading.Thread(target=run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _fallBack(self):
+        """Abandon the pool and sweep the chunks not done yet in a thread."""
+        pool, self._pool = self._pool, None
+        with self._lock:
+            self._generation += 1
+            indices = [i for i in range(len(self.tasks)) if i not in self._finished]
+        if pool is not None:
+            pool.terminate()
+        self.parallel = False
+        self._startThread(indices)
+
+    def _workersStalled(self):
+        if self._pool is None or self.cancelled:
+            return False
+        if self._startError is not None:
+            return True
+        return not self._finished and time.time() - self._poolStarted >= STARTUP_SECONDS
+
+    def _accept(self, index, generation):
+        """
+        Whether a chunk result still counts (called with the lock held): not
+        from an abandoned pool and not already collected by the other path.
+        """
+        if generation is not None and generation != self._generation:
+            return False
+        if index is not None and index in self._finished:
+            return False
+        self._finished.add(index)
+        self._remaining -= 1
+        return True
+
+    def _collect(self, result, index=None, generation=None):
+        count, hits = result
+        with self._lock:
+            if self._accept(index, generation):
+                self.checked += count
+                self._pending.extend(hits)
+
+    def _fail(self, error, index=None, generation=None):
+        with self._lock:
+            if self._accept(index, generation) and self.error is None:
+                self.error = error
+
+    def poll(self):
+        """Hits found since the previous poll."""
+        if self._workersStalled():
+            self._fallBack()
+        with self._lock:
+            hits, self._pending = self._pending, []
+        if self.done and self._pool is not None:
+            pool, self._pool = self._pool, None
+            if self.cancelled:
+                pool.terminate()
+            pool.join()
+        return hits
+
+    def cancel(self):
+        self.cancelled = True
+        if self._pool is not None:
+            self._pool.terminate()
+
+    def run(self, interval=0.05):
+        """Blocking sweep: every hit, in arrival order."""
+        self.start()
+        hits = []
+        while not self.done:
+            hits.extend(self.poll())
+            time.sleep(interval)
+        hits.extend(self.poll())
+        return hits
+
+
+# ======== INCREMENTAL ========
+
+def glyphVersions(font, names, masterID):
+    """Version token of every glyph in names (it changes when the glyph or a component source is edited)."""
+    return dict((name, layers.dependencyToken(font, name, masterID)) for name in names)
+
+
+class SweepMemory(object):
+    """Settings, rows, glyph versions and hits of the last complete sweep."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.settings = None
+        self.rows = None
+        self.versions = {}
+        self.hits = []
+
+    def plan(self, settings, rows, versions):
+        """
+        (rows to sweep, hits still valid, changed glyph names) for a new check.
+        When the settings or the pair rows differ from the last sweep, every
+        row is swept again and changed is None.
+        """
+        rows = [(left, list(rights)) for left, rights in rows]
+        if self.rows is None or settings != self.settings or rows != self.rows:
+            return rows, [], None
+        previous = self.versions
+        changed = set(name for name, version in versions.items() if previous.get(name) != version)
+        if not changed:
+            return [], list(self.hits), changed
+        kept = [hit for hit in self.hits if hit[0] not in changed and hit[1] not in changed]
+        dirty = []
+        for left, rights in rows:
+            if left in changed:
+                dirty.append((left, rights))
+                continue
+            rights = [right for right in rights if right in changed]
+            if rights:
+                dirty.append((left, rights))
+        return dirty, kept, changed
+
+    def commit(self, settings, rows, versions, hits):
+        """Remember a sweep that ran to the end (a cancelled one must not be committed)."""
+        self.settings = settings
+        self.rows = [(left, list(rights)) for left, rights in rows]
+        self.versions = dict(versions)
+        self.hits = list(hits)
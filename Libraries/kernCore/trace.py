@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+# Description: Level-gated tracing with an in-memory ring buffer, counters and timers
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+__doc__ = """
+Tracing for the kerning scripts.
+
+Every event has a category ("AUTOKERN", "COLLISIONS", ...) and a level
+(DEBUG, INFO, WARNING, ERROR). An event is kept only when its level reaches
+the threshold of its category (defaultLevel when the category has none).
+The check is one dict lookup and the message is only formatted when the
+event is kept, so pass a format string plus arguments:
+
+    tracer.debug("AUTOKERN", "pair %s/%s delta %d", left, right, delta)
+
+Kept events go to a ring buffer of the last `capacity` events instead of the
+Macro window; only events at echoLevel or above (WARNING by default) are also
+printed, and echo() prints a summary line whatever its level. dump() /
+export(path) return or write the buffer on demand.
+
+Counters and timers replace the per-pair prints: count("autokern.skipped")
+and `with tracer.timer("collisions.prepare"):` accumulate per phase, and
+report() prints the totals.
+"""
+
+import collections
+import contextlib
+import time
+
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+RING_SIZE = 5000
+
+
+def _format(message, args):
+    if not args:
+        return message
+    try:
+        return message % args
+    except (TypeError, ValueError):
+        return " ".join(str(a) for a in (message,) + args)
+
+
+class Tracer(object):
+    """Categories with levels, a ring buffer of events, counters and timers."""
+
+    def __init__(self, capacity=RING_SIZE, defaultLevel=INFO, echoLevel=WARNING):
+        self.defaultLevel = defaultLevel
+        self.echoLevel = echoLevel
+        self.levels = {}
+        self.events = collections.deque(maxlen=capacity)
+        self.counters = collections.Counter()
+        # nom -> [segons acumulats, crides]
+        self.timers = {}
+
+    # ======== CATEGORIES ========
+
+    def setLevel(self, category, level):
+        self.levels[category] = level
+
+    def enable(self, category, level=DEBUG):
+        self.levels[category] = level
+
+    def disable(self, category):
+        self.levels[category] = OFF
+
+    def enabled(self, category, level=DEBUG):
+        return level >= self.levels.get(category, self.defaultLevel)
+
+    # ======== EVENTS ========
+
+    def event(self, category, level, message, *args):
+        if level < self.levels.get(category, self.defaultLevel):
+            return
+        message = _format(message, args)
+        self.events.append((time.time(), category, level, message))
+        if level >= self.echoLevel:
+            print("[%s %s] %s" % (category, LEVEL_NAMES.get(level, level), message))
+
+    def echo(self, category, message, *args):
+        """
+        INFO event that is always printed as it is, for the summaries the user
+        expects in the Macro window; it is buffered like any other event.
+        """
+        message = _format(message, args)
+        self.events.append((time.time(), category, INFO, message))
+        print(message)
+
+    # El nivell es comprova aquí mateix: una categoria apagada no fa cap crida més
+    def debug(self, category, message, *args):
+        if DEBUG >= self.levels.get(category, self.defaultLevel):
+            self.event(category, DEBUG, message, *args)
+
+    def info(self, category, message, *args):
+        if INFO >= self.levels.get(category, self.defaultLevel):
+            self.event(category, INFO, message, *args)
+
+    def warning(self, category, message, *args):
+        self.event(category, WARNING, message, *args)
+
+    def error(self, category, message, *args):
+        self.event(category, ERROR, message, *args)
+
+    # ======== COUNTERS & TIMERS ========
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.timers.get(name)
+            if entry is None:
+                entry = self.timers[name] = [0.0, 0]
+            entry[0] += time.perf_counter() - start
+            entry[1] += 1
+
+    def report(self, prefix=None):
+        """Counter and timer totals as lines (only names starting with prefix)."""
+        lines = []
+        for name in sorted(self.counters):
+            if prefix is None or name.startswith(prefix):
+                lines.append("%s: %d" % (name, self.counters[name]))
+        for name in sorted(self.timers):
+            if prefix is None or name.startswith(prefix):
+                total, calls = self.timers[name]
+                lines.append("%s: %.1f ms (%d calls)" % (name, total * 1000.0, calls))
+        return lines
+
+    def resetStats(self, prefix=None):
+        for table in (self.counters, self.timers):
+            for name in [n for n in table if prefix is None or n.startswith(prefix)]:
+                del table[name]
+
+    # ======== BUFFER ========
+
+    def dump(self, category=None, level=DEBUG, last=None):
+        """Buffered events as text lines, oldest first."""
+        lines = []
+        for stamp, cat, lev, message in self.events:
+            if lev < level or (category is not None and cat != category):
+                continue
+            lines.append("%s.%03d [%s %s] %s" % (
+                time.strftime("%H:%M:%S", time.localtime(stamp)), int(stamp * 1000) % 1000,
+                cat, LEVEL_NAMES.get(lev, lev), message))
+        return lines[-last:] if last else lines
+
+    def export(self, path, category=None, level=DEBUG):
+        """Write the buffered events and the counter/timer report to a text file."""
+        with open(path, "w") as f:
+            for line in self.dump(category, level):
+                f.write(line + "\n")
+            report = self.report()
+            if report:
+                f.write("\n")
+                for line in report:
+                    f.write(line + "\n")
+        return path
+
+    def clear(self):
+        self.events.clear()
+
+
+# Compartit per tots els scripts durant la sessió de Glyphs
+sharedTracer = Tracer()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Description: Shared fixtures for the kernCore tests (stand-in font model, no GlyphsApp)
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import os
+import sys
+
+import pytest
+
+_LIBRARIES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+
+from kernCore import sourceFont
+
+
+def makeGlyph(font, name, left=None, right=None, glyphID=None, width=500, masterIDs=None):
+    """Square glyph (ink from 50 to width - 50) added to font."""
+    glyph = sourceFont.SourceGlyph(name, (), "Letter", left, right, glyphID)
+    for masterID in masterIDs or [m.id for m in font.masters]:
+        nodes = [sourceFont.SourceNode(x, y) for x, y in ((50, 0), (width - 50, 0), (width - 50, 700), (50, 700))]
+        glyph.setLayer(masterID, sourceFont.SourceLayer(width, [sourceFont.SourcePath(nodes)]))
+    return font.addGlyph(glyph)
+
+
+@pytest.fixture
+def font():
+    """Two masters, glyphs with Glyphs 3 style IDs and kerning groups."""
+    f = sourceFont.SourceFont()
+    f.masters.append(sourceFont.SourceMaster("m1", "Regular"))
+    f.masters.append(sourceFont.SourceMaster("m2", "Bold"))
+    makeGlyph(f, "A", "A", "A", "ID-A")
+    makeGlyph(f, "Aacute", "A", "A", "ID-AACUTE")
+    makeGlyph(f, "V", "V", "V", "ID-V")
+    makeGlyph(f, "T", "T", "T", "ID-T")
+    makeGlyph(f, "o", "o", "o", "ID-O")
+    makeGlyph(f, "x", None, None, "ID-X")
+    return f
+
+
+@pytest.fixture
+def addGlyph():
+    return makeGlyph
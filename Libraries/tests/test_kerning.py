@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Description: KerningResolver lookup order and updates
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+from kernCore import kerning
+from kernCore.kerning import LEFT_PREFIX, RIGHT_PREFIX
+
+
+def test_lookup_order(font):
+    # A/V: les quatre entrades; cada pas en treu una i queda la següent
+    font.setKerningForPair("m1", "ID-A", "ID-V", -10)
+    font.setKerningForPair("m1", "ID-A", RIGHT_PREFIX + "V", -20)
+    font.setKerningForPair("m1", LEFT_PREFIX + "A", "ID-V", -30)
+    font.setKerningForPair("m1", LEFT_PREFIX + "A", RIGHT_PREFIX + "V", -40)
+    expected = [
+        (kerning.DIRECT, -10),
+        (kerning.GLYPH_GROUP, -20),
+        (kerning.GROUP_GLYPH, -30),
+        (kerning.GROUP_GROUP, -40),
+        (kerning.NONE, None),
+    ]
+    entries = [("ID-A", "ID-V"), ("ID-A", RIGHT_PREFIX + "V"), (LEFT_PREFIX + "A", "ID-V"), (LEFT_PREFIX + "A", RIGHT_PREFIX + "V")]
+    for step, result in enumerate(expected):
+        assert kerning.KerningResolver(font, "m1").resolve("A", "V") == result
+        if step < len(entries):
+            font.removeKerningForPair("m1", *entries[step])
+
+
+def test_glyph_keys_by_id_and_name(font):
+    font.setKerningForPair("m1", "ID-T", "o", -50)
+    font.setKerningForPair("m1", "V", "ID-O", -25)
+    resolver = kerning.KerningResolver(font, "m1")
+    assert resolver.resolve("T", "o") == (kerning.DIRECT, -50)
+    assert resolver.resolve("V", "o") == (kerning.DIRECT, -25)
+
+
+def test_group_members_share_group_kerning(font):
+    font.setKerningForPair("m1", LEFT_PREFIX + "A", RIGHT_PREFIX + "V", -40)
+    resolver = kerning.KerningResolver(font, "m1")
+    assert resolver.resolve("Aacute", "V") == (kerning.GROUP_GROUP, -40)
+    assert not resolver.isKerned("x", "V")
+    assert resolver.resolve("A", "missing") == (kerning.NONE, None)
+
+
+def test_masters_are_separate(font):
+    font.setKerningForPair("m2", "ID-A", "ID-V", -60)
+    assert kerning.KerningResolver(font, "m1").kind("A", "V") == kerning.NONE
+    assert kerning.KerningResolver(font, "m2").resolve("A", "V") == (kerning.DIRECT, -60)
+
+
+def test_set_pair_and_refresh(font):
+    resolver = kerning.KerningResolver(font, "m1")
+    resolver.setPair(LEFT_PREFIX + "T", RIGHT_PREFIX + "o", -70)
+    assert resolver.resolve("T", "o") == (kerning.GROUP_GROUP, -70)
+    font.glyphs["x"].leftKerningGroup = "o"
+    assert resolver.isKerned("T", "x") is False
+    font.setKerningForPair("m1", LEFT_PREFIX + "T", RIGHT_PREFIX + "o", -70)
+    resolver.refresh()
+    assert resolver.resolve("T", "x") == (kerning.GROUP_GROUP, -70)
+    resolver.setPair(LEFT_PREFIX + "T", RIGHT_PREFIX + "o", None)
+    assert resolver.unkerned([("T", "o"), ("T", "x")]) == [("T", "o"), ("T", "x")]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Description: KerningMerger key translation and conflict policies
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import pytest
+
+from kernCore import merge, snapshots, sourceFont
+
+
+@pytest.fixture
+def source(addGlyph):
+    """Same glyph names as the font fixture, other IDs, plus Q (not in the target)."""
+    f = sourceFont.SourceFont()
+    f.masters.append(sourceFont.SourceMaster("s1", "Regular"))
+    f.masters.append(sourceFont.SourceMaster("s2", "Black"))
+    for name, group in (("A", "A"), ("V", "V"), ("T", "T"), ("o", "o"), ("Q", "Q")):
+        addGlyph(f, name, group, group, "SRC-" + name)
+    return f
+
+
+def _merge(target, policy, jobs):
+    merger = merge.KerningMerger(target, policy)
+    for source, sourceMasterID in jobs:
+        merger.add(source, sourceMasterID, "m1")
+    return merger.merge()
+
+
+def test_match_masters(font, source):
+    assert dict((k, m.id) for k, m in merge.matchMasters(source, font).items()) == {"s1": "m1"}
+    assert merge.matchMasters(source, font, byName=False) == {}
+
+
+def test_key_translation(font, source):
+    translation = merge.KeyTranslation(source, font)
+    assert translation.translate("SRC-A") == "A"
+    assert translation.translate("V") == "V"
+    assert translation.translate("@MMK_L_T") == "@MMK_L_T"
+    assert translation.translate("@MMK_R_Q") is None
+    assert translation.translate("SRC-Q") is None
+    assert translation.missing == {"@MMK_R_Q": 1, "Q": 1}
+
+
+def test_missing_keys_are_skipped(font, source):
+    source.setKerningForPair("s1", "A", "V", -80)
+    source.setKerningForPair("s1", "Q", "V", -20)
+    source.setKerningForPair("s1", "@MMK_L_T", "@MMK_R_Q", -30)
+    report = _merge(font, merge.OVERWRITE, [(source, "s1")])
+    assert report.written == 1 and report.skipped == 2
+    assert report.missing == {"Q": 1, "@MMK_R_Q": 1}
+    # s'escriu sota l'ID del destí
+    assert snapshots.flatKerning(font, "m1") == {("ID-A", "ID-V"): -80}
+
+
+@pytest.mark.parametrize("policy, expected", [
+    (merge.OVERWRITE, -100),
+    (merge.KEEP, -40),
+    (merge.MAX, -40),
+    (merge.MIN, -100),
+    (merge.AVERAGE, -73),
+])
+def test_policies(font, source, policy, expected):
+    font.setKerningForPair("m1", "ID-A", "ID-V", -40)
+    source.setKerningForPair("s1", "A", "V", -80)
+    source.setKerningForPair("s2", "A", "V", -100)
+    report = _merge(font, policy, [(source, "s1"), (source, "s2")])
+    assert report.batch.ok
+    assert [(c.existing, c.incoming, c.result) for c in report.conflicts] == [(-40, [-80, -100], expected)]
+    assert snapshots.flatKerning(font, "m1") == {("ID-A", "ID-V"): expected}
+    assert (report.written, report.unchanged) == ((0, 1) if expected == -40 else (1, 0))
+
+
+def test_keep_without_target_value_takes_first_source(font, source):
+    source.setKerningForPair("s1", "@MMK_L_T", "@MMK_R_o", -50)
+    source.setKerningForPair("s2", "@MMK_L_T", "@MMK_R_o", -60)
+    report = _merge(font, merge.KEEP, [(source, "s1"), (source, "s2")])
+    assert report.conflicts[0].existing is None
+    assert snapshots.flatKerning(font, "m1") == {("@MMK_L_T", "@MMK_R_o"): -50}
+
+
+def test_equal_values_are_unchanged(font, source):
+    font.setKerningForPair("m1", "ID-T", "ID-O", -30)
+    source.setKerningForPair("s1", "T", "o", -30)
+    report = _merge(font, merge.OVERWRITE, [(source, "s1")])
+    assert (report.written, report.unchanged, report.conflicts) == (0, 1, [])
+
+
+def test_unknown_policy(font):
+    with pytest.raises(ValueError):
+        merge.KerningMerger(font, "sum")
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Description: pairStream round trips (.jsonl, .kcp) and the older JSON documents
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import json
+
+import pytest
+
+from kernCore import pairStream
+from kernCore.pairStream import PairRecord
+
+
+KERNING = {
+    "m1": {"@MMK_L_T": {"o": -40, "@MMK_R_a": -12.5}, "A": {"V": -80}},
+    "m2": {"@MMK_L_T": {"o": -55}, "Ä": {"V": -90}},
+}
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".kcp"])
+def test_kerning_round_trip(tmp_path, extension):
+    path = str(tmp_path / ("backup" + extension))
+    with pairStream.PairWriter(path, {"name": "test"}) as writer:
+        writer.writeKerning("m1", KERNING["m1"], "Regular")
+        writer.writeKerning("m2", KERNING["m2"], "Bold")
+    assert writer.count == 5
+    assert pairStream.isBinary(path) == (extension == ".kcp")
+
+    reader = pairStream.PairReader(path)
+    records = list(reader)
+    assert reader.header["name"] == "test"
+    assert reader.header["format"] == pairStream.FORMAT
+    assert list(reader.masters.items()) == [("m1", "Regular"), ("m2", "Bold")]
+    read = {}
+    for record in records:
+        read.setdefault(record.master, {}).setdefault(record.left, {})[record.right] = record.value
+    assert read == KERNING
+    assert isinstance(read["m1"]["@MMK_L_T"]["@MMK_R_a"], float)
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".kcp"])
+def test_pair_list_round_trip(tmp_path, extension):
+    path = str(tmp_path / ("pairs" + extension))
+    pairs = [("A", "V"), ("T", "o"), ("A", "V")]
+    with pairStream.PairWriter(path) as writer:
+        for left, right in pairs:
+            writer.write(left, right)
+    assert [(r.left, r.right, r.value) for r in pairStream.readPairs(path)] == [(l, r, None) for l, r in pairs]
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".kcp"])
+def test_group_keys_are_normalized(tmp_path, extension):
+    path = str(tmp_path / ("groups" + extension))
+    with pairStream.PairWriter(path) as writer:
+        writer.write("public.kern1.T", "public.kern2.o", -30)
+        writer.write("@T", "@o", -20)
+    assert list(pairStream.readPairs(path)) == [
+        PairRecord(None, "@MMK_L_T", "@MMK_R_o", -30),
+        PairRecord(None, "@MMK_L_T", "@MMK_R_o", -20),
+    ]
+
+
+def test_legacy_pair_list(tmp_path):
+    path = str(tmp_path / "pairs.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"name": "old", "pairs": [["A", "V"], ["T", "o"], ["bad"]]}, f)
+    reader = pairStream.PairReader(path)
+    assert [(r.left, r.right, r.value) for r in reader] == [("A", "V", None), ("T", "o", None)]
+    assert reader.legacy and reader.header == {"name": "old"}
+
+
+def test_legacy_kerning_backup(tmp_path):
+    path = str(tmp_path / "backup.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"@T": {"o": -40}, "A": {"@V": -80}}, f)
+    assert sorted(pairStream.readPairs(path)) == sorted([
+        PairRecord(None, "@MMK_L_T", "o", -40),
+        PairRecord(None, "A", "@MMK_R_V", -80),
+    ])
+    assert sorted((r.left, r.right) for r in pairStream.readPairs(path, normalize=False)) == [("@T", "o"), ("A", "@V")]
+
+
+def test_corrupt_binary_file(tmp_path):
+    path = str(tmp_path / "bad.kcp")
+    with open(path, "wb") as f:
+        f.write(pairStream.MAGIC + b"Z")
+    with pytest.raises(ValueError):
+        list(pairStream.readPairs(path))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Description: Pruner sign, kind and every-master filters
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import pytest
+
+from kernCore import pruning
+
+
+@pytest.fixture
+def kerned(font):
+    for masterID, pairs in (
+        ("m1", {("ID-A", "ID-V"): -5, ("ID-V", "ID-A"): -30, ("@MMK_L_T", "@MMK_R_o"): 4,
+                ("@MMK_L_A", "ID-V"): -10, ("ID-T", "ID-O"): 10, ("ID-O", "ID-X"): 0}),
+        ("m2", {("ID-A", "ID-V"): -8, ("@MMK_L_T", "@MMK_R_o"): 20, ("ID-V", "ID-A"): -3}),
+    ):
+        for (left, right), value in pairs.items():
+            font.setKerningForPair(masterID, left, right, value)
+    return font
+
+
+def _pairs(candidates, masterID):
+    return sorted((left, right) for left, right, _ in candidates[masterID])
+
+
+@pytest.mark.parametrize("sign, expected", [
+    # -10 queda fora de NEGATIVE (estricte) i dins de ANY (|v| <= llindar)
+    (pruning.NEGATIVE, [("ID-A", "ID-V")]),
+    (pruning.POSITIVE, [("@MMK_L_T", "@MMK_R_o")]),
+    (pruning.ANY, [("@MMK_L_A", "ID-V"), ("@MMK_L_T", "@MMK_R_o"), ("ID-A", "ID-V"), ("ID-O", "ID-X"), ("ID-T", "ID-O")]),
+])
+def test_sign_filters(kerned, sign, expected):
+    candidates = pruning.Pruner(kerned, ["m1"]).candidates(10, sign)
+    assert _pairs(candidates, "m1") == sorted(expected)
+
+
+def test_threshold_sign_is_ignored(kerned):
+    pruner = pruning.Pruner(kerned, ["m1"])
+    assert pruner.candidates(-10, pruning.NEGATIVE) == pruner.candidates(10, pruning.NEGATIVE)
+
+
+@pytest.mark.parametrize("kinds, expected", [
+    (pruning.GROUPS, [("@MMK_L_T", "@MMK_R_o")]),
+    (pruning.EXCEPTIONS, [("@MMK_L_A", "ID-V"), ("ID-A", "ID-V"), ("ID-O", "ID-X"), ("ID-T", "ID-O")]),
+    (pruning.GLYPHS, [("ID-A", "ID-V"), ("ID-O", "ID-X"), ("ID-T", "ID-O")]),
+])
+def test_kind_filters(kerned, kinds, expected):
+    candidates = pruning.Pruner(kerned, ["m1"]).candidates(10, pruning.ANY, kinds)
+    assert _pairs(candidates, "m1") == sorted(expected)
+
+
+def test_every_master(kerned):
+    pruner = pruning.Pruner(kerned)
+    separate = pruner.candidates(10, pruning.ANY)
+    together = pruner.candidates(10, pruning.ANY, everyMaster=True)
+    # T/o és 20 a m2; V/A és -30 a m1; la resta falta a m2 (compta com a 0)
+    assert ("@MMK_L_T", "@MMK_R_o") in _pairs(separate, "m1")
+    assert ("ID-V", "ID-A") in _pairs(separate, "m2")
+    assert _pairs(together, "m1") == [("@MMK_L_A", "ID-V"), ("ID-A", "ID-V"), ("ID-O", "ID-X"), ("ID-T", "ID-O")]
+    assert _pairs(together, "m2") == [("ID-A", "ID-V")]
+    assert pruner.counts(10, pruning.ANY, everyMaster=True) == {"m1": 4, "m2": 1}
+
+
+def test_prune(kerned):
+    pruner = pruning.Pruner(kerned)
+    reports = pruner.prune(pruner.candidates(10, pruning.NEGATIVE))
+    assert reports["m1"].ok and reports["m1"].removed == 1
+    assert "ID-V" not in kerned.kerning["m1"].get("ID-A", {})
+    assert kerned.kerning["m2"]["ID-V"] == {}
+    assert pruner.counts(10, pruning.NEGATIVE) == {"m1": 0, "m2": 0}
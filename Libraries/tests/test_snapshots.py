@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Description: SnapshotStore checkpoints, diffs and restores
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+from kernCore import snapshots
+
+
+def _set(font, masterID, pairs):
+    font.kerning[masterID] = {}
+    for (left, right), value in pairs.items():
+        font.setKerningForPair(masterID, left, right, value)
+
+
+def test_diff():
+    current = {("A", "V"): -80, ("T", "o"): -40, ("x", "x"): 5}
+    target = {("A", "V"): -80, ("T", "o"): -50, ("V", "A"): -70}
+    changes, removals = snapshots.diff(current, target)
+    assert changes == {("T", "o"): -50, ("V", "A"): -70}
+    assert removals == [("x", "x")]
+
+
+def test_checkpoint_chain(font, tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "store"))
+    # prou parelles perquè els canvis petits es desin com a delta
+    first = dict((("@MMK_L_%s" % left, "@MMK_R_%s" % right), -5) for left in "AVT" for right in "AVo")
+    first[("ID-A", "ID-V")] = -80
+    first[("@MMK_L_T", "@MMK_R_o")] = -40
+    _set(font, "m1", first)
+    base = store.checkpoint(font, "m1", "start")
+    assert base.kind == snapshots.BASE and base.pairs == 10
+    assert store.checkpoint(font, "m1") is None
+
+    second = dict(first)
+    second[("ID-A", "ID-V")] = -90
+    second[("ID-V", "ID-A")] = -70
+    second[("ID-T", "ID-O")] = -10
+    _set(font, "m1", second)
+    delta = store.checkpoint(font, "m1")
+    assert delta.kind == snapshots.DELTA and delta.parent == base.id and delta.changes == 3
+
+    third = dict(second)
+    del third[("@MMK_L_T", "@MMK_R_o")]
+    _set(font, "m1", third)
+    removal = store.checkpoint(font, "m1")
+    assert removal.kind == snapshots.DELTA and removal.changes == 1
+
+    assert store.state(base.id) == first
+    assert store.state(delta.id) == second
+    assert store.state(removal.id) == third
+    assert [s.id for s in store.snapshots("m1")] == [base.id, delta.id, removal.id]
+
+    # Un magatzem nou llegeix l'índex i refà els estats des dels fitxers
+    reopened = snapshots.SnapshotStore(str(tmp_path / "store"))
+    assert reopened.state(delta.id) == second
+    assert reopened.latest("m1").id == removal.id
+
+
+def test_large_change_starts_a_new_base(font, tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "store"))
+    _set(font, "m1", {("ID-A", "ID-V"): -80, ("ID-T", "ID-O"): -40})
+    store.checkpoint(font, "m1")
+    _set(font, "m1", {("ID-V", "ID-A"): -60, ("ID-O", "ID-T"): -30})
+    assert store.checkpoint(font, "m1").kind == snapshots.BASE
+
+
+def test_restore_writes_only_the_differences(font, tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "store"))
+    saved = {("ID-A", "ID-V"): -80, ("@MMK_L_T", "@MMK_R_o"): -40, ("ID-T", "ID-X"): -5}
+    _set(font, "m1", saved)
+    snapshot = store.checkpoint(font, "m1")
+
+    _set(font, "m1", {("ID-A", "ID-V"): -80, ("@MMK_L_T", "@MMK_R_o"): -10, ("ID-V", "ID-A"): -70})
+    report = store.restore(font, "m1", snapshot.id)
+    assert report.ok
+    assert report.applied == 2 and report.removed == 1
+    assert snapshots.flatKerning(font, "m1") == saved
+
+
+def test_restore_into_another_master(font, tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "store"))
+    _set(font, "m1", {("ID-A", "ID-V"): -80})
+    snapshot = store.checkpoint(font, "m1")
+    store.restore(font, "m2", snapshot.id)
+    assert snapshots.flatKerning(font, "m2") == {("ID-A", "ID-V"): -80}
+
+
+def test_delete(font, tmp_path):
+    store = snapshots.SnapshotStore(str(tmp_path / "store"))
+    _set(font, "m1", {("ID-A", "ID-V"): -80})
+    _set(font, "m2", {("ID-A", "ID-V"): -90})
+    store.checkpoint(font, "m1")
+    kept = store.checkpoint(font, "m2")
+    store.delete("m1")
+    assert store.snapshots() == [store.snapshot(kept.id)]
+    assert not (tmp_path / "store" / "base-0001.kcp").exists()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Description: CollisionSweep hits against a brute-force distance check
+# Author: Designed by Josep Patau Bellart, programmed with AI tools
+# License: Apache2
+
+import pytest
+
+from kernCore import benchmark, geometry, segmentIndex, sweep
+
+
+def _setup(glyphs=30, nodes=16, seed=3):
+    font = benchmark.syntheticFont(glyphs, nodes, 1, seed=seed)
+    masterID = font.masters[0].id
+    names = font.glyphs.keys()
+    cache = segmentIndex.IndexCache()
+    table = dict((name, cache.geometry(font, name, masterID)) for name in names)
+    rows = [(left, list(names)) for left in names]
+    return font, masterID, names, table, rows
+
+
+def _bruteForce(font, masterID, names, margin):
+    decomposed = dict((name, font.glyphs[name].layers[masterID].copyDecomposedLayer()) for name in names)
+    hits = set()
+    for left in names:
+        layerL = decomposed[left]
+        for right in names:
+            if geometry.minDistanceBetweenLayers(layerL, decomposed[right], layerL.width) < margin:
+                hits.add((left, right))
+    return hits
+
+
+@pytest.mark.parametrize("margin", [10, 40, 80])
+@pytest.mark.parametrize("prune", [True, False])
+def test_thread_sweep_matches_brute_force(margin, prune):
+    font, masterID, names, table, rows = _setup()
+    hits = sweep.CollisionSweep(table, rows, margin, processes=1, prune=prune).run(interval=0.001)
+    expected = _bruteForce(font, masterID, names, margin)
+    assert expected
+    assert len(hits) == len(set(hits))
+    assert set(hits) == expected
+
+
+def test_pool_sweep_matches_brute_force(monkeypatch):
+    if not sweep.pythonExecutable():
+        pytest.skip("no Python executable to spawn workers")
+    monkeypatch.setattr(sweep, "PARALLEL_MIN_PAIRS", 0)
+    font, masterID, names, table, rows = _setup()
+    run = sweep.CollisionSweep(table, rows, 40, processes=2, chunkSize=8)
+    hits = run.run(interval=0.01)
+    assert run.parallel and run.error is None
+    assert len(hits) == len(set(hits))
+    assert set(hits) == _bruteForce(font, masterID, names, 40)
+
+
+def test_broad_phase_keeps_every_hit():
+    font, masterID, names, table, rows = _setup(seed=5)
+    phase = sweep.BroadPhase(table, 40)
+    kept = set((left, right) for left, rights in phase.pruneRows(rows) for right in rights)
+    assert _bruteForce(font, masterID, names, 40) <= kept
@@ -9,8 +9,15 @@ from GlyphsApp import Glyphs, GSGuide
 from AppKit import NSPoint
 import vanilla
 import math
+import os
+import sys
 import traceback
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import flatten, layers
+
 
 class XBeamInspector(object):
 
@@ -25,6 +32,7 @@ class XBeamInspector(object):
         self.loadPrefs()
         self.buildUI()
         self.report_text = ""
+        self._flatCache = {}
 
     # -------------------------
     # PREFERENCES
@@ -221,37 +229,6 @@ class XBeamInspector(object):
             
         return factor, angle, diagonalType
 
-    # -------------------------
-    # CHECK IF SEGMENT IS CURVED (mismo que script 1)
-    # -------------------------
-
-    def isCurvedSegment(self, n1, n2):
-        """
-        Detecta si un segmento tiene curvas verificando si alguno de los nodos
-        tiene manejadores (handle) y no están en la posición por defecto
-        """
-        # Verificar si n1 tiene manejadores
-        if hasattr(n1, 'connection') and n1.connection == OFFCURVE:
-            return True
-            
-        # Verificar si n2 tiene manejadores
-        if hasattr(n2, 'connection') and n2.connection == OFFCURVE:
-            return True
-            
-        # Verificar si hay manejadores en las curvas Bezier
-        if hasattr(n1, 'position') and hasattr(n2, 'position'):
-            if hasattr(n1, 'type') and n1.type == CURVE:
-                return True
-            if hasattr(n2, 'type') and n2.type == CURVE:
-                return True
-                
-        if hasattr(n1, 'hasHandle') and n1.hasHandle():
-            return True
-        if hasattr(n2, 'hasHandle') and n2.hasHandle():
-            return True
-            
-        return False
-
     # -------------------------
     # SHOULD DISCARD
     # -------------------------
@@ -267,17 +244,40 @@ class XBeamInspector(object):
     # ANALYZE SEGMENTS AT Y (mismo que script 1)
     # -------------------------
 
+    def flattenedOutline(self, layer):
+        """
+        Contorn descompost, sense solapaments i aplanat (corbes reals, no el
+        polígon de control). Es calcula una vegada per capa i es reutilitza
+        per a totes les Y i els tres tests mentre el glif, i els glifs que fa
+        servir com a components, no canviïn.
+        """
+        glyph = layer.parent
+        key = (glyph.name if glyph else None, layer.layerId)
+        token = layers.layerToken(glyph, layer)
+        font = glyph.parent if glyph else None
+        if font is not None:
+            # Editar "o" ha d'invalidar "ö": token de cada component al mateix master
+            masterID = getattr(layer, "associatedMasterId", None) or layer.layerId
+            token = (token,) + tuple(
+                layers.dependencyToken(font, component.componentName, masterID)
+                for component in getattr(layer, "components", None) or ())
+        cached = self._flatCache.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        work = layer.copyDecomposedLayer()
+        work.removeOverlap()
+        polylines = flatten.flattenLayer(work)
+        self._flatCache[key] = (token, polylines)
+        return polylines
+
     def analyzeSegmentsAtY(self, layer, y):
-        layer = layer.copyDecomposedLayer()
-        layer.removeOverlap()
-        
         segments_info = []
         
-        for path in layer.paths:
-            nodes = path.nodes
-            for i in range(len(nodes)):
-                n1 = nodes[i]
-                n2 = nodes[(i + 1) % len(nodes)]
+        for points, closed, curved in self.flattenedOutline(layer):
+            count = len(points)
+            for i in range(len(curved)):
+                n1 = NSPoint(*points[i])
+                n2 = NSPoint(*points[(i + 1) % count])
                 
                 y_min = min(n1.y, n2.y)
                 y_max = max(n1.y, n2.y)
@@ -287,7 +287,7 @@ class XBeamInspector(object):
                         t = (y - n1.y) / (n2.y - n1.y)
                         x_intersect = n1.x + t * (n2.x - n1.x)
                         
-                        is_curved = self.isCurvedSegment(n1, n2)
+                        is_curved = curved[i]
                         
                         factor = 1.0
                         angle = 0
@@ -540,6 +540,10 @@ class XBeamInspector(object):
         vertical_problems = {}
         curve_problems = {}
         diagonal_problems = {}
+
+        # Només es guarden els contorns dels glifs d'aquesta inspecció
+        names = set(glyph.name for glyph in glyphs)
+        self._flatCache = dict((key, value) for key, value in self._flatCache.items() if key[0] in names)
         
         for glyph in glyphs:
             try:
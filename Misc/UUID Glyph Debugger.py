@@ -14,9 +14,16 @@ Find glyphs by UUID or character/name and display detailed information"""
 
 
 from GlyphsApp import *
+import os
+import sys
 import uuid
 from vanilla import Window, Tabs, TextBox, EditText, Button, TextEditor
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import fontIndex
+
 def findGlyphByUUID(uuid_string):
     """
     Find a glyph by its UUID and display detailed information
@@ -36,13 +43,7 @@ def findGlyphByUUID(uuid_string):
         output_lines.append(f"❌ Invalid UUID format: {uuid_string}")
         return "\n".join(output_lines)
     
-    found_glyph = None
-    
-    # Search in all font glyphs
-    for glyph in font.glyphs:
-        if glyph.id.lower() == uuid_string.lower():
-            found_glyph = glyph
-            break
+    found_glyph = fontIndex.indexForFont(font).glyphForID(uuid_string)
     
     if found_glyph:
         output_lines.extend(getGlyphInfo(found_glyph))
@@ -86,11 +87,10 @@ def findGlyphByCharacter(char_or_name):
         output_lines.append(f"🔤 Character: '{char}' (U+{unicode_hex})")
         
         # Search by Unicode
-        for glyph in font.glyphs:
-            if hasattr(glyph, 'unicode') and glyph.unicode == unicode_hex:
-                found_glyphs.append(glyph)
-                output_lines.append(f"✅ Found by Unicode: {glyph.name}")
-                break
+        glyph = fontIndex.indexForFont(font).glyphForUnicode(unicode_hex)
+        if glyph:
+            found_glyphs.append(glyph)
+            output_lines.append(f"✅ Found by Unicode: {glyph.name}")
         
         # Search by unicode name
         if unicode_name in font.glyphs and font.glyphs[unicode_name] not in found_glyphs:
@@ -244,14 +244,7 @@ def findUUIDInKerning(search_string):
 
 def nameForID(font, ID):
     """Helper function to get glyph name from ID"""
-    try:
-        if isinstance(ID, str) and ID.startswith("@"):
-            return ID
-        else:
-            glyph = font.glyphForId_(ID)
-            return glyph.name if glyph else str(ID)
-    except:
-        return str(ID)
+    return fontIndex.indexForFont(font).nameForID(ID) or str(ID)
 
 class UUIDInspector:
     def __init__(self):
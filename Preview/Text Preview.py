@@ -23,8 +23,15 @@ from AppKit import (
 )
 
 from Foundation import NSUserDefaults
+import os
+import sys
 import uuid
 
+_LIBRARIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Libraries")
+if _LIBRARIES not in sys.path:
+    sys.path.insert(0, _LIBRARIES)
+from kernCore import kerningWatch
+
 
 BACKGROUNDS = {
     0: NSColor.whiteColor(),
@@ -32,6 +39,9 @@ BACKGROUNDS = {
     2: NSColor.blackColor(),
 }
 
+# Kerning edits that post no notification are picked up after this many seconds
+KERNING_RESCAN_SECONDS = 5.0
+
 
 # ---------------------------------------------------------
 # SAFE NSVIEW CLASS
@@ -284,14 +294,38 @@ class TextViewerPro(object):
             None
         )
 
+        # Every kerning edit in Glyphs closes an undo group
+        for name in (
+            "NSUndoManagerDidCloseUndoGroupNotification",
+            "NSUndoManagerDidUndoChangeNotification",
+            "NSUndoManagerDidRedoChangeNotification",
+        ):
+            nc.addObserver_selector_name_object_(
+                self,
+                "kerningMayHaveChanged:",
+                name,
+                None
+            )
+
         self.updatePreviewSize()
     
+    def kerningMayHaveChanged_(self, notification):
+        """Mark the kerning to be re-read on the next timer tick"""
+        if not self.isAlive:
+            return
+
+        f = Glyphs.font
+        if f:
+            kerningWatch.sharedWatch.markDirty(f)
+
     def fontChanged_(self, notification):
         """Called when font changes (including kerning edits)"""
         if not self.isAlive:
             return
             
         f = Glyphs.font
+        if f:
+            kerningWatch.sharedWatch.markDirty(f)
         if f and f.masters:
             newNames = [m.name for m in f.masters]
             if newNames != self.masterNames:
@@ -521,22 +555,20 @@ class TextViewerPro(object):
     # ---------------------------------------------------------
 
     def getKerningSignature(self):
-        """Generate a signature of current kerning to detect changes"""
+        """Kerning version of the previewed master; only moves when its kerning changes"""
         f = Glyphs.font
-        if not f:
-            return None
-        
-        kerning = f.kerning
-        if not kerning:
+        master = self.currentMaster()
+        if not f or not master:
             return None
-        
-        sig_items = []
-        for master_id, master_kerning in kerning.items():
-            if master_kerning:
-                for pair, value in master_kerning.items():
-                    sig_items.append(f"{master_id}:{pair}:{value}")
-        
-        return tuple(sorted(sig_items))
+
+        return (
+            master.id,
+            kerningWatch.sharedWatch.version(
+                f,
+                master.id,
+                KERNING_RESCAN_SECONDS
+            )
+        )
 
     def layoutGlyphs(self):
         positioned = []